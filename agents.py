@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+import numpy as np
+
+from market_stats import RETURN_WINDOWS
+
+# --- 가상 투자자 (시장 참여자) ---
+# 학생 말고도 시장에 참여하는 가상 투자자 무리가 날마다 주문을 내고, 그 순매수/순매도가 주가를 움직인다.
+#   momentum    최근 lookback 일 동안 오른 종목을 사고 내린 종목을 판다 (lookback 은 1/5/20일 중 하나)
+#   contrarian  반대로 오른 종목을 팔고 내린 종목을 산다
+#   news        그날 뉴스 해설의 섹터 영향을 따라 사고판다
+# 투자자마다 관심 종목(watchlist) 몇 개와 민감도, 주문 크기가 정해져 있다.
+# 하루 결정은 (투자자 × 관심 종목) 배열 하나로 한 번에 계산한다: 신호 모으기 → 잡음 → 문턱값 → 주문 크기,
+# 종목별 순주문은 bincount 로 합친다. 계산량은 투자자 수 × 관심 종목 수에 비례하고 전체 종목 수와는 상관없다.
+# 가격 영향: 종목의 순주문을 그 종목을 보는 투자자 주문 여력 합으로 나눈 쏠림(-1 ~ 1)에
+#   영향 = impact × 부호 × √|쏠림|  (제곱근 가격 영향). 투자자 수가 늘어도 쏠림의 크기는 그대로라 영향이 커지지 않는다.
+
+AGENT_TYPES = ("momentum", "contrarian", "news")
+DEFAULT_AGENTS = {"momentum": 1200, "contrarian": 900, "news": 900, "impact": 0.01}   # 기본 카탈로그 종목당 주문 약 650건
+WATCHLIST_SIZE = 8     # 투자자 한 명이 보는 종목 수
+DEAD_ZONE = 0.5        # 신호가 이보다 약하면 주문하지 않음 (표준화한 신호 기준)
+DECISION_NOISE = 0.5   # 투자자마다 다르게 판단하는 잡음의 표준편차 (균등 분포로 뽑음)
+
+
+class AgentPopulation:
+    """가상 투자자 무리 (한 번 만들면 읽기 전용이라 세션끼리 공유해도 됨)."""
+
+    def __init__(self, n_stocks, counts, watchlist_size=WATCHLIST_SIZE, seed=0):
+        rng = np.random.default_rng(seed)
+        self.n_stocks = n_stocks
+        sizes = [int(counts.get(kind, 0)) for kind in AGENT_TYPES]
+        self.n_agents = sum(sizes)
+        kind = np.repeat(np.arange(len(AGENT_TYPES)), sizes)
+        # 신호 행 번호: [momentum × 기간들, contrarian × 기간들, news]
+        windows = len(RETURN_WINDOWS)
+        lookback = rng.integers(0, windows, size=self.n_agents)
+        self.signal_row = np.where(kind == 2, 2 * windows, kind * windows + lookback).astype(np.intp)
+        self.sensitivity = rng.lognormal(0.0, 0.5, size=self.n_agents).astype(np.float32)
+        self.order_size = rng.lognormal(0.0, 1.0, size=self.n_agents).astype(np.float32)
+        self.watchlist = rng.integers(0, max(1, n_stocks), size=(self.n_agents, watchlist_size), dtype=np.intp)
+        # (투자자 × 관심 종목) 칸을 펼친 배열들: 신호 행렬에서 바로 꺼낼 위치, 민감도, 주문 크기
+        self._cells = self.watchlist.ravel()
+        self._signal_cells = (self.signal_row[:, None] * n_stocks + self.watchlist).ravel()
+        self._cell_sensitivity = np.repeat(self.sensitivity, watchlist_size)
+        self._cell_size = np.repeat(self.order_size, watchlist_size)
+        # 종목별 주문 여력 (그 종목을 보는 투자자의 주문 크기 합): 쏠림을 -1 ~ 1 로 맞추는 분모
+        self.depth = np.bincount(self._cells, weights=self._cell_size, minlength=n_stocks)
+
+    def signals(self, returns, stock_news):
+        """(신호 종류 × 종목) 표준화 신호 행렬. returns 는 기간 -> 종목별 수익률(%) (NaN 가능)."""
+        rows = [returns[window] for window in RETURN_WINDOWS]
+        rows = rows + [-row for row in rows] + [np.asarray(stock_news, dtype=np.float64)]
+        matrix = np.nan_to_num(np.stack(rows))
+        scale = matrix.std(axis=1, keepdims=True)
+        return np.divide(matrix, scale, out=np.zeros_like(matrix), where=scale > 0).astype(np.float32)
+
+    def order_flow(self, signals, rng):
+        """하루치 주문을 한 번에 결정해 종목별 순주문(주문 크기 단위)을 돌려준다."""
+        decision = signals.ravel().take(self._signal_cells)
+        decision *= self._cell_sensitivity
+        noise = rng.random(decision.shape, dtype=np.float32) # 표준편차가 DECISION_NOISE 인 균등 잡음
+        noise -= np.float32(0.5)
+        noise *= np.float32(DECISION_NOISE * 12 ** 0.5)
+        decision += noise
+        orders = np.clip(decision, -1, 1)
+        orders[np.abs(decision) <= DEAD_ZONE] = 0
+        orders *= self._cell_size
+        return np.bincount(self._cells, weights=orders, minlength=self.n_stocks)
+
+    def price_impacts(self, returns, stock_news, rng, impact=DEFAULT_AGENTS["impact"]):
+        """종목별 가격 영향(일간 수익률에 더할 값)."""
+        flow = self.order_flow(self.signals(returns, stock_news), rng)
+        imbalance = np.divide(flow, self.depth, out=np.zeros_like(flow), where=self.depth > 0)
+        return impact * np.sign(imbalance) * np.sqrt(np.abs(imbalance))
+
+
+@lru_cache(maxsize=8)
+def get_population(n_stocks, counts, seed=0):
+    """종목 수와 투자자 구성((종류, 수) tuple) 별 투자자 무리. 같은 카탈로그면 프로세스 안에서 한 번만 만든다."""
+    return AgentPopulation(n_stocks, dict(counts), seed=seed)
@@ -0,0 +1,88 @@
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+
+# --- 프로세스 공용 이벤트 루프 ---
+# LLM 호출과 저장소 읽기/쓰기 같은 I/O 는 백그라운드 스레드 하나에서 도는 이벤트 루프에서 비동기로 처리한다.
+# Streamlit 스크립트(동기 코드)는 run() 으로 결과를 기다리거나 submit() 으로 맡겨 두고 바로 돌아간다.
+# 여러 세션의 요청이 같은 루프에서 겹쳐 진행되므로 I/O 를 기다리는 동안 스레드를 하나씩 붙잡지 않는다.
+# 루프 안의 코루틴에서는 st.session_state 나 st.* 를 건드리지 않는다 (스크립트 실행 문맥이 없음).
+
+_loop = None
+_lock = threading.Lock()
+
+
+def get_loop():
+    """공용 이벤트 루프 (처음 부를 때 데몬 스레드에서 시작)."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="aio-loop", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro):
+    """코루틴을 공용 루프에 맡기고 concurrent.futures.Future 를 돌려준다 (기다리지 않음)."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=None):
+    """코루틴을 공용 루프에서 실행하고 결과를 기다린다 (동기 코드용 다리)."""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("공용 이벤트 루프 안에서는 run() 대신 await 를 쓰세요.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+async def execute(query):
+    """저장소 질의 실행. execute 가 코루틴 함수면(비동기 클라이언트) 기다리고, 동기면 작업 스레드에서 실행한다."""
+    if inspect.iscoroutinefunction(query.execute):
+        return await query.execute()
+    return await asyncio.to_thread(query.execute)
+
+
+# --- 키별 순서 보장 ---
+# 같은 사용자의 저장처럼 순서가 중요한 작업은 키별 asyncio.Lock 으로 맡긴 순서대로 하나씩 실행한다.
+# (run_coroutine_threadsafe 로 맡긴 순서대로 코루틴이 시작되고, asyncio.Lock 은 기다린 순서대로 넘겨준다)
+# 키의 마지막 작업이 끝나면 그 키의 잠금과 Future 를 지운다 (세션이 끝난 사용자 키가 쌓이지 않도록).
+# 맡기기와 _latest 갱신을 _lock 안에서 함께 하므로, 끝난 작업이 아직 마지막이면 그 키로 대기 중인 작업은 없다.
+_key_locks = {}   # 키 -> asyncio.Lock
+_latest = {}      # 키 -> 마지막으로 맡긴 작업의 Future
+
+
+def submit_serial(key, coro):
+    """key 가 같은 작업끼리는 맡긴 순서대로 실행되도록 코루틴을 맡긴다."""
+    async def ordered():
+        lock = _key_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            return await coro
+
+    def forget(future):
+        with _lock:
+            if _latest.get(key) is future:
+                del _latest[key]
+                _key_locks.pop(key, None)
+
+    loop = get_loop()
+    with _lock:
+        future = asyncio.run_coroutine_threadsafe(ordered(), loop)
+        _latest[key] = future
+    future.add_done_callback(forget)
+    return future
+
+
+def wait_serial(key, timeout=None):
+    """key 로 맡긴 작업이 모두 끝날 때까지 기다린다 (실패한 작업의 예외는 던지지 않음)."""
+    with _lock:
+        future = _latest.get(key)
+    if future is not None:
+        concurrent.futures.wait([future], timeout)
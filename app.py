@@ -1,13 +1,32 @@
+import asyncio
+import functools
 import os
 import streamlit as st
-import random
-import time
-import pandas as pd
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import date
-import plotly.express as px
-from openai import OpenAI
 import json
-from supabase import create_client, Client
+import logging
+import numpy as np
+import aio
+import backtest
+import engine
+from engine import LEVELS, TradeError
+from backends import FakeLLMBackend, OpenAIBackend, SQLiteStore
+from news_corpus import CorpusBackend, get_corpus
+from scenario import load_scenario
+from session_memory import IDLE_CHECK_SECONDS, SPILLED_KEY, SessionMemory
+from state_store import open_state_store, user_key
+from ticker_search import get_ticker_index, matches
+from usage import MeteredLLM, UsageMeter, load_budgets
+import tracing
+from ledger import BUY
+from universe import load_universe
+from glossary import GLOSSARY
+from hedging import LatencyGuard, load_deadlines
+from scheduler import LLMScheduler, load_rate_limits
+# pandas, plotly.express, openai, supabase 는 처음 쓰는 곳에서 불러온다 (로그인 화면을 빨리 띄우기 위함).
+# 파이썬이 모듈을 한 번만 불러오므로 두 번째부터는 함수 안의 import 도 비용이 거의 없다.
 
 # --- Streamlit 설정 ---
 st.set_page_config(
@@ -151,702 +170,399 @@ div[data-testid="stToast"] {
     unsafe_allow_html=True,
 )
 
-# --- API 키 설정 ---
-if "OPENAI_API_KEY" not in os.environ:
-    st.error("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다. API 키를 설정해주세요.")
+# --- 외부 상태 저장소 (state_store.py) ---
+# STATE_STORE_URL (sqlite:///경로 또는 redis://...) 을 설정하면 사용자별 게임 상태와 수준별 LLM 예산 카운터를
+# 모든 앱 프로세스가 함께 보는 저장소에 둔다 (워커를 여러 개 띄울 때). users 테이블은 계정 확인에만 쓴다.
+# 워커는 자기 메모리의 상태를 믿지 않고 실행마다 저장소의 버전을 확인해, 다른 워커가 더 새로 저장했으면 다시 불러온다.
+# (LEDGER_DIR 를 쓴다면 모든 워커가 같은 폴더를 봐야 한다)
+@st.cache_resource
+def get_state_store():
+    return open_state_store()
+
+try:
+    state_store = get_state_store()
+except (ImportError, OSError, ValueError) as e:
+    st.error(f"상태 저장소에 연결하지 못했습니다: {e}")
     st.stop()
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
-# --- Supabase 설정 ---
+# --- LLM 백엔드 설정 ---
+# LLM_BACKEND=fake 이면 네트워크 없이 로컬 FakeLLMBackend 사용 (FAKE_LLM_LATENCY, FAKE_LLM_JITTER: 초 단위 지연)
+# LLM_BACKEND=corpus 이면 오프라인 뉴스 코퍼스(news_corpus.py, NEWS_CORPUS_PATH)에서 뉴스와 해설을 뽑음 (API 키 불필요)
+# 코퍼스가 있으면 예산을 다 쓴 사용자(offline 단계)도 템플릿 대신 코퍼스 뉴스를 받는다.
+# LLM_MODEL (기본 gpt-4o-mini), LLM_CHEAP_MODEL: 수준별 예산을 넘었을 때 쓸 더 싼 모델 (usage.py 참고)
+# LLM_BUDGETS: 수준별 예산 JSON, LLM_USAGE_LOG: 호출별 사용량을 덧붙여 기록할 JSON Lines 파일
+# LLM_DEADLINES: 종류(news/explanation)별 마감 시간(초) JSON, LLM_HEDGE=0 이면 p95 헤지 요청을 보내지 않음 (hedging.py)
+# LLM_RATE_LIMITS: 프로세스 전체 분당 한도 JSON ({"requests_per_minute": .., "tokens_per_minute": ..}, scheduler.py)
+# 사용량 계량기와 예산은 모든 세션이 공유해야 하므로 프로세스에 하나만 만든다.
+# LLM 요청은 공용 이벤트 루프(aio.py)에서 비동기로 보내므로, 여러 세션의 요청이 스레드를 붙잡지 않고 겹쳐 진행된다.
+@st.cache_resource
+def get_llm(backend, model, cheap_model, latency=0.0, jitter=0.0):
+    corpus = get_corpus()
+    offline = CorpusBackend(corpus) if corpus else None
+    if backend == "corpus":
+        primary, cheap = offline or FakeLLMBackend(), None
+    elif backend == "fake":
+        primary, cheap = FakeLLMBackend(latency=latency, jitter=jitter), None
+    else:
+        # OpenAI 클라이언트는 첫 호출 때 만들어진다 (OpenAIBackend.client)
+        primary = OpenAIBackend(model=model, api_key=os.environ["OPENAI_API_KEY"])
+        cheap = OpenAIBackend(model=cheap_model, api_key=os.environ["OPENAI_API_KEY"]) if cheap_model and cheap_model != model else None
+    meter = UsageMeter(journal_path=os.environ.get("LLM_USAGE_LOG"), shared=state_store)
+    guard = LatencyGuard(load_deadlines(), hedge=os.environ.get("LLM_HEDGE", "1") != "0")
+    return MeteredLLM(primary, meter=meter, budgets=load_budgets(), cheap=cheap, offline=offline, guard=guard,
+                      scheduler=LLMScheduler(load_rate_limits()))
+
+if os.environ.get("LLM_BACKEND") == "fake":
+    llm = get_llm("fake", "fake", None, float(os.environ.get("FAKE_LLM_LATENCY", 0)), float(os.environ.get("FAKE_LLM_JITTER", 0)))
+elif os.environ.get("LLM_BACKEND") == "corpus":
+    llm = get_llm("corpus", "corpus", None)
+else:
+    if "OPENAI_API_KEY" not in os.environ:
+        st.error("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다. API 키를 설정해주세요.")
+        st.stop()
+    llm = get_llm("openai", os.environ.get("LLM_MODEL", "gpt-4o-mini"), os.environ.get("LLM_CHEAP_MODEL"))
+
+# --- 저장소 설정 (Supabase) ---
+# STORE_BACKEND=sqlite 이면 SQLITE_PATH (기본 users.db) 의 로컬 users 테이블 사용
+# Supabase 는 비동기 클라이언트로 공용 이벤트 루프에서 호출하고, SQLite 는 루프의 작업 스레드에서 실행한다 (store_execute).
+@st.cache_resource
+def get_sqlite_store(path):
+    return SQLiteStore(path)
+
+@st.cache_resource
+def get_supabase_client(url, key):
+    from supabase import acreate_client
+    return aio.run(acreate_client(url, key))
+
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
+if os.environ.get("STORE_BACKEND") != "sqlite" and (not SUPABASE_URL or not SUPABASE_KEY):
     st.warning("Supabase URL 또는 Key가 설정되지 않았습니다. 데이터 저장/로드가 불가능합니다.")
-    supabase = None
-else:
+
+def get_store():
+    """사용자 저장소 (프로세스에 하나). 실제 로그인/저장 때 처음 만들어진다. 사용할 수 없으면 None."""
+    if os.environ.get("STORE_BACKEND") == "sqlite":
+        return get_sqlite_store(os.environ.get("SQLITE_PATH", "users.db"))
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        return None
     try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        return get_supabase_client(SUPABASE_URL, SUPABASE_KEY)
     except Exception as e:
         st.error(f"Supabase 클라이언트 생성 실패: {e}")
-        supabase = None
+        return None
+
+def store_execute(query):
+    """저장소 질의를 공용 이벤트 루프에서 실행하고 결과를 기다린다."""
+    return aio.run(aio.execute(query))
+
+def session_llm():
+    """현재 세션의 계량 LLM. 비동기 경로(acomplete)에서 쓰도록 필요한 값만 일반 dict 로 복사해 둔다."""
+    keys = ("user_id", "selected_level", "day_count")
+    return llm.session({key: st.session_state[key] for key in keys if key in st.session_state})
+
+# --- 세션 메모리 (session_memory.py) ---
+# 오래 쉬는 세션의 게임 상태(주가 기록, 원장, 뉴스 등)는 압축 파일로 내려두고 다음 상호작용 때 다시 불러온다.
+# SESSION_IDLE_SECONDS (기본 600), SESSION_MEMORY_BUDGET_MB (세션당, 기본 8), SESSION_MEMORY_TOTAL_MB (전체, 기본 512),
+# SESSION_SPILL_DIR (기본 임시 폴더 아래 stockgame-sessions) 로 조정한다.
+@st.cache_resource
+def get_session_memory():
+    return SessionMemory()
+
+session_memory = get_session_memory()
+
+def session_activity(func):
+    """스크립트/패널 실행 동안 세션을 실행 중으로 표시하고, 내려둔 상태가 있으면 먼저 다시 불러온다."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return func(*args, **kwargs)
+        try:
+            session_memory.begin(ctx.session_id, st.session_state)
+        except (OSError, ValueError):
+            clear_login_state()
+            st.session_state["_restore_failed"] = True
+            st.rerun()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session_memory.end(ctx.session_id, st.session_state)
+    return wrapper
+
+@st.fragment(run_every=IDLE_CHECK_SECONDS)
+def session_housekeeping():
+    """화면이 열려 있는 동안 주기적으로 돌며, 내려둘 차례가 된 이 세션의 상태를 이 세션의 실행 안에서 내려둔다."""
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        session_memory.idle(ctx.session_id, st.session_state)
 
 # --- 수준별 설정 ---
-LEVELS = {
-    "초등": {"name": "초등 (5~6학년)", "initial_cash": 1_000_000, "grade_level": "초등학생 5~6학년"},
-    "중등": {"name": "중등 (1~3학년)", "initial_cash": 5_000_000, "grade_level": "중학생 1~3학년"},
-    "고등": {"name": "고등 (1~3학년)", "initial_cash": 10_000_000, "grade_level": "고등학생 1~3학년"},
-}
+# LEVELS (수준별 이름, 초기 자본금, 학년, 주가 변동성) 는 engine.py 에 정의
+
+# --- 종목 카탈로그 ---
+# 종목, 섹터, 초기 가격 범위, 수준별 설명은 data/stock_universe.csv (또는 STOCK_UNIVERSE_PATH) 에서 읽어옴
+# load_universe 는 파일이 바뀌지 않는 한 프로세스 안에서 한 번만 파싱함
+try:
+    STOCK_UNIVERSE = load_universe()
+except (OSError, ValueError, KeyError) as e:
+    st.error(f"종목 카탈로그를 불러오지 못했습니다: {e}")
+    st.stop()
 
-# --- 수준별 주식 설명 ---
-# (각 수준에 맞게 설명을 수정하거나 추가)
-STOCK_DESCRIPTIONS = {
-    "초등": {
-        "삼성전자": "TV, 스마트폰 만드는 회사! 갤럭시 알지? 반도체 칩도 세계 최고!",
-        "SK하이닉스": "컴퓨터, 스마트폰의 기억력 담당! 사진, 영상 저장 도와줘.",
-        "LG디스플레이": "TV, 스마트폰 화면 만드는 회사! OLED 기술로 선명하게!",
-        "현대자동차": "자동차 만드는 회사! 쏘나타, 아이오닉 들어봤지? 전기차도 만들어.",
-        "기아": "디자인 예쁜 자동차 회사! K5, 쏘렌토, EV6 멋지지?",
-        "현대모비스": "자동차 부품 만드는 회사! 엔진, 브레이크 등 안전 부품 담당.",
-        "LG에너지솔루션": "전기차 배터리 세계 1등! 미래 에너지 책임져.",
-        "SK이노베이션": "기름 만들고, 플라스틱 원료도 만들어. 전기차 배터리도!",
-        "두산에너빌리티": "전기 만드는 발전소 짓는 회사! 원자력, 풍력 발전소도.",
-        "네이버": "궁금한 거 검색하는 네이버! 뉴스, 웹툰, 쇼핑 다 있어.",
-        "카카오": "카카오톡 만든 회사! 택시, 페이, 게임 등 편리한 서비스 가득.",
-        "카카오뱅크": "스마트폰 은행! 앱으로 쉽게 돈 보내고 관리해.",
-        "CJ제일제당": "맛있는 음식 만드는 회사! 햇반, 비비고 만두 알지?",
-        "아모레퍼시픽": "화장품 만드는 회사! 설화수, 이니스프리 들어봤지?",
-        "LG생활건강": "샴푸, 치약, 화장품 만드는 회사! 코카콜라도 팔아.",
-        "KB금융": "KB국민은행 있는 금융 회사! 돈 관리 도와줘.",
-        "신한지주": "신한은행 있는 금융 회사! 카드, 보험도 있어.",
-        "하나금융지주": "하나은행 있는 금융 회사! 외국 돈 거래 잘해.",
-        "삼성물산": "건물 짓고, 옷도 팔고, 에버랜드도 운영해!",
-        "HD현대": "큰 배 만들고, 굴착기 같은 건설 기계도 만들어.",
-        "GS건설": "아파트 '자이' 짓는 회사! 살기 좋은 집 만들어.",
-        "롯데쇼핑": "롯데백화점, 롯데마트 운영! 쇼핑은 여기서!",
-        "이마트": "큰 마트 이마트! 없는 거 빼고 다 있어. 노브랜드 유명해.",
-        "KT": "인터넷, 스마트폰 통신 회사! 전화, TV 서비스 제공.",
-        "SK텔레콤": "스마트폰 통신 1등 회사! 빠른 5G 서비스 제공.",
-        "삼성바이오로직스": "특별한 약(바이오 의약품) 만드는 회사! 아픈 사람 도와줘.",
-        "셀트리온": "바이오 의약품 개발하고 만드는 회사! 병 치료 도와줘.",
-        "LG화학": "플라스틱, 배터리 만드는 화학 회사! 생활 곳곳에 있어.",
-        "금호석유화학": "타이어 원료(합성고무) 만드는 회사! 산업에 꼭 필요해.",
-        "POSCO홀딩스": "튼튼한 철 만드는 회사! 자동차, 건물에 쓰여.",
-        "현대제철": "자동차, 건물용 철 만드는 회사! 현대차 그룹이야.",
-        "대한항공": "비행기 회사! 해외여행 갈 때 타는 비행기.",
-        "HMM": "큰 배로 물건 실어 나르는 회사! 수출입 도와줘.",
-        "CJ ENM": "tvN, Mnet 방송국 운영! 영화, 음악도 만들어.",
-        "하이브": "BTS 소속사! 아이돌 키우고 음악 만들어.",
-        "오리온": "초코파이, 포카칩 만드는 과자 회사!",
-        "농심": "신라면, 짜파게티 만드는 라면 회사!",
-    },
-    "중등": { # 중등 수준 설명 (기존 설명 활용 또는 약간 수정)
-        "삼성전자": "대한민국 대표 전자 기업. 스마트폰(갤럭시), TV, 가전제품 및 반도체(메모리, 시스템LSI) 생산. 글로벌 시장 점유율 높음.",
-        "SK하이닉스": "메모리 반도체(DRAM, NAND Flash) 전문 기업. 데이터센터, PC, 모바일 기기 등에 필수적인 부품 공급.",
-        "LG디스플레이": "디스플레이 패널(OLED, LCD) 생산 기업. TV, 스마트폰, 노트북, 차량용 디스플레이 등에 사용. OLED 기술 선도.",
-        "현대자동차": "국내 1위, 글로벌 상위권 자동차 제조사. 내연기관차, 전기차(아이오닉), 수소차(넥쏘) 등 다양한 라인업 보유.",
-        "기아": "현대차그룹 계열 자동차 제조사. K시리즈, 쏘렌토, 스포티지 등 인기 모델 보유. 디자인 경쟁력 강조 및 전기차(EV) 라인업 확장 중.",
-        "현대모비스": "현대차그룹 핵심 부품 계열사. 자동차 모듈, 핵심 부품(전동화, 램프 등), A/S 부품 사업 영위.",
-        "LG에너지솔루션": "글로벌 전기차 배터리 시장 선두 기업. 파우치형 배터리 강점. GM, 현대차 등 다수 완성차 업체에 공급.",
-        "SK이노베이션": "정유, 석유화학, 윤활유 및 배터리 사업 영위. SK온을 통해 전기차 배터리 사업 확장 중.",
-        "두산에너빌리티": "발전 설비(원자력, 화력, 풍력 등) 및 플랜트 건설 전문 기업. 해수담수화, SMR(소형모듈원전), 가스터빈 등 신사업 추진.",
-        "네이버": "국내 1위 검색 포털. 검색, 커머스, 핀테크(네이버페이), 콘텐츠(웹툰), 클라우드 등 다양한 인터넷 서비스 제공.",
-        "카카오": "국민 메신저 카카오톡 기반 플랫폼 기업. 모빌리티, 페이, 게임, 웹툰, 뱅크 등 다양한 생활 밀착형 서비스 확장.",
-        "카카오뱅크": "인터넷 전문 은행. 비대면 금융 서비스 강점. 간편 송금, 대출, 예적금 상품 제공. 플랫폼 기반 성장 추구.",
-        "CJ제일제당": "국내 대표 식품 기업. 햇반, 비비고 등 HMR(가정간편식) 강자. 바이오(아미노산 등), 사료 사업도 영위. 글로벌 확장 중.",
-        "아모레퍼시픽": "국내 1위 화장품 기업. 설화수, 라네즈, 이니스프리 등 다수 브랜드 보유. 중국 시장 의존도 높았으나 다변화 노력 중.",
-        "LG생활건강": "화장품(후, 숨, 오휘), 생활용품(페리오, 엘라스틴), 음료(코카콜라) 사업 영위. 럭셔리 화장품 강점.",
-        "KB금융": "국내 리딩 금융지주사. KB국민은행, KB증권, KB손해보험 등 계열사 보유. 은행 중심 안정적 수익 구조.",
-        "신한지주": "KB금융과 경쟁하는 리딩 금융지주사. 신한은행, 신한카드, 신한금융투자 등 보유. 비은행 부문 경쟁력 강화 노력.",
-        "하나금융지주": "주요 금융지주사 중 하나. 하나은행, 하나증권, 하나카드 등 보유. 외환 및 글로벌 부문 강점.",
-        "삼성물산": "삼성그룹 지배구조 핵심. 건설(래미안), 상사, 패션(빈폴), 리조트(에버랜드), 바이오(삼성바이오로직스 지분) 등 다양한 사업 영위.",
-        "HD현대": "조선(HD한국조선해양), 건설기계(HD현대인프라코어, HD현대건설기계), 에너지(HD현대오일뱅크) 등 중공업 중심 그룹 지주사.",
-        "GS건설": "주택 브랜드 '자이'로 유명한 대형 건설사. 주택, 건축, 플랜트, 인프라 등 다양한 건설 사업 영위.",
-        "롯데쇼핑": "롯데그룹 유통 부문 핵심. 백화점, 마트, 슈퍼, 아울렛, 이커머스(롯데ON) 등 운영. 오프라인 채널 강점.",
-        "이마트": "신세계그룹 계열 국내 1위 대형마트. 창고형 할인점(트레이더스), 전문점(노브랜드), 온라인(SSG닷컴) 등 운영.",
-        "KT": "유무선 통신 서비스 제공. 인터넷, IPTV, 이동통신 등. B2B(클라우드, AI) 및 미디어/콘텐츠 사업 확장 중.",
-        "SK텔레콤": "국내 1위 이동통신사. 5G 네트워크 경쟁력. AI, 메타버스, 구독 서비스 등 신성장 동력 발굴.",
-        "삼성바이오로직스": "바이오의약품 위탁개발생산(CDMO) 전문 기업. 글로벌 최대 규모 생산 능력 보유. 높은 기술력과 신뢰도 강점.",
-        "셀트리온": "바이오시밀러(바이오의약품 복제약) 개발 및 생산 기업. 램시마, 트룩시마 등 글로벌 시장 판매. 신약 개발도 추진.",
-        "LG화학": "석유화학, 첨단소재(배터리 소재 등), 생명과학 사업 영위. 배터리 소재 부문 성장성 주목.",
-        "금호석유화학": "합성고무(타이어 원료), 합성수지(플라스틱 원료) 주력 화학 기업. 페놀유도체 등 정밀화학 제품도 생산.",
-        "POSCO홀딩스": "국내 1위, 글로벌 경쟁력 갖춘 철강 기업 포스코의 지주사. 철강 외 이차전지소재, 수소 등 친환경 미래소재 사업 육성.",
-        "현대제철": "현대차그룹 계열 철강사. 자동차 강판, 건설용 형강/철근 등 생산. 전기로 기반 친환경 생산 전환 추진.",
-        "대한항공": "국내 1위, FSC(Full Service Carrier) 항공사. 여객 및 화물 운송 사업. 아시아나항공 인수 추진 중.",
-        "HMM": "국내 최대 컨테이너 선사. 글로벌 해운 얼라이언스 '디 얼라이언스' 회원사. 해운 시황에 따른 실적 변동성 큼.",
-        "CJ ENM": "미디어(tvN, Mnet), 영화(CJ엔터테인먼트), 음악(스톤뮤직), 커머스 사업 영위. 콘텐츠 제작 및 유통 역량 보유.",
-        "하이브": "BTS 소속사로 시작한 글로벌 엔터테인먼트 기업. 멀티 레이블 체제. 위버스 플랫폼 기반 팬덤 비즈니스 확장.",
-        "오리온": "초코파이로 유명한 제과 기업. 중국, 베트남, 러시아 등 해외 시장 성공적 진출. 간편대용식, 바이오 사업 진출 모색.",
-        "농심": "신라면, 짜파게티 등 대표 라면 브랜드 보유. 스낵(새우깡 등), 음료 사업도 영위. 해외 시장, 특히 미국 성장세 주목.",
-    },
-    "고등": { # 고등 수준 설명 (기존 설명 + 심화 내용)
-        "삼성전자": "글로벌 IT 리더. DX(Device eXperience: 스마트폰, 가전)와 DS(Device Solutions: 반도체) 부문 영위. 파운드리 경쟁력 강화 및 AI 반도체 시장 대응 중요.",
-        "SK하이닉스": "메모리 반도체 강자. HBM(고대역폭메모리) 등 AI 서버용 고성능 메모리 수요 증가 수혜 기대. NAND 시장 업황 회복 주목.",
-        "LG디스플레이": "대형 OLED 시장 주도. IT용 OLED 및 차량용 P-OLED 등 신시장 개척. LCD 사업 축소 및 OLED 전환 가속화.",
-        "현대자동차": "글로벌 완성차 업체. 전용 전기차 플랫폼 E-GMP 기반 아이오닉 시리즈 호평. SDV(소프트웨어 중심 자동차) 전환 및 미래 모빌리티(UAM, 로보틱스) 투자 확대.",
-        "기아": "현대차그룹 내 디자인 및 EV 특화 브랜드. EV 라인업 성공적 안착. PBV(목적기반모빌리티) 시장 선점 목표.",
-        "현대모비스": "자동차 핵심 부품 공급사. 전동화, 자율주행 관련 핵심 기술 내재화 노력. 그룹사 외 수주 확대 및 소프트웨어 역량 강화 필요.",
-        "LG에너지솔루션": "글로벌 Top-tier 배터리 셀 제조사. 북미 중심 생산 능력 확대. 원통형, 파우치형, LFP 등 다양한 폼팩터 및 소재 기술 보유. IRA 수혜 기대.",
-        "SK이노베이션": "정유/화학 기반 에너지 기업. 배터리 자회사 SK온의 흑자 전환 및 IPO 추진 중요. 카본 투 그린(Carbon to Green) 전략 실행.",
-        "두산에너빌리티": "전력 인프라 핵심 기업. 원전 생태계 복원 및 SMR 기술 개발 선도. 가스터빈 국산화 및 수소, 풍력 등 친환경 에너지 포트폴리오 강화.",
-        "네이버": "국내 최대 인터넷 플랫폼. 검색 광고, 커머스 중심 안정적 성장. AI(하이퍼클로바X), 클라우드, 웹툰 글로벌 확장 등 미래 성장 동력 확보 노력.",
-        "카카오": "모바일 플랫폼 기반 서비스 확장. 카카오톡 채널 및 광고 수익화. 모빌리티, 페이 등 주요 자회사 수익성 개선 및 규제 리스크 관리 중요.",
-        "카카오뱅크": "대표적인 인터넷 전문 은행. 중저신용자 대출 확대 및 플랫폼 비즈니스 강화. 금리 환경 변화 및 핀테크 경쟁 심화 대응 필요.",
-        "CJ제일제당": "식품(K-Food 글로벌 확산), 바이오(스페셜티 아미노산), F&C(사료) 사업 포트폴리오. 수익성 중심 경영 및 재무구조 개선 노력.",
-        "아모레퍼시픽": "화장품 산업 대표 기업. 중국 의존도 축소 및 북미, 유럽 등 신시장 개척. 온라인 채널 강화 및 브랜드 리빌딩 진행 중.",
-        "LG생활건강": "화장품, 생활용품, 음료 3개 부문 안정적 사업 구조. 중국 리오프닝 효과 및 북미 사업 성과 주목. 브랜드 포트폴리오 관리 중요.",
-        "KB금융": "리딩 금융그룹. 은행의 안정적 이익 기반 위에 비은행(증권, 보험, 카드) 시너지 창출. 디지털 전환 및 비금융 플랫폼 확장 노력.",
-        "신한지주": "균형 잡힌 사업 포트폴리오. 비은행 부문 이익 기여도 증대 노력. 글로벌 및 자본시장 부문 경쟁력 강화. 주주환원 정책 확대.",
-        "하나금융지주": "은행 중심 금융그룹. 기업금융 및 외환 부문 강점. 비은행 경쟁력 강화 및 디지털 금융 혁신 추진.",
-        "삼성물산": "삼성그룹 사실상 지주회사 역할. 보유 지분 가치(삼성전자, 삼성바이오로직스 등) 중요. 건설 수주 및 상사 트레이딩 실적, 신사업(친환경 에너지 등) 성과 주목.",
-        "HD현대": "조선 부문 업황 개선 수혜. 건설기계 북미/신흥국 인프라 투자 수혜. 정유 부문 실적 안정화 및 로봇, AI 등 신기술 투자.",
-        "GS건설": "주택 시장 변동성 영향. 해외 플랜트 수주 및 신사업(모듈러 주택, 수처리 등) 성과 중요. 재무 건전성 관리 필요.",
-        "롯데쇼핑": "백화점, 마트 등 오프라인 유통 강자. 이커머스(롯데ON) 경쟁력 강화 및 수익성 개선 과제. 해외 사업(베트남 등) 성과 주목.",
-        "이마트": "오프라인 할인점 경쟁력 유지 및 온라인(SSG닷컴, G마켓) 시너지 창출 노력. SCK컴퍼니(스타벅스) 실적 기여. 수익성 개선 집중.",
-        "KT": "통신 본업 안정성 기반 비통신(미디어, 클라우드, AI) 성장 추구. CEO 리스크 해소 후 성장 전략 구체화. 주주환원 정책 유지.",
-        "SK텔레콤": "견조한 무선 사업 실적. AI 컴퍼니 전환 목표(에이닷 등). T우주(구독), 이프랜드(메타버스) 등 신사업 성과 가시화 필요.",
-        "삼성바이오로직스": "글로벌 CDMO 시장 지배력 강화. 4공장 가동 및 5공장 증설 계획. ADC(항체-약물 접합체) 등 차세대 기술 투자.",
-        "셀트리온": "바이오시밀러 퍼스트무버. 미국 시장 직판 체제 구축. 휴미라, 스텔라라 등 블록버스터 바이오시밀러 출시 예정. 신약 개발 역량 강화.",
-        "LG화학": "기초소재(석유화학), 첨단소재(양극재 등), 생명과학 사업 영위. LG에너지솔루션 지분 가치 반영. 친환경 소재 및 배터리 소재 집중 육성.",
-        "금호석유화학": "합성고무/수지 등 주력 제품 시황 중요. NB라텍스(의료용 장갑 소재) 수요 변화 주목. 주주환원 정책 및 신성장 동력 확보 노력.",
-        "POSCO홀딩스": "철강 사업 안정성 및 친환경 전환. 이차전지소재(리튬, 니켈, 양/음극재) 밸류체인 구축 가속화. 수소 사업 비전 제시.",
-        "현대제철": "자동차 강판 등 그룹사 물량 기반 안정적 실적. 건설 시황 영향. 탄소중립 목표 달성 위한 수소환원제철 기술 개발 중요.",
-        "대한항공": "여객 수요 회복 및 견조한 화물 실적. 유가 및 환율 변동성 영향. 아시아나항공 인수 관련 불확실성 해소 필요.",
-        "HMM": "컨테이너 운임 시황 민감. 선대 확장 및 효율화 노력. 매각 이슈 및 글로벌 해운 동맹 재편 영향 주목.",
-        "CJ ENM": "방송 광고 시장 둔화 영향. 티빙(OTT) 성장 및 수익성 개선 과제. 피프스시즌(미국 제작사) 등 글로벌 콘텐츠 경쟁력 강화.",
-        "하이브": "멀티 레이블 체제 안착 및 신인 그룹 성공적 데뷔. 위버스 플랫폼 수익 모델 다각화. 게임, AI 등 신규 사업 확장.",
-        "오리온": "견고한 국내 및 해외(중국, 베트남, 러시아) 실적. 제품 카테고리 확장(간편대용식 등) 및 신규 시장 진출 모색. 바이오 사업 투자.",
-        "농심": "국내외 라면 시장 지배력. 해외 법인 고성장 지속. 비용 상승 부담 완화 및 판가 인상 효과. 건강기능식품 등 신사업 추진.",
-    }
-}
+# --- 시나리오 ---
+# SCENARIO_PATH 의 사건 파일을 시작할 때 (거래일 × 섹터) 충격 행렬로 미리 계산해 두고, 하루 지나기 때 engine 에 넘김
+# 형식 오류는 불러오는 여기서만 알린다: 처음 불러올 때는 앱을 멈추고, 실행 중 파일을 고치다 틀리면 직전 시나리오를 계속 씀
+@st.cache_resource
+def last_scenario():
+    return {}
+
+try:
+    SCENARIO = load_scenario(STOCK_UNIVERSE.sectors)
+    last_scenario()["scenario"] = SCENARIO
+except (OSError, ValueError) as e:
+    if "scenario" not in last_scenario():
+        st.error(f"시나리오 파일을 불러오지 못했습니다: {e}")
+        st.stop()
+    SCENARIO = last_scenario()["scenario"]
+    st.warning(f"시나리오 파일을 다시 불러오지 못해 이전 시나리오를 계속 씁니다: {e}", icon="⚠️")
 
 # --- 수준별 용어 사전 ---
-GLOSSARY = {
-    "초등": {
-        "주식": "회사의 작은 조각. 이걸 사면 나도 회사 주인!",
-        "주가": "주식 1개의 가격. 사고 싶은 사람이 많으면 오르고, 팔고 싶은 사람이 많으면 내려.",
-        "매수": "주식을 사는 것. '나 이 회사 주식 살래!'",
-        "매도": "주식을 파는 것. '나 이 주식 팔아서 돈으로 바꿀래!'",
-        "포트폴리오": "내가 가진 주식과 현금 꾸러미. 어떤 주식을 얼마나 가졌는지 보여줘.",
-        "수익률": "내가 투자한 돈이 얼마나 늘었는지 알려주는 숫자. (%)",
-        "상승": "주가가 오르는 것. 기분 좋아!",
-        "하락": "주가가 내리는 것. 조금 슬퍼.",
-        "변동": "주가가 오르락내리락 춤추는 것.",
-        "투자": "돈을 불리기 위해 주식 같은 곳에 돈을 넣는 것.",
-        "섹터": "비슷한 일을 하는 회사들 모임. (예: 자동차 회사 모임, 과자 회사 모임)",
-        "전일 대비": "어제랑 비교해서 주가가 얼마나 변했는지 보여주는 것.",
-        "뉴스": "세상 소식. 회사에 좋은 소식도 있고, 나쁜 소식도 있어.",
-        "현금": "내가 지금 바로 쓸 수 있는 돈.",
-        "평가액": "내가 가진 주식들을 지금 가격으로 계산하면 얼마인지 알려주는 것.",
-        "손익": "내가 돈을 벌었는지(이익), 잃었는지(손해) 알려주는 것.",
-    },
-    "중등": {
-        "주식": "기업이 자금을 모으기 위해 발행하는 소유권 증서. 주주는 회사의 일부를 소유.",
-        "주가": "시장에서 거래되는 주식 1주당 가격. 수요와 공급에 따라 결정됨.",
-        "매수": "주식을 사는 행위. 가격 상승을 기대하고 구매.",
-        "매도": "보유한 주식을 파는 행위. 이익 실현 또는 손실 확정 목적.",
-        "포트폴리오": "투자자가 보유한 다양한 자산(주식, 채권, 현금 등)의 구성.",
-        "수익률": "투자 원금 대비 발생한 이익의 비율. (총 평가액 - 총 투자금) / 총 투자금 * 100%",
-        "상승": "주가가 이전 가격보다 오르는 현상.",
-        "하락": "주가가 이전 가격보다 내리는 현상.",
-        "변동성": "주가나 시장 지수가 움직이는 정도. 변동성이 크면 가격 변화가 심함.",
-        "투자": "미래의 수익을 기대하고 현재의 자금을 투입하는 행위.",
-        "섹터": "산업 분류. 비슷한 사업을 영위하는 기업들의 그룹 (예: IT 섹터, 바이오 섹터).",
-        "전일 대비 등락률": "오늘 종가가 어제 종가에 비해 얼마나 변동했는지 백분율로 표시.",
-        "뉴스 (경제)": "기업 실적, 경제 지표 발표, 정책 변화 등 주가에 영향을 미칠 수 있는 정보.",
-        "현금": "즉시 사용 가능한 자금. 포트폴리오 내 유동성 자산.",
-        "평가액 (주식)": "보유 주식 수량 × 현재 주가. 포트폴리오의 현재 가치.",
-        "손익": "매수 가격과 현재(또는 매도) 가격의 차이로 발생하는 이익 또는 손실.",
-        "시가총액": "기업의 전체 주식 가치. 주가 × 총 발행 주식 수.",
-        "배당금": "기업이 이익의 일부를 주주에게 나눠주는 돈.",
-    },
-    "고등": {
-        "주식 (보통주)": "기업의 소유권을 나타내는 대표적인 유가증권. 의결권과 배당권 보유.",
-        "주가": "자본시장에서 결정되는 주식의 시장 가격. 기업 가치, 업황, 경제 상황 등 복합적 요인 반영.",
-        "매수 (Long Position)": "가격 상승을 예상하고 특정 자산을 매입하는 것.",
-        "매도 (Short Selling / Position Closing)": "보유 자산을 팔거나(청산), 가격 하락을 예상하고 빌려서 파는 것(공매도).",
-        "포트폴리오": "위험 분산 및 수익 극대화를 위해 여러 자산에 분산 투자한 집합.",
-        "수익률 (CAGR, 누적)": "투자기간 동안의 연평균 복합 수익률 또는 총 누적 수익률.",
-        "상승 (Bull Market)": "주식 시장이 전반적으로 장기간 상승하는 추세.",
-        "하락 (Bear Market)": "주식 시장이 전반적으로 장기간 하락하는 추세.",
-        "변동성 (Volatility)": "자산 가격의 변동 정도를 나타내는 통계적 지표. 표준편차 등으로 측정.",
-        "투자 (Investment)": "자본을 투입하여 미래의 자본 이득이나 소득 증대를 추구하는 행위.",
-        "섹터/산업": "경제 활동 영역에 따른 기업 분류 (GICS, KRX 산업분류 등). 경기 순환과의 연관성 분석.",
-        "전일 대비 등락률": "기준 시점(주로 전일 종가) 대비 가격 변화율. 시장 모멘텀 파악 지표.",
-        "뉴스 (거시/미시)": "금리, 환율, GDP 등 거시경제 지표 및 개별 기업 뉴스(실적, M&A, 신기술 등).",
-        "현금 (Cash Equivalents)": "현금 및 단기 금융상품. 포트폴리오의 안정성 및 기회 확보 수단.",
-        "평가액 (Mark-to-Market)": "보유 자산을 현재 시장 가격으로 평가한 금액.",
-        "손익 (실현/미실현)": "매매를 통해 확정된 손익(실현)과 평가상의 손익(미실현).",
-        "시가총액 (Market Capitalization)": "기업의 규모와 시장 가치를 나타내는 지표.",
-        "배당수익률": "주가 대비 배당금의 비율. 투자 매력도 판단 지표 중 하나.",
-        "PER (주가수익비율)": "주가 / 주당순이익(EPS). 기업의 수익성 대비 주가 수준 평가.",
-        "PBR (주가순자산비율)": "주가 / 주당순자산(BPS). 기업의 자산가치 대비 주가 수준 평가.",
-        "ROE (자기자본이익률)": "당기순이익 / 자기자본. 기업의 수익성 및 효율성 지표.",
-    }
-}
+# GLOSSARY 는 glossary.py 에 정의 (프로세스에서 한 번만 만들어짐)
 
 # --- 세션 상태 초기화 ---
 def initialize_session_state(selected_level):
-    level_info = LEVELS[selected_level]
-    initial_cash = level_info["initial_cash"]
-
-    # 포트폴리오 초기화 (기존 데이터 없거나 리셋 필요 시)
-    if "portfolio" not in st.session_state or st.session_state.get("force_reset"):
-        st.session_state["portfolio"] = {"cash": initial_cash, "stocks": {}}
-        st.session_state["initial_cash_set"] = initial_cash # 초기 자본금 기록
-        if "force_reset" in st.session_state:
-            del st.session_state["force_reset"] # 리셋 플래그 제거
-
-    # 주식 정보 초기화 (기존 데이터 없거나 리셋 필요 시)
-    if "stocks" not in st.session_state or not st.session_state["stocks"]: # stocks가 비어있을 때도 초기화
-        st.session_state["stocks"] = {}
-        base_stocks_data = { # 기본 구조만 정의
-            "기술(Tech)": ["삼성전자", "SK하이닉스", "LG디스플레이"],
-            "자동차(Auto)": ["현대자동차", "기아", "현대모비스"],
-            "에너지(Energy)": ["LG에너지솔루션", "SK이노베이션", "두산에너빌리티"],
-            "인터넷(Internet)": ["네이버", "카카오", "카카오뱅크"],
-            "소비재(Consumer Goods)": ["CJ제일제당", "아모레퍼시픽", "LG생활건강"],
-            "금융(Finance)": ["KB금융", "신한지주", "하나금융지주"],
-            "건설(Construction)": ["삼성물산", "HD현대", "GS건설"],
-            "유통(Retail)": ["롯데쇼핑", "이마트"],
-            "통신(Telecom)": ["KT", "SK텔레콤"],
-            "제약/바이오(Pharma/Bio)": ["삼성바이오로직스", "셀트리온"],
-            "화학(Chemical)": ["LG화학", "금호석유화학"],
-            "철강(Steel)": ["POSCO홀딩스", "현대제철"],
-            "운송(Transportation)": ["대한항공", "HMM"],
-            "엔터테인먼트(Entertainment)": ["CJ ENM", "하이브"],
-            "식품(Food)": ["오리온", "농심"],
-        }
-        # 각 수준별 설명 매핑 및 초기 가격 설정
-        for sector, stock_list in base_stocks_data.items():
-            st.session_state["stocks"][sector] = {}
-            for stock_name in stock_list:
-                # 초기 가격 랜덤 설정 (기존 로직 유지, 약간의 조정 가능)
-                if stock_name in ["삼성전자", "SK하이닉스", "기아", "KB금융", "신한지주", "HD현대", "GS건설", "KT", "SK텔레콤", "현대제철", "대한항공", "HMM", "카카오", "카카오뱅크"]:
-                    price = random.randint(30000, 90000) # 범위 약간 조정
-                elif stock_name in ["LG디스플레이", "두산에너빌리티", "하나금융지주"]:
-                     price = random.randint(15000, 45000)
-                elif stock_name in ["현대자동차", "현대모비스", "SK이노베이션", "네이버", "아모레퍼시픽", "삼성물산", "롯데쇼핑", "이마트", "셀트리온", "금호석유화학", "CJ ENM", "하이브", "오리온"]:
-                     price = random.randint(120000, 280000)
-                elif stock_name in ["LG에너지솔루션", "CJ제일제당", "POSCO홀딩스", "농심"]:
-                     price = random.randint(280000, 450000)
-                elif stock_name in ["LG생활건강", "삼성바이오로직스", "LG화학"]:
-                     price = random.randint(500000, 800000)
-                else:
-                     price = random.randint(50000, 150000) # 기본값
-
-                st.session_state["stocks"][sector][stock_name] = {
-                    "current_price": price,
-                    "price_history": [price], # 초기 가격 기록
-                    "description_초등": STOCK_DESCRIPTIONS["초등"].get(stock_name, "설명 없음"),
-                    "description_중등": STOCK_DESCRIPTIONS["중등"].get(stock_name, "설명 없음"),
-                    "description_고등": STOCK_DESCRIPTIONS["고등"].get(stock_name, "설명 없음"),
-                }
-
-    # 나머지 세션 상태 초기화 (기존 로직 유지, 필요시 추가)
-    if "chat_session" not in st.session_state: st.session_state["chat_session"] = []
-    if "news_analysis_results" not in st.session_state: st.session_state["news_analysis_results"] = {}
-    if "messages" not in st.session_state: st.session_state["messages"] = []
-    if "daily_news" not in st.session_state: st.session_state["daily_news"] = None
-    if "previous_daily_news" not in st.session_state: st.session_state["previous_daily_news"] = None
-    # if "news_date" not in st.session_state: st.session_state["news_date"] = None # 날짜 사용 안 함
-    if "news_meanings" not in st.session_state: st.session_state["news_meanings"] = {}
-    # if "ai_news_analysis_output" not in st.session_state: st.session_state["ai_news_analysis_output"] = {} # 사용 안 함
-    if "day_count" not in st.session_state: st.session_state["day_count"] = 1
-    if "sector_news_impact" not in st.session_state: st.session_state["sector_news_impact"] = {}
+    # 게임 상태(포트폴리오, 원장, 주식, 뉴스 등)는 엔진에서 초기화
+    engine.initialize_state(st.session_state, selected_level, universe=STOCK_UNIVERSE,
+                            force_reset=st.session_state.get("force_reset", False))
+    if "force_reset" in st.session_state:
+        del st.session_state["force_reset"] # 리셋 플래그 제거
+
+    # 화면 전용 상태 초기화
     if 'buy_confirm' not in st.session_state: st.session_state['buy_confirm'] = False
     if 'sell_confirm' not in st.session_state: st.session_state['sell_confirm'] = False
-    if 'user_id' not in st.session_state: st.session_state['user_id'] = None
     if 'user_settings' not in st.session_state: st.session_state['user_settings'] = None
-    if 'selected_level' not in st.session_state: st.session_state['selected_level'] = "초등" # 기본값
 
 # --- 뉴스 생성 함수 (수준별) ---
 def generate_news():
-    selected_level = st.session_state.get('selected_level', '초등')
-    level_info = LEVELS[selected_level]
-    grade_level_text = level_info['grade_level']
-
-    if selected_level == '초등':
-        level_instruction = f"{grade_level_text} 수준에 맞춰 아주 쉽고 구체적인 예시(예: 장난감, 과자, 게임)를 들어 설명해주세요. 어려운 경제 용어(예: 금리, 환율, 인플레이션)는 최대한 피하고, 일상 생활과 관련된 내용으로 작성해주세요."
-        sentence_count = "8~10문장"
-    elif selected_level == '중등':
-        level_instruction = f"{grade_level_text} 수준에 맞춰 작성해주세요. 기본적인 경제 개념(예: 수요와 공급, 경쟁, 인기 상품)을 포함해도 좋습니다. 너무 전문적이지 않게 설명해주세요."
-        sentence_count = "10~12문장"
-    else: # 고등
-        level_instruction = f"{grade_level_text} 수준에 맞춰 작성해주세요. 경제 지표(예: 성장률, 실업률), 국제 관계, 기술 트렌드, 금리 변동 등 좀 더 심도 있는 내용을 다루어도 좋습니다. 분석적인 시각을 포함해주세요."
-        sentence_count = "12~15문장"
-
-    prompt = f"""
-지시:
-{level_instruction}
-주식 시장과 경제에 관련된 뉴스 기사 5개를 생성해주세요.
-각 기사는 {sentence_count} 정도로 자세하게 작성하고, 특정 회사 이름이나 주식 종목을 직접적으로 언급하지 마세요.
-학생들이 뉴스를 읽고 어떤 종류의 회사가 유망할지 또는 어려움을 겪을지 스스로 추론할 수 있도록, 일반적인 경제 상황이나 특정 산업(예: IT, 자동차, 게임, 식품, 에너지 등) 동향에 대한 뉴스를 만들어주세요.
-긍정적인 뉴스, 부정적인 뉴스, 중립적인 뉴스를 다양하게 포함하되, '긍정적/부정적/중립적'이라는 단어는 뉴스 본문에 쓰지 마세요.
-뉴스 내용에 따라 관련 주식들의 가격이 오르거나 내릴 수 있는 단서를 포함해주세요.
-각 뉴스 기사는 "## 뉴스 [번호]" 로 시작해주세요. (예: ## 뉴스 1, ## 뉴스 2 ...)
-
-**생성된 뉴스 기사:**
-"""
-    messages = [{"role": "user", "content": prompt}]
-
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", # 또는 gpt-4o
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1500, # 토큰 수 조정 가능
-            top_p=0.95,
-            frequency_penalty=0,
-            presence_penalty=0
-        )
-        news_text = response.choices[0].message.content.strip()
-
-        news_articles = []
-        if news_text:
-            # "## 뉴스 " 기준으로 나누고, 빈 문자열 제거
-            raw_articles = news_text.split("## 뉴스 ")
-            for article in raw_articles:
-                if article.strip():
-                    # 뉴스 번호 제거 및 공백 제거
-                    content = article.split('\n', 1)[-1].strip() if '\n' in article else article.strip()
-                    if content: # 내용이 있는 경우에만 추가
-                         # 뉴스 번호 부분 제거 (예: "1\n뉴스 내용..." -> "뉴스 내용...")
-                        if content and content[0].isdigit() and content[1:3] in ['\n', '. ']:
-                             content = content.split('\n', 1)[-1].strip()
-                        news_articles.append(content)
-
-        # 정확히 5개가 생성되지 않았을 경우 처리 (예: 부족하면 빈 문자열 추가, 많으면 자르기)
-        if len(news_articles) < 5:
-            news_articles.extend(["(뉴스 생성 실패)"] * (5 - len(news_articles)))
-        return news_articles[:5]
-
+        return aio.run(engine.agenerate_news(st.session_state.get('selected_level', '초등'), session_llm().acomplete))
     except Exception as e:
         st.error(f"뉴스 생성 중 오류 발생: {e}")
-        return ["(뉴스 생성 오류)"] * 5
-
+        return [engine.NEWS_ERROR] * engine.NEWS_COUNT
 
 # --- 뉴스 해설 함수 (수준별) ---
-def explain_daily_news_meanings(daily_news):
-    if daily_news is None:
-        return {}
-
-    selected_level = st.session_state.get('selected_level', '초등')
-    level_info = LEVELS[selected_level]
-    grade_level_text = level_info['grade_level']
-
-    if selected_level == '초등':
-        level_instruction = f"{grade_level_text}이 이해하기 쉽게 아주 쉬운 단어로 2~3문장 이내로 요약해주세요. 비유나 쉬운 예시를 사용하면 좋습니다."
-    elif selected_level == '중등':
-        level_instruction = f"{grade_level_text}이 이해하기 쉽게 핵심 내용을 3문장 정도로 요약해주세요. 관련 경제 용어가 있다면 간단히 설명해주세요."
-    else: # 고등
-        level_instruction = f"{grade_level_text}이 이해할 수 있도록 핵심 내용과 이 뉴스가 경제나 특정 산업에 미칠 수 있는 잠재적 영향을 3-4문장 정도로 분석적으로 요약해주세요."
-
-    meanings = {}
-    valid_sectors_list = list(st.session_state["stocks"].keys()) # 미리 목록 생성
-
-    for i, news_article in enumerate(daily_news):
-        if "(뉴스 생성 오류)" in news_article or "(뉴스 생성 실패)" in news_article:
-             meanings[str(i + 1)] = {"explanation": "뉴스 생성에 실패하여 해설할 수 없습니다.", "sectors": []}
-             continue
-
-        prompt = f"""
-**신문 기사:**
-{news_article}
-
-**지시:**
-위 신문 기사의 핵심 의미를 {level_instruction} "해설: " 다음에 설명해주세요.
-그리고 이 뉴스와 가장 관련성이 높은 주식 섹터 1~2개를 쉼표로 구분해서 "관련 섹터: " 다음에 알려주세요. 제시된 섹터 목록 [{', '.join(valid_sectors_list)}] 중에서만 선택하고, 관련 섹터가 명확하지 않거나 없다면 "관련 섹터: 없음" 이라고 해주세요.
-
-뉴스 의미 해설:
-"""
-        messages = [{"role": "user", "content": prompt}]
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini", # 또는 gpt-4o
-                messages=messages,
-                temperature=0.5,
-                max_tokens=300,
-                top_p=0.95,
-                frequency_penalty=0,
-                presence_penalty=0
-            )
-            meaning_text = response.choices[0].message.content.strip()
-
-            explanation = ""
-            related_sectors = []
-
-            # "해설:" 부분 추출
-            if "해설:" in meaning_text:
-                explanation_start_index = meaning_text.find("해설:") + len("해설:")
-                # "관련 섹터:" 앞까지 또는 문자열 끝까지 추출
-                explanation_end_index = meaning_text.find("관련 섹터:")
-                if explanation_end_index != -1:
-                    explanation = meaning_text[explanation_start_index:explanation_end_index].strip()
-                else:
-                    explanation = meaning_text[explanation_start_index:].strip()
-            else:
-                explanation = "AI 해설 생성에 실패했습니다." # 해설 태그가 없는 경우
-
-            # "관련 섹터:" 부분 추출
-            if "관련 섹터:" in meaning_text:
-                related_sectors_str = meaning_text.split("관련 섹터:")[-1].strip()
-                if related_sectors_str.lower() != "없음" and related_sectors_str:
-                    # 제시된 섹터 목록과 비교하여 유효한 섹터만 필터링
-                    potential_sectors = [sector.strip() for sector in related_sectors_str.split(',')]
-                    related_sectors = [s for s in potential_sectors if s in valid_sectors_list] # 미리 생성한 목록 사용
-                else:
-                    related_sectors = [] # "없음" 또는 빈 문자열인 경우 빈 리스트
-            else:
-                 related_sectors = [] # 관련 섹터 태그가 없는 경우
-
-            meanings[str(i + 1)] = {"explanation": explanation, "sectors": related_sectors}
+def show_news_error(news_number, error):
+    if news_number == 0:
+        st.error(f"뉴스 생성 중 오류 발생: {error}")
+    else:
+        st.error(f"뉴스 {news_number} 해설 중 오류 발생: {error}")
 
-        except Exception as e:
-            st.error(f"뉴스 {i+1} 해설 중 오류 발생: {e}")
-            meanings[str(i + 1)] = {"explanation": f"오류 발생: {e}", "sectors": []}
-        time.sleep(0.5) # API 호출 간격
-    return meanings
+def news_lookup():
+    """오프라인 뉴스 코퍼스에서 미리 해설된 기사를 찾는 함수 (코퍼스가 없으면 None)."""
+    corpus = get_corpus()
+    return corpus.tagged_meaning if corpus else None
 
-# --- 주식 매수/매도 함수 (기존과 동일, 메시지 처리 강화) ---
+# --- 주식 매수/매도 함수 (체결은 엔진, 메시지 표시는 화면에서) ---
 def buy_stock(stock_name, quantity, sector):
-    if (
-        sector not in st.session_state["stocks"]
-        or stock_name not in st.session_state["stocks"][sector]
-    ):
-        st.error("존재하지 않는 주식 종목입니다.")
-        st.toast("존재하지 않는 주식 종목입니다.", icon="❌")
-        return
-
-    if quantity <= 0:
-        st.error("매수 수량은 1주 이상이어야 합니다.")
-        st.toast("매수 수량은 1주 이상이어야 합니다.", icon="❌")
-        return
-
-    stock_price = st.session_state["stocks"][sector][stock_name]["current_price"]
-    total_price = stock_price * quantity
-
-    if st.session_state["portfolio"]["cash"] >= total_price:
-        st.session_state["portfolio"]["cash"] -= total_price
-        portfolio_stocks = st.session_state["portfolio"]["stocks"]
-        if stock_name in portfolio_stocks:
-            # 평균 매수 단가 재계산
-            current_quantity = portfolio_stocks[stock_name]["quantity"]
-            current_total_purchase = portfolio_stocks[stock_name]["purchase_price"] * current_quantity
-            new_quantity = current_quantity + quantity
-            new_total_purchase = current_total_purchase + total_price
-            portfolio_stocks[stock_name]["quantity"] = new_quantity
-            portfolio_stocks[stock_name]["purchase_price"] = new_total_purchase / new_quantity if new_quantity > 0 else 0
-        else:
-            portfolio_stocks[stock_name] = {
-                "quantity": quantity,
-                "purchase_price": stock_price, # 첫 매수 시 매수 단가는 현재가
-            }
-        success_msg = f"{stock_name} {quantity}주 매수 완료! (총 {total_price:,.0f}원)"
-        st.success(success_msg)
-        st.toast(success_msg, icon="✅")
-        st.session_state['buy_confirm'] = False # 확인 상태 초기화
-        save_session_data() # 상태 저장
-    else:
-        max_quantity = st.session_state["portfolio"]["cash"] // stock_price if stock_price > 0 else 0
-        error_msg = f"잔액 부족! (최대 {max_quantity}주 매수 가능)"
-        st.error(error_msg)
-        st.toast(error_msg, icon="❌")
+    try:
+        total_price = engine.buy_stock(st.session_state, stock_name, quantity, sector)
+    except TradeError as e:
+        st.error(str(e))
+        st.toast(str(e), icon="❌")
         st.session_state['buy_confirm'] = False # 확인 상태 초기화
-
-def sell_stock(stock_name, quantity):
-    if stock_name not in st.session_state["portfolio"]["stocks"]:
-        st.error("보유하고 있지 않은 주식입니다.")
-        st.toast("보유하고 있지 않은 주식입니다.", icon="❌")
-        return
-
-    owned_quantity = st.session_state["portfolio"]["stocks"][stock_name]["quantity"]
-
-    if quantity <= 0:
-        st.error("매도 수량은 1주 이상이어야 합니다.")
-        st.toast("매도 수량은 1주 이상이어야 합니다.", icon="❌")
-        return
-
-    if quantity > owned_quantity:
-        st.error(f"매도 가능 수량 초과! (최대 {owned_quantity}주 매도 가능)")
-        st.toast(f"매도 가능 수량 초과! (최대 {owned_quantity}주 매도 가능)", icon="❌")
         return
+    success_msg = f"{stock_name} {quantity}주 매수 완료! (총 {total_price:,.0f}원)"
+    st.success(success_msg)
+    st.toast(success_msg, icon="✅")
+    st.session_state['buy_confirm'] = False # 확인 상태 초기화
+    save_session_data() # 상태 저장
 
-    # 현재가 찾기
-    stock_price = 0
-    stock_sector = ""
-    for sector, stocks_in_sector in st.session_state["stocks"].items():
-        if stock_name in stocks_in_sector:
-            stock_price = stocks_in_sector[stock_name]["current_price"]
-            stock_sector = sector
-            break
-
-    if stock_price <= 0: # 0 또는 음수 가격 오류 방지
-        st.error("주식 가격 정보를 찾을 수 없거나 유효하지 않습니다.")
-        st.toast("주식 가격 정보를 찾을 수 없거나 유효하지 않습니다.", icon="❌")
+def sell_stock(stock_name, quantity):
+    try:
+        sell_value, realized_profit = engine.sell_stock(st.session_state, stock_name, quantity)
+    except TradeError as e:
+        st.error(str(e))
+        st.toast(str(e), icon="❌")
         return
-
-    sell_value = stock_price * quantity
-    st.session_state["portfolio"]["cash"] += sell_value
-    st.session_state["portfolio"]["stocks"][stock_name]["quantity"] -= quantity
-
-    # 보유 수량이 0이 되면 포트폴리오에서 제거
-    if st.session_state["portfolio"]["stocks"][stock_name]["quantity"] == 0:
-        del st.session_state["portfolio"]["stocks"][stock_name]
-
-    success_msg = f"{stock_name} {quantity}주 매도 완료! (+{sell_value:,.0f}원)"
+    success_msg = f"{stock_name} {quantity}주 매도 완료! (+{sell_value:,.0f}원, 실현 손익 {realized_profit:+,.0f}원)"
     st.success(success_msg)
     st.toast(success_msg, icon="✅")
     st.session_state['sell_confirm'] = False # 확인 상태 초기화
     save_session_data() # 상태 저장
 
-# --- 주가 업데이트 함수 (기존과 유사, 뉴스 영향 반영) ---
-def update_stock_prices():
-    if not st.session_state.get("news_meanings"): # 뉴스가 아니라 뉴스 해설 기준으로 변경
-        # 뉴스가 없으면 랜덤 변동만 적용
-        for sector in st.session_state["stocks"]:
-            for stock_name in st.session_state["stocks"][sector]:
-                change_rate = random.uniform(-0.03, 0.03) # 기본 변동폭
-                change_rate = max(-0.1, min(0.1, change_rate)) # 최대 변동폭 제한
-                current_price = st.session_state["stocks"][sector][stock_name]["current_price"]
-                new_price = current_price * (1 + change_rate)
-                new_price = max(1, int(new_price)) # 최소 1원
-                st.session_state["stocks"][sector][stock_name]["current_price"] = new_price
-                st.session_state["stocks"][sector][stock_name]["price_history"].append(new_price)
+# --- 주가 업데이트 함수 (팩터 모델 + 뉴스 영향 반영) ---
+def show_price_update_message(had_news):
+    if had_news:
+        st.info("뉴스 영향을 반영하여 주가가 변동되었습니다.")
+        st.toast("주가가 변동되었습니다.", icon="📊")
+    else:
         st.info("주가가 임의로 변동되었습니다.")
         st.toast("주가가 임의로 변동되었습니다.", icon="📈")
-        st.session_state["sector_news_impact"] = {} # 뉴스 영향 없음
-        return
-
-    # 뉴스 해설 기반 섹터 영향 계산
-    sector_impacts = {sector: 0.0 for sector in st.session_state["stocks"]}
-    news_meanings = st.session_state["news_meanings"]
-
-    for news_index, meaning_data in news_meanings.items():
-        explanation = meaning_data.get("explanation", "")
-        related_sectors = meaning_data.get("sectors", [])
-
-        # 간단한 감성 분석 (긍정/부정 키워드 기반)
-        positive_keywords = ["성장", "증가", "호황", "개발 성공", "수출 증가", "인기", "기대", "긍정적", "개선", "호조", "확대"]
-        negative_keywords = ["감소", "하락", "부진", "어려움", "위기", "경쟁 심화", "규제", "부정적", "악화", "축소", "둔화"]
-
-        sentiment_score = 0
-        # 설명에서 키워드 빈도 계산 (간단 버전)
-        for p_kw in positive_keywords:
-            sentiment_score += explanation.count(p_kw)
-        for n_kw in negative_keywords:
-            sentiment_score -= explanation.count(n_kw)
-
-        # 관련 섹터에 영향 적용 (점수 기반으로 영향력 조절)
-        impact_magnitude = 0.0 # 기본 영향력 0
-        if sentiment_score > 0:
-            impact_magnitude = random.uniform(0.01, 0.04) * min(sentiment_score, 3) # 영향력 상한선 설정
-        elif sentiment_score < 0:
-            impact_magnitude = random.uniform(-0.04, -0.01) * min(abs(sentiment_score), 3) # 영향력 상한선 설정
-
-        for sector in related_sectors:
-            if sector in sector_impacts:
-                sector_impacts[sector] += impact_magnitude
-
-    # 개별 주가 업데이트 (기본 변동 + 섹터 영향)
-    for sector in st.session_state["stocks"]:
-        sector_impact = sector_impacts.get(sector, 0.0)
-        for stock_name in st.session_state["stocks"][sector]:
-            # 기본 랜덤 변동 (변동폭 약간 줄임)
-            random_change = random.uniform(-0.02, 0.02)
-            # 총 변동률 = 기본 변동 + 섹터 영향
-            total_change_rate = random_change + sector_impact
-            # 변동률 제한 (예: 하루 최대 +/- 15%)
-            total_change_rate = max(-0.15, min(0.15, total_change_rate))
-
-            current_price = st.session_state["stocks"][sector][stock_name]["current_price"]
-            new_price = current_price * (1 + total_change_rate)
-            # 가격이 0 이하로 떨어지지 않도록 최소 1원으로 설정
-            new_price = max(1, int(new_price))
-
-            st.session_state["stocks"][sector][stock_name]["current_price"] = new_price
-            st.session_state["stocks"][sector][stock_name]["price_history"].append(new_price)
-
-    st.info("뉴스 영향을 반영하여 주가가 변동되었습니다.")
-    st.toast("주가가 변동되었습니다.", icon="📊")
-    st.session_state["sector_news_impact"] = sector_impacts # 디버깅 또는 정보 제공용
 
 
 # --- 포트폴리오 정보 계산 함수 ---
 def calculate_portfolio_summary():
-    portfolio = st.session_state.get("portfolio", {"cash": 0, "stocks": {}}) # 기본값 설정
-    cash = portfolio.get("cash", 0)
-    total_stock_value = 0
-    total_purchase_value = 0
-
-    for stock_name, stock_info in portfolio.get("stocks", {}).items():
-        quantity = stock_info.get("quantity", 0)
-        purchase_price = stock_info.get("purchase_price", 0)
-        current_price = 0
-        # 현재가 찾기
-        for sector, stocks_in_sector in st.session_state.get("stocks", {}).items():
-            if stock_name in stocks_in_sector:
-                current_price = stocks_in_sector[stock_name].get("current_price", 0)
-                break
-        if current_price > 0 and quantity > 0:
-            total_stock_value += current_price * quantity
-            total_purchase_value += purchase_price * quantity
-
-    total_value = cash + total_stock_value
-    # 초기 자본금 가져오기 (없으면 현재 레벨 기본값 사용)
-    initial_cash = st.session_state.get("initial_cash_set", LEVELS[st.session_state.get('selected_level', '초등')]['initial_cash'])
-
-    total_profit_loss = total_value - initial_cash
-    total_profit_rate = (total_profit_loss / initial_cash) * 100 if initial_cash > 0 else 0
-
-    return cash, total_value, total_profit_loss, total_profit_rate, initial_cash
+    return engine.calculate_portfolio_summary(st.session_state)
 
 # --- 화면 표시 함수 ---
+# 표/매매/뉴스 패널은 st.fragment 로 감싸서, 패널 안의 입력(수량 변경, 확인/취소 클릭 등)은 그 패널만 다시 실행한다.
+# 체결처럼 사이드바 잔고까지 바뀌는 경우에만 st.rerun() 으로 전체 화면을 다시 그린다.
+
+def rerun_panel():
+    """패널(fragment) 재실행 중이면 그 패널만, 전체 실행 중이면 전체 화면을 다시 실행한다."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException: # scope="fragment" 는 패널 재실행 중에만 쓸 수 있음
+        st.rerun()
+
+def cached_view(name, key, build):
+    """같은 입력이면 패널용 표를 다시 만들지 않도록 세션에 보관한다.
+
+    주가는 하루 지나기(day_count 증가)나 새 게임/복원(stocks 객체 교체) 때만 바뀌므로 둘을 기본 키로 쓴다.
+    """
+    stocks = st.session_state.get("stocks")
+    full_key = (id(stocks), st.session_state.get("day_count", 1)) + tuple(key)
+    entry = st.session_state.get(f"_view_{name}")
+    if entry is None or entry[0] != full_key:
+        entry = (full_key, stocks, build()) # stocks 참조를 함께 보관해 id 재사용을 막음
+        st.session_state[f"_view_{name}"] = entry
+    return entry[2]
+
+
+# 시세 표: 정렬/섹터 필터/페이지 나누기는 서버에서 하고, 보이는 페이지의 행만 브라우저로 보낸다
+# (하루 한 번 계산한 시장 통계의 정렬 색인을 잘라 쓰므로 종목 수가 늘어도 화면 하나의 비용은 같음)
+MARKET_PAGE_SIZE = 20
+MARKET_SORTS = {"기본 순서": "catalog", "현재 주가": "price", "전일 대비": "change", "변동성": "volatility"}
+ALL_SECTORS = "전체 섹터"
+
+
+def build_market_page(sector, sort_label, ascending, page):
+    import pandas as pd
+    stats = engine.get_market_stats(st.session_state) # 하루 지나기 때 계산해 둔 통계 (전일 대비 포함)
+    rows, _ = stats.page(MARKET_SORTS[sort_label], ascending, None if sector == ALL_SECTORS else sector, page, MARKET_PAGE_SIZE)
+    daily_change, volatility = stats.returns[1][rows], stats.volatility[rows]
+    return pd.DataFrame({
+        "섹터": [stats.sector_names[i] for i in stats.sector_index[rows]],
+        "종목": [stats.tickers[i] for i in rows],
+        "현재 주가": [f"{price:,.0f} 원" for price in stats.prices[rows]],
+        "전일 대비": [" - " if np.isnan(rate) else f"{rate:+.2f}%" for rate in daily_change], # 부호 표시
+        "변동성": [" - " if np.isnan(value) else f"{value:.2f}%" for value in volatility],
+    })
+
+
+def reset_market_page():
+    st.session_state["market_page"] = 1
+
+
+MARKET_VIEWS = ["종목별 수익률", "섹터 평균", "상승/하락 상위"]
+
+def build_market_analytics(view, sort_column, ascending):
+    import pandas as pd
+    stats = engine.get_market_stats(st.session_state)
+    if view == "섹터 평균":
+        df = pd.DataFrame(stats.sector_columns())
+    elif view == "상승/하락 상위":
+        columns = stats.stock_columns()
+        movers = np.concatenate([stats.gainers, stats.losers])
+        df = pd.DataFrame({name: np.asarray(values)[movers] for name, values in columns.items()})
+        df.insert(0, "구분", ["상승"] * len(stats.gainers) + ["하락"] * len(stats.losers))
+        return df
+    else:
+        df = pd.DataFrame(stats.stock_columns())
+    if sort_column in df.columns:
+        df = df.sort_values(sort_column, ascending=ascending, na_position="last")
+    return df
+
 
+@st.fragment
+@session_activity
+@tracing.traced("ui.market_panel")
 def display_stock_prices():
     selected_level = st.session_state.get('selected_level', '초등')
-    stocks_data = []
     if "stocks" not in st.session_state or not st.session_state["stocks"]:
         st.warning("주식 정보가 로드되지 않았습니다. 앱을 다시 시작하거나 관리자에게 문의하세요.")
         return
 
-    for sector, sector_stocks in st.session_state["stocks"].items():
-        for stock_name, stock_info in sector_stocks.items():
-            price_history = stock_info.get("price_history", [])
-            current_price = stock_info.get("current_price", 0)
-            daily_change_rate_str = " - "
-            if len(price_history) >= 2:
-                previous_day_price = price_history[-2]
-                if previous_day_price > 0: # 0으로 나누기 방지
-                    daily_change_rate = (current_price - previous_day_price) / previous_day_price * 100
-                    daily_change_rate_str = f"{daily_change_rate:+.2f}%" # 부호 표시
-                else:
-                    daily_change_rate_str = "N/A"
-
-            stocks_data.append(
-                {
-                    "종목": stock_name,
-                    "섹터": sector,
-                    "현재 주가": f"{current_price:,.0f} 원",
-                    "전일 대비": daily_change_rate_str,
-                    "price_history": price_history,
-                    # 수준별 설명 가져오기 (키 형식 변경 반영)
-                    "description": stock_info.get(f"description_{selected_level}", stock_info.get("description_중등", "설명 없음")),
-                }
-            )
-
-    if not stocks_data:
+    stats = engine.get_market_stats(st.session_state)
+    if not stats.tickers:
         st.info("표시할 주식 데이터가 없습니다.")
         return
 
-    stocks_df = pd.DataFrame(stocks_data)
-    # 컬럼 순서 지정 및 표시
-    st.dataframe(stocks_df[["섹터", "종목", "현재 주가", "전일 대비"]], hide_index=True, use_container_width=True)
+    # 시세 표 (섹터 필터 · 정렬 · 페이지)
+    col_sector, col_sort, col_order, col_page = st.columns([2, 2, 1, 1])
+    with col_sector:
+        sector = st.selectbox("섹터", [ALL_SECTORS] + stats.sector_names, key="market_sector", on_change=reset_market_page)
+    with col_sort:
+        sort_label = st.selectbox("정렬", list(MARKET_SORTS), key="market_sort", on_change=reset_market_page)
+    with col_order:
+        ascending = st.toggle("오름차순", value=True, key="market_ascending", on_change=reset_market_page)
+    total = len(stats.tickers) if sector == ALL_SECTORS else int(np.diff(stats.sector_offsets)[stats.sector_names.index(sector)])
+    pages = max(1, -(-total // MARKET_PAGE_SIZE))
+    if st.session_state.get("market_page", 1) > pages: # 필터가 바뀌어 페이지 수가 줄었으면 마지막 페이지로
+        st.session_state["market_page"] = pages
+    with col_page:
+        page = st.number_input("페이지", min_value=1, max_value=pages, step=1, key="market_page")
+    page_df = cached_view(
+        "market", (sector, sort_label, ascending, page), lambda: build_market_page(sector, sort_label, ascending, page - 1)
+    )
+    st.dataframe(page_df, hide_index=True, use_container_width=True)
+    first = (page - 1) * MARKET_PAGE_SIZE
+    st.caption(f"전체 {total:,}개 종목 중 {first + 1:,}~{first + len(page_df):,}번째 ({page}/{pages} 페이지)")
+
+    # 시장 분석 (하루 한 번 계산된 통계를 보기/정렬 기준별로 보여줌)
+    with st.expander("📊 시장 분석 (수익률·변동성·섹터 평균)", expanded=False):
+        col_view, col_sort, col_order = st.columns([2, 2, 1])
+        with col_view:
+            view = st.selectbox("보기", MARKET_VIEWS, key="market_view_select")
+        sort_options = ["1일 수익률(%)", "5일 수익률(%)", "20일 수익률(%)", "변동성(20일, %)"]
+        if view == "섹터 평균":
+            sort_options = ["평균 1일 수익률(%)", "평균 5일 수익률(%)", "평균 20일 수익률(%)", "평균 변동성(%)"]
+        with col_sort:
+            sort_column = st.selectbox("정렬 기준", sort_options, key="market_sort_select", disabled=(view == "상승/하락 상위"))
+        with col_order:
+            ascending = st.toggle("오름차순", value=False, key="market_sort_ascending")
+        analytics_df = cached_view(
+            "market_analytics", (view, sort_column, ascending), lambda: build_market_analytics(view, sort_column, ascending)
+        )
+        if analytics_df.empty:
+            st.info("통계를 계산할 주가 기록이 아직 부족합니다. '하루 지나기' 후 다시 확인해보세요.")
+        else:
+            st.dataframe(
+                analytics_df, hide_index=True, use_container_width=True,
+                column_config={
+                    "현재 주가": st.column_config.NumberColumn(format="%d 원"),
+                    **{name: st.column_config.NumberColumn(format="%.2f") for name in analytics_df.columns if "%" in name},
+                },
+            )
 
     st.markdown("---")
-    # 상세 정보 보기
-    stock_names_list = ["종목 선택..."] + stocks_df["종목"].tolist()
-    selected_stock_all_info = st.selectbox(
-        "종목 상세 정보 보기 (기업 정보 및 주가 그래프)", stock_names_list, key="stock_detail_select"
-    )
+    # 상세 정보 보기 (검색해서 고름)
+    col_search, col_select = st.columns([1, 2])
+    with col_search:
+        query_detail = st.text_input("종목 검색", key="stock_detail_search", placeholder="종목명 또는 초성", help=SEARCH_HELP)
+    with col_select:
+        selected_stock_all_info = st.selectbox(
+            "종목 상세 정보 보기 (기업 정보 및 주가 그래프)", ["종목 선택..."] + search_tickers(query_detail), key="stock_detail_select",
+            format_func=lambda ticker: ticker if ticker == "종목 선택..." else ticker_label(ticker),
+        )
 
     if selected_stock_all_info and selected_stock_all_info != "종목 선택...":
-        # stocks_df에서 데이터 찾기 (오류 방지)
-        selected_stock_data_list = stocks_df[stocks_df["종목"] == selected_stock_all_info]
-        if not selected_stock_data_list.empty:
-            selected_stock_data = selected_stock_data_list.iloc[0]
-            selected_stock_sector = selected_stock_data["섹터"]
+        # 게임 상태에서 종목 찾기 (오류 방지)
+        selected_stock_sector, selected_stock_data = engine.find_stock(st.session_state, selected_stock_all_info)
+        if selected_stock_data is not None:
 
             col1_info, col2_graph = st.columns([1, 1]) # 비율 조정
 
             with col1_info:
                 st.subheader(f"🏢 {selected_stock_all_info} ({selected_stock_sector}) 기업 정보")
                 # 수준에 맞는 설명 표시
-                st.info(f"{selected_stock_data['description']}")
+                st.info(selected_stock_data.get(f"description_{selected_level}", selected_stock_data.get("description_중등", "설명 없음")))
 
             with col2_graph:
                 st.subheader("📈 주가 그래프")
-                price_history = selected_stock_data["price_history"]
+                price_history = selected_stock_data.get("price_history", [])
                 if len(price_history) > 1:
+                    import pandas as pd
+                    import plotly.express as px
                     price_history_df = pd.DataFrame({
                         "날짜": range(1, len(price_history) + 1),
                         "주가": price_history,
@@ -863,59 +579,57 @@ def display_stock_prices():
             st.warning(f"'{selected_stock_all_info}' 종목 정보를 찾을 수 없습니다.")
 
 
-def display_portfolio_table():
+def build_portfolio_table(ledger):
+    import pandas as pd
     portfolio = st.session_state.get("portfolio", {"cash": 0, "stocks": {}})
-    portfolio_stocks = portfolio.get("stocks", {})
 
-    if portfolio_stocks:
-        portfolio_data = []
-        total_stock_value = 0
-        total_purchase_value_all = 0 # 모든 주식의 총 매수 금액 합계
-
-        for stock_name, stock_info in portfolio_stocks.items():
-            quantity = stock_info.get("quantity", 0)
-            purchase_price = stock_info.get("purchase_price", 0) # 평균 매수 단가
-            current_price = 0
-            stock_sector = ""
-            # 현재가 및 섹터 찾기
-            for sector, stocks_in_sector in st.session_state.get("stocks", {}).items():
-                if stock_name in stocks_in_sector:
-                    current_price = stocks_in_sector[stock_name].get("current_price", 0)
-                    stock_sector = sector
-                    break
+    # 원장의 보유 현황을 배열로 받아 평가액/손익을 한 번에 계산 (종목별 반복 탐색 없음)
+    tickers, quantities, avg_costs, fifo_costs = ledger.holdings()
+    price_lookup = engine.build_price_lookup(st.session_state)
+    current_prices = np.array([price_lookup.get(name, (0, ""))[0] for name in tickers], dtype=np.float64)
+    held = (quantities > 0) & (current_prices > 0) # 유효한 보유 종목만
+    if not held.any():
+        return None, 0.0
+
+    names = [name for name, is_held in zip(tickers, held) if is_held]
+    quantities, avg_costs, fifo_costs, current_prices = quantities[held], avg_costs[held], fifo_costs[held], current_prices[held]
+    current_values = current_prices * quantities # 현재 평가액
+    purchase_values = avg_costs * quantities # 총 매수 금액 (평균단가 기준)
+    profit_losses = current_values - purchase_values # 미실현 손익
+    fifo_profit_losses = current_values - fifo_costs # 미실현 손익 (FIFO 기준)
+    profit_rates = np.divide(profit_losses, purchase_values, out=np.zeros_like(profit_losses), where=purchase_values > 0) * 100
+
+    portfolio_df = pd.DataFrame({
+        "종목": names,
+        "섹터": [price_lookup[name][1] for name in names],
+        "보유 수량": quantities,
+        "평균 매수가": [f"{v:,.0f} 원" for v in avg_costs],
+        "현재가": [f"{v:,.0f} 원" for v in current_prices],
+        "평가액": [f"{v:,.0f} 원" for v in current_values],
+        "손익": [f"{v:,.0f} 원" for v in profit_losses],
+        "손익(FIFO)": [f"{v:,.0f} 원" for v in fifo_profit_losses],
+        "수익률": [f"{v:.2f}%" for v in profit_rates],
+    }).astype({"보유 수량": object})
+    # 현금 행 추가
+    portfolio_df.loc[len(portfolio_df)] = {
+        "종목": "💰 현금", "섹터": "-", "보유 수량": "-", "평균 매수가": "-", "현재가": "-",
+        "평가액": f"{portfolio.get('cash', 0):,.0f} 원", "손익": "-", "손익(FIFO)": "-", "수익률": "-",
+    }
+    return portfolio_df, profit_losses.sum()
 
-            if current_price <= 0 or quantity <= 0: continue # 유효하지 않은 데이터 건너뛰기
-
-            current_value = current_price * quantity # 현재 평가액
-            purchase_value_total = purchase_price * quantity # 총 매수 금액 (이 종목)
-            profit_loss = current_value - purchase_value_total # 손익 금액
-            profit_rate = (profit_loss / purchase_value_total) * 100 if purchase_value_total > 0 else 0 # 수익률
-
-            total_stock_value += current_value
-            total_purchase_value_all += purchase_value_total
-
-            portfolio_data.append({
-                "종목": stock_name,
-                "섹터": stock_sector,
-                "보유 수량": quantity,
-                "평균 매수가": f"{purchase_price:,.0f} 원", # 컬럼명 변경
-                "현재가": f"{current_price:,.0f} 원",
-                "평가액": f"{current_value:,.0f} 원",
-                "손익": f"{profit_loss:,.0f} 원",
-                "수익률": f"{profit_rate:.2f}%",
-            })
-
-        # 현금 행 추가
-        portfolio_data.append({
-            "종목": "💰 현금", "섹터": "-", "보유 수량": "-", "평균 매수가": "-",
-            "현재가": "-", "평가액": f"{portfolio.get('cash', 0):,.0f} 원", "손익": "-", "수익률": "-",
-        })
 
-        portfolio_df = pd.DataFrame(portfolio_data)
-        # 컬럼 순서 지정 및 표시
-        st.dataframe(portfolio_df[[
-            "종목", "섹터", "보유 수량", "평균 매수가", "현재가", "평가액", "손익", "수익률"
-        ]], hide_index=True, use_container_width=True)
+@st.fragment
+@session_activity
+@tracing.traced("ui.portfolio_panel")
+def display_portfolio_table():
+    import pandas as pd
+    ledger = engine.get_ledger(st.session_state)
+    cash = st.session_state.get("portfolio", {}).get("cash", 0)
+    # 체결(원장 길이)이나 현금이 바뀔 때만 다시 계산
+    portfolio_df, unrealized = cached_view("portfolio", (len(ledger), cash), lambda: build_portfolio_table(ledger))
+
+    if portfolio_df is not None:
+        st.dataframe(portfolio_df, hide_index=True, use_container_width=True)
 
         st.markdown("---")
         # 포트폴리오 요약 정보 표시 (calculate_portfolio_summary 함수 사용)
@@ -925,12 +639,315 @@ def display_portfolio_table():
         st.markdown(f"**📊 총 평가액 (주식 + 현금):** {total_value:,.0f} 원")
         st.markdown(f"**📈 총 손익:** {total_profit_loss:,.0f} 원")
         st.markdown(f"**🚀 총 수익률:** {total_profit_rate:.2f}%")
-        # st.markdown(f"**🛒 총 매수 금액 (보유 주식):** {total_purchase_value_all:,.0f} 원") # 필요시 주석 해제
-        # st.markdown(f"**🌱 시작 자본금:** {initial_cash:,.0f} 원") # 필요시 주석 해제
-
+        st.markdown(f"**📉 미실현 손익 (보유 주식):** {unrealized:,.0f} 원")
     else:
         st.info("보유 주식이 없습니다. '주식 매수' 탭에서 주식을 구매해보세요!")
 
+    if len(ledger) > 0:
+        st.markdown(f"**💵 실현 손익 (평균단가 / FIFO):** {ledger.realized_pnl():,.0f} 원 / {ledger.realized_pnl(method='fifo'):,.0f} 원")
+        with st.expander("🧾 종목별 거래 내역", expanded=False):
+            realized_by_ticker = ledger.realized_by_ticker()
+            selected_ticker = st.selectbox("종목 선택", ledger.tickers, key="ledger_history_select")
+            history = ledger.history(selected_ticker)
+            st.caption(f"{selected_ticker} 실현 손익: {realized_by_ticker[ledger.tickers.index(selected_ticker)]:,.0f} 원")
+            st.dataframe(pd.DataFrame({
+                "거래일": history["day"],
+                "구분": np.where(history["side"] == BUY, "매수", "매도"),
+                "수량": history["qty"],
+                "체결가": history["price"],
+                "실현 손익": history["realized_avg"],
+            }), hide_index=True, use_container_width=True)
+
+
+# --- 뉴스/매매 패널 ---
+@st.fragment
+@session_activity
+@tracing.traced("ui.news_panel")
+def display_news_panel():
+    """오늘의 뉴스 생성 버튼과 뉴스 목록."""
+    st.header(f"📰 Day {st.session_state.get('day_count', 1)} 뉴스")
+    if SCENARIO is not None: # 오늘 일어나는 시나리오 사건 (하루 지나기 때 주가에 반영)
+        for headline in SCENARIO.headlines.get(st.session_state.get("day_count", 1), []):
+            st.warning(headline, icon="📢")
+    # 뉴스 생성 버튼
+    if st.button("오늘의 뉴스 생성하기", use_container_width=True, key="news_gen_button", help="AI가 오늘의 경제 뉴스를 생성합니다."):
+        with st.spinner(f"Day {st.session_state.get('day_count', 1)} 뉴스 생성 중... (수준: {LEVELS[st.session_state.get('selected_level', '초등')]['name']})"):
+            st.session_state["daily_news"] = generate_news()
+            st.session_state["news_meanings"] = {} # 새 뉴스 생성 시 이전 해설 초기화
+            save_session_data() # 뉴스 생성 후 저장
+        st.rerun() # 어제 뉴스 해설 탭도 바뀌므로 전체 새로고침
+
+    # 생성된 뉴스 표시
+    if st.session_state.get("daily_news"):
+        st.markdown("---")
+        st.subheader("오늘의 주요 뉴스")
+        for i, news in enumerate(st.session_state["daily_news"]):
+            with st.expander(f"**뉴스 {i+1}**", expanded=(i==0)): # 첫 번째 뉴스만 펼치기
+                st.write(news)
+        st.markdown("---")
+        st.info("💡 뉴스를 읽고 어떤 섹터/기업에 영향이 있을지 예측해보세요! '하루 지나기' 후 '어제 뉴스 해설' 탭에서 AI 분석을 확인할 수 있습니다.")
+    else:
+        st.info("👆 '오늘의 뉴스 생성하기' 버튼을 눌러 뉴스를 받아보세요.")
+
+
+# --- 종목 검색 ---
+# 종목 선택 목록은 전체 종목 대신 검색 색인(ticker_search.py)에서 찾은 상위 SEARCH_LIMIT 개만 보여준다.
+# 색인은 카탈로그마다 한 번 만들어 모든 세션이 공유한다. 이름 일부나 초성(예: ㅅㅅㅈㅈ)으로 찾을 수 있다.
+SEARCH_LIMIT = 20
+SEARCH_HELP = "이름 일부나 초성으로 찾을 수 있어요 (예: 삼성, 하이닉스, ㅅㅅㅈㅈ)"
+SELL_SEARCH_MIN_HOLDINGS = 20 # 보유 종목이 이보다 많을 때만 매도 화면에 검색칸 표시
+
+def search_tickers(query, limit=SEARCH_LIMIT):
+    """검색어에 맞는 종목 중 이 게임에 있는 것만 순위대로."""
+    results = get_ticker_index(STOCK_UNIVERSE).search(query, limit)
+    return [ticker for ticker in results if engine.find_stock(st.session_state, ticker)[0] is not None]
+
+def ticker_label(ticker):
+    if ticker not in STOCK_UNIVERSE.ticker_index:
+        return ticker
+    return f"{ticker} · {STOCK_UNIVERSE.sector_of(ticker)}"
+
+@st.fragment
+@session_activity
+@tracing.traced("ui.buy_panel")
+def display_buy_panel():
+    """종목 검색 → 종목 → 수량 → 확인 순서의 매수 화면."""
+    selected_level = st.session_state.get('selected_level', '초등')
+    query_buy = st.text_input("1. 매수할 종목 검색:", key="buy_search", placeholder="종목명 또는 초성", help=SEARCH_HELP)
+    candidates = search_tickers(query_buy)
+    if not candidates:
+        st.info("검색어와 맞는 종목이 없습니다.")
+        return
+    selected_stock_buy = st.selectbox(
+        "2. 매수할 종목 선택:", ["종목 선택..."] + candidates, key="buy_stock",
+        format_func=lambda ticker: ticker if ticker == "종목 선택..." else ticker_label(ticker),
+    )
+
+    if selected_stock_buy != "종목 선택...":
+        selected_sector_buy, stock_info_buy = engine.find_stock(st.session_state, selected_stock_buy)
+        if stock_info_buy: # 주식 정보 있는지 확인
+            stock_price_buy = stock_info_buy.get("current_price", 0)
+            # 수준별 설명 가져오기 (키 형식 변경 반영)
+            description_key = f"description_{selected_level}"
+            stock_description = stock_info_buy.get(description_key, stock_info_buy.get("description_중등","설명 없음"))
+
+            st.info(f"**{selected_stock_buy}** 현재 주가: **{stock_price_buy:,.0f}원**")
+            st.caption(f"기업 정보: {stock_description}")
+
+            # 매수 가능 수량 계산 및 표시
+            available_cash = st.session_state.get("portfolio", {}).get("cash", 0)
+            max_buy_quantity = available_cash // stock_price_buy if stock_price_buy > 0 else 0
+            st.caption(f"현금 잔고: {available_cash:,.0f}원 (최대 {max_buy_quantity}주 매수 가능)")
+
+            quantity_buy = st.number_input(
+                f"3. 매수 수량 입력 (최대 {max_buy_quantity}주):",
+                min_value=1,
+                max_value=max(1, max_buy_quantity), # 0주 방지, 최대값 1 이상
+                value=1,
+                step=1,
+                key="buy_quantity",
+                disabled=(max_buy_quantity == 0) # 잔액 없으면 비활성화
+            )
+
+            total_buy_price = stock_price_buy * quantity_buy
+            st.markdown(f"**예상 매수 금액:** {total_buy_price:,.0f} 원")
+
+            # 매수 확인 절차
+            if not st.session_state.get('buy_confirm', False):
+                if st.button("주식 매수", use_container_width=True, key='buy_button_confirm', disabled=(max_buy_quantity == 0 or quantity_buy <= 0)):
+                    if quantity_buy > max_buy_quantity:
+                        st.error(f"매수 가능 수량 초과! (최대 {max_buy_quantity}주)")
+                    elif quantity_buy <= 0:
+                        st.error("매수 수량은 1주 이상이어야 합니다.")
+                    else:
+                        st.session_state['buy_confirm'] = True
+                        rerun_panel() # 확인 UI 표시 위해 새로고침
+            else:
+                st.warning(f"**{selected_stock_buy} {quantity_buy}주**를 **{total_buy_price:,.0f}원**에 매수하시겠습니까?")
+                col_confirm, col_cancel = st.columns([1, 1])
+                with col_confirm:
+                    if st.button("✅ 네, 매수합니다", use_container_width=True, key='buy_confirm_button'):
+                        buy_stock(selected_stock_buy, quantity_buy, selected_sector_buy)
+                        st.rerun() # 사이드바 잔고와 포트폴리오 업데이트 반영 (전체 새로고침)
+                with col_cancel:
+                    if st.button("❌ 아니요, 취소합니다", use_container_width=True, key='buy_cancel_button'):
+                        st.session_state['buy_confirm'] = False
+                        st.info("매수를 취소했습니다.")
+                        rerun_panel() # 확인 UI 숨기기
+        else:
+            st.warning("선택한 종목 정보를 불러올 수 없습니다.")
+    else:
+        st.info("매수할 종목을 선택해주세요.")
+
+
+@st.fragment
+@session_activity
+@tracing.traced("ui.sell_panel")
+def display_sell_panel():
+    """보유 종목 → 수량 → 확인 순서의 매도 화면."""
+    portfolio_stocks = st.session_state.get("portfolio", {}).get("stocks", {})
+    if portfolio_stocks:
+        owned_names = list(portfolio_stocks.keys())
+        if len(owned_names) > SELL_SEARCH_MIN_HOLDINGS:
+            query_sell = st.text_input("매도할 종목 검색:", key="sell_search", placeholder="종목명 또는 초성", help=SEARCH_HELP)
+            owned_names = [name for name in owned_names if matches(query_sell, name)]
+        owned_stock_names = ["종목 선택..."] + owned_names
+        selected_stock_sell = st.selectbox("1. 매도할 종목 선택:", owned_stock_names, key="sell_stock")
+
+        if selected_stock_sell != "종목 선택...":
+            stock_info_sell = portfolio_stocks.get(selected_stock_sell)
+            if stock_info_sell: # 보유 정보 있는지 확인
+                owned_quantity = stock_info_sell.get("quantity", 0)
+                purchase_price_avg = stock_info_sell.get("purchase_price", 0)
+
+                # 현재가 찾기
+                current_price_sell = 0
+                for sector, stocks_in_sector in st.session_state.get("stocks", {}).items():
+                    if selected_stock_sell in stocks_in_sector:
+                        current_price_sell = stocks_in_sector[selected_stock_sell].get("current_price", 0)
+                        break
+
+                st.info(f"**{selected_stock_sell}** 보유 수량: **{owned_quantity}주**")
+                st.caption(f"평균 매수가: {purchase_price_avg:,.0f}원 / 현재가: {current_price_sell:,.0f}원")
+
+                quantity_sell = st.number_input(
+                    f"2. 매도 수량 입력 (최대 {owned_quantity}주):",
+                    min_value=1,
+                    max_value=owned_quantity,
+                    value=1,
+                    step=1,
+                    key="sell_quantity",
+                    disabled=(owned_quantity == 0) # 보유량 없으면 비활성화
+                )
+
+                total_sell_price = current_price_sell * quantity_sell
+                st.markdown(f"**예상 매도 금액:** {total_sell_price:,.0f} 원")
+
+                # 매도 확인 절차
+                if not st.session_state.get('sell_confirm', False):
+                    if st.button("주식 매도", use_container_width=True, key='sell_button_confirm', disabled=(owned_quantity == 0 or quantity_sell <= 0)):
+                        if quantity_sell > owned_quantity:
+                            st.error(f"매도 가능 수량 초과! (최대 {owned_quantity}주)")
+                        elif quantity_sell <= 0:
+                            st.error("매도 수량은 1주 이상이어야 합니다.")
+                        else:
+                            st.session_state['sell_confirm'] = True
+                            rerun_panel()
+                else:
+                    st.warning(f"**{selected_stock_sell} {quantity_sell}주**를 **{total_sell_price:,.0f}원**에 매도하시겠습니까?")
+                    col_confirm, col_cancel = st.columns([1, 1])
+                    with col_confirm:
+                        if st.button("✅ 네, 매도합니다", use_container_width=True, key='sell_confirm_button'):
+                            sell_stock(selected_stock_sell, quantity_sell)
+                            st.rerun() # 사이드바 잔고와 포트폴리오 업데이트 반영 (전체 새로고침)
+                    with col_cancel:
+                        if st.button("❌ 아니요, 취소합니다", use_container_width=True, key='sell_cancel_button'):
+                            st.session_state['sell_confirm'] = False
+                            st.info("매도를 취소했습니다.")
+                            rerun_panel()
+            else:
+                st.warning("선택한 보유 주식 정보를 찾을 수 없습니다.")
+    else:
+        st.info("매도할 주식이 없습니다. 먼저 주식을 매수하세요.")
+
+
+# --- 전략 실험실 (백테스트) ---
+BACKTEST_MIN_DAYS = 3        # 전략을 비교하려면 필요한 최소 거래일
+BACKTEST_TOP_RESULTS = 10    # 매개변수 비교에서 보여 줄 상위 조합 수
+
+
+def backtest_history():
+    # 주가 기록은 하루 지나기 때만 바뀌므로 cached_view 의 기본 키(날짜, stocks 객체)로 충분
+    return cached_view("backtest_history", (), lambda: backtest.PriceHistory.from_state(st.session_state))
+
+
+def count_slider(label, max_value, default, key):
+    """1 ~ max_value 정수 슬라이더. 고를 수 있는 값이 1 하나뿐이면 (min == max 슬라이더는 만들 수 없음) 1 을 쓴다."""
+    if max_value <= 1:
+        st.caption(f"{label} 1 (아직 고를 수 있는 값이 하나뿐이에요)")
+        return 1
+    return st.slider(label, 1, max_value, min(default, max_value), key=key)
+
+
+def strategy_params(strategy, history):
+    """전략별 매개변수 입력 위젯 (키는 전략마다 따로)."""
+    max_lookback = min(20, history.days - 2)
+    if strategy == "buy_and_hold":
+        sector = st.selectbox("섹터", ["전체"] + history.sector_names, key="bt_bh_sector")
+        return {"sector": None if sector == "전체" else sector}
+    if strategy == "momentum":
+        return {
+            "lookback": count_slider("며칠 수익률로 고를까요?", max_lookback, 5, key="bt_mom_lookback"),
+            "top_n": count_slider("몇 종목을 살까요?", min(20, len(history.tickers)), 5, key="bt_mom_top"),
+            "rebalance": st.slider("며칠마다 바꿀까요?", 1, 10, 1, key="bt_mom_rebalance"),
+        }
+    if strategy == "sector_rotation":
+        return {
+            "lookback": count_slider("며칠 수익률로 고를까요?", max_lookback, 5, key="bt_rot_lookback"),
+            "top_sectors": count_slider("몇 개 섹터를 살까요?", len(history.sector_names), 2, key="bt_rot_top"),
+            "rebalance": st.slider("며칠마다 바꿀까요?", 1, 10, 1, key="bt_rot_rebalance"),
+        }
+    return {
+        "threshold": st.slider("뉴스 영향이 얼마 이상일 때 살까요? (%)", 0.0, 5.0, 0.0, 0.5, key="bt_news_threshold") / 100,
+        "top_sectors": count_slider("몇 개 섹터를 살까요?", len(history.sector_names), 2, key="bt_news_top"),
+    }
+
+
+def run_strategy_sweep(history):
+    """기본 격자 + 섹터별 사서 보유를 모두 비교한다 (큰 게임은 프로세스 풀에서)."""
+    grids = dict(backtest.DEFAULT_GRIDS, buy_and_hold={"sector": [None] + history.sector_names})
+    return backtest.sweep(history, grids)
+
+
+@st.fragment
+@session_activity
+@tracing.traced("ui.backtest_panel")
+def display_backtest_panel():
+    import pandas as pd
+    history = backtest_history()
+    if history.days < BACKTEST_MIN_DAYS:
+        st.info(f"전략을 비교하려면 주가 기록이 {BACKTEST_MIN_DAYS}일 이상 필요해요. '하루 지나기'를 몇 번 해 보세요.")
+        return
+    ledger = engine.get_ledger(st.session_state)
+    mine = cached_view("backtest_actual", (len(ledger),), lambda: backtest.actual_equity(history, ledger))
+
+    strategy = st.selectbox(
+        "전략", list(backtest.STRATEGIES), key="bt_strategy", format_func=lambda name: backtest.STRATEGY_LABELS[name],
+    )
+    params = strategy_params(strategy, history)
+    result = backtest.run_backtest(history, strategy, **params)
+    mine_result = backtest.BacktestResult("mine", {}, mine)
+
+    st.line_chart(pd.DataFrame(
+        {result.label: result.equity, "내 자산": mine}, index=pd.RangeIndex(1, history.days + 1, name="Day"),
+    ))
+    summary = pd.DataFrame([result.summary(), dict(mine_result.summary(), 전략="내 자산")])
+    st.dataframe(summary, hide_index=True, use_container_width=True, column_config={
+        "최종 자산": st.column_config.NumberColumn(format="%d 원"),
+        **{name: st.column_config.NumberColumn(format="%.2f") for name in summary.columns if "%" in name},
+    })
+    gap = result.total_return - mine_result.total_return
+    st.caption(f"이 전략은 내 투자보다 수익률이 {abs(gap):.2f}%p {'높아요' if gap > 0 else '낮아요'}. "
+               "(전략은 소수 주 단위로 사고팔 수 있다고 가정해요)")
+
+    st.markdown("---")
+    sweep_key = (id(st.session_state.get("stocks")), st.session_state.get("day_count", 1))
+    if st.button("🔍 모든 전략·매개변수 비교하기", key="bt_sweep_button"):
+        with st.spinner("여러 전략을 계산하는 중..."):
+            results = run_strategy_sweep(history)
+        st.session_state["_view_backtest_sweep"] = (sweep_key, len(results), results[:BACKTEST_TOP_RESULTS])
+    saved = st.session_state.get("_view_backtest_sweep")
+    if saved and saved[0] == sweep_key:
+        _, count, top_results = saved
+        st.markdown(f"**전략 {count}가지 중 수익률 상위 {len(top_results)}개**")
+        top_df = pd.DataFrame([r.summary() for r in top_results])
+        st.dataframe(top_df, hide_index=True, use_container_width=True, column_config={
+            "최종 자산": st.column_config.NumberColumn(format="%d 원"),
+            **{name: st.column_config.NumberColumn(format="%.2f") for name in top_df.columns if "%" in name},
+        })
+        better = sum(r.total_return > mine_result.total_return for r in top_results)
+        st.caption(f"내 수익률 {mine_result.total_return:.2f}% — 상위 {len(top_results)}개 중 {better}개가 나보다 높아요.")
+
 
 # --- 주식 용어 사전 (수준별) ---
 def display_stock_glossary():
@@ -944,28 +961,35 @@ def display_stock_glossary():
 
 
 # --- 로그인 및 데이터 저장/로드 ---
+def clear_login_state():
+    """로그아웃: 세션 상태 초기화 (로그아웃 시 필요한 부분만)"""
+    keys_to_reset = ["user_id", "user_settings", "portfolio", "stocks", "day_count", "daily_news", "previous_daily_news", "news_meanings", "initial_cash_set", "ledger", "sector_impact_history", "market_stats", SPILLED_KEY, "_sync_point"]
+    for key in keys_to_reset:
+        if key in st.session_state:
+            del st.session_state[key]
+    st.session_state['selected_level'] = "초등" # 레벨 기본값으로
+    st.session_state['force_reset'] = True # 초기화 플래그 설정
+
 def login_sidebar():
     # 이미 로그인된 경우
     if 'user_settings' in st.session_state and st.session_state['user_settings'] is not None:
         st.sidebar.success(f"{st.session_state['user_id']}님, 환영합니다!")
         # 로그아웃 버튼
         if st.sidebar.button("로그아웃"):
-            # 세션 상태 초기화 (로그아웃 시 필요한 부분만)
-            keys_to_reset = ["user_id", "user_settings", "portfolio", "stocks", "day_count", "daily_news", "previous_daily_news", "news_meanings", "initial_cash_set"]
-            for key in keys_to_reset:
-                if key in st.session_state:
-                    del st.session_state[key]
-            st.session_state['selected_level'] = "초등" # 레벨 기본값으로
-            st.session_state['force_reset'] = True # 초기화 플래그 설정
+            clear_login_state()
             st.rerun() # 페이지 새로고침
         return True # 로그인 상태 반환
 
+    if st.session_state.pop("_restore_failed", False):
+        st.sidebar.warning("오래 쉬는 동안 게임 상태를 불러오지 못했습니다. 다시 로그인해주세요.")
+
     # 로그인 폼
     st.sidebar.header("로그인")
     account = st.sidebar.text_input("아이디", key="login_id")
     pw = st.sidebar.text_input("비밀번호", type="password", key="login_pw")
 
     if st.sidebar.button("로그인", key="login_button"):
+        supabase = get_store()
         if not supabase:
             st.error("데이터베이스 연결 오류로 로그인할 수 없습니다.")
             return False
@@ -973,19 +997,25 @@ def login_sidebar():
             st.warning("아이디와 비밀번호를 입력해주세요.")
             return False
         try:
-            response = supabase.table("users").select("*").eq("account", account).eq("pw", pw).execute()
+            aio.wait_serial(("save", account)) # 다른 탭에서 맡겨 둔 저장이 끝난 뒤에 읽음
+            with tracing.span("db.login"):
+                response = store_execute(supabase.table("users").select("*").eq("account", account).eq("pw", pw))
             if response.data and len(response.data) > 0:
                 user_data = response.data[0]
                 st.session_state["user_id"] = user_data["account"] # 사용자 ID 저장
                 st.session_state["selected_level"] = user_data.get("level", "초등") # 저장된 레벨 로드, 없으면 초등
 
-                if "data" in user_data and user_data["data"]:
+                saved_data, version = user_data.get("data"), user_data.get("version") or 0
+                if state_store is not None:
+                    # 상태 저장소에 저장된 게임이 있으면 그것을 쓰고, 없으면 users 테이블의 예전 데이터에서 옮겨 옴
+                    stored_data, version = state_store.get(user_key(account))
+                    saved_data = stored_data or saved_data
+                st.session_state["_sync_point"] = SyncPoint(version, engine.sync_marker({})) # 다음 저장의 비교 기준
+                if saved_data:
                     try:
-                        user_settings = json.loads(user_data["data"])
                         # 저장된 게임 데이터 복원
-                        for key in ["stocks", "previous_daily_news", "news_meanings", "day_count", "portfolio", "daily_news", "initial_cash_set"]:
-                            if key in user_settings:
-                                st.session_state[key] = user_settings[key]
+                        user_settings = engine.restore_state(st.session_state, saved_data)
+                        st.session_state["_sync_point"].marker = engine.sync_marker(user_settings)
                         st.session_state['user_settings'] = user_settings # 로드 성공 표시
                         st.success("로그인 성공! 게임 데이터를 불러왔습니다.")
                         # st.rerun() # 데이터 로드 후 화면 갱신 (아래에서 처리)
@@ -1015,34 +1045,217 @@ def login_sidebar():
 
     return False # 로그인 안된 상태
 
-def save_session_data():
-    if supabase and 'user_id' in st.session_state and st.session_state['user_id']:
-        keys_to_save = ["stocks", "previous_daily_news", "news_meanings", "day_count", "portfolio", "daily_news", "selected_level", "initial_cash_set"]
-        data_to_save = {key: st.session_state[key] for key in keys_to_save if key in st.session_state}
-
+# --- 버전 비교 저장 (optimistic concurrency) ---
+# 저장할 때마다 버전(users.version 열 또는 상태 저장소의 버전)이 1씩 오르고, 저장은 세션이 마지막으로 맞춘 버전일 때만 성공한다(CAS).
+# 그사이 같은 계정의 다른 탭/기기가 먼저 저장했으면 최신본을 읽어 이 세션의 변경(거래 등)을 그 위에 다시 얹고(engine.rebase_state)
+# 다시 시도한다. 잠금 없이 저장하므로 평소에는 한 번에 끝나고, 엇갈린 두 탭의 거래도 사라지지 않는다.
+# 합친 결과는 다음 실행 때 세션에 반영하고, 얹지 못한 거래가 있으면 알려준다.
+# Supabase 의 users 테이블에는 version 열이 있어야 한다 (migrations/001_users_version.sql).
+# 열을 아직 추가하지 않은 배포에서는 처음 읽을 때 알아채고 예전처럼 버전 없이 덮어쓴다 (나중 저장이 이김).
+SAVE_RETRIES = 5
+
+@st.cache_resource
+def users_schema():
+    """users.version 열이 있는지 ("versioned": 없으면 아직 모름). 실행마다 모듈이 새로 읽히므로 프로세스에 하나만 둔다."""
+    return {}
+
+def users_versioned():
+    return users_schema().get("versioned")
+
+def _missing_version_column(error):
+    """users.version 열이 없어서 난 오류인지 (PostgREST 42703 undefined_column)."""
+    message = str(error)
+    return getattr(error, "code", None) == "42703" or ("version" in message and "column" in message)
+
+async def _versioned_query(versioned, unversioned):
+    """version 열을 쓰는 질의를 실행하고, 열이 없는 배포면 기억해 두었다가 버전 없는 질의로 대신한다."""
+    schema = users_schema()
+    if schema.get("versioned") is not False:
         try:
-            json_data = json.dumps(data_to_save, ensure_ascii=False, allow_nan=False, default=lambda o: '<not serializable>')
-        except ValueError:
-            def replace_nan_inf(obj):
-                if isinstance(obj, dict):
-                    return {k: replace_nan_inf(v) for k, v in obj.items()}
-                elif isinstance(obj, list):
-                    return [replace_nan_inf(elem) for elem in obj]
-                elif isinstance(obj, float) and (obj != obj or obj == float('inf') or obj == float('-inf')):
-                    return None
-                return obj
-            cleaned_data = replace_nan_inf(data_to_save)
-            json_data = json.dumps(cleaned_data, ensure_ascii=False, allow_nan=False, default=lambda o: '<not serializable>')
+            response = await aio.execute(versioned())
+            schema["versioned"] = True
+            return response
+        except Exception as e:
+            if not _missing_version_column(e):
+                raise
+            schema["versioned"] = False # 프로세스에서 한 번만 알아채고 알린다
+            logging.getLogger(__name__).warning(
+                "users.version 열이 없어 버전 비교 없이 저장합니다 (migrations/001_users_version.sql 를 적용하세요).")
+    return await aio.execute(unversioned())
+
+class SyncPoint:
+    """세션이 저장소와 마지막으로 맞춘 지점: 버전과 그때 상태의 요약(engine.sync_marker).
+
+    저장 코루틴(공용 루프)이 성공할 때마다 갱신하고, 세션은 맡긴 저장이 모두 끝난 뒤에만 읽는다.
+    version 이 None 이면 합친 결과를 세션이 아직 반영하지 않았다는 뜻이라 다음 저장은 항상 다시 얹는다.
+    """
 
+    def __init__(self, version, marker):
+        self.version = version
+        self.marker = marker
+
+async def load_saved(store, account):
+    """저장된 (JSON, 버전)."""
+    if state_store is not None:
+        data, version = await asyncio.to_thread(state_store.get, user_key(account))
+        if version:
+            return data, version
+    response = await _versioned_query(
+        lambda: store.table("users").select("data, version").eq("account", account),
+        lambda: store.table("users").select("data").eq("account", account),
+    )
+    row = response.data[0] if response.data else {}
+    if state_store is not None:
+        # 상태 저장소에 아직 없는 계정: users 의 데이터로 시작하고, 비교할 버전은 상태 저장소 기준(0)
+        return row.get("data"), 0
+    return row.get("data"), row.get("version") or 0
+
+async def put_saved(store, account, json_data, expected_version):
+    """버전이 expected_version 일 때만 저장하고 새 버전을 돌려준다 (그사이 누가 저장했으면 None)."""
+    if state_store is not None:
+        return await asyncio.to_thread(state_store.put, user_key(account), json_data, expected_version)
+    response = await _versioned_query(
+        lambda: store.table("users").update({"data": json_data, "version": expected_version + 1})
+        .eq("account", account).eq("version", expected_version),
+        lambda: store.table("users").update({"data": json_data}).eq("account", account),
+    )
+    if not users_versioned(): # 버전 열이 없으면 비교 없이 덮어씀
+        return expected_version + 1
+    return expected_version + 1 if response.data else None
+
+async def save_user_data(store, account, json_data, sync, marker):
+    """버전을 비교해 저장하고, 엇갈렸으면 최신본 위에 다시 얹어 재시도한다.
+
+    (새 버전, 합친 JSON 또는 None, 얹지 못한 거래 목록, 이 세션의 하루 진행을 버렸는지) 를 돌려준다.
+    """
+    with tracing.span("db.save") as span:
+        span.record(request_bytes=len(json_data.encode("utf-8")))
+        data, expected, merged = json_data, sync.version, None
+        dropped, day_discarded = [], False
+        for _ in range(SAVE_RETRIES):
+            if expected is not None:
+                version = await put_saved(store, account, data, expected)
+                if version is not None:
+                    break
+            with tracing.span("db.save_rebase"):
+                their_data, expected = await load_saved(store, account)
+                theirs = json.loads(their_data) if their_data else {}
+                merged_state, dropped, day_discarded = await asyncio.to_thread(
+                    engine.rebase_state, sync.marker, json.loads(json_data), theirs,
+                )
+                data = merged = await asyncio.to_thread(engine.serialize_state, merged_state)
+        else:
+            raise RuntimeError("다른 탭/기기의 저장과 계속 엇갈려 저장하지 못했습니다. 잠시 후 다시 시도해주세요.")
+        # 이어서 맡겨진 저장은 이번 상태에서 갈라진 것이므로 기준 요약은 이번 상태, 합쳤으면 버전은 비워 둠
+        sync.marker = marker
+        sync.version = version if merged is None else None
+        return version, merged, dropped, day_discarded
+
+def sync_external_state():
+    """맡긴 저장이 다른 탭과 합쳐졌으면 합친 결과를, 다른 워커가 더 새로 저장했으면 그 상태를 세션에 불러온다."""
+    account = st.session_state.get("user_id")
+    sync = st.session_state.get("_sync_point")
+    if not account or sync is None:
+        return
+    future = st.session_state.get("_save_future")
+    if future is not None:
+        aio.wait_serial(("save", account)) # 이 세션이 맡긴 저장이 끝나야 버전을 비교할 수 있음
+        if future.done() and future.exception() is None and future.result()[1] is not None:
+            version, merged, dropped, day_discarded = future.result()
+            engine.restore_state(st.session_state, merged)
+            st.session_state["_sync_point"] = SyncPoint(version, engine.sync_marker(st.session_state))
+            st.session_state["_save_future"] = None
+            if day_discarded:
+                st.warning("다른 탭(기기)에서 먼저 하루를 진행해서 이 화면의 하루 진행은 반영되지 않았습니다. 거래는 그대로 옮겼습니다.")
+            if dropped:
+                trades = ", ".join(f"Day {t['day']} {t['ticker']} {'매수' if t['side'] == BUY else '매도'} {t['qty']}주" for t in dropped)
+                st.warning(f"다른 탭(기기)의 거래와 합치면서 잔액/보유 수량이 모자라 반영하지 못한 거래: {trades}")
+            return
+    if state_store is not None and sync.version is not None and state_store.version(user_key(account)) > sync.version:
+        with tracing.span("state.sync"):
+            data, version = state_store.get(user_key(account))
+            saved = engine.restore_state(st.session_state, data)
+            st.session_state["_sync_point"] = SyncPoint(version, engine.sync_marker(saved))
+
+def save_session_data():
+    """현재 상태를 직렬화해 공용 루프에 저장을 맡기고 바로 돌아간다 (같은 계정의 저장은 맡긴 순서대로 실행).
+
+    저장 실패는 다음 저장 때 표시한다.
+    """
+    previous = st.session_state.get("_save_future")
+    if previous is not None and previous.done() and previous.exception() is not None:
+        st.error(f"데이터 저장 중 오류 발생: {previous.exception()}")
+    supabase = get_store() if st.session_state.get('user_id') else None
+    if supabase:
+        json_data = engine.serialize_state(st.session_state)
         if json_data:
-            try:
-                supabase.table("users").update({"data": json_data}).eq("account", st.session_state["user_id"]).execute()
-            except Exception as e:
-                st.error(f"데이터 저장 중 오류 발생: {e}")
+            account = st.session_state["user_id"]
+            sync = st.session_state.get("_sync_point") or SyncPoint(None, engine.sync_marker({}))
+            st.session_state["_sync_point"] = sync
+            st.session_state["_save_future"] = aio.submit_serial(
+                ("save", account), save_user_data(supabase, account, json_data, sync, engine.sync_marker(st.session_state)),
+            )
+
+
+# --- 성능 패널 (관리자 전용) ---
+# ADMIN_ACCOUNTS 환경 변수에 쉼표로 구분해 적은 계정만 사이드바에서 단계별 처리 시간을 볼 수 있음
+ADMIN_ACCOUNTS = {a.strip() for a in os.environ.get("ADMIN_ACCOUNTS", "").split(",") if a.strip()}
+
+def display_performance_panel():
+    if st.session_state.get("user_id") not in ADMIN_ACCOUNTS:
+        return
+    import pandas as pd
+    with st.sidebar.expander("⏱️ 성능 패널 (관리자)", expanded=False):
+        rows = tracing.REGISTRY.summary()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        else:
+            st.caption("아직 기록된 구간이 없습니다.")
+        st.download_button(
+            "Prometheus 형식으로 내보내기", tracing.REGISTRY.to_prometheus(),
+            file_name="stockgame_metrics.prom", mime="text/plain", key="perf_export_button",
+        )
+        if st.button("기록 초기화", key="perf_reset_button"):
+            tracing.REGISTRY.reset()
+
+        # LLM 사용량과 비용 (게임 날짜별)
+        st.markdown("**💸 LLM 사용량 (Day별 비용)**")
+        for level in LEVELS:
+            budget = llm.budgets.get(level, {})
+            used = llm.meter.level_tokens(level)
+            limit = budget.get("offline_after_tokens")
+            st.caption(f"{LEVELS[level]['name']}: 오늘 {used:,} 토큰" + (f" / {limit:,}" if limit else "") + f" · 현재 단계 {llm.tier(None, level)}")
+        usage_rows = llm.meter.report_by_day()
+        if usage_rows:
+            st.dataframe(pd.DataFrame(usage_rows), hide_index=True, use_container_width=True)
+        else:
+            st.caption("아직 LLM 호출 기록이 없습니다.")
+        # 종류별 LLM 응답 지연 꼬리와 헤지/마감 초과 (hedging.py)
+        guard_rows = llm.guard.summary()
+        if guard_rows:
+            st.markdown("**⏳ LLM 지연 (헤지·마감)**")
+            st.dataframe(pd.DataFrame(guard_rows), hide_index=True, use_container_width=True)
+        # 프로세스 공용 LLM 요청 줄 (등급별 대기 수와 대기 시간, scheduler.py)
+        st.markdown("**🚦 LLM 요청 줄**")
+        scheduler = llm.scheduler
+        st.caption(f"대기 {scheduler.queue_depth()}건 · 합쳐진 요청 {scheduler.coalesced}건"
+                   f" · 분당 한도 요청 {scheduler.requests.rate or '없음'} / 토큰 {scheduler.tokens.rate or '없음'}")
+        st.dataframe(pd.DataFrame(scheduler.summary()), hide_index=True, use_container_width=True)
+
+        # 세션별 메모리 사용량과 내려둔 세션
+        st.markdown("**🧠 세션 메모리**")
+        st.caption(f"사용 중 {session_memory.total_bytes() / 1024 ** 2:,.1f} MB / {session_memory.total_budget_bytes / 1024 ** 2:,.0f} MB"
+                   f" · 내려두기 {session_memory.spills}회 · 다시 불러오기 {session_memory.rehydrations}회")
+        memory_rows = session_memory.report()
+        if memory_rows:
+            st.dataframe(pd.DataFrame(memory_rows), hide_index=True, use_container_width=True)
 
 
 # --- 메인 앱 로직 ---
+@session_activity
 def main():
+    session_housekeeping() # 유휴 세션 내려두기 확인 (보이는 출력 없음)
+
     # 로그인 상태 확인 및 처리
     is_logged_in = login_sidebar()
 
@@ -1067,6 +1280,7 @@ def main():
         st.stop() # 메인 로직 중단
 
     # --- 로그인 후 ---
+    sync_external_state() # 다른 워커가 더 새로 저장한 게임이 있으면 먼저 불러옴
 
     # 세션 상태 초기화 (로그인 후 또는 새 게임 시작 시)
     # user_settings가 있고, new_user 플래그가 있거나, stocks/portfolio가 비정상일 때 초기화
@@ -1126,26 +1340,23 @@ def main():
         st.markdown("---")
 
         # 하루 지나기 버튼
+        if llm.tier(st.session_state.get("user_id"), st.session_state.get("selected_level", "초등")) == "offline":
+            st.caption("오늘 AI 사용량을 모두 써서 저장된 뉴스와 해설로 진행됩니다.")
         if st.button("☀️ 하루 지나기", use_container_width=True, key="day_pass_button"):
             if st.session_state.get("daily_news"):
                 current_day = st.session_state.get('day_count', 1)
-                with st.spinner(f"Day {current_day} 마감 및 Day {current_day + 1} 준비 중..."):
-                    # 1. 현재 뉴스 저장 (이전 뉴스로)
-                    st.session_state["previous_daily_news"] = st.session_state["daily_news"]
-                    # 2. 이전 뉴스 해설 생성
-                    meanings = explain_daily_news_meanings(st.session_state["previous_daily_news"])
-                    if meanings:
-                        st.session_state["news_meanings"] = meanings
-                    else:
-                        st.session_state["news_meanings"] = {} # 실패 시 초기화
-                    # 3. 주가 업데이트 (뉴스 해설 기반)
-                    update_stock_prices()
-                    # 4. 다음 날 뉴스 생성
-                    st.session_state["daily_news"] = generate_news()
-                    # 5. 날짜 증가
-                    st.session_state["day_count"] = current_day + 1
-                    # 6. 상태 저장
-                    save_session_data()
+                with st.spinner(f"Day {current_day} 마감 및 Day {current_day + 1} 준비 중..."), tracing.span("ui.day_advance"):
+                    # 전날 뉴스 해설 → 주가 업데이트 → 다음 날 뉴스 생성 → 날짜 증가 (엔진에서 진행)
+                    # 오늘 뉴스 해설과 다음 날 뉴스는 공용 루프에서 동시에 받아 오고, 반영은 여기서 함
+                    news_meanings, next_news, errors = aio.run(engine.afetch_day(
+                        st.session_state.get("selected_level", "초등"), st.session_state["daily_news"],
+                        list(st.session_state["stocks"].keys()), session_llm().acomplete, lookup=news_lookup(),
+                    ))
+                    for news_number, error in errors:
+                        show_news_error(news_number, error)
+                    had_news = engine.apply_day(st.session_state, news_meanings, next_news, scenario=SCENARIO)
+                    show_price_update_message(had_news)
+                    save_session_data() # 상태 저장
                 st.success(f"Day {st.session_state['day_count']} 시작! 주가가 변동되었고 새로운 뉴스가 생성되었습니다.")
                 st.toast("새로운 하루가 시작되었습니다!", icon="🌅")
                 st.rerun() # 변경사항 반영 위해 새로고침
@@ -1155,6 +1366,7 @@ def main():
 
         # 용어 사전 표시
         display_stock_glossary()
+        display_performance_panel()
 
         # 앱 가이드 표시
         with st.sidebar.expander("🚀 앱 사용 가이드", expanded=False):
@@ -1175,7 +1387,7 @@ def main():
         - 관심 있는 종목을 선택하면 해당 기업에 대한 설명(수준별)과 주가 그래프를 볼 수 있습니다.
 
         **4단계: 주식 매수하기**
-        - '💰 주식 매수' 탭에서 원하는 종목과 수량을 선택 후 '주식 매수' 버튼을 누르세요.
+        - '💰 주식 매수' 탭에서 종목을 이름이나 초성(예: ㅅㅅㅈㅈ)으로 검색해 고르고 수량을 정한 후 '주식 매수' 버튼을 누르세요.
         - 정말 매수할지 확인 창이 뜹니다. '매수 확인'을 누르면 거래가 완료됩니다.
         - **팁:** 뉴스를 보고 유망하다고 생각되는 섹터의 주식을 골라보세요!
 
@@ -1203,31 +1415,11 @@ def main():
     col_news, col_main_ui = st.columns([1, 2]) # 뉴스 영역과 메인 UI 영역 분할
 
     with col_news:
-        st.header(f"📰 Day {st.session_state.get('day_count', 1)} 뉴스")
-        # 뉴스 생성 버튼
-        if st.button("오늘의 뉴스 생성하기", use_container_width=True, key="news_gen_button", help="AI가 오늘의 경제 뉴스를 생성합니다."):
-            with st.spinner(f"Day {st.session_state.get('day_count', 1)} 뉴스 생성 중... (수준: {LEVELS[selected_level]['name']})"):
-                st.session_state["daily_news"] = generate_news()
-                st.session_state["news_meanings"] = {} # 새 뉴스 생성 시 이전 해설 초기화
-                save_session_data() # 뉴스 생성 후 저장
-            st.rerun() # 뉴스 표시 위해 새로고침
-
-        # 생성된 뉴스 표시
-        if st.session_state.get("daily_news"):
-            st.markdown("---")
-            st.subheader("오늘의 주요 뉴스")
-            for i, news in enumerate(st.session_state["daily_news"]):
-                with st.expander(f"**뉴스 {i+1}**", expanded=(i==0)): # 첫 번째 뉴스만 펼치기
-                    st.write(news)
-            st.markdown("---")
-            st.info("💡 뉴스를 읽고 어떤 섹터/기업에 영향이 있을지 예측해보세요! '하루 지나기' 후 '어제 뉴스 해설' 탭에서 AI 분석을 확인할 수 있습니다.")
-        else:
-            st.info("👆 '오늘의 뉴스 생성하기' 버튼을 눌러 뉴스를 받아보세요.")
-
+        display_news_panel()
 
     with col_main_ui:
         # 메인 탭 구성
-        tab_titles = ['📈 현재 주가', '📊 내 포트폴리오', '💰 주식 매수', '📉 주식 매도', '📰 어제 뉴스 해설']
+        tab_titles = ['📈 현재 주가', '📊 내 포트폴리오', '💰 주식 매수', '📉 주식 매도', '📰 어제 뉴스 해설', '🧪 전략 실험실']
         tabs = st.tabs(tab_titles)
 
         with tabs[0]: # 현재 주가 탭
@@ -1243,136 +1435,12 @@ def main():
         with tabs[2]: # 주식 매수 탭
             st.subheader("💰 주식 매수")
             st.markdown("투자하고 싶은 주식을 매수해보세요.")
-
-            # 섹터 선택 -> 종목 선택 연동
-            sector_names = ["섹터 선택..."] + list(st.session_state.get("stocks", {}).keys())
-            selected_sector_buy = st.selectbox("1. 매수할 섹터 선택:", sector_names, key="buy_sector")
-
-            if selected_sector_buy != "섹터 선택...":
-                stock_names_in_sector = ["종목 선택..."] + list(st.session_state.get("stocks", {}).get(selected_sector_buy, {}).keys())
-                selected_stock_buy = st.selectbox("2. 매수할 종목 선택:", stock_names_in_sector, key="buy_stock")
-
-                if selected_stock_buy != "종목 선택...":
-                    stock_info_buy = st.session_state.get("stocks", {}).get(selected_sector_buy, {}).get(selected_stock_buy)
-                    if stock_info_buy: # 주식 정보 있는지 확인
-                        stock_price_buy = stock_info_buy.get("current_price", 0)
-                        # 수준별 설명 가져오기 (키 형식 변경 반영)
-                        description_key = f"description_{selected_level}"
-                        stock_description = stock_info_buy.get(description_key, stock_info_buy.get("description_중등","설명 없음"))
-
-                        st.info(f"**{selected_stock_buy}** 현재 주가: **{stock_price_buy:,.0f}원**")
-                        st.caption(f"기업 정보: {stock_description}")
-
-                        # 매수 가능 수량 계산 및 표시
-                        available_cash = st.session_state.get("portfolio", {}).get("cash", 0)
-                        max_buy_quantity = available_cash // stock_price_buy if stock_price_buy > 0 else 0
-                        st.caption(f"현금 잔고: {available_cash:,.0f}원 (최대 {max_buy_quantity}주 매수 가능)")
-
-                        quantity_buy = st.number_input(
-                            f"3. 매수 수량 입력 (최대 {max_buy_quantity}주):",
-                            min_value=1,
-                            max_value=max(1, max_buy_quantity), # 0주 방지, 최대값 1 이상
-                            value=1,
-                            step=1,
-                            key="buy_quantity",
-                            disabled=(max_buy_quantity == 0) # 잔액 없으면 비활성화
-                        )
-
-                        total_buy_price = stock_price_buy * quantity_buy
-                        st.markdown(f"**예상 매수 금액:** {total_buy_price:,.0f} 원")
-
-                        # 매수 확인 절차
-                        if not st.session_state.get('buy_confirm', False):
-                            if st.button("주식 매수", use_container_width=True, key='buy_button_confirm', disabled=(max_buy_quantity == 0 or quantity_buy <= 0)):
-                                if quantity_buy > max_buy_quantity:
-                                    st.error(f"매수 가능 수량 초과! (최대 {max_buy_quantity}주)")
-                                elif quantity_buy <= 0:
-                                    st.error("매수 수량은 1주 이상이어야 합니다.")
-                                else:
-                                    st.session_state['buy_confirm'] = True
-                                    st.rerun() # 확인 UI 표시 위해 새로고침
-                        else:
-                            st.warning(f"**{selected_stock_buy} {quantity_buy}주**를 **{total_buy_price:,.0f}원**에 매수하시겠습니까?")
-                            col_confirm, col_cancel = st.columns([1, 1])
-                            with col_confirm:
-                                if st.button("✅ 네, 매수합니다", use_container_width=True, key='buy_confirm_button'):
-                                    buy_stock(selected_stock_buy, quantity_buy, selected_sector_buy)
-                                    st.rerun() # 포트폴리오 업데이트 반영
-                            with col_cancel:
-                                if st.button("❌ 아니요, 취소합니다", use_container_width=True, key='buy_cancel_button'):
-                                    st.session_state['buy_confirm'] = False
-                                    st.info("매수를 취소했습니다.")
-                                    st.rerun() # 확인 UI 숨기기
-                    else:
-                        st.warning("선택한 종목 정보를 불러올 수 없습니다.")
-            else:
-                st.info("먼저 매수할 섹터를 선택해주세요.")
-
+            display_buy_panel()
 
         with tabs[3]: # 주식 매도 탭
             st.subheader("📉 주식 매도")
             st.markdown("보유 중인 주식을 판매하여 현금화하세요.")
-
-            portfolio_stocks = st.session_state.get("portfolio", {}).get("stocks", {})
-            if portfolio_stocks:
-                owned_stock_names = ["종목 선택..."] + list(portfolio_stocks.keys())
-                selected_stock_sell = st.selectbox("1. 매도할 종목 선택:", owned_stock_names, key="sell_stock")
-
-                if selected_stock_sell != "종목 선택...":
-                    stock_info_sell = portfolio_stocks.get(selected_stock_sell)
-                    if stock_info_sell: # 보유 정보 있는지 확인
-                        owned_quantity = stock_info_sell.get("quantity", 0)
-                        purchase_price_avg = stock_info_sell.get("purchase_price", 0)
-
-                        # 현재가 찾기
-                        current_price_sell = 0
-                        for sector, stocks_in_sector in st.session_state.get("stocks", {}).items():
-                            if selected_stock_sell in stocks_in_sector:
-                                current_price_sell = stocks_in_sector[selected_stock_sell].get("current_price", 0)
-                                break
-
-                        st.info(f"**{selected_stock_sell}** 보유 수량: **{owned_quantity}주**")
-                        st.caption(f"평균 매수가: {purchase_price_avg:,.0f}원 / 현재가: {current_price_sell:,.0f}원")
-
-                        quantity_sell = st.number_input(
-                            f"2. 매도 수량 입력 (최대 {owned_quantity}주):",
-                            min_value=1,
-                            max_value=owned_quantity,
-                            value=1,
-                            step=1,
-                            key="sell_quantity",
-                            disabled=(owned_quantity == 0) # 보유량 없으면 비활성화
-                        )
-
-                        total_sell_price = current_price_sell * quantity_sell
-                        st.markdown(f"**예상 매도 금액:** {total_sell_price:,.0f} 원")
-
-                        # 매도 확인 절차
-                        if not st.session_state.get('sell_confirm', False):
-                            if st.button("주식 매도", use_container_width=True, key='sell_button_confirm', disabled=(owned_quantity == 0 or quantity_sell <= 0)):
-                                if quantity_sell > owned_quantity:
-                                    st.error(f"매도 가능 수량 초과! (최대 {owned_quantity}주)")
-                                elif quantity_sell <= 0:
-                                    st.error("매도 수량은 1주 이상이어야 합니다.")
-                                else:
-                                    st.session_state['sell_confirm'] = True
-                                    st.rerun()
-                        else:
-                            st.warning(f"**{selected_stock_sell} {quantity_sell}주**를 **{total_sell_price:,.0f}원**에 매도하시겠습니까?")
-                            col_confirm, col_cancel = st.columns([1, 1])
-                            with col_confirm:
-                                if st.button("✅ 네, 매도합니다", use_container_width=True, key='sell_confirm_button'):
-                                    sell_stock(selected_stock_sell, quantity_sell)
-                                    st.rerun()
-                            with col_cancel:
-                                if st.button("❌ 아니요, 취소합니다", use_container_width=True, key='sell_cancel_button'):
-                                    st.session_state['sell_confirm'] = False
-                                    st.info("매도를 취소했습니다.")
-                                    st.rerun()
-                    else:
-                        st.warning("선택한 보유 주식 정보를 찾을 수 없습니다.")
-            else:
-                st.info("매도할 주식이 없습니다. 먼저 주식을 매수하세요.")
+            display_sell_panel()
 
         with tabs[4]: # 어제 뉴스 해설 탭
             st.subheader(f"📰 Day {st.session_state.get('day_count', 1) - 1} 뉴스 해설")
@@ -1397,7 +1465,9 @@ def main():
                                 st.info(explanation)
                                 if sectors:
                                     st.markdown("**관련 섹터:**")
-                                    st.success(f"{', '.join(sectors)}")
+                                    weights = meaning_data.get("sector_weights") or {}
+                                    # 관련도(가장 관련 높은 섹터 = 100%)가 있으면 함께 표시
+                                    st.success(", ".join(f"{s} ({weights[s]:.0%})" if s in weights else s for s in sectors))
                                 else:
                                     st.markdown("**관련 섹터:** 없음")
                         else:
@@ -1410,9 +1480,15 @@ def main():
             else:
                 st.info("아직 어제 뉴스에 대한 해설이 생성되지 않았습니다. '하루 지나기'를 진행했는지 확인해주세요.")
 
+        with tabs[5]: # 전략 실험실 탭
+            st.subheader("🧪 전략 실험실")
+            st.markdown("지금까지의 주가로 '이렇게 투자했다면?'을 계산해 내 투자 결과와 비교해보세요.")
+            display_backtest_panel()
+
 
 if __name__ == "__main__":
     # 앱 시작 시 초기 레벨 설정 (세션 상태에 없으면 기본값)
     if 'selected_level' not in st.session_state:
         st.session_state['selected_level'] = "초등"
-    main()
\ No newline at end of file
+    with tracing.span("ui.script_run"): # 재실행(rerun) 1회 전체 시간
+        main()
\ No newline at end of file
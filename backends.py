@@ -0,0 +1,318 @@
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import aio
+from tracing import span
+
+# --- 외부 서비스 백엔드 ---
+# LLM 과 사용자 저장소(Supabase users 테이블)를 교체 가능한 백엔드로 감싼다.
+#   LLM:    complete(prompt, temperature, max_tokens, json_mode=False, kind=None) -> str
+#           (kind 는 engine 이 넘기는 호출 종류로, 백엔드는 쓰지 않고 usage.MeteredLLM 이 기록에 씀)
+#           complete_with_usage(...) -> (str, prompt 토큰 수, completion 토큰 수)  (사용량 계량용, usage.py)
+#           json_mode=True 이면 JSON 객체 하나로만 답한다 (형식이 어긋난 응답의 재요청용)
+#           acomplete_with_usage(...) 는 같은 결과를 돌려주는 코루틴 (aio.py 의 공용 루프에서 실행)
+#   저장소: table("users").select(...).eq(...).execute() 처럼 supabase-py 와 같은 호출 형태
+# 로컬 대체 백엔드(FakeLLMBackend, SQLiteStore)를 쓰면 네트워크 없이 지연/처리량을 측정할 수 있다.
+
+USERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    account TEXT PRIMARY KEY,
+    pw TEXT NOT NULL,
+    level TEXT DEFAULT '초등',
+    data TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+# --- LLM 백엔드 ---
+class LLMError(Exception):
+    """LLM 백엔드 호출 실패 (업스트림 클라이언트의 예외를 __cause__ 로 감쌈)."""
+
+
+class OpenAIBackend:
+    """OpenAI Chat Completions 호출 (비동기 클라이언트 하나를 공용 이벤트 루프에서 씀).
+
+    client(AsyncOpenAI 호환)를 주지 않으면 첫 호출 때 api_key 로 만든다 (openai 패키지 import 도 그때 함).
+    동기 complete/complete_with_usage 는 공용 루프에 요청을 맡기고 결과를 기다린다.
+    API 오류와 형식이 어긋난 응답은 LLMError 로 알린다.
+    """
+
+    def __init__(self, client=None, model="gpt-4o-mini", api_key=None):
+        self._client = client
+        self._api_key = api_key
+        self.model = model
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self._api_key)
+        return self._client
+
+    def complete(self, prompt, temperature, max_tokens, json_mode=False, kind=None):
+        return self.complete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode)[0]
+
+    def complete_with_usage(self, prompt, temperature, max_tokens, json_mode=False):
+        """(응답, prompt 토큰 수, completion 토큰 수) 를 돌려준다."""
+        return aio.run(self.acomplete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode))
+
+    async def acomplete(self, prompt, temperature, max_tokens, json_mode=False, kind=None):
+        return (await self.acomplete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode))[0]
+
+    async def acomplete_with_usage(self, prompt, temperature, max_tokens, json_mode=False):
+        client = self.client
+        with span("llm.openai") as s:
+            try:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=0.95,
+                    frequency_penalty=0,
+                    presence_penalty=0,
+                    **({"response_format": {"type": "json_object"}} if json_mode else {}),
+                )
+                content = response.choices[0].message.content.strip()
+            except Exception as e:
+                raise LLMError(f"LLM 호출에 실패했습니다: {e}") from e
+            usage = getattr(response, "usage", None)
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            s.record(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                request_bytes=len(prompt.encode("utf-8")),
+                response_bytes=len(content.encode("utf-8")),
+            )
+        return content, prompt_tokens, completion_tokens
+
+
+FAKE_NEWS_TEMPLATES = [
+    "새로운 게임기가 출시되면서 관련 부품을 찾는 곳이 늘었습니다. 공장들은 생산을 늘리고 있고 수출도 증가하고 있습니다.",
+    "원자재 가격이 크게 올라 공장을 운영하는 비용이 늘었습니다. 일부 회사는 제품 가격을 올릴지 고민하고 있습니다.",
+    "해외 여행을 떠나는 사람들이 많아지면서 비행기와 배를 이용하는 사람이 늘고 있습니다.",
+    "정부가 새로운 규제를 발표하면서 일부 인터넷 서비스 회사들의 사업 확대가 어려워질 수 있다는 전망이 나왔습니다.",
+    "날씨가 더워지면서 시원한 음료와 간편식을 찾는 사람이 늘어 식품 회사들의 판매가 호조를 보이고 있습니다.",
+    "전기차 판매가 예상보다 둔화되면서 배터리를 만드는 회사들의 재고가 늘고 있습니다.",
+    "새 아파트를 짓는 공사가 줄어들면서 철강과 건설 자재를 찾는 곳이 감소했습니다.",
+    "새로운 신약 개발 성공 소식이 전해지면서 바이오 산업에 대한 기대가 커지고 있습니다.",
+]
+FAKE_EXPLANATIONS = [
+    "이 뉴스는 관련 산업의 수요가 증가하고 성장이 기대된다는 뜻이에요.",
+    "이 뉴스는 관련 회사들의 판매가 감소하고 실적이 부진할 수 있다는 뜻이에요.",
+    "이 뉴스는 시장에 큰 변화는 없지만 앞으로의 흐름을 지켜봐야 한다는 뜻이에요.",
+]
+_SECTOR_LIST_PATTERN = re.compile(r"제시된 섹터 목록 \[([^\]]*)\]")
+_EXPLANATION_MARKER = "뉴스 의미 해설:"
+_JSON_EXPLANATION_MARKER = '"explanation"'
+_ARTICLE_COUNT_PATTERN = re.compile(r"뉴스 기사 (\d+)개")
+
+
+class FakeLLMBackend:
+    """정해진 형식("## 뉴스 N", "해설:")의 문장을 돌려주는 로컬 LLM 대체물.
+
+    latency 초(± jitter 초, 균등분포)만큼 기다린 뒤 응답하므로 실제 호출 지연을 흉내 낼 수 있다.
+    stall_rate 비율의 호출은 stall_latency 초를 더 기다린다 (가끔 느린 업스트림 응답, 꼬리 지연 측정용).
+    """
+
+    model = "fake"
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=None, stall_rate=0.0, stall_latency=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall_latency = stall_latency
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _next_delay(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+            if self.stall_rate and self._rng.random() < self.stall_rate:
+                delay += self.stall_latency
+            return delay
+
+    def complete(self, prompt, temperature, max_tokens, json_mode=False, kind=None):
+        return self.complete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode)[0]
+
+    def complete_with_usage(self, prompt, temperature, max_tokens, json_mode=False):
+        with span("llm.fake") as s:
+            delay = self._next_delay()
+            if delay > 0:
+                time.sleep(delay)
+            return self._finish(s, prompt, json_mode)
+
+    async def acomplete(self, prompt, temperature, max_tokens, json_mode=False, kind=None):
+        return (await self.acomplete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode))[0]
+
+    async def acomplete_with_usage(self, prompt, temperature, max_tokens, json_mode=False):
+        with span("llm.fake") as s:
+            delay = self._next_delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return self._finish(s, prompt, json_mode)
+
+    def _finish(self, s, prompt, json_mode):
+        content = self._respond_json(prompt) if json_mode else self._respond(prompt)
+        # 토큰 수는 글자 수로 대략 추정 (한국어 2글자 ≈ 1토큰)
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        s.record(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            request_bytes=len(prompt.encode("utf-8")), response_bytes=len(content.encode("utf-8")),
+        )
+        return content, prompt_tokens, completion_tokens
+
+    def _respond(self, prompt):
+        with self._lock:
+            match = _SECTOR_LIST_PATTERN.search(prompt)
+            if match: # 예전 형식: 관련 섹터도 함께 요청
+                sectors = [s.strip() for s in match.group(1).split(",") if s.strip()]
+                related = ", ".join(self._rng.sample(sectors, k=min(len(sectors), self._rng.randint(1, 2))))
+                return f"해설: {self._rng.choice(FAKE_EXPLANATIONS)}\n관련 섹터: {related or '없음'}"
+            if _EXPLANATION_MARKER in prompt:
+                return f"해설: {self._rng.choice(FAKE_EXPLANATIONS)}"
+            articles = self._rng.sample(FAKE_NEWS_TEMPLATES, k=5)
+        return "\n\n".join(f"## 뉴스 {i}\n{article}" for i, article in enumerate(articles, start=1))
+
+    def _respond_json(self, prompt):
+        with self._lock:
+            if _JSON_EXPLANATION_MARKER in prompt:
+                return json.dumps({"explanation": self._rng.choice(FAKE_EXPLANATIONS)}, ensure_ascii=False)
+            match = _ARTICLE_COUNT_PATTERN.search(prompt)
+            articles = self._rng.sample(FAKE_NEWS_TEMPLATES, k=int(match.group(1)) if match else 5)
+        return json.dumps({"articles": articles}, ensure_ascii=False)
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 2) if text else 0
+
+
+# --- 사용자 저장소 백엔드 ---
+class SQLiteStore:
+    """supabase-py 의 table(...).select/insert/update/eq/execute 형태를 흉내 내는 SQLite 저장소."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(USERS_SCHEMA)
+            if "version" not in self._table_columns("users"): # 버전 열이 없던 예전 파일
+                self._conn.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._columns = {"users": self._table_columns("users")}
+
+    def _table_columns(self, table):
+        return {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+
+    def table(self, name):
+        if name not in self._columns:
+            raise ValueError(f"알 수 없는 테이블입니다: {name}")
+        return _SQLiteQuery(self, name)
+
+    def add_user(self, account, pw, level="초등", data=None):
+        return self.table("users").insert({"account": account, "pw": pw, "level": level, "data": data}).execute()
+
+    def close(self):
+        self._conn.close()
+
+
+class _SQLiteQuery:
+    def __init__(self, store, table):
+        self._store = store
+        self._table = table
+        self._action = None
+        self._values = None
+        self._columns = "*"
+        self._filters = []
+
+    def _check(self, column):
+        if column not in self._store._columns[self._table]:
+            raise ValueError(f"{self._table} 테이블에 {column} 열이 없습니다.")
+        return column
+
+    def select(self, columns="*"):
+        self._action = "select"
+        if columns != "*":
+            self._columns = ", ".join(self._check(c.strip()) for c in columns.split(","))
+        return self
+
+    def insert(self, values):
+        self._action = "insert"
+        self._values = values if isinstance(values, list) else [values]
+        return self
+
+    def update(self, values):
+        self._action = "update"
+        self._values = values
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((self._check(column), value))
+        return self
+
+    def _where(self):
+        if not self._filters:
+            return "", []
+        return " WHERE " + " AND ".join(f"{column} = ?" for column, _ in self._filters), [v for _, v in self._filters]
+
+    def execute(self):
+        with span(f"db.sqlite.{self._action}") as s:
+            response = self._execute()
+            if self._action in ("insert", "update"):
+                values = self._values if isinstance(self._values, list) else [self._values]
+                s.record(request_bytes=sum(len(str(v).encode("utf-8")) for row in values for v in row.values()))
+            else:
+                s.record(response_bytes=sum(len(str(v).encode("utf-8")) for row in response.data for v in row.values()))
+        return response
+
+    def _execute(self):
+        where, params = self._where()
+        conn = self._store._conn
+        with self._store._lock, conn:
+            if self._action == "select":
+                rows = conn.execute(f"SELECT {self._columns} FROM {self._table}{where}", params).fetchall()
+            elif self._action == "insert":
+                rows = []
+                for values in self._values:
+                    columns = [self._check(c) for c in values]
+                    conn.execute(
+                        f"INSERT INTO {self._table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        [_to_sql(values[c]) for c in columns],
+                    )
+                    rows.append(values)
+                return SimpleNamespace(data=rows, count=None)
+            elif self._action == "update":
+                columns = [self._check(c) for c in self._values]
+                assignments = ", ".join(f"{c} = ?" for c in columns)
+                # 바뀐 행을 돌려줌 (조건 열을 바꾸는 update 도 있으므로 다시 조회하지 않음)
+                rows = conn.execute(
+                    f"UPDATE {self._table} SET {assignments}{where} RETURNING *", [_to_sql(self._values[c]) for c in columns] + params
+                ).fetchall()
+            elif self._action == "delete":
+                rows = conn.execute(f"SELECT * FROM {self._table}{where}", params).fetchall()
+                conn.execute(f"DELETE FROM {self._table}{where}", params)
+            else:
+                raise ValueError("select/insert/update/delete 중 하나를 먼저 호출해야 합니다.")
+        return SimpleNamespace(data=[dict(row) for row in rows], count=None)
+
+
+def _to_sql(value):
+    # dict/list 는 Supabase 의 json 열처럼 JSON 문자열로 저장
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
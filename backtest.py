@@ -0,0 +1,267 @@
+import itertools
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tracing import span
+
+# --- 전략 백테스트 ---
+# 게임이 지금까지 만든 주가 기록(price_history)과 날마다의 뉴스 섹터 영향(sector_impact_history)으로
+# "처음부터 이 전략대로 투자했다면?" 을 계산해 학생의 실제 자산 곡선과 비교한다.
+# 전략은 (거래일 × 종목) 보유 비중 행렬을 한 번에 만들고, 자산 곡선은 일간 수익률 행렬과 곱해 구하므로
+# 날짜나 종목을 도는 반복문이 없다.
+#   buy_and_hold     첫날 (섹터를 고르면 그 섹터 종목만) 같은 금액씩 사서 끝까지 보유
+#   momentum         lookback 일 수익률이 오른 상위 top_n 종목을 같은 비중으로, rebalance 일마다 교체
+#   sector_rotation  lookback 일 섹터 평균 수익률이 오른 상위 top_sectors 섹터의 종목을 같은 비중으로
+#   news_following   어제 발표된 뉴스 섹터 영향(하루 지나기 뒤 화면에 보이는 값)이 threshold 보다 큰 상위 top_sectors 섹터를
+#                    오늘 사서 다음 날까지 보유 (오늘 주가에 들어갈 영향은 그날이 지나야 알 수 있으므로 쓰지 않음)
+# 매매는 그날 주가(종가)로 소수 주 단위까지 하고 수수료는 없다 (게임 규칙과 같음). 고르지 않은 비중은 현금.
+# 여러 매개변수 조합(sweep)은 프로세스 풀에 나눠 계산한다 (주가 행렬은 워커마다 한 번만 보냄).
+
+SWEEP_PARALLEL_CELLS = 50_000_000   # 조합 수 × 거래일 × 종목 수가 이보다 작으면 프로세스를 띄우지 않고 바로 계산
+SWEEP_PROCESSES = int(os.environ.get("BACKTEST_PROCESSES", 0)) or None   # 기본: CPU 수
+
+STRATEGY_LABELS = {
+    "buy_and_hold": "사서 보유",
+    "momentum": "모멘텀 (오른 종목)",
+    "sector_rotation": "섹터 로테이션",
+    "news_following": "뉴스 따라가기",
+}
+# 전략별 기본 매개변수 격자 (sweep 용)
+DEFAULT_GRIDS = {
+    "buy_and_hold": {"sector": [None]},
+    "momentum": {"lookback": [1, 3, 5, 10, 20], "top_n": [1, 3, 5, 10], "rebalance": [1, 5]},
+    "sector_rotation": {"lookback": [1, 3, 5, 10, 20], "top_sectors": [1, 2, 3], "rebalance": [1, 5]},
+    "news_following": {"threshold": [0.0, 0.01, 0.02, 0.04], "top_sectors": [1, 2, 3]},
+}
+
+
+class PriceHistory:
+    """백테스트 입력: (거래일 × 종목) 주가 행렬과 (거래일 - 1) × 섹터 뉴스 영향 행렬."""
+
+    def __init__(self, tickers, sector_names, sector_index, prices, impacts, initial_cash):
+        self.tickers = tickers
+        self.ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+        self.sector_names = sector_names
+        self.sector_index = sector_index
+        self.prices = prices                  # prices[t, i]: Day t+1 의 주가
+        self.impacts = impacts                # impacts[t, s]: Day t+1 뉴스가 Day t+2 주가에 준 영향
+        self.initial_cash = initial_cash
+        self.returns = np.nan_to_num(prices[1:] / prices[:-1] - 1) # (거래일 - 1) × 종목 일간 수익률
+        self.sector_counts = np.bincount(sector_index, minlength=len(sector_names))
+        self.sector_matrix = np.zeros((len(tickers), len(sector_names))) # 종목 × 섹터 소속 (0/1)
+        self.sector_matrix[np.arange(len(tickers)), sector_index] = 1
+
+    @property
+    def days(self):
+        return self.prices.shape[0]
+
+    @classmethod
+    def from_state(cls, state):
+        """게임 상태(stocks, sector_impact_history, initial_cash_set)에서 만든다.
+
+        기록이 짧은 종목은 앞쪽을 첫 주가로 채우고, 영향 기록이 없는 예전 날짜는 영향 0 으로 본다.
+        """
+        stocks = state["stocks"]
+        sector_names = list(stocks.keys())
+        tickers, sector_index, histories = [], [], []
+        for i, sector in enumerate(sector_names):
+            for name, info in stocks[sector].items():
+                tickers.append(name)
+                sector_index.append(i)
+                histories.append(info.get("price_history") or [info.get("current_price", 0)])
+        days = max((len(history) for history in histories), default=1)
+        prices = np.empty((days, len(histories)))
+        for column, history in enumerate(histories):
+            prices[:days - len(history), column] = history[0]
+            prices[days - len(history):, column] = history
+
+        sector_position = {sector: i for i, sector in enumerate(sector_names)}
+        impacts = np.zeros((days - 1, len(sector_names)))
+        records = (state.get("sector_impact_history") or [])[-(days - 1):] if days > 1 else []
+        for row, record in enumerate(records, start=days - 1 - len(records)):
+            for sector, impact in record.items():
+                if sector in sector_position:
+                    impacts[row, sector_position[sector]] = impact
+        initial_cash = state.get("initial_cash_set") or state.get("portfolio", {}).get("cash", 0)
+        return cls(tickers, sector_names, np.array(sector_index, dtype=np.int32), prices, impacts, initial_cash)
+
+
+class BacktestResult:
+    """전략 하나(매개변수 한 조합)의 자산 곡선과 요약 지표 (% 단위)."""
+
+    def __init__(self, strategy, params, equity):
+        self.strategy = strategy
+        self.params = params
+        self.equity = equity
+        self.total_return = (equity[-1] / equity[0] - 1) * 100 if equity[0] else 0.0
+        peaks = np.maximum.accumulate(equity)
+        self.max_drawdown = float(np.max(1 - equity / np.where(peaks > 0, peaks, 1))) * 100
+        daily = equity[1:] / equity[:-1] - 1 if len(equity) > 1 else np.empty(0)
+        self.volatility = float(np.std(daily, ddof=1)) * 100 if len(daily) > 1 else float("nan")
+
+    @property
+    def label(self):
+        name = STRATEGY_LABELS.get(self.strategy, self.strategy)
+        params = ", ".join(f"{key}={value}" for key, value in self.params.items() if value is not None)
+        return f"{name} ({params})" if params else name
+
+    def summary(self):
+        """표 출력용 한 행."""
+        return {
+            "전략": self.label,
+            "최종 자산": self.equity[-1],
+            "수익률(%)": self.total_return,
+            "최대 낙폭(%)": self.max_drawdown,
+            "일간 변동성(%)": self.volatility,
+        }
+
+
+# --- 전략 (보유 비중 행렬) ---
+# 각 전략은 (거래일 - 1) × 종목 비중 행렬 W 를 돌려준다. W[t] 는 Day t+1 주가로 사서 Day t+2 까지 들고 가는 비중.
+def buy_and_hold(history, sector=None):
+    """첫날 같은 금액씩 산 뒤 그대로 보유 (비중은 주가 따라 변함)."""
+    selected = np.ones(len(history.tickers), dtype=bool)
+    if sector is not None:
+        selected = history.sector_index == history.sector_names.index(sector)
+    growth = np.where(selected, history.prices[:-1] / history.prices[0], 0.0)
+    totals = growth.sum(axis=1, keepdims=True)
+    return np.divide(growth, totals, out=np.zeros_like(growth), where=totals > 0)
+
+
+def momentum(history, lookback=5, top_n=5, rebalance=1):
+    """lookback 일 수익률이 0 보다 큰 상위 top_n 종목을 1/top_n 씩."""
+    signal = _lookback_returns(history.prices, lookback)
+    picked = _pick_top(signal, top_n, floor=0.0)
+    return _hold(picked / max(1, min(top_n, len(history.tickers))), lookback, history.days, rebalance)
+
+
+def sector_rotation(history, lookback=5, top_sectors=2, rebalance=1):
+    """lookback 일 섹터 평균 수익률이 0 보다 큰 상위 top_sectors 섹터에 같은 금액씩 (섹터 안에서는 종목별 같은 비중)."""
+    signal = _lookback_returns(history.prices, lookback)
+    sector_signal = (signal @ history.sector_matrix) / np.maximum(history.sector_counts, 1)
+    picked = _pick_top(sector_signal, top_sectors, floor=0.0)
+    return _hold(_sector_weights(history, picked, top_sectors), lookback, history.days, rebalance)
+
+
+def news_following(history, threshold=0.0, top_sectors=2):
+    """어제 주가에 반영된 뉴스 섹터 영향이 threshold 보다 큰 상위 top_sectors 섹터를 다음 날까지 보유.
+
+    W[t] 는 impacts[t - 1] 로 정한다 (impacts[t] 는 W[t] 가 들고 가는 바로 그 수익률에 더해진 영향). 첫날은 현금.
+    """
+    picked = np.zeros(history.impacts.shape, dtype=bool)
+    picked[1:] = _pick_top(history.impacts[:-1], top_sectors, floor=threshold)
+    return _sector_weights(history, picked, top_sectors)
+
+
+STRATEGIES = {
+    "buy_and_hold": buy_and_hold,
+    "momentum": momentum,
+    "sector_rotation": sector_rotation,
+    "news_following": news_following,
+}
+
+
+def _lookback_returns(prices, lookback):
+    """Day lookback+1 부터 마지막 전날까지, 각 날의 lookback 일 수익률 (신호는 그날까지의 주가만 씀)."""
+    if lookback < 1:
+        raise ValueError("lookback 은 1 이상이어야 합니다.")
+    return prices[lookback:-1] / prices[:-1 - lookback] - 1
+
+
+def _pick_top(signal, k, floor):
+    """행마다 값이 floor 보다 큰 상위 k 칸 (NaN 은 고르지 않음)."""
+    k = min(k, signal.shape[1])
+    picked = np.zeros(signal.shape, dtype=bool)
+    if k < 1 or signal.shape[0] == 0:
+        return picked
+    filled = np.where(np.isnan(signal), -np.inf, signal)
+    top = np.argpartition(-filled, k - 1, axis=1)[:, :k]
+    np.put_along_axis(picked, top, True, axis=1)
+    return picked & (filled > floor)
+
+
+def _sector_weights(history, picked_sectors, top_sectors):
+    """고른 섹터마다 1/top_sectors, 그 안에서 종목 수로 나눈 종목 비중."""
+    per_sector = picked_sectors / (max(1, min(top_sectors, len(history.sector_names))) * np.maximum(history.sector_counts, 1))
+    return per_sector[:, history.sector_index]
+
+
+def _hold(decisions, start, days, rebalance):
+    """start 날부터 rebalance 일마다 정한 비중을 다음 결정까지 유지한 (거래일 - 1) × 종목 행렬."""
+    weights = np.zeros((days - 1, decisions.shape[1]))
+    if start < days - 1:
+        held = np.repeat(decisions[::max(1, rebalance)], max(1, rebalance), axis=0)
+        weights[start:] = held[:days - 1 - start]
+    return weights
+
+
+# --- 실행 ---
+def equity_curve(history, weights, initial_cash=None):
+    """비중 행렬로 날마다의 자산(원)을 계산한다 (Day 1 = 초기 자본)."""
+    daily = np.einsum("ti,ti->t", weights, history.returns)
+    cash = history.initial_cash if initial_cash is None else initial_cash
+    return cash * np.concatenate([[1.0], np.cumprod(1 + daily)])
+
+
+def run_backtest(history, strategy, **params):
+    weights = STRATEGIES[strategy](history, **params)
+    return BacktestResult(strategy, params, equity_curve(history, weights))
+
+
+def actual_equity(history, ledger):
+    """거래 원장을 주가 기록 위에 다시 재생한 학생의 날마다 자산 (현금 + 보유 주식 평가액)."""
+    days = history.days
+    trade_days = np.clip(ledger.column("day").astype(np.int64) - 1, 0, days - 1) # Day d 의 체결은 d 번째 주가로
+    signed_qty = ledger.column("side").astype(np.int64) * ledger.column("qty")
+    cash = history.initial_cash - np.cumsum(np.bincount(trade_days, weights=signed_qty * ledger.column("price"), minlength=days))
+
+    columns = np.array([history.ticker_index.get(ticker, -1) for ticker in ledger.tickers], dtype=np.int64)
+    trade_columns = columns[ledger.column("ticker")] if len(ledger) else np.empty(0, dtype=np.int64)
+    traded, slots = np.unique(trade_columns[trade_columns >= 0], return_inverse=True) # 거래한 종목 열만 계산
+    positions = np.zeros((days, len(traded)))
+    known = trade_columns >= 0
+    np.add.at(positions, (trade_days[known], slots), signed_qty[known])
+    holdings_value = (np.cumsum(positions, axis=0) * history.prices[:, traded]).sum(axis=1)
+    return cash + holdings_value
+
+
+def expand_grid(grid):
+    """{매개변수: [값, ...]} 격자의 모든 조합."""
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+_worker_history = None
+
+
+def _init_worker(history):
+    global _worker_history
+    _worker_history = history
+
+
+def _run_job(job):
+    strategy, params = job
+    return run_backtest(_worker_history, strategy, **params)
+
+
+def sweep(history, grids, processes=SWEEP_PROCESSES):
+    """{전략: 매개변수 격자} 의 모든 조합을 백테스트해 수익률 높은 순으로 돌려준다.
+
+    계산량이 SWEEP_PARALLEL_CELLS 를 넘으면 프로세스 풀에 나눈다 (워커를 띄우는 데 1초 가까이 들어 작은 게임은 바로 계산).
+    워커는 spawn 으로 띄워 서버의 다른 스레드 상태를 물려받지 않는다.
+    """
+    jobs = [(strategy, params) for strategy, grid in grids.items() for params in expand_grid(grid)]
+    with span("backtest.sweep"):
+        workers = min(processes or os.cpu_count() or 1, len(jobs))
+        if workers <= 1 or len(jobs) * history.returns.size < SWEEP_PARALLEL_CELLS:
+            results = [run_backtest(history, strategy, **params) for strategy, params in jobs]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(history,),
+            ) as executor:
+                results = list(executor.map(_run_job, jobs, chunksize=math.ceil(len(jobs) / (workers * 4))))
+    return sorted(results, key=lambda result: result.total_return, reverse=True)
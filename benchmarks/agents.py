@@ -0,0 +1,53 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from agents import AGENT_TYPES, AgentPopulation
+from market_stats import RETURN_WINDOWS
+
+# --- 가상 투자자 벤치마크 ---
+# 사용법: python -m benchmarks.agents --agents 1000 10000 100000 1000000 --stocks 2000 --days 20 --max-seconds 1
+# 투자자 수를 늘려 가며 하루치 결정(신호 → 주문 → 종목별 순주문 → 가격 영향) 1회 시간을 잰다.
+# 투자자는 세 종류를 같은 수로 섞고, --max-seconds 는 투자자 100,000명일 때의 하루 시간 기준이다.
+
+CHECKED_AGENTS = 100_000
+
+
+def run(n_agents, n_stocks, days, seed=0):
+    rng = np.random.default_rng(seed)
+    counts = {kind: n_agents // len(AGENT_TYPES) for kind in AGENT_TYPES}
+    started = time.perf_counter()
+    population = AgentPopulation(n_stocks, counts, seed=seed)
+    build_seconds = time.perf_counter() - started
+
+    returns = {window: rng.normal(0, window ** 0.5, size=n_stocks) for window in RETURN_WINDOWS}
+    stock_news = np.where(rng.random(n_stocks) < 0.1, rng.uniform(-0.04, 0.04, size=n_stocks), 0.0)
+    started = time.perf_counter()
+    for _ in range(days):
+        population.price_impacts(returns, stock_news, rng)
+    return build_seconds, (time.perf_counter() - started) / days
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가상 투자자 하루 결정 비용 측정")
+    parser.add_argument("--agents", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--stocks", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--max-seconds", type=float, default=None, help=f"투자자 {CHECKED_AGENTS:,}명 하루 시간이 이를 넘으면 실패(종료 코드 1)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for n_agents in args.agents:
+        build_seconds, day_seconds = run(n_agents, args.stocks, args.days)
+        print(f"투자자 {n_agents:>9,}명: 만들기 {build_seconds * 1000:8.1f}ms  하루 {day_seconds * 1000:8.1f}ms"
+              f"  ({n_agents / day_seconds / 1e6:5.1f}M 명/s)")
+        if args.max_seconds is not None and n_agents == CHECKED_AGENTS and day_seconds > args.max_seconds:
+            print(f"  -> 기준 {args.max_seconds:.2f}s 초과", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
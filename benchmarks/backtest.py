@@ -0,0 +1,57 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import backtest
+from market import DEFAULT_VOLATILITY, FactorModel
+
+# --- 전략 백테스트 벤치마크 ---
+# 사용법: python -m benchmarks.backtest --stocks 10000 --days 250 --processes 4
+# 팩터 모델로 만든 큰 주가 기록 위에서 기본 매개변수 격자 전체(sweep)를 한 프로세스로 계산한 시간과
+# 프로세스 풀로 나눠 계산한 시간을 비교한다. 두 결과(전략 순위)가 같은지도 확인한다.
+
+
+def build_history(n_stocks, days, n_sectors=15, seed=0):
+    rng = np.random.default_rng(seed)
+    sector_index = np.sort(rng.integers(0, n_sectors, size=n_stocks)).astype(np.int32)
+    impacts = np.where(rng.random((days, n_sectors)) < 0.3, rng.uniform(-0.04, 0.04, size=(days, n_sectors)), 0.0)
+    model = FactorModel.from_level(sector_index, n_sectors, DEFAULT_VOLATILITY, rng=rng)
+    prices = model.simulate(rng.integers(15000, 800000, size=n_stocks), days, impacts).astype(np.float64)
+    return backtest.PriceHistory(
+        [f"종목{i:05d}" for i in range(n_stocks)], [f"섹터{s}" for s in range(n_sectors)], sector_index,
+        prices, impacts, 10_000_000,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="전략 백테스트 sweep 벤치마크")
+    parser.add_argument("--stocks", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--processes", type=int, default=None, help="프로세스 풀 크기 (기본: CPU 수)")
+    args = parser.parse_args(argv)
+
+    history = build_history(args.stocks, args.days)
+    grids = dict(backtest.DEFAULT_GRIDS, buy_and_hold={"sector": [None] + history.sector_names})
+    jobs = sum(len(backtest.expand_grid(grid)) for grid in grids.values())
+
+    started = time.perf_counter()
+    inline = backtest.sweep(history, grids, processes=1)
+    inline_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    pooled = backtest.sweep(history, grids, processes=args.processes)
+    pooled_seconds = time.perf_counter() - started
+
+    print(f"종목 {args.stocks}개 × {args.days + 1}일, 전략 조합 {jobs}개")
+    print(f"  한 프로세스: {inline_seconds:6.2f}s  ({inline_seconds / jobs * 1000:6.1f}ms/조합)")
+    print(f"  프로세스 풀: {pooled_seconds:6.2f}s  ({inline_seconds / pooled_seconds:4.1f}배)")
+    print(f"  최고 전략: {inline[0].label}  수익률 {inline[0].total_return:.2f}%")
+    if [r.label for r in inline] != [r.label for r in pooled]:
+        print("  -> 두 결과의 순위가 다릅니다", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# --- 콜드 스타트(로그인 화면) 벤치마크 ---
+# 사용법: python -m benchmarks.cold_start --runs 5 --max-seconds 3
+# 매 실행마다 새 파이썬 프로세스에서 app.py 를 한 번 실행(streamlit AppTest)해 로그인 화면이 그려질 때까지의 시간을 잰다.
+# 비교용으로 무거운 패키지(pandas, plotly, openai, supabase)를 미리 불러온 경우(예전처럼 맨 위에서 import)도 함께 잰다.
+
+HEAVY_MODULES = ["pandas", "plotly.express", "openai", "supabase"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+eager = {eager!r}
+started = time.perf_counter()
+for name in eager:
+    __import__(name)
+at = AppTest.from_file({app!r}, default_timeout=60).run()
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "login_form": any(w.key == "login_button" for w in at.button),
+    "exceptions": [str(e.value) for e in at.exception],
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once(eager):
+    env = dict(os.environ)
+    # 로그인 화면만 그리므로 실제 키나 네트워크는 필요 없다
+    env.setdefault("OPENAI_API_KEY", "sk-cold-start-benchmark")
+    code = _CHILD.format(eager=list(eager), app=os.path.join(ROOT, "app.py"), heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로그인 화면 콜드 스타트 시간 측정")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="지연 import 경로의 중앙값이 이 시간을 넘으면 실패(종료 코드 1)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for label, eager in (("lazy", []), ("eager", HEAVY_MODULES)):
+        samples = [run_once(eager) for _ in range(args.runs)]
+        results[label] = statistics.median(s["seconds"] for s in samples)
+        last = samples[-1]
+        print(f"{label:>6}: 중앙값 {results[label]:6.3f}s  (최소 {min(s['seconds'] for s in samples):.3f}s)"
+              f"  로그인 폼={'O' if last['login_form'] else 'X'}  불러온 무거운 모듈={last['loaded'] or '-'}")
+        if last["exceptions"]:
+            print(f"  예외: {last['exceptions']}", file=sys.stderr)
+    print(f"지연 import 로 {results['eager'] - results['lazy']:.3f}s 단축 ({results['eager'] / results['lazy']:.2f}배)")
+
+    if args.max_seconds is not None and results["lazy"] > args.max_seconds:
+        print(f"  -> 기준 {args.max_seconds:.1f}s 초과", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from market import DEFAULT_VOLATILITY, FactorModel
+
+# --- 팩터 모델 벤치마크 ---
+# 사용법: python -m benchmarks.factor_model --stocks 10000 --days 1000 --max-seconds 10
+# 하루씩 step() 을 호출하는 경로(앱과 동일)와 여러 날을 묶어 뽑는 simulate() 경로를 모두 잰다.
+
+
+def run(n_stocks, days, n_sectors=15, seed=0):
+    rng = np.random.default_rng(seed)
+    sector_index = rng.integers(0, n_sectors, size=n_stocks)
+    prices = rng.integers(15000, 800000, size=n_stocks)
+    impacts = rng.uniform(-0.04, 0.04, size=(days, n_sectors))
+    model = FactorModel.from_level(sector_index, n_sectors, DEFAULT_VOLATILITY, rng=rng)
+
+    started = time.perf_counter()
+    current = prices
+    for day in range(days):
+        current = model.step(current, impacts[day])
+    step_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model.simulate(prices, days, impacts)
+    simulate_seconds = time.perf_counter() - started
+    return {"step": step_seconds, "simulate": simulate_seconds}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="팩터 모델 주가 엔진 벤치마크")
+    parser.add_argument("--stocks", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=1_000)
+    parser.add_argument("--sectors", type=int, default=15)
+    parser.add_argument("--max-seconds", type=float, default=None, help="이 시간을 넘으면 실패(종료 코드 1)")
+    args = parser.parse_args(argv)
+
+    results = run(args.stocks, args.days, args.sectors)
+    cells = args.stocks * args.days
+    failed = False
+    for name, seconds in results.items():
+        print(f"{name:>8}: {seconds:7.3f}s  ({cells / seconds / 1e6:6.1f}M 종목·일/s)")
+        if args.max_seconds is not None and seconds > args.max_seconds:
+            print(f"  -> 기준 {args.max_seconds:.1f}s 초과", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
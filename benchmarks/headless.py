@@ -0,0 +1,94 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import engine
+from backends import FakeLLMBackend
+from universe import load_universe, synthetic_universe
+
+# --- 헤드리스 게임 엔진 벤치마크 ---
+# 사용법: python -m benchmarks.headless [--stocks 2000] [--check]
+# Streamlit 없이 엔진만 돌려 하루 진행, 매매, 평가, 저장/복원 처리량(초당 횟수)을 잰다.
+# LLM 은 지연 없는 FakeLLMBackend, Supabase 는 메모리 dict 스텁으로 대체한다.
+# --check 를 주면 THRESHOLDS 보다 느린 항목이 있을 때 종료 코드 1 로 끝난다 (회귀 확인용).
+
+# 항목별 최소 처리량 (초당 횟수, 기본 카탈로그 기준)
+THRESHOLDS = {
+    "day_step": 200.0,
+    "trade": 5_000.0,
+    "valuation": 1_000.0,
+    "serialize": 20.0,
+}
+
+
+class StubStore:
+    """users 테이블의 data 열만 흉내 내는 메모리 저장소."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def save(self, account, json_data):
+        self.rows[account] = json_data
+
+    def load(self, account):
+        return self.rows.get(account)
+
+
+def _rate(fn, repeat):
+    started = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return repeat / (time.perf_counter() - started)
+
+
+def run(universe, days=200, trades=5_000, valuations=2_000, saves=200, seed=0):
+    rng = np.random.default_rng(seed)
+    state = engine.new_state("고등", universe=universe, rng=rng)
+    state["user_id"] = "bench"
+    state["portfolio"]["cash"] = 10 ** 15  # 매매 도중 잔액 부족이 나지 않도록
+    llm = FakeLLMBackend(seed=seed)
+    state["daily_news"] = engine.generate_news("고등", llm.complete)
+    store = StubStore()
+    tickers = [(sector, name) for sector, stocks in state["stocks"].items() for name in stocks]
+
+    results = {}
+    results["day_step"] = _rate(lambda i: engine.advance_day(state, llm.complete, rng=rng, call_interval=0), days)
+
+    def trade(i):
+        sector, name = tickers[i % len(tickers)]
+        engine.buy_stock(state, name, 2, sector)
+        engine.sell_stock(state, name, 1)
+    results["trade"] = _rate(trade, trades // 2) * 2
+
+    results["valuation"] = _rate(lambda i: (engine.calculate_portfolio_summary(state), engine.get_ledger(state).holdings()), valuations)
+
+    def save_and_load(i):
+        store.save("bench", engine.serialize_state(state))
+        engine.restore_state({}, store.load("bench"))
+    results["serialize"] = _rate(save_and_load, saves)
+    return results, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="헤드리스 게임 엔진 처리량 벤치마크")
+    parser.add_argument("--stocks", type=int, default=None, help="합성 카탈로그 종목 수 (기본: 기본 카탈로그)")
+    parser.add_argument("--days", type=int, default=200)
+    parser.add_argument("--check", action="store_true", help="THRESHOLDS 미달 시 실패 처리")
+    args = parser.parse_args(argv)
+
+    universe = synthetic_universe(args.stocks) if args.stocks else load_universe()
+    results, state = run(universe, days=args.days)
+    print(f"종목 {len(universe)}개, 원장 {len(engine.get_ledger(state))}건, 저장 크기 {len(engine.serialize_state(state)):,} bytes")
+    failed = False
+    for name, rate in results.items():
+        threshold = THRESHOLDS[name]
+        status = "OK" if rate >= threshold else "느림"
+        print(f"{name:>10}: {rate:12,.1f} /s  (기준 {threshold:,.0f} /s) {status}")
+        failed |= rate < threshold
+    return 1 if args.check and failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
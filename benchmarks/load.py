@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import aio
+import engine
+from backends import FakeLLMBackend, SQLiteStore
+from tracing import REGISTRY
+from usage import MeteredLLM, load_budgets
+from universe import load_universe
+
+# --- 동시 접속 부하 테스트 ---
+# 사용법: python -m benchmarks.load --sessions 200 --days 3 --llm-latency 0.3 --llm-jitter 0.1
+# 로컬 대체 백엔드(FakeLLMBackend + SQLiteStore)로 여러 학생 세션을 동시에 돌린다.
+# 세션마다 로그인 → (매수/매도 → 하루 지나기) × days 를 진행하고 단계별 지연 분위수와 처리량을 출력한다.
+# --io async 이면 세션을 스레드 대신 이벤트 루프 하나의 코루틴으로 돌린다 (LLM: acomplete, 저장소: aio.execute).
+# 하루 지나기의 해설 5건과 다음 날 뉴스가 겹쳐 진행되므로(engine.afetch_day) 같은 지연에서 세션당 시간이 짧아진다.
+
+
+def run_session(session_no, store, llm, universe, days, trades_per_day, timings):
+    rng = np.random.default_rng(session_no)
+    pick = random.Random(session_no)
+    account = f"student{session_no:04d}"
+
+    def timed(name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[name].append(time.perf_counter() - started)
+        return result
+
+    def save(state):
+        json_data = engine.serialize_state(state)
+        store.table("users").update({"data": json_data}).eq("account", account).execute()
+
+    # 1. 로그인 (저장된 데이터가 있으면 복원, 없으면 새 게임)
+    response = timed("login", store.table("users").select("*").eq("account", account).eq("pw", "pw").execute)
+    user_data = response.data[0]
+    state = {"user_id": account, "selected_level": user_data["level"]}
+    if user_data.get("data"):
+        engine.restore_state(state, user_data["data"])
+    engine.initialize_state(state, state["selected_level"], universe=universe, rng=rng)
+    complete = llm.session(state).complete
+    timed("news", lambda: state.update(daily_news=engine.generate_news(state["selected_level"], complete)))
+
+    tickers = [(sector, name) for sector, stocks in state["stocks"].items() for name in stocks]
+    for _ in range(days):
+        # 2. 매매 (체결 후 저장까지 한 번의 상호작용으로 측정)
+        for _ in range(trades_per_day):
+            sector, name = pick.choice(tickers)
+            held = state["portfolio"]["stocks"].get(name, {}).get("quantity", 0)
+            try:
+                if held and pick.random() < 0.4:
+                    timed("trade", lambda: (engine.sell_stock(state, name, max(1, held // 2)), save(state)))
+                else:
+                    timed("trade", lambda: (engine.buy_stock(state, name, 1, sector), save(state)))
+            except engine.TradeError:
+                pass
+        # 3. 하루 지나기 (해설 5건 + 주가 갱신 + 다음 날 뉴스 + 저장)
+        timed("day_advance", lambda: (engine.advance_day(state, complete, rng=rng, call_interval=0), save(state)))
+
+
+async def arun_session(session_no, store, llm, universe, days, trades_per_day, timings):
+    """run_session 의 비동기 버전 (매매는 CPU 만 쓰므로 그대로, LLM 과 저장소 I/O 만 기다림)."""
+    rng = np.random.default_rng(session_no)
+    pick = random.Random(session_no)
+    account = f"student{session_no:04d}"
+
+    async def timed(name, coro):
+        started = time.perf_counter()
+        result = await coro
+        timings[name].append(time.perf_counter() - started)
+        return result
+
+    async def save(state):
+        json_data = engine.serialize_state(state)
+        await aio.execute(store.table("users").update({"data": json_data}).eq("account", account))
+
+    response = await timed("login", aio.execute(store.table("users").select("*").eq("account", account).eq("pw", "pw")))
+    user_data = response.data[0]
+    state = {"user_id": account, "selected_level": user_data["level"]}
+    if user_data.get("data"):
+        engine.restore_state(state, user_data["data"])
+    engine.initialize_state(state, state["selected_level"], universe=universe, rng=rng)
+    acomplete = llm.session(state).acomplete
+    state["daily_news"] = await timed("news", engine.agenerate_news(state["selected_level"], acomplete))
+
+    tickers = [(sector, name) for sector, stocks in state["stocks"].items() for name in stocks]
+    for _ in range(days):
+        for _ in range(trades_per_day):
+            sector, name = pick.choice(tickers)
+            held = state["portfolio"]["stocks"].get(name, {}).get("quantity", 0)
+            started = time.perf_counter()
+            try:
+                if held and pick.random() < 0.4:
+                    engine.sell_stock(state, name, max(1, held // 2))
+                else:
+                    engine.buy_stock(state, name, 1, sector)
+            except engine.TradeError:
+                continue
+            await save(state)
+            timings["trade"].append(time.perf_counter() - started)
+
+        async def day_advance():
+            news_meanings, next_news, _ = await engine.afetch_day(state["selected_level"], state["daily_news"], state["stocks"].keys(), acomplete)
+            engine.apply_day(state, news_meanings, next_news, rng=rng)
+            await save(state)
+        await timed("day_advance", day_advance())
+
+
+async def run_sessions_async(args, store, llm, universe, timings):
+    semaphore = asyncio.Semaphore(args.concurrency or args.sessions)
+
+    async def limited(n):
+        async with semaphore:
+            await arun_session(n, store, llm, universe, args.days, args.trades_per_day, timings)
+
+    results = await asyncio.gather(*(limited(n) for n in range(args.sessions)), return_exceptions=True)
+    return [r for r in results if isinstance(r, Exception)]
+
+
+def percentile_table(timings):
+    lines = []
+    for name, samples in timings.items():
+        values = np.asarray(samples) * 1000
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        lines.append(f"{name:>12}: n={len(values):6d}  p50={p50:8.1f}ms  p95={p95:8.1f}ms  p99={p99:8.1f}ms  max={values.max():8.1f}ms")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 백엔드 기반 동시 세션 부하 테스트")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=None, help="동시에 실행할 세션 수 (기본: 전체)")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--io", choices=["threads", "async"], default="threads", help="세션 실행 방식 (스레드 또는 이벤트 루프)")
+    parser.add_argument("--trades-per-day", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="가짜 LLM 응답 지연 (초)")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="가짜 LLM 지연 편차 (초)")
+    parser.add_argument("--db", default=None, help="SQLite 파일 경로 (기본: 임시 파일)")
+    parser.add_argument("--price-as", default="gpt-4o-mini", help="가짜 LLM 토큰을 이 모델 가격으로 환산 (usage.MODEL_PRICES)")
+    parser.add_argument("--budgets", default=None, help="수준별 LLM 토큰 예산 JSON (기본: LLM_BUDGETS 또는 usage.DEFAULT_BUDGETS)")
+    parser.add_argument("--prometheus", default=None, help="계측 결과를 Prometheus 텍스트로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="stock-load-"), "users.db")
+    store = SQLiteStore(db_path)
+    for session_no in range(args.sessions):
+        account = f"student{session_no:04d}"
+        if not store.table("users").select("account").eq("account", account).execute().data:
+            store.add_user(account, "pw", level=random.choice(list(engine.LEVELS)))
+    backend = FakeLLMBackend(latency=args.llm_latency, jitter=args.llm_jitter, seed=0)
+    backend.model = args.price_as
+    llm = MeteredLLM(backend, budgets=load_budgets(args.budgets))
+    universe = load_universe()
+    timings = defaultdict(list)
+
+    started = time.perf_counter()
+    if args.io == "async":
+        errors = asyncio.run(run_sessions_async(args, store, llm, universe, timings))
+    else:
+        with ThreadPoolExecutor(max_workers=args.concurrency or args.sessions) as pool:
+            futures = [
+                pool.submit(run_session, n, store, llm, universe, args.days, args.trades_per_day, timings)
+                for n in range(args.sessions)
+            ]
+            errors = [f.exception() for f in futures if f.exception() is not None]
+    elapsed = time.perf_counter() - started
+
+    print(f"세션 {args.sessions}개 ({args.io}), {args.days}일, LLM 지연 {args.llm_latency}±{args.llm_jitter}s, DB {db_path}")
+    for line in percentile_table(timings):
+        print(line)
+    print("단계별 계측 (tracing):")
+    for row in REGISTRY.summary():
+        print(f"  {row['단계']:>22}: n={row['호출 수']:6d}  p50={row['p50 (ms)']:8.1f}ms  p95={row['p95 (ms)']:8.1f}ms"
+              f"  tokens={row['prompt_tokens'] + row['completion_tokens']:,}")
+    if args.prometheus:
+        with open(args.prometheus, "w", encoding="utf-8") as f:
+            f.write(REGISTRY.to_prometheus())
+    print("LLM 사용량 (수준·Day별):")
+    for row in llm.meter.report_by_day():
+        print(f"  {row['수준']} Day {row['Day']:>3}: 호출 {row['호출 수']:5d} (대체 {row['대체 호출']:5d})"
+              f"  tokens={row['prompt_tokens'] + row['completion_tokens']:,}  사용자당 ${row['사용자당 비용 (USD)']:.6f}")
+    interactions = sum(len(samples) for samples in timings.values())
+    print(f"총 {elapsed:.2f}s, 상호작용 {interactions}건 ({interactions / elapsed:,.1f}/s), LLM 호출 {backend.calls}건")
+    if errors:
+        print(f"오류 {len(errors)}건: {errors[0]!r}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
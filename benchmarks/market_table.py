@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from streamlit.testing.v1 import AppTest
+
+from tracing import REGISTRY
+from universe import synthetic_universe, write_universe_csv
+
+# --- 시세 표 페이지 비용 벤치마크 ---
+# 사용법: python -m benchmarks.market_table --stocks 40 1000 10000 --flips 10 --max-growth 3
+# 종목 수를 바꿔 가며 app.py 를 streamlit AppTest 로 실행하고, 시세 표 페이지를 여러 번 넘기면서
+# 시세 패널 1회 시간(ui.market_panel)과 브라우저로 보내는 표 크기(Arrow 바이트)를 잰다.
+# 표는 보이는 페이지만 보내므로 두 값 모두 종목 수와 상관없이 거의 같아야 한다.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(n_stocks, flips, workdir):
+    universe_path = os.path.join(workdir, f"universe-{n_stocks}.csv")
+    write_universe_csv(synthetic_universe(n_stocks, seed=0), universe_path)
+    os.environ.update({
+        "STOCK_UNIVERSE_PATH": universe_path, "LLM_BACKEND": "fake",
+        "STORE_BACKEND": "sqlite", "SQLITE_PATH": os.path.join(workdir, "users.db"),
+    })
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.session_state["user_id"] = "bench"
+    at.session_state["user_settings"] = {"new_user": True}
+    at.run()
+    at.selectbox(key="market_sort").select("전일 대비").run() # 정렬 색인을 만드는 첫 실행은 빼고 잰다
+
+    REGISTRY.reset()
+    payload = 0
+    pages = int(at.number_input(key="market_page").proto.max)
+    for flip in range(flips):
+        at.number_input(key="market_page").set_value(flip % pages + 1).run()
+        payload = max(payload, len(at.dataframe[0].proto.arrow_data.data))
+    if at.exception:
+        raise RuntimeError(f"예외: {[e.message for e in at.exception]}")
+    rows = {row["단계"]: row for row in REGISTRY.summary()}
+    return rows["ui.market_panel"]["평균 (ms)"], payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="시세 표 페이지 렌더링 비용 측정")
+    parser.add_argument("--stocks", type=int, nargs="+", default=[40, 1000, 10000])
+    parser.add_argument("--flips", type=int, default=10)
+    parser.add_argument("--max-growth", type=float, default=None, help="가장 큰/작은 카탈로그의 패널 시간 비율이 이보다 크면 실패(종료 코드 1)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="stock-market-")
+    results = []
+    for n_stocks in args.stocks:
+        panel_ms, payload = measure(n_stocks, args.flips, workdir)
+        results.append(panel_ms)
+        print(f"종목 {n_stocks:>6}개: 시세 패널 평균 {panel_ms:7.1f}ms  표 전송 {payload / 1024:6.1f}KB")
+    growth = results[-1] / results[0] if results[0] else float("inf")
+    print(f"종목 {args.stocks[0]}개 → {args.stocks[-1]}개: 패널 시간 {growth:.1f}배")
+    if args.max_growth is not None and growth > args.max_growth:
+        print(f"  -> 기준 {args.max_growth:.1f}배 초과", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+import engine
+from backends import FakeLLMBackend
+from scheduler import LLMScheduler
+from universe import load_universe
+from usage import MeteredLLM
+
+# --- LLM 요청 스케줄러 벤치마크 ---
+# 사용법: python -m benchmarks.scheduler --sessions 30 --days 3 --batch 300 --rpm 3000 --llm-latency 0.3
+# 학생 세션들이 하루 지나기(engine.afetch_day)를 반복하는 동안 일괄 작업(해설 요청 --batch 건)이 같은 한도를 나눠 쓴다.
+# 일괄 작업을 batch 등급으로 보낼 때와 학생 요청과 같은 interactive 등급으로 보낼 때의 하루 시간, 등급별 대기,
+# 학생별로 보낸 요청 수의 고르기(최소/최대), 합쳐진 요청 수, 실제 분당 요청 수를 비교한다.
+# --max-day-p95 는 batch 등급 설정에서 학생 하루 시간 p95 (초) 기준이다.
+
+MODES = {"우선순위": "batch", "우선순위 없음": "interactive"}
+
+
+async def run_mode(batch_priority, args, sectors):
+    backend = FakeLLMBackend(latency=args.llm_latency, jitter=args.llm_jitter, seed=0)
+    scheduler = LLMScheduler({"requests_per_minute": args.rpm, "tokens_per_minute": args.tpm})
+    scheduler.requests.level = scheduler.tokens.level = 0 # 빈 버킷에서 시작해 한도가 바로 걸리게 함
+    llm = MeteredLLM(backend, budgets={}, scheduler=scheduler)
+    levels = list(engine.LEVELS)
+    day_times = []
+
+    async def student(n):
+        state = {"user_id": f"student{n:03d}", "selected_level": levels[n % len(levels)], "day_count": 1}
+        acomplete = llm.session(state).acomplete
+        news = [f"학생 {n} 의 {i}번째 기사: 새로운 게임기가 출시되면서 관련 부품을 찾는 곳이 늘었습니다." for i in range(engine.NEWS_COUNT)]
+        await asyncio.sleep(n * args.stagger / max(1, args.sessions)) # 학생마다 조금씩 늦게 시작
+        for _ in range(args.days):
+            started = time.perf_counter()
+            _, news, _ = await engine.afetch_day(state["selected_level"], news, sectors, acomplete)
+            day_times.append(time.perf_counter() - started)
+            state["day_count"] += 1
+
+    async def batch_job():
+        acomplete = llm.session({"user_id": "corpus_builder", "selected_level": "고등", "day_count": 0}, priority=batch_priority).acomplete
+        await asyncio.gather(*(
+            acomplete(engine.build_explanation_prompt("고등", f"일괄 기사 {i}"), temperature=0.5, max_tokens=engine.EXPLANATION_MAX_TOKENS, kind="explanation")
+            for i in range(args.batch)
+        ))
+
+    started = time.perf_counter()
+    await asyncio.gather(batch_job(), *(student(n) for n in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    sent = Counter(row["user"] for row in llm.meter.recent if row["model"] != "coalesced")
+    students = [sent[f"student{n:03d}"] for n in range(args.sessions)]
+    return np.asarray(day_times) * 1000, scheduler, backend.calls / elapsed * 60, (min(students), max(students))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="우선순위·공평 분배·요청 합치기를 쓰는 LLM 스케줄러의 대기 시간 측정")
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=300, help="일괄 작업의 해설 요청 수")
+    parser.add_argument("--rpm", type=int, default=3000, help="분당 요청 한도")
+    parser.add_argument("--tpm", type=int, default=None, help="분당 토큰 한도 (기본: 없음)")
+    parser.add_argument("--stagger", type=float, default=2.0, help="학생들이 하루 지나기를 시작하는 시각을 이 초 안에 고르게 흩뜨림")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--max-day-p95", type=float, default=None, help="우선순위 설정의 하루 시간 p95(초)가 이를 넘으면 실패(종료 코드 1)")
+    args = parser.parse_args(argv)
+    sectors = load_universe().sectors
+
+    print(f"학생 {args.sessions}명 × {args.days}일, 일괄 요청 {args.batch}건, 분당 한도 {args.rpm:,}건, LLM 지연 {args.llm_latency}±{args.llm_jitter}s")
+    day_p95 = {}
+    for mode, batch_priority in MODES.items():
+        day_times, scheduler, rate, (fewest, most) = asyncio.run(run_mode(batch_priority, args, sectors))
+        p50, day_p95[mode], p99 = np.percentile(day_times, [50, 95, 99])
+        print(f"  {mode}: 하루 p50={p50:8.1f}ms  p95={day_p95[mode]:8.1f}ms  p99={p99:8.1f}ms"
+              f"  실제 {rate:,.0f}건/분  합쳐진 요청 {scheduler.coalesced}건  학생별 요청 {fewest}~{most}건")
+        for row in scheduler.summary():
+            if row["보낸 수"]:
+                print(f"    {row['등급']:>12}: 보낸 수 {row['보낸 수']:5d}  대기 p50={row['대기 p50 (ms)']:8.1f}ms"
+                      f"  p95={row['대기 p95 (ms)']:8.1f}ms  최대={row['대기 최대 (ms)']:8.1f}ms")
+    if args.max_day_p95 is not None and day_p95["우선순위"] > args.max_day_p95 * 1000:
+        print(f"우선순위 설정의 하루 p95 {day_p95['우선순위']:.1f}ms 가 기준 {args.max_day_p95 * 1000:.0f}ms 를 넘었습니다.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+import engine
+from backends import FakeLLMBackend
+from hedging import LatencyGuard, load_deadlines
+from universe import load_universe
+from usage import MeteredLLM
+
+# --- LLM 꼬리 지연 벤치마크 ---
+# 사용법: python -m benchmarks.tail_latency --days 200 --sessions 20 --llm-latency 0.3 --stall-rate 0.03 --stall-latency 5
+# 가끔 아주 늦게 답하는 가짜 LLM 으로 하루 지나기의 LLM 단계(engine.afetch_day: 해설 5건 + 다음 날 뉴스)를 반복하고
+# 헤지/마감 시간 없이, 헤지만, 헤지 + 마감 시간 세 가지 설정의 하루 시간 분위수를 비교한다.
+# 헤지는 관측이 쌓여야 시작되므로 처음 --warmup 일은 분위수에서 뺀다.
+# --max-p99 는 헤지 + 마감 시간 설정의 p99 (초) 기준이다.
+
+MODES = {
+    "기본": {"hedge": False, "deadlines": {}},
+    "헤지": {"hedge": True, "deadlines": {}},
+    "헤지+마감": {"hedge": True, "deadlines": None},
+}
+
+
+async def run_mode(backend, guard, level, sectors, days, sessions, warmup):
+    llm = MeteredLLM(backend, budgets={}, guard=guard)
+    acomplete = llm.session({"user_id": "bench", "selected_level": level, "day_count": 1}).acomplete
+    news = await engine.agenerate_news(level, acomplete)
+    timings = []
+
+    async def session(n):
+        for day in range(days // sessions):
+            started = time.perf_counter()
+            await engine.afetch_day(level, news, sectors, acomplete)
+            if day >= warmup:
+                timings.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(session(n) for n in range(sessions)))
+    return np.asarray(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="헤지/마감 시간에 따른 하루 지나기 LLM 꼬리 지연 비교")
+    parser.add_argument("--days", type=int, default=200, help="설정마다 진행할 전체 일수 (세션들에 나눔)")
+    parser.add_argument("--sessions", type=int, default=20, help="동시에 하루를 진행하는 세션 수")
+    parser.add_argument("--warmup", type=int, default=2, help="세션마다 분위수에서 뺄 처음 일수")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--stall-rate", type=float, default=0.03, help="아주 늦게 답하는 호출 비율")
+    parser.add_argument("--stall-latency", type=float, default=5.0, help="늦은 호출에 더해지는 지연 (초)")
+    parser.add_argument("--deadlines", default='{"news": 2.0, "explanation": 1.5}', help="헤지+마감 설정의 마감 시간 JSON")
+    parser.add_argument("--max-p99", type=float, default=None, help="헤지+마감 설정의 p99(초)가 이를 넘으면 실패(종료 코드 1)")
+    args = parser.parse_args(argv)
+
+    level = "초등"
+    sectors = load_universe().sectors
+
+    print(f"LLM 지연 {args.llm_latency}±{args.llm_jitter}s, {args.stall_rate:.0%} 호출은 +{args.stall_latency}s,"
+          f" 세션 {args.sessions}개 × {args.days // args.sessions}일")
+    p99 = {}
+    for mode, config in MODES.items():
+        backend = FakeLLMBackend(latency=args.llm_latency, jitter=args.llm_jitter, seed=0,
+                                 stall_rate=args.stall_rate, stall_latency=args.stall_latency)
+        deadlines = load_deadlines(args.deadlines) if config["deadlines"] is None else config["deadlines"]
+        guard = LatencyGuard(deadlines, hedge=config["hedge"])
+        timings = asyncio.run(run_mode(backend, guard, level, sectors, args.days, args.sessions, args.warmup)) * 1000
+        p50, p95, p99[mode] = np.percentile(timings, [50, 95, 99])
+        counts = {key: sum(row[key] for row in guard.summary()) for key in ("헤지", "헤지 성공", "마감 초과")}
+        print(f"  {mode:>6}: n={len(timings):5d}  p50={p50:8.1f}ms  p95={p95:8.1f}ms  p99={p99[mode]:8.1f}ms"
+              f"  max={timings.max():8.1f}ms  LLM 호출 {backend.calls:5d}건"
+              f"  (헤지 {counts['헤지']}, 헤지 성공 {counts['헤지 성공']}, 마감 초과 {counts['마감 초과']})")
+    if args.max_p99 is not None and p99["헤지+마감"] > args.max_p99 * 1000:
+        print(f"헤지+마감 p99 {p99['헤지+마감']:.1f}ms 가 기준 {args.max_p99 * 1000:.0f}ms 를 넘었습니다.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+import engine
+from tracing import REGISTRY
+from universe import synthetic_universe, write_universe_csv
+
+# --- 화면 패널(fragment) 재실행 비용 벤치마크 ---
+# 사용법: python -m benchmarks.ui_panels --stocks 2000 --holdings 500 --interactions 10
+# 큰 종목 카탈로그와 보유 종목이 많은 포트폴리오로 app.py 를 streamlit AppTest 로 실행한 뒤
+# 매수 수량을 여러 번 바꿔 가며 전체 스크립트 1회(ui.script_run)와 매수 패널 1회(ui.buy_panel)의 시간을 비교한다.
+# 패널 안의 입력은 실제 서버에서 그 패널(fragment)만 다시 실행하므로 ui.buy_panel 이 상호작용 1회의 비용이다.
+# (AppTest 는 매번 전체 스크립트를 실행하므로 두 구간을 같은 실행 안에서 함께 잴 수 있다.)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fragment 패널 재실행 비용 측정")
+    parser.add_argument("--stocks", type=int, default=2000)
+    parser.add_argument("--holdings", type=int, default=500)
+    parser.add_argument("--interactions", type=int, default=10)
+    parser.add_argument("--min-ratio", type=float, default=None, help="전체/패널 시간 비율이 이보다 작으면 실패(종료 코드 1)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="stock-ui-")
+    universe_path = os.path.join(workdir, "universe.csv")
+    write_universe_csv(synthetic_universe(args.stocks, seed=0), universe_path)
+    os.environ.update({
+        "STOCK_UNIVERSE_PATH": universe_path, "LLM_BACKEND": "fake",
+        "STORE_BACKEND": "sqlite", "SQLITE_PATH": os.path.join(workdir, "users.db"),
+    })
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.session_state["user_id"] = "bench"
+    at.session_state["user_settings"] = {"new_user": True}
+    at.session_state["selected_level"] = "고등"
+    at.run()
+
+    # 보유 종목 채우기 (현금을 넉넉히 주고 엔진으로 직접 체결)
+    state = at.session_state
+    state["portfolio"]["cash"] = 10 ** 15
+    rng = np.random.default_rng(0)
+    tickers = [(sector, name) for sector, stocks in state["stocks"].items() for name in stocks]
+    for i in rng.choice(len(tickers), size=min(args.holdings, len(tickers)), replace=False):
+        sector, name = tickers[i]
+        engine.buy_stock(state, name, int(rng.integers(1, 20)), sector)
+
+    sector, name = tickers[0]
+    at.run()
+    at.text_input(key="buy_search").input(name).run()
+    at.selectbox(key="buy_stock").select(name).run()
+    REGISTRY.reset()
+    for quantity in range(2, args.interactions + 2):
+        at.number_input(key="buy_quantity").set_value(quantity).run()
+    if at.exception:
+        print(f"예외: {[e.message for e in at.exception]}", file=sys.stderr)
+        return 1
+
+    rows = {row["단계"]: row for row in REGISTRY.summary()}
+    full, panel = rows["ui.script_run"]["평균 (ms)"], rows["ui.buy_panel"]["평균 (ms)"]
+    print(f"종목 {args.stocks}개, 보유 {args.holdings}종목, 상호작용 {args.interactions}회")
+    for stage in ("ui.script_run", "ui.market_panel", "ui.portfolio_panel", "ui.news_panel", "ui.buy_panel", "ui.sell_panel"):
+        if stage in rows:
+            print(f"  {stage:>20}: 평균 {rows[stage]['평균 (ms)']:8.1f}ms  p95 {rows[stage]['p95 (ms)']:8.1f}ms")
+    ratio = full / panel if panel else float("inf")
+    print(f"수량 변경 1회: 전체 재실행 {full:.1f}ms → 매수 패널만 {panel:.1f}ms ({ratio:.1f}배)")
+    if args.min_ratio is not None and ratio < args.min_ratio:
+        print(f"  -> 기준 {args.min_ratio:.1f}배 미달", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import argparse
+import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+import engine
+from backends import FakeLLMBackend, OpenAIBackend
+from news_corpus import DEFAULT_DB_PATH, NewsCorpus
+from sector_classifier import char_ngrams, get_classifier
+from tracing import REGISTRY
+from usage import token_cost
+
+# --- 뉴스 코퍼스 일괄 생성 ---
+# 사용법: python corpus_builder.py --days 30 --concurrency 8 [--backend openai --model gpt-4o-mini] [--run-id 2026-10]
+# 세 수준(LEVELS) × days 개의 작업(하루치 뉴스 5개 + 기사별 해설)을 정해진 동시 실행 수로 나눠 LLM 에 요청하고,
+# 결과를 오프라인 뉴스 코퍼스(news_corpus.py, NEWS_CORPUS_PATH)에 바로 저장한다.
+#   체크포인트: 끝난 작업은 코퍼스의 meta 표에 "job:<run-id>:<수준>:<day>" 로 남기므로 중단 후 다시 실행하면 이어서 한다.
+#   중복 제거: 글자 3-gram 의 MinHash + LSH 로 후보를 찾고, 실제 Jaccard 유사도가 NEAR_DUPLICATE_JACCARD 이상이면 버린다.
+#   영향(impact): 해설의 감성 점수(engine.explanation_sentiment)를 IMPACT_PER_POINT 배 한 값 (상한 3점)
+# 앱은 다음 시작 때 새 기사를 읽는다 (CorpusBackend 의 표본 목록은 프로세스 시작 시 만들어짐).
+
+NEAR_DUPLICATE_JACCARD = 0.8   # 이 이상 겹치면 같은 기사로 봄
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16                 # 밴드 16개 × 4행: Jaccard 0.8 인 쌍을 후보로 잡을 확률 ≈ 99.98%
+IMPACT_PER_POINT = 0.02
+_PRIME = (1 << 31) - 1
+
+
+def shingles(article):
+    return {zlib.crc32(gram.encode("utf-8")) for gram in char_ngrams(article, (3, 3))}
+
+
+class NearDuplicateIndex:
+    """MinHash LSH 로 거의 같은 기사를 찾는 색인 (스레드 안전)."""
+
+    def __init__(self, threshold=NEAR_DUPLICATE_JACCARD, permutations=MINHASH_PERMUTATIONS, bands=LSH_BANDS, seed=0):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = permutations // bands
+        self._a = rng.integers(1, _PRIME, size=permutations, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=permutations, dtype=np.uint64)
+        self._buckets = {}   # (밴드 번호, 밴드 값) -> 기사 번호 목록
+        self._shingles = []
+        self._lock = threading.Lock()
+
+    def _signature(self, grams):
+        values = np.fromiter(grams, dtype=np.uint64, count=len(grams))
+        return ((self._a[:, None] * values[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add_if_new(self, article):
+        """이미 있는 기사와 거의 같으면 False, 아니면 색인에 넣고 True."""
+        grams = shingles(article)
+        if not grams:
+            return False
+        signature = self._signature(grams)
+        keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        with self._lock:
+            candidates = {n for key in keys for n in self._buckets.get(key, ())}
+            for n in candidates:
+                other = self._shingles[n]
+                if len(grams & other) / len(grams | other) >= self.threshold:
+                    return False
+            number = len(self._shingles)
+            self._shingles.append(grams)
+            for key in keys:
+                self._buckets.setdefault(key, []).append(number)
+        return True
+
+    def __len__(self):
+        return len(self._shingles)
+
+
+def impact_from_explanation(explanation):
+    score = engine.explanation_sentiment(explanation)
+    return max(-3, min(3, score)) * IMPACT_PER_POINT
+
+
+class CorpusBuilder:
+    """(수준, day) 작업을 동시에 실행해 코퍼스를 채운다."""
+
+    def __init__(self, corpus, backend, run_id="default", classifier=None):
+        self.corpus = corpus
+        self.backend = backend
+        self.run_id = run_id
+        self.classifier = classifier or get_classifier()
+        self.sectors = list(self.classifier.sectors)
+        self.dedupe = NearDuplicateIndex()
+        for level in engine.LEVELS:
+            for article_id in corpus.ids(level):
+                self.dedupe.add_if_new(corpus.get(article_id)["article"])
+        self._lock = threading.Lock()
+        self.stats = {"generated": 0, "stored": 0, "duplicates": 0, "failed_articles": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def job_key(self, level, day):
+        return f"job:{self.run_id}:{level}:{day}"
+
+    def pending_jobs(self, days):
+        return [
+            (level, day) for day in range(1, days + 1) for level in engine.LEVELS
+            if self.corpus.get_meta(self.job_key(level, day)) is None
+        ]
+
+    def _complete(self, prompt, temperature, max_tokens, json_mode=False, kind="llm"):
+        content, prompt_tokens, completion_tokens = self.backend.complete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode)
+        with self._lock:
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+        return content
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def run_job(self, level, day):
+        """하루치 뉴스와 해설을 만들어 저장하고, 끝나면 체크포인트를 남긴다. 저장된 기사 수를 돌려준다."""
+        articles = engine.generate_news(level, self._complete)
+        valid = [a for a in articles if engine.NEWS_FAILED not in a and engine.NEWS_ERROR not in a]
+        self._count(generated=len(valid), failed_articles=len(articles) - len(valid))
+        fresh = [a for a in valid if self.dedupe.add_if_new(a)]
+        self._count(duplicates=len(valid) - len(fresh))
+        weights = self.classifier.sector_weights(fresh, self.sectors) if fresh else []
+        stored = 0
+        for article, sector_weights in zip(fresh, weights):
+            meaning_text = self._complete(
+                engine.build_explanation_prompt(level, article), temperature=0.5, max_tokens=engine.EXPLANATION_MAX_TOKENS, kind="explanation",
+            )
+            explanation = engine.parse_explanation(meaning_text, self.sectors)["explanation"]
+            stored += self.corpus.add(
+                level, article, explanation, sector_weights, impact_from_explanation(explanation),
+                source=f"llm:{self.backend.model}:{self.run_id}",
+            ) is not None
+        self._count(stored=stored)
+        self.corpus.set_meta(self.job_key(level, day), stored)
+        return stored
+
+    def run(self, days, concurrency=4, on_progress=None):
+        """남은 작업을 실행하고 (완료 작업 수, 실패 목록) 을 돌려준다."""
+        jobs = self.pending_jobs(days)
+        failures = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = {pool.submit(self.run_job, level, day): (level, day) for level, day in jobs}
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    failures.append((futures[future], future.exception()))
+                else:
+                    done += 1
+                if on_progress:
+                    on_progress(done + len(failures), len(jobs))
+        return done, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="세 수준의 뉴스와 해설을 일괄 생성해 오프라인 코퍼스에 저장")
+    parser.add_argument("--days", type=int, default=30, help="수준별로 만들 하루치 뉴스 묶음 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 실행할 작업 수")
+    parser.add_argument("--run-id", default="default", help="체크포인트 이름 (같은 이름으로 다시 실행하면 이어서 함)")
+    parser.add_argument("--db", default=None, help="코퍼스 파일 (기본: NEWS_CORPUS_PATH 또는 data/news_corpus.db)")
+    parser.add_argument("--backend", choices=["openai", "fake"], default="openai")
+    parser.add_argument("--model", default=os.environ.get("LLM_MODEL", "gpt-4o-mini"))
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="가짜 LLM 응답 지연 (초, --backend fake)")
+    args = parser.parse_args(argv)
+
+    corpus = NewsCorpus(args.db or os.environ.get("NEWS_CORPUS_PATH", DEFAULT_DB_PATH))
+    if args.backend == "fake":
+        backend = FakeLLMBackend(latency=args.llm_latency)
+    else:
+        backend = OpenAIBackend(model=args.model, api_key=os.environ.get("OPENAI_API_KEY"))
+    builder = CorpusBuilder(corpus, backend, run_id=args.run_id)
+    pending = len(builder.pending_jobs(args.days))
+    print(f"코퍼스 {corpus.path}: 기사 {corpus.count()}건, 남은 작업 {pending}/{args.days * len(engine.LEVELS)}건")
+
+    def progress(finished, total):
+        print(f"\r  작업 {finished}/{total}", end="", file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    done, failures = builder.run(args.days, concurrency=args.concurrency, on_progress=progress)
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+
+    stats = builder.stats
+    minutes = elapsed / 60 if elapsed else float("inf")
+    cost = token_cost(backend.model, stats["prompt_tokens"], stats["completion_tokens"])
+    print(f"작업 {done}건 완료, 실패 {len(failures)}건, {elapsed:.1f}s")
+    print(f"  생성 기사 {stats['generated']}건 ({stats['generated'] / minutes:,.1f}/분), 저장 {stats['stored']}건"
+          f" ({stats['stored'] / minutes:,.1f}/분), 중복 {stats['duplicates']}건, 파싱 실패 {stats['failed_articles']}건")
+    print(f"  tokens={stats['prompt_tokens'] + stats['completion_tokens']:,}  비용 ${cost:.4f}  코퍼스 기사 {corpus.count()}건")
+    for row in REGISTRY.summary():
+        print(f"  {row['단계']:>22}: n={row['호출 수']:6d}  p50={row['p50 (ms)']:8.1f}ms  p95={row['p95 (ms)']:8.1f}ms")
+    if failures:
+        (level, day), error = failures[0]
+        print(f"실패한 작업은 다시 실행하면 이어서 합니다. 첫 오류 ({level} day {day}): {error!r}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
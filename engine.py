@@ -0,0 +1,824 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from agents import AGENT_TYPES, DEFAULT_AGENTS, get_population
+from backends import LLMError
+from ledger import BUY, SELL, TradeLedger
+from market import FactorModel
+from market_stats import MarketStats
+from sector_classifier import get_classifier
+from tracing import span, traced
+from universe import load_universe
+
+# --- 게임 엔진 (Streamlit 과 분리된 순수 로직) ---
+# 시장, 포트폴리오, 뉴스 로직을 상태(state) 매핑 하나만 받아 처리한다.
+# state 는 st.session_state 또는 일반 dict 모두 가능하며 아래 키를 사용한다.
+#   stocks, portfolio, ledger, day_count, daily_news, previous_daily_news,
+#   news_meanings, sector_news_impact, sector_impact_history, selected_level, initial_cash_set, user_id,
+#   market_stats (저장하지 않는 계산 캐시)
+# 화면 표시(st.info/st.toast 등)는 하지 않고 결과를 반환하거나 예외를 던지며, 표시는 app.py 가 맡는다.
+# LLM 호출은 complete(prompt, temperature, max_tokens, json_mode=False, kind="llm") -> str 형태의 함수를 주입받는다.
+# (json_mode=True 는 응답 형식이 어긋났을 때 모자란 부분만 JSON 으로 다시 받는 재요청에만 쓴다.
+#  kind 는 호출 종류 "news"/"explanation" 으로, 사용량 기록과 종류별 마감 시간에 쓰인다.)
+# 비동기 경로(agenerate_news, afetch_day)는 같은 형태의 코루틴 함수 acomplete 를 받아 호출들을 겹쳐 진행하고,
+# state 는 건드리지 않는다. 결과는 apply_day 로 state 에 반영한다 (aio.py 의 공용 루프에서 실행).
+
+# --- 수준별 설정 ---
+# volatility: 팩터 모델의 일간 변동성 (시장/섹터/개별 종목 표준편차, 섹터 간 상관계수)
+# agents: 가상 투자자 종류별 수와 주문 쏠림의 최대 가격 영향 (agents.py, None 이면 가상 투자자 없음)
+LEVELS = {
+    "초등": {"name": "초등 (5~6학년)", "initial_cash": 1_000_000, "grade_level": "초등학생 5~6학년",
+             "volatility": {"market": 0.005, "sector": 0.006, "idiosyncratic": 0.009, "sector_correlation": 0.2},
+             "agents": {**DEFAULT_AGENTS, "impact": 0.005}},
+    "중등": {"name": "중등 (1~3학년)", "initial_cash": 5_000_000, "grade_level": "중학생 1~3학년",
+             "volatility": {"market": 0.006, "sector": 0.008, "idiosyncratic": 0.011, "sector_correlation": 0.3},
+             "agents": {**DEFAULT_AGENTS, "impact": 0.008}},
+    "고등": {"name": "고등 (1~3학년)", "initial_cash": 10_000_000, "grade_level": "고등학생 1~3학년",
+             "volatility": {"market": 0.008, "sector": 0.010, "idiosyncratic": 0.014, "sector_correlation": 0.3},
+             "agents": {**DEFAULT_AGENTS, "impact": 0.01}},
+}
+
+# 저장/복원 대상 키
+SAVED_KEYS = ["stocks", "previous_daily_news", "news_meanings", "day_count", "portfolio", "daily_news", "selected_level", "initial_cash_set",
+              "sector_impact_history"]
+RESTORED_KEYS = ["stocks", "previous_daily_news", "news_meanings", "day_count", "portfolio", "daily_news", "initial_cash_set", "ledger",
+                 "sector_impact_history"]
+
+NEWS_COUNT = 5
+NEWS_ERROR = "(뉴스 생성 오류)"
+NEWS_FAILED = "(뉴스 생성 실패)"
+EXPLANATION_FAILED = "AI 해설 생성에 실패했습니다."
+NEWS_MAX_TOKENS = 1500         # 뉴스 5개 생성 한 번의 최대 응답 토큰
+EXPLANATION_MAX_TOKENS = 300   # 뉴스 해설 한 건의 최대 응답 토큰
+LLM_CONCURRENCY = 5            # 비동기 경로에서 하루 진행 한 번이 동시에 보내는 해설 요청 수
+
+# 간단한 감성 분석 키워드 (해설 기반 섹터 영향 계산용)
+POSITIVE_KEYWORDS = ["성장", "증가", "호황", "개발 성공", "수출 증가", "인기", "기대", "긍정적", "개선", "호조", "확대"]
+NEGATIVE_KEYWORDS = ["감소", "하락", "부진", "어려움", "위기", "경쟁 심화", "규제", "부정적", "악화", "축소", "둔화"]
+
+# LEDGER_DIR 환경 변수가 있으면 사용자별 저널 파일에 체결 내역을 증분 저장
+LEDGER_DIR = os.environ.get("LEDGER_DIR")
+
+
+class TradeError(Exception):
+    """사용자에게 그대로 보여줄 수 있는 매수/매도 오류."""
+
+
+# --- 상태 초기화 ---
+def new_state(level="초등", universe=None, rng=None):
+    """헤드리스 실행용 새 게임 상태 dict 를 만든다."""
+    state = {"selected_level": level}
+    initialize_state(state, level, universe=universe, rng=rng)
+    return state
+
+
+def initialize_state(state, level, universe=None, rng=None, force_reset=False):
+    initial_cash = LEVELS[level]["initial_cash"]
+
+    # 포트폴리오 초기화 (기존 데이터 없거나 리셋 필요 시)
+    if "portfolio" not in state or force_reset:
+        state["portfolio"] = {"cash": initial_cash, "stocks": {}}
+        state["initial_cash_set"] = initial_cash # 초기 자본금 기록
+        journal_path = ledger_journal_path(state)
+        if journal_path and os.path.exists(journal_path):
+            os.remove(journal_path) # 이전 게임의 저널 삭제
+        state["ledger"] = TradeLedger(journal_path=journal_path) # 거래 원장도 새로 시작
+
+    # 주식 정보 초기화 (기존 데이터 없거나 비어 있을 때)
+    if "stocks" not in state or not state["stocks"]:
+        # 카탈로그의 가격 범위 안에서 초기 가격을 한 번에 생성
+        state["stocks"] = (universe or load_universe()).build_stocks_state(rng)
+
+    for key, default in (
+        ("daily_news", None), ("previous_daily_news", None), ("news_meanings", {}),
+        ("day_count", 1), ("sector_news_impact", {}), ("sector_impact_history", []), ("user_id", None), ("selected_level", level),
+    ):
+        if key not in state:
+            state[key] = default
+
+
+# --- 거래 원장 ---
+def ledger_journal_path(state):
+    user_id = state.get("user_id")
+    if not LEDGER_DIR or not user_id:
+        return None
+    return os.path.join(LEDGER_DIR, f"{user_id}.jsonl")
+
+
+def get_ledger(state):
+    ledger = state.get("ledger")
+    if isinstance(ledger, TradeLedger):
+        return ledger
+    journal_path = ledger_journal_path(state)
+    if journal_path and os.path.exists(journal_path):
+        ledger = TradeLedger.load(journal_path)
+    else:
+        # 저장된 원장 데이터(dict) 복원, 없으면 기존 보유 종목을 매수 기록으로 옮겨 시작
+        ledger = TradeLedger.from_dict(ledger if isinstance(ledger, dict) else None, journal_path=journal_path)
+        if len(ledger) == 0:
+            for stock_name, stock_info in state.get("portfolio", {}).get("stocks", {}).items():
+                if stock_info.get("quantity", 0) > 0 and stock_info.get("purchase_price", 0) > 0:
+                    ledger.record(state.get("day_count", 1), stock_name, BUY,
+                                  stock_info["quantity"], stock_info["purchase_price"])
+    state["ledger"] = ledger
+    return ledger
+
+
+def find_stock(state, stock_name):
+    """종목의 (섹터, 종목 정보) 를 찾는다 (섹터 수만큼만 탐색, 없으면 (None, None))."""
+    for sector, stocks_in_sector in state.get("stocks", {}).items():
+        stock_info = stocks_in_sector.get(stock_name)
+        if stock_info is not None:
+            return sector, stock_info
+    return None, None
+
+
+def build_price_lookup(state):
+    # 종목명 -> (현재가, 섹터) 조회표 (섹터별 반복 탐색 대신 한 번만 생성)
+    return {
+        stock_name: (stock_info.get("current_price", 0), sector)
+        for sector, stocks_in_sector in state.get("stocks", {}).items()
+        for stock_name, stock_info in stocks_in_sector.items()
+    }
+
+
+# --- 주식 매수/매도 ---
+@traced("engine.buy")
+def buy_stock(state, stock_name, quantity, sector):
+    """매수를 체결하고 총 매수 금액을 반환한다. 실패 시 TradeError."""
+    if sector not in state["stocks"] or stock_name not in state["stocks"][sector]:
+        raise TradeError("존재하지 않는 주식 종목입니다.")
+    if quantity <= 0:
+        raise TradeError("매수 수량은 1주 이상이어야 합니다.")
+
+    stock_price = state["stocks"][sector][stock_name]["current_price"]
+    total_price = stock_price * quantity
+    portfolio = state["portfolio"]
+    if portfolio["cash"] < total_price:
+        max_quantity = portfolio["cash"] // stock_price if stock_price > 0 else 0
+        raise TradeError(f"잔액 부족! (최대 {max_quantity}주 매수 가능)")
+
+    return _fill_buy(state, stock_name, quantity, stock_price, state.get("day_count", 1))
+
+
+def _fill_buy(state, stock_name, quantity, price, day, ts=None):
+    """매수 체결을 포트폴리오와 원장에 반영한다 (잔액은 부른 쪽에서 확인)."""
+    total_price = price * quantity
+    portfolio = state["portfolio"]
+    ledger = get_ledger(state) # 포트폴리오 변경 전에 원장 준비 (기존 보유분 이관)
+    portfolio["cash"] -= total_price
+    portfolio_stocks = portfolio["stocks"]
+    if stock_name in portfolio_stocks:
+        # 평균 매수 단가 재계산
+        current_quantity = portfolio_stocks[stock_name]["quantity"]
+        current_total_purchase = portfolio_stocks[stock_name]["purchase_price"] * current_quantity
+        new_quantity = current_quantity + quantity
+        portfolio_stocks[stock_name]["quantity"] = new_quantity
+        portfolio_stocks[stock_name]["purchase_price"] = (current_total_purchase + total_price) / new_quantity
+    else:
+        portfolio_stocks[stock_name] = {
+            "quantity": quantity,
+            "purchase_price": price, # 첫 매수 시 매수 단가는 체결가
+        }
+    ledger.record(day, stock_name, BUY, quantity, price, ts=ts)
+    return total_price
+
+
+@traced("engine.sell")
+def sell_stock(state, stock_name, quantity):
+    """매도를 체결하고 (매도 금액, 실현 손익) 을 반환한다. 실패 시 TradeError."""
+    portfolio_stocks = state["portfolio"]["stocks"]
+    if stock_name not in portfolio_stocks:
+        raise TradeError("보유하고 있지 않은 주식입니다.")
+    owned_quantity = portfolio_stocks[stock_name]["quantity"]
+    if quantity <= 0:
+        raise TradeError("매도 수량은 1주 이상이어야 합니다.")
+    if quantity > owned_quantity:
+        raise TradeError(f"매도 가능 수량 초과! (최대 {owned_quantity}주 매도 가능)")
+
+    _, stock_info = find_stock(state, stock_name)
+    stock_price = stock_info.get("current_price", 0) if stock_info else 0
+    if stock_price <= 0: # 0 또는 음수 가격 오류 방지
+        raise TradeError("주식 가격 정보를 찾을 수 없거나 유효하지 않습니다.")
+
+    return _fill_sell(state, stock_name, quantity, stock_price, state.get("day_count", 1))
+
+
+def _fill_sell(state, stock_name, quantity, price, day, ts=None):
+    """매도 체결을 원장과 포트폴리오에 반영한다 (보유 수량은 부른 쪽에서 확인)."""
+    portfolio_stocks = state["portfolio"]["stocks"]
+    realized_profit = get_ledger(state).record(day, stock_name, SELL, quantity, price, ts=ts)
+    sell_value = price * quantity
+    state["portfolio"]["cash"] += sell_value
+    portfolio_stocks[stock_name]["quantity"] -= quantity
+    # 보유 수량이 0이 되면 포트폴리오에서 제거
+    if portfolio_stocks[stock_name]["quantity"] == 0:
+        del portfolio_stocks[stock_name]
+    return sell_value, realized_profit
+
+
+# --- 주가 업데이트 (팩터 모델 + 뉴스 영향 반영) ---
+def explanation_sentiment(explanation):
+    """해설의 감성 점수 (긍정 키워드 수 - 부정 키워드 수, 간단 버전)."""
+    score = sum(explanation.count(kw) for kw in POSITIVE_KEYWORDS)
+    return score - sum(explanation.count(kw) for kw in NEGATIVE_KEYWORDS)
+
+
+def news_sector_impacts(news_meanings, sectors, rng):
+    """뉴스 해설의 감성 점수를 관련 섹터별 영향(변동률)으로 바꾼다. 영향의 크기는 rng(np.random.Generator)로 뽑는다.
+
+    섹터별 가중치(sector_weights)가 있으면 영향에 곱하고, 없으면(예전 저장 데이터) 관련 섹터마다 1.0 으로 본다.
+    영향(impact)이 미리 매겨진 해설(오프라인 뉴스 코퍼스)은 감성 점수 대신 그 값을 쓴다.
+    """
+    sector_impacts = {sector: 0.0 for sector in sectors}
+    for meaning_data in (news_meanings or {}).values():
+        if "impact" in meaning_data:
+            impact_magnitude = meaning_data["impact"]
+        else:
+            sentiment_score = explanation_sentiment(meaning_data.get("explanation", ""))
+            # 관련 섹터에 영향 적용 (점수 기반으로 영향력 조절, 상한 3)
+            impact_magnitude = 0.0
+            if sentiment_score > 0:
+                impact_magnitude = float(rng.uniform(0.01, 0.04)) * min(sentiment_score, 3)
+            elif sentiment_score < 0:
+                impact_magnitude = float(rng.uniform(-0.04, -0.01)) * min(abs(sentiment_score), 3)
+
+        weights = meaning_data.get("sector_weights") or {sector: 1.0 for sector in meaning_data.get("sectors", [])}
+        for sector, weight in weights.items():
+            if sector in sector_impacts:
+                sector_impacts[sector] += impact_magnitude * weight
+    return sector_impacts
+
+
+@traced("engine.update_prices")
+def update_stock_prices(state, rng=None, scenario=None):
+    """하루치 주가를 갱신하고 뉴스 해설이 반영되었는지 여부를 반환한다.
+
+    scenario 는 부른 쪽이 미리 불러 둔 scenario.Scenario (없으면 None).
+    """
+    stocks = state["stocks"]
+    news_meanings = state.get("news_meanings") # 뉴스가 아니라 뉴스 해설 기준
+    sector_names = list(stocks.keys())
+    sector_index = np.array([i for i, sector in enumerate(sector_names) for _ in stocks[sector]], dtype=np.int32)
+    level = state.get("selected_level", "초등")
+    model = FactorModel.from_level(sector_index, len(sector_names), LEVELS[level].get("volatility"), rng=rng)
+    sector_impacts = news_sector_impacts(news_meanings, stocks, model.rng)
+    # 시나리오 사건: 미리 계산해 둔 충격 행렬에서 오늘 행만 더함 (섹터 수만큼)
+    shocks = scenario.shocks_for(state.get("day_count", 1)) if scenario is not None else None
+    if shocks is not None:
+        for sector, shock in zip(scenario.sector_names, shocks.tolist()):
+            if sector in sector_impacts:
+                sector_impacts[sector] += shock
+
+    # 전 종목을 배열로 모아 팩터 모델로 한 번에 갱신 (시장/섹터 팩터 + 개별 변동 + 섹터 영향 + 가상 투자자 영향)
+    stats = get_market_stats(state) # 어제까지의 수익률 (가상 투자자의 판단 근거)
+    stock_infos = [stock_info for sector in sector_names for stock_info in stocks[sector].values()]
+    current_prices = np.array([stock_info["current_price"] for stock_info in stock_infos], dtype=np.float64)
+    sector_impact_list = [sector_impacts[sector] for sector in sector_names]
+    agent_impacts = agent_price_impacts(LEVELS[level].get("agents"), stats, sector_impact_list, model.rng)
+    new_prices = model.step(current_prices, sector_impact_list, stock_impacts=agent_impacts).tolist()
+    for stock_info, new_price in zip(stock_infos, new_prices):
+        stock_info["current_price"] = new_price
+        stock_info["price_history"].append(new_price)
+
+    state["sector_news_impact"] = sector_impacts if news_meanings or shocks is not None else {}
+    # 날마다의 섹터 영향 기록 (백테스트의 뉴스 전략용, 0 이 아닌 섹터만). 주가 기록의 하루 변화와 한 칸씩 맞물린다.
+    state.setdefault("sector_impact_history", []).append({sector: round(impact, 6) for sector, impact in sector_impacts.items() if impact})
+    # 갱신된 주가로 수익률/변동성/상승·하락 상위 통계를 한 번 계산해 둠
+    with span("engine.market_stats"):
+        state["market_stats"] = MarketStats.from_stocks(stocks)
+    return bool(news_meanings)
+
+
+def agent_price_impacts(config, stats, sector_impacts, rng):
+    """가상 투자자들의 하루 주문이 만든 종목별 가격 영향 (config 가 비었으면 None)."""
+    if not config or not stats.tickers:
+        return None
+    counts = tuple((kind, int(config.get(kind, 0))) for kind in AGENT_TYPES)
+    population = get_population(len(stats.tickers), counts)
+    stock_news = np.asarray(sector_impacts, dtype=np.float64)[stats.sector_index]
+    with span("engine.agents"):
+        return population.price_impacts(stats.returns, stock_news, rng, impact=config.get("impact", DEFAULT_AGENTS["impact"]))
+
+
+def get_market_stats(state):
+    """현재 주가 기준 시장 통계. 새 게임/복원 등으로 주가가 바뀌었으면 다시 계산한다."""
+    stats = state.get("market_stats")
+    if stats is None or not stats.is_current(state["stocks"]):
+        with span("engine.market_stats"):
+            stats = state["market_stats"] = MarketStats.from_stocks(state["stocks"])
+    return stats
+
+
+# --- 포트폴리오 정보 계산 ---
+@traced("engine.valuation")
+def calculate_portfolio_summary(state):
+    portfolio = state.get("portfolio", {"cash": 0, "stocks": {}}) # 기본값 설정
+    cash = portfolio.get("cash", 0)
+    total_stock_value = 0
+    for stock_name, stock_info in portfolio.get("stocks", {}).items():
+        quantity = stock_info.get("quantity", 0)
+        _, market_info = find_stock(state, stock_name)
+        current_price = market_info.get("current_price", 0) if market_info else 0
+        if current_price > 0 and quantity > 0:
+            total_stock_value += current_price * quantity
+
+    total_value = cash + total_stock_value
+    # 초기 자본금 가져오기 (없으면 현재 레벨 기본값 사용)
+    initial_cash = state.get("initial_cash_set", LEVELS[state.get("selected_level", "초등")]["initial_cash"])
+    total_profit_loss = total_value - initial_cash
+    total_profit_rate = (total_profit_loss / initial_cash) * 100 if initial_cash > 0 else 0
+    return cash, total_value, total_profit_loss, total_profit_rate, initial_cash
+
+
+# --- 뉴스 생성 (수준별) ---
+def _news_style(level):
+    """수준별 (작성 지시, 기사당 문장 수)."""
+    grade_level_text = LEVELS[level]["grade_level"]
+    if level == "초등":
+        level_instruction = f"{grade_level_text} 수준에 맞춰 아주 쉽고 구체적인 예시(예: 장난감, 과자, 게임)를 들어 설명해주세요. 어려운 경제 용어(예: 금리, 환율, 인플레이션)는 최대한 피하고, 일상 생활과 관련된 내용으로 작성해주세요."
+        sentence_count = "8~10문장"
+    elif level == "중등":
+        level_instruction = f"{grade_level_text} 수준에 맞춰 작성해주세요. 기본적인 경제 개념(예: 수요와 공급, 경쟁, 인기 상품)을 포함해도 좋습니다. 너무 전문적이지 않게 설명해주세요."
+        sentence_count = "10~12문장"
+    else: # 고등
+        level_instruction = f"{grade_level_text} 수준에 맞춰 작성해주세요. 경제 지표(예: 성장률, 실업률), 국제 관계, 기술 트렌드, 금리 변동 등 좀 더 심도 있는 내용을 다루어도 좋습니다. 분석적인 시각을 포함해주세요."
+        sentence_count = "12~15문장"
+    return level_instruction, sentence_count
+
+
+def build_news_prompt(level):
+    level_instruction, sentence_count = _news_style(level)
+    return f"""
+지시:
+{level_instruction}
+주식 시장과 경제에 관련된 뉴스 기사 5개를 생성해주세요.
+각 기사는 {sentence_count} 정도로 자세하게 작성하고, 특정 회사 이름이나 주식 종목을 직접적으로 언급하지 마세요.
+학생들이 뉴스를 읽고 어떤 종류의 회사가 유망할지 또는 어려움을 겪을지 스스로 추론할 수 있도록, 일반적인 경제 상황이나 특정 산업(예: IT, 자동차, 게임, 식품, 에너지 등) 동향에 대한 뉴스를 만들어주세요.
+긍정적인 뉴스, 부정적인 뉴스, 중립적인 뉴스를 다양하게 포함하되, '긍정적/부정적/중립적'이라는 단어는 뉴스 본문에 쓰지 마세요.
+뉴스 내용에 따라 관련 주식들의 가격이 오르거나 내릴 수 있는 단서를 포함해주세요.
+각 뉴스 기사는 "## 뉴스 [번호]" 로 시작해주세요. (예: ## 뉴스 1, ## 뉴스 2 ...)
+
+**생성된 뉴스 기사:**
+"""
+
+
+def build_news_json_prompt(level, count, existing=()):
+    """형식이 어긋나 모자란 기사 count 개만 JSON 으로 다시 요청하는 프롬프트."""
+    level_instruction, sentence_count = _news_style(level)
+    avoid = "".join(f"\n- {article[:40]}" for article in existing)
+    return f"""
+지시:
+{level_instruction}
+주식 시장과 경제에 관련된 뉴스 기사 {count}개를 생성해주세요.
+각 기사는 {sentence_count} 정도로 작성하고, 특정 회사 이름이나 주식 종목을 직접적으로 언급하지 마세요.
+'긍정적/부정적/중립적'이라는 단어는 뉴스 본문에 쓰지 마세요.{f"{chr(10)}이미 있는 아래 기사들과 주제가 겹치지 않게 해주세요.{avoid}" if avoid else ""}
+반드시 다음 JSON 형식으로만 답해주세요: {{"articles": ["기사 본문", ...]}}
+"""
+
+
+# 뉴스 머리글: "## 뉴스 1", "##뉴스 2.", "**뉴스 3**", "뉴스 [4]:", "### 뉴스 5)" 등 번호/공백/꾸밈 변형을 허용
+_NEWS_HEADER = re.compile(r"^[ \t]*(?:#{1,6}[ \t]*)?(?:\*\*)?[ \t]*뉴스[ \t]*\[?[ \t]*\d+(?![0-9가-힣])[ \t]*\]?[ \t]*[.:)]?[ \t]*(?:\*\*)?[ \t]*", re.M)
+_JSON_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+_SEPARATOR_TAIL = re.compile(r"(?:\s*(?:-{3,}|\*{3,}))+\s*$")
+
+
+def parse_news_articles(news_text):
+    """머리글 위치를 한 번 훑어 기사 본문 목록을 만든다 (빈 기사는 버림, 개수는 맞추지 않음)."""
+    if not news_text:
+        return []
+    headers = list(_NEWS_HEADER.finditer(news_text))
+    articles = []
+    for header, following in zip(headers, headers[1:] + [None]):
+        body = news_text[header.end():following.start() if following else len(news_text)]
+        body = _SEPARATOR_TAIL.sub("", body).strip()
+        if body:
+            articles.append(body)
+    return articles
+
+
+def parse_json_articles(text):
+    """JSON 응답({"articles": [...]} 또는 목록)의 기사 본문 목록. 형식이 맞지 않으면 빈 목록."""
+    try:
+        data = json.loads(_JSON_FENCE.sub("", text or ""))
+    except ValueError:
+        return []
+    if isinstance(data, dict):
+        data = data.get("articles", [])
+    if not isinstance(data, list):
+        return []
+    articles = []
+    for item in data:
+        if isinstance(item, dict):
+            item = item.get("article") or item.get("content") or ""
+        if isinstance(item, str) and item.strip():
+            articles.append(item.strip())
+    return articles
+
+
+def _pad_news(news_articles):
+    # 정확히 5개가 아니면 부족한 만큼 실패 표시를 채우고, 많으면 자른다
+    news_articles = list(news_articles)
+    if len(news_articles) < NEWS_COUNT:
+        news_articles.extend([NEWS_FAILED] * (NEWS_COUNT - len(news_articles)))
+    return news_articles[:NEWS_COUNT]
+
+
+def parse_news(news_text):
+    return _pad_news(parse_news_articles(news_text))
+
+
+@contextmanager
+def _news_retry():
+    """모자란 기사의 JSON 재요청 구간. LLM/연결 오류는 이 구간의 오류 수(engine.news_retry)로 세고 넘어간다
+    (이미 받은 기사는 살리고 나머지만 실패 표시). 그 밖의 예외는 그대로 전달한다."""
+    try:
+        with span("engine.news_retry"):
+            yield
+    except (LLMError, OSError):
+        pass
+
+
+def _first_articles(level, news_text):
+    """첫 응답의 기사 목록과, 모자라면 모자란 만큼을 다시 요청할 JSON prompt (다 있으면 None)."""
+    articles = parse_news_articles(news_text)[:NEWS_COUNT]
+    missing = NEWS_COUNT - len(articles)
+    return articles, build_news_json_prompt(level, missing, articles) if missing else None
+
+
+@traced("engine.generate_news")
+def generate_news(level, complete):
+    """수준별 뉴스 5개를 생성한다. LLM 호출 오류는 그대로 전달한다.
+
+    형식이 어긋나 기사가 모자라면 모자란 수만큼만 JSON 형식으로 한 번 다시 요청한다 (그래도 모자라면 실패 표시).
+    """
+    news_text = complete(build_news_prompt(level), temperature=0.7, max_tokens=NEWS_MAX_TOKENS, kind="news")
+    articles, retry_prompt = _first_articles(level, news_text)
+    if retry_prompt:
+        with _news_retry():
+            retry_text = complete(retry_prompt, temperature=0.7, max_tokens=NEWS_MAX_TOKENS, json_mode=True, kind="news")
+            articles += parse_json_articles(retry_text)[:NEWS_COUNT - len(articles)]
+    return _pad_news(articles)
+
+
+async def agenerate_news(level, acomplete):
+    """generate_news 의 비동기 버전."""
+    with span("engine.generate_news"):
+        news_text = await acomplete(build_news_prompt(level), temperature=0.7, max_tokens=NEWS_MAX_TOKENS, kind="news")
+        articles, retry_prompt = _first_articles(level, news_text)
+        if retry_prompt:
+            with _news_retry():
+                retry_text = await acomplete(retry_prompt, temperature=0.7, max_tokens=NEWS_MAX_TOKENS, json_mode=True, kind="news")
+                articles += parse_json_articles(retry_text)[:NEWS_COUNT - len(articles)]
+    return _pad_news(articles)
+
+
+# --- 뉴스 해설 (수준별) ---
+def build_explanation_prompt(level, news_article):
+    grade_level_text = LEVELS[level]["grade_level"]
+    if level == "초등":
+        level_instruction = f"{grade_level_text}이 이해하기 쉽게 아주 쉬운 단어로 2~3문장 이내로 요약해주세요. 비유나 쉬운 예시를 사용하면 좋습니다."
+    elif level == "중등":
+        level_instruction = f"{grade_level_text}이 이해하기 쉽게 핵심 내용을 3문장 정도로 요약해주세요. 관련 경제 용어가 있다면 간단히 설명해주세요."
+    else: # 고등
+        level_instruction = f"{grade_level_text}이 이해할 수 있도록 핵심 내용과 이 뉴스가 경제나 특정 산업에 미칠 수 있는 잠재적 영향을 3-4문장 정도로 분석적으로 요약해주세요."
+
+    return f"""
+**신문 기사:**
+{news_article}
+
+**지시:**
+위 신문 기사의 핵심 의미를 {level_instruction} "해설: " 다음에 설명해주세요.
+
+뉴스 의미 해설:
+"""
+
+
+def build_explanation_json_prompt(level, news_article):
+    """해설 응답이 비었을 때 JSON 으로 다시 요청하는 프롬프트."""
+    return build_explanation_prompt(level, news_article).replace(
+        '"해설: " 다음에 설명해주세요.\n\n뉴스 의미 해설:\n',
+        '반드시 다음 JSON 형식으로만 답해주세요: {"explanation": "해설"}\n',
+    )
+
+
+# "해설:" 과 (예전 형식의) "관련 섹터:" 를 한 번에 찾는다. 콜론 앞뒤 공백, 전각 콜론, 굵게(**) 표시를 허용
+_EXPLANATION_PATTERN = re.compile(
+    r"(?:\*\*)?해설(?:\*\*)?\s*[:：]\s*(?:\*\*)?(?P<explanation>.*?)"
+    r"(?:\s*(?:\*\*)?관련\s*섹터(?:\*\*)?\s*[:：]\s*(?P<sectors>[^\n]*))?\s*$",
+    re.S,
+)
+
+
+def parse_explanation(meaning_text, valid_sectors):
+    # 관련 섹터는 sector_classifier 가 정하지만, 예전 형식("관련 섹터: ...")의 응답도 그대로 읽을 수 있게 둠
+    # "해설:" 표시가 없으면 응답 전체를 해설로 보고, 내용이 비었을 때만 빈 문자열을 돌려준다
+    meaning_text = (meaning_text or "").strip()
+    match = _EXPLANATION_PATTERN.search(meaning_text)
+    if match:
+        explanation, related_sectors_str = match.group("explanation").strip(), (match.group("sectors") or "").strip()
+    else:
+        explanation, related_sectors_str = meaning_text, ""
+
+    # 관련 섹터 중 제시된 섹터 목록에 있는 것만 남김
+    related_sectors = []
+    if related_sectors_str and related_sectors_str.lower() != "없음":
+        related_sectors = [s.strip() for s in related_sectors_str.split(",") if s.strip() in valid_sectors]
+    return {"explanation": explanation, "sectors": related_sectors}
+
+
+def parse_json_explanation(text):
+    try:
+        data = json.loads(_JSON_FENCE.sub("", text or ""))
+    except ValueError:
+        return ""
+    explanation = data.get("explanation") if isinstance(data, dict) else None
+    return explanation.strip() if isinstance(explanation, str) else ""
+
+
+def _explanation_jobs(daily_news, valid_sectors, classifier=None, lookup=None):
+    """(바로 정해지는 해설 dict, LLM 해설이 필요한 [(번호, 기사, 섹터 가중치)] 목록)."""
+    meanings = {}
+    pending = []
+    for i, news_article in enumerate(daily_news):
+        if NEWS_ERROR in news_article or NEWS_FAILED in news_article:
+            meanings[str(i + 1)] = {"explanation": "뉴스 생성에 실패하여 해설할 수 없습니다.", "sectors": []}
+            continue
+        tagged = lookup(news_article) if lookup else None
+        if tagged is not None:
+            weights = {s: w for s, w in tagged["sector_weights"].items() if s in valid_sectors}
+            if weights: # 코퍼스의 섹터가 지금 카탈로그에 없으면 일반 경로로 처리
+                meanings[str(i + 1)] = {**tagged, "sectors": list(weights), "sector_weights": weights}
+                continue
+        pending.append(i)
+    if not pending:
+        return meanings, []
+    with span("engine.classify_sectors"):
+        pending_weights = (classifier or get_classifier()).sector_weights([daily_news[i] for i in pending], valid_sectors)
+    return meanings, [(i, daily_news[i], weights) for i, weights in zip(pending, pending_weights)]
+
+
+def _sorted_meanings(meanings):
+    return dict(sorted(meanings.items(), key=lambda item: int(item[0])))
+
+
+@traced("engine.explain_news")
+def explain_daily_news_meanings(level, daily_news, valid_sectors, complete, on_error=None, call_interval=0.5, classifier=None, lookup=None):
+    """뉴스별 해설과 관련 섹터를 만든다. 기사별 오류는 on_error(번호, 예외) 로 알린다.
+
+    해설은 LLM 이 쓰고, 관련 섹터와 섹터별 가중치(sector_weights)는 오프라인 분류기로 한 번에 매긴다.
+    lookup(기사) 이 해설을 돌려주는 기사(오프라인 뉴스 코퍼스에 있는 기사)는 LLM 과 분류기를 거치지 않는다.
+    """
+    if daily_news is None:
+        return {}
+    valid_sectors = list(valid_sectors)
+    meanings, jobs = _explanation_jobs(daily_news, valid_sectors, classifier, lookup)
+    for i, news_article, weights in jobs:
+        try:
+            meaning_text = complete(build_explanation_prompt(level, news_article), temperature=0.5, max_tokens=EXPLANATION_MAX_TOKENS, kind="explanation")
+            explanation = parse_explanation(meaning_text, valid_sectors)["explanation"]
+            if not explanation: # 빈 응답이면 이 기사만 JSON 형식으로 한 번 다시 요청
+                with span("engine.explanation_retry"):
+                    explanation = parse_json_explanation(complete(
+                        build_explanation_json_prompt(level, news_article), temperature=0.5,
+                        max_tokens=EXPLANATION_MAX_TOKENS, json_mode=True, kind="explanation",
+                    )) or EXPLANATION_FAILED
+        except Exception as e:
+            if on_error:
+                on_error(i + 1, e)
+            explanation = f"오류 발생: {e}"
+        meanings[str(i + 1)] = {"explanation": explanation, "sectors": list(weights), "sector_weights": weights}
+        if call_interval:
+            time.sleep(call_interval) # API 호출 간격
+    return _sorted_meanings(meanings)
+
+
+async def aexplain_daily_news_meanings(level, daily_news, valid_sectors, acomplete, classifier=None, lookup=None, concurrency=LLM_CONCURRENCY):
+    """explain_daily_news_meanings 의 비동기 버전. 해설 요청을 동시에 concurrency 개까지 보낸다.
+
+    (해설 dict, [(번호, 예외)]) 를 돌려준다 (오류 표시는 부른 쪽에서).
+    """
+    if daily_news is None:
+        return {}, []
+    valid_sectors = list(valid_sectors)
+    meanings, jobs = _explanation_jobs(daily_news, valid_sectors, classifier, lookup)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def explain(i, news_article, weights):
+        async with semaphore:
+            try:
+                meaning_text = await acomplete(build_explanation_prompt(level, news_article), temperature=0.5, max_tokens=EXPLANATION_MAX_TOKENS, kind="explanation")
+                explanation = parse_explanation(meaning_text, valid_sectors)["explanation"]
+                if not explanation:
+                    with span("engine.explanation_retry"):
+                        explanation = parse_json_explanation(await acomplete(
+                            build_explanation_json_prompt(level, news_article), temperature=0.5,
+                            max_tokens=EXPLANATION_MAX_TOKENS, json_mode=True, kind="explanation",
+                        )) or EXPLANATION_FAILED
+                error = None
+            except Exception as e:
+                explanation, error = f"오류 발생: {e}", e
+        meanings[str(i + 1)] = {"explanation": explanation, "sectors": list(weights), "sector_weights": weights}
+        return (i + 1, error) if error else None
+
+    with span("engine.explain_news"):
+        errors = [e for e in await asyncio.gather(*(explain(*job) for job in jobs)) if e]
+    return _sorted_meanings(meanings), errors
+
+
+# --- 하루 진행 ---
+def apply_day(state, news_meanings, next_news, rng=None, scenario=None):
+    """받아 온 해설과 다음 날 뉴스를 state 에 반영한다: 뉴스 이동 → 주가 갱신 → 날짜 증가. 뉴스 해설 반영 여부를 반환."""
+    state["previous_daily_news"] = state["daily_news"]
+    state["news_meanings"] = news_meanings or {}
+    had_news = update_stock_prices(state, rng=rng, scenario=scenario)
+    state["daily_news"] = next_news
+    state["day_count"] = state.get("day_count", 1) + 1
+    return had_news
+
+
+@traced("engine.advance_day")
+def advance_day(state, complete, on_error=None, rng=None, call_interval=0.5, lookup=None, scenario=None):
+    """전날 뉴스 해설 → 주가 갱신 → 다음 날 뉴스 생성 → 날짜 증가를 차례로 진행한다.
+
+    뉴스 해설이 반영되었는지 여부를 반환한다. 다음 날 뉴스 생성 실패는 on_error(0, 예외) 로 알린다.
+    lookup 은 explain_daily_news_meanings 에, scenario 는 update_stock_prices 에 그대로 넘긴다.
+    """
+    level = state.get("selected_level", "초등")
+    # 1. 현재 뉴스(다음 날에는 이전 뉴스)의 해설 생성
+    news_meanings = explain_daily_news_meanings(
+        level, state["daily_news"], state["stocks"].keys(), complete,
+        on_error=on_error, call_interval=call_interval, lookup=lookup,
+    )
+    # 2. 다음 날 뉴스 생성
+    try:
+        next_news = generate_news(level, complete)
+    except Exception as e:
+        if on_error:
+            on_error(0, e)
+        next_news = [NEWS_ERROR] * NEWS_COUNT
+    # 3. 주가 업데이트 (뉴스 해설 기반) 와 날짜 증가
+    return apply_day(state, news_meanings, next_news, rng=rng, scenario=scenario)
+
+
+async def afetch_day(level, daily_news, valid_sectors, acomplete, classifier=None, lookup=None, concurrency=LLM_CONCURRENCY):
+    """하루 진행에 필요한 LLM 결과(오늘 뉴스 해설, 다음 날 뉴스)를 동시에 받아 온다. state 는 건드리지 않는다.
+
+    (해설 dict, 다음 날 뉴스, [(번호, 예외)]) 를 돌려준다. 번호 0 은 뉴스 생성 오류.
+    """
+    async def next_news():
+        try:
+            return await agenerate_news(level, acomplete), None
+        except Exception as e:
+            return [NEWS_ERROR] * NEWS_COUNT, e
+
+    with span("engine.fetch_day"):
+        (news_meanings, errors), (news, news_error) = await asyncio.gather(
+            aexplain_daily_news_meanings(level, daily_news, valid_sectors, acomplete, classifier, lookup, concurrency),
+            next_news(),
+        )
+    if news_error is not None:
+        errors.append((0, news_error))
+    return news_meanings, news, errors
+
+
+# --- 저장/복원 ---
+def _replace_nan_inf(obj):
+    if isinstance(obj, dict):
+        return {k: _replace_nan_inf(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_replace_nan_inf(elem) for elem in obj]
+    elif isinstance(obj, float) and (obj != obj or obj == float('inf') or obj == float('-inf')):
+        return None
+    return obj
+
+
+def serialize_state(state):
+    """저장 대상 키를 JSON 문자열로 만든다 (거래 원장은 열 단위 dict 로 저장)."""
+    with span("engine.serialize") as s:
+        data_to_save = {key: state[key] for key in SAVED_KEYS if key in state}
+        if "ledger" in state:
+            ledger = get_ledger(state)
+            data_to_save["ledger"] = ledger.to_dict()
+            ledger.flush() # 저널 파일에는 새 체결만 덧붙임
+        try:
+            json_data = json.dumps(data_to_save, ensure_ascii=False, allow_nan=False, default=lambda o: '<not serializable>')
+        except ValueError:
+            json_data = json.dumps(_replace_nan_inf(data_to_save), ensure_ascii=False, allow_nan=False, default=lambda o: '<not serializable>')
+        s.record(response_bytes=len(json_data.encode("utf-8")))
+    return json_data
+
+
+def _intern_descriptions(stocks):
+    """종목 설명 문자열은 모든 세션이 같으므로 intern 해서 세션마다 복사본을 들지 않게 한다."""
+    for sector_stocks in stocks.values():
+        for info in sector_stocks.values():
+            for key, value in info.items():
+                if key.startswith("description_") and isinstance(value, str):
+                    info[key] = sys.intern(value)
+
+
+@traced("engine.restore")
+def restore_state(state, json_data):
+    """serialize_state 로 만든 JSON 을 state 에 복원하고 복원된 dict 를 반환한다 (형식 오류 시 JSONDecodeError)."""
+    saved = json.loads(json_data)
+    if isinstance(saved.get("stocks"), dict):
+        _intern_descriptions(saved["stocks"])
+    for key in RESTORED_KEYS:
+        if key in saved:
+            state[key] = saved[key]
+    return saved
+
+
+# --- 동시 저장 병합 (rebase) ---
+# 같은 계정을 두 탭/기기에서 열면 저장이 엇갈릴 수 있다. 저장은 버전을 비교해서(CAS) 하고,
+# 그사이 다른 쪽이 먼저 저장했으면 마지막으로 맞춘 지점(sync_marker) 이후 이쪽의 변경을 저장된 최신본 위에 다시 얹는다.
+#   거래: 체결(원장 행) 단위로 얹는다. 체결가는 그대로 두고 잔액/보유 수량이 모자라면 빼고 알려준다.
+#   하루 지나기: 주가/뉴스를 새로 뽑으므로 합칠 수 없다. 한쪽만 진행했으면 진행한 쪽을 기준으로 다른 쪽의 거래를 얹고,
+#               양쪽 다 진행했으면 저장된 쪽을 남기고 이쪽의 하루 진행은 버린다 (거래는 얹음).
+#   뉴스 생성, 수준 변경: 한쪽만 바꿨으면 그 값을 쓴다.
+MERGE_FIELDS = ["daily_news", "selected_level", "initial_cash_set"]
+
+
+def _ledger_rows(ledger):
+    """원장(TradeLedger 또는 저장된 dict) 의 체결 행 (ts, day, 종목, 구분, 수량, 가격) 목록."""
+    if isinstance(ledger, TradeLedger):
+        ledger = ledger.to_dict()
+    if not ledger:
+        return []
+    tickers = ledger.get("tickers", [])
+    columns = ledger.get("columns", {})
+    return [
+        (ts, day, tickers[ticker_id], side, qty, price)
+        for ts, day, ticker_id, side, qty, price in zip(*(columns.get(name, []) for name in ("ts", "day", "ticker", "side", "qty", "price")))
+    ]
+
+
+def _trade_id(row):
+    ts, _, ticker, side, qty, price = row
+    return (round(ts, 6), ticker, side, qty, price)
+
+
+def _timeline(state):
+    """하루 진행 기록의 지문 (Day 번호와 현재 주가). 하루 지나기를 따로 하면 주가가 달라진다."""
+    prices = tuple(info.get("current_price") for sector in (state.get("stocks") or {}).values() for info in sector.values())
+    return (state.get("day_count", 1), hash(prices))
+
+
+def sync_marker(state):
+    """저장소와 맞춘 시점의 요약 (rebase_state 의 기준). state 는 세션 상태나 저장된 dict."""
+    return {
+        "timeline": _timeline(state),
+        "trades": frozenset(_trade_id(row) for row in _ledger_rows(state.get("ledger"))),
+        "fields": {key: state.get(key) for key in MERGE_FIELDS},
+    }
+
+
+@traced("engine.rebase")
+def rebase_state(marker, mine, theirs):
+    """marker 이후 mine(이쪽) 과 theirs(저장된 최신본) 의 변경을 합친다.
+
+    mine/theirs 는 저장 JSON 을 새로 읽은 dict 여야 한다 (합치면서 그 안의 포트폴리오를 고쳐 씀).
+    (합친 dict, 얹지 못한 체결 목록, 이쪽의 하루 진행을 버렸는지) 를 돌려준다.
+    """
+    base_timeline = marker["timeline"]
+    mine_timeline, their_timeline = _timeline(mine), _timeline(theirs)
+    day_discarded = False
+    if mine_timeline == their_timeline or mine_timeline == base_timeline:
+        leader, follower = theirs, mine
+    elif their_timeline == base_timeline:
+        leader, follower = mine, theirs
+    else:
+        leader, follower = theirs, mine
+        day_discarded = True
+
+    merged = dict(leader)
+    if _timeline(follower) == _timeline(leader):
+        for key in MERGE_FIELDS:
+            if follower.get(key) != marker["fields"].get(key) and leader.get(key) == marker["fields"].get(key):
+                merged[key] = follower.get(key)
+
+    known = marker["trades"] | {_trade_id(row) for row in _ledger_rows(leader.get("ledger"))}
+    dropped = []
+    for row in _ledger_rows(follower.get("ledger")):
+        if _trade_id(row) in known:
+            continue
+        ts, day, ticker, side, qty, price = row
+        price = int(price) if float(price).is_integer() else price # 원장은 가격을 실수로 저장함
+        held = merged["portfolio"]["stocks"].get(ticker, {}).get("quantity", 0)
+        if side == BUY and merged["portfolio"]["cash"] >= price * qty:
+            _fill_buy(merged, ticker, qty, price, day, ts=ts)
+        elif side == SELL and held >= qty:
+            _fill_sell(merged, ticker, qty, price, day, ts=ts)
+        else:
+            dropped.append({"day": day, "ticker": ticker, "side": side, "qty": qty, "price": price})
+    if isinstance(merged.get("ledger"), TradeLedger):
+        merged["ledger"] = merged["ledger"].to_dict()
+    return merged, dropped, day_discarded
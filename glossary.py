@@ -0,0 +1,66 @@
+# --- 수준별 용어 사전 ---
+# 사이드바 '주식 용어 사전' 에 표시되는 수준별 용어와 설명.
+
+GLOSSARY = {
+    "초등": {
+        "주식": "회사의 작은 조각. 이걸 사면 나도 회사 주인!",
+        "주가": "주식 1개의 가격. 사고 싶은 사람이 많으면 오르고, 팔고 싶은 사람이 많으면 내려.",
+        "매수": "주식을 사는 것. '나 이 회사 주식 살래!'",
+        "매도": "주식을 파는 것. '나 이 주식 팔아서 돈으로 바꿀래!'",
+        "포트폴리오": "내가 가진 주식과 현금 꾸러미. 어떤 주식을 얼마나 가졌는지 보여줘.",
+        "수익률": "내가 투자한 돈이 얼마나 늘었는지 알려주는 숫자. (%)",
+        "상승": "주가가 오르는 것. 기분 좋아!",
+        "하락": "주가가 내리는 것. 조금 슬퍼.",
+        "변동": "주가가 오르락내리락 춤추는 것.",
+        "투자": "돈을 불리기 위해 주식 같은 곳에 돈을 넣는 것.",
+        "섹터": "비슷한 일을 하는 회사들 모임. (예: 자동차 회사 모임, 과자 회사 모임)",
+        "전일 대비": "어제랑 비교해서 주가가 얼마나 변했는지 보여주는 것.",
+        "뉴스": "세상 소식. 회사에 좋은 소식도 있고, 나쁜 소식도 있어.",
+        "현금": "내가 지금 바로 쓸 수 있는 돈.",
+        "평가액": "내가 가진 주식들을 지금 가격으로 계산하면 얼마인지 알려주는 것.",
+        "손익": "내가 돈을 벌었는지(이익), 잃었는지(손해) 알려주는 것.",
+    },
+    "중등": {
+        "주식": "기업이 자금을 모으기 위해 발행하는 소유권 증서. 주주는 회사의 일부를 소유.",
+        "주가": "시장에서 거래되는 주식 1주당 가격. 수요와 공급에 따라 결정됨.",
+        "매수": "주식을 사는 행위. 가격 상승을 기대하고 구매.",
+        "매도": "보유한 주식을 파는 행위. 이익 실현 또는 손실 확정 목적.",
+        "포트폴리오": "투자자가 보유한 다양한 자산(주식, 채권, 현금 등)의 구성.",
+        "수익률": "투자 원금 대비 발생한 이익의 비율. (총 평가액 - 총 투자금) / 총 투자금 * 100%",
+        "상승": "주가가 이전 가격보다 오르는 현상.",
+        "하락": "주가가 이전 가격보다 내리는 현상.",
+        "변동성": "주가나 시장 지수가 움직이는 정도. 변동성이 크면 가격 변화가 심함.",
+        "투자": "미래의 수익을 기대하고 현재의 자금을 투입하는 행위.",
+        "섹터": "산업 분류. 비슷한 사업을 영위하는 기업들의 그룹 (예: IT 섹터, 바이오 섹터).",
+        "전일 대비 등락률": "오늘 종가가 어제 종가에 비해 얼마나 변동했는지 백분율로 표시.",
+        "뉴스 (경제)": "기업 실적, 경제 지표 발표, 정책 변화 등 주가에 영향을 미칠 수 있는 정보.",
+        "현금": "즉시 사용 가능한 자금. 포트폴리오 내 유동성 자산.",
+        "평가액 (주식)": "보유 주식 수량 × 현재 주가. 포트폴리오의 현재 가치.",
+        "손익": "매수 가격과 현재(또는 매도) 가격의 차이로 발생하는 이익 또는 손실.",
+        "시가총액": "기업의 전체 주식 가치. 주가 × 총 발행 주식 수.",
+        "배당금": "기업이 이익의 일부를 주주에게 나눠주는 돈.",
+    },
+    "고등": {
+        "주식 (보통주)": "기업의 소유권을 나타내는 대표적인 유가증권. 의결권과 배당권 보유.",
+        "주가": "자본시장에서 결정되는 주식의 시장 가격. 기업 가치, 업황, 경제 상황 등 복합적 요인 반영.",
+        "매수 (Long Position)": "가격 상승을 예상하고 특정 자산을 매입하는 것.",
+        "매도 (Short Selling / Position Closing)": "보유 자산을 팔거나(청산), 가격 하락을 예상하고 빌려서 파는 것(공매도).",
+        "포트폴리오": "위험 분산 및 수익 극대화를 위해 여러 자산에 분산 투자한 집합.",
+        "수익률 (CAGR, 누적)": "투자기간 동안의 연평균 복합 수익률 또는 총 누적 수익률.",
+        "상승 (Bull Market)": "주식 시장이 전반적으로 장기간 상승하는 추세.",
+        "하락 (Bear Market)": "주식 시장이 전반적으로 장기간 하락하는 추세.",
+        "변동성 (Volatility)": "자산 가격의 변동 정도를 나타내는 통계적 지표. 표준편차 등으로 측정.",
+        "투자 (Investment)": "자본을 투입하여 미래의 자본 이득이나 소득 증대를 추구하는 행위.",
+        "섹터/산업": "경제 활동 영역에 따른 기업 분류 (GICS, KRX 산업분류 등). 경기 순환과의 연관성 분석.",
+        "전일 대비 등락률": "기준 시점(주로 전일 종가) 대비 가격 변화율. 시장 모멘텀 파악 지표.",
+        "뉴스 (거시/미시)": "금리, 환율, GDP 등 거시경제 지표 및 개별 기업 뉴스(실적, M&A, 신기술 등).",
+        "현금 (Cash Equivalents)": "현금 및 단기 금융상품. 포트폴리오의 안정성 및 기회 확보 수단.",
+        "평가액 (Mark-to-Market)": "보유 자산을 현재 시장 가격으로 평가한 금액.",
+        "손익 (실현/미실현)": "매매를 통해 확정된 손익(실현)과 평가상의 손익(미실현).",
+        "시가총액 (Market Capitalization)": "기업의 규모와 시장 가치를 나타내는 지표.",
+        "배당수익률": "주가 대비 배당금의 비율. 투자 매력도 판단 지표 중 하나.",
+        "PER (주가수익비율)": "주가 / 주당순이익(EPS). 기업의 수익성 대비 주가 수준 평가.",
+        "PBR (주가순자산비율)": "주가 / 주당순자산(BPS). 기업의 자산가치 대비 주가 수준 평가.",
+        "ROE (자기자본이익률)": "당기순이익 / 자기자본. 기업의 수익성 및 효율성 지표.",
+    }
+}
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import threading
+
+from tracing import Histogram
+
+# --- LLM 호출 마감 시간과 헤지(hedged request) ---
+# 업스트림 응답 하나가 늦으면 '하루 지나기' 전체가 그 응답을 기다리며 멈춘다. 그래서 비동기 경로의 LLM 호출마다
+#   1. 같은 종류(뉴스/해설) 호출 지연의 p95 가 지나도 답이 없으면 같은 요청을 한 번 더 보내 먼저 온 답을 쓰고 (헤지)
+#   2. 마감 시간(deadline)이 지나면 남은 요청을 취소하고 TimeoutError 를 낸다.
+#      MeteredLLM 은 이때 캐시된 응답 → 오프라인 백엔드(뉴스 코퍼스 등) 순서로 대신한다.
+# p95 에서 헤지하므로 추가 요청은 대략 호출의 5% 이다 (취소된 요청도 업스트림에서는 과금될 수 있음).
+# 관측이 HEDGE_MIN_SAMPLES 건보다 적은 종류는 p95 를 믿을 수 없으므로 헤지하지 않고 마감 시간만 적용한다.
+
+# 종류별 마감 시간 (초). LLM_DEADLINES 환경 변수의 JSON 으로 덮어쓸 수 있고, null 이면 마감 없음
+DEFAULT_DEADLINES = {"news": 30.0, "explanation": 10.0, "llm": 30.0}
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+MIN_HEDGE_DELAY = 0.05   # 헤지 지연 하한 (초). 아주 빠른 백엔드에서 요청이 두 배가 되지 않게 함
+# 지연 히스토그램 구간: 10ms 부터 1.25 배씩 약 60초까지 (p95 를 구간 폭 25% 안에서 추정)
+LATENCY_BUCKETS = tuple(round(0.01 * 1.25 ** i, 4) for i in range(40))
+
+
+def load_deadlines(text=None):
+    """기본 마감 시간에 LLM_DEADLINES(JSON) 의 종류별 값을 덮어쓴 표."""
+    deadlines = dict(DEFAULT_DEADLINES)
+    text = os.environ.get("LLM_DEADLINES") if text is None else text
+    if text:
+        deadlines.update(json.loads(text))
+    return deadlines
+
+
+class LatencyGuard:
+    """호출 종류별 지연을 모아 헤지 시점을 정하고, 마감 시간 안에서 요청을 실행한다 (프로세스에서 공유, 스레드 안전)."""
+
+    def __init__(self, deadlines=None, hedge=True, min_samples=HEDGE_MIN_SAMPLES, quantile=HEDGE_QUANTILE):
+        self.deadlines = load_deadlines() if deadlines is None else deadlines
+        self.hedge = hedge
+        self.min_samples = min_samples
+        self.quantile = quantile
+        self._lock = threading.Lock()
+        self._histograms = {}   # 종류 -> 성공한 호출의 지연 히스토그램
+        self._counts = {}       # (종류, 사건) -> 횟수. 사건: hedges(헤지 요청), hedge_wins(헤지가 먼저 답함), timeouts
+
+    def _count(self, kind, event):
+        with self._lock:
+            self._counts[(kind, event)] = self._counts.get((kind, event), 0) + 1
+
+    def hedge_delay(self, kind):
+        """kind 호출에 헤지 요청을 보낼 때까지 기다릴 시간 (헤지하지 않으면 None)."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            histogram = self._histograms.get(kind)
+            if histogram is None or histogram.count < self.min_samples:
+                return None
+            return max(MIN_HEDGE_DELAY, histogram.quantile(self.quantile))
+
+    def observe(self, kind, seconds):
+        with self._lock:
+            histogram = self._histograms.get(kind)
+            if histogram is None:
+                histogram = self._histograms[kind] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    async def call(self, kind, request):
+        """request() 가 만드는 코루틴을 실행한다. 헤지 시점이 지나면 한 번 더 보내 먼저 성공한 결과를 돌려준다.
+
+        마감 시간이 지나면 남은 요청을 취소하고 TimeoutError. 헤지를 보내기 전에 실패한 요청은 그 예외를 그대로 낸다.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        delay, deadline = self.hedge_delay(kind), self.deadlines.get(kind)
+        hedge_at = None if delay is None else started + delay
+        expires = None if deadline is None else started + deadline
+        first = asyncio.ensure_future(request())
+        pending = {first}
+        try:
+            while True:
+                wake = min((t for t in (hedge_at, expires) if t is not None), default=None)
+                done, pending = await asyncio.wait(
+                    pending, timeout=None if wake is None else max(0.0, wake - loop.time()), return_when=asyncio.FIRST_COMPLETED,
+                )
+                error = None
+                for task in done:
+                    if task.exception() is None:
+                        self.observe(kind, loop.time() - started)
+                        if task is not first:
+                            self._count(kind, "hedge_wins")
+                        return task.result()
+                    error = task.exception()
+                if not pending: # 보낸 요청이 모두 실패
+                    raise error
+                now = loop.time()
+                if expires is not None and now >= expires:
+                    self._count(kind, "timeouts")
+                    raise TimeoutError(f"LLM 응답이 마감 시간({deadline:g}초) 안에 오지 않았습니다.")
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    pending.add(asyncio.ensure_future(request()))
+                    self._count(kind, "hedges")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def summary(self):
+        """종류별 지연 분위수와 헤지/마감 초과 횟수 행 목록 (화면 표 출력용)."""
+        with self._lock:
+            rows = []
+            for kind in sorted(set(self._histograms) | {kind for kind, _ in self._counts}):
+                histogram = self._histograms.get(kind) or Histogram(LATENCY_BUCKETS)
+                rows.append({
+                    "종류": kind,
+                    "성공 수": histogram.count,
+                    "p95 (ms)": round(histogram.quantile(0.95) * 1000, 1),
+                    "p99 (ms)": round(histogram.quantile(0.99) * 1000, 1),
+                    "마감 (초)": self.deadlines.get(kind),
+                    "헤지": self._counts.get((kind, "hedges"), 0),
+                    "헤지 성공": self._counts.get((kind, "hedge_wins"), 0),
+                    "마감 초과": self._counts.get((kind, "timeouts"), 0),
+                })
+            return rows
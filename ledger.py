@@ -0,0 +1,248 @@
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+# --- 거래 원장 (Trade Ledger) ---
+# 매수/매도 체결 내역을 시간순으로 추가만 하는(append-only) 원장.
+# 열(column) 단위 numpy 배열에 저장해서 메모리를 적게 쓰고, 조회는 벡터 연산으로 처리한다.
+# 종목별 행 번호 인덱스와 평균단가/FIFO 로트(lot) 상태를 체결 시점에 갱신해 두므로
+# 실현 손익, 매입 원가, 종목별 거래 내역 조회 시 원장 전체를 다시 훑지 않는다.
+
+BUY = 1
+SELL = -1
+METHODS = ("avg", "fifo")   # 원가 계산 방식: 평균단가 / 선입선출
+
+# 저장되는 기본 열 (열 이름: dtype)
+BASE_COLUMNS = {
+    "ts": np.float64,     # 체결 시각 (epoch 초)
+    "day": np.int32,      # 게임 내 거래일 (Day)
+    "ticker": np.int32,   # 종목 코드 (self.tickers 의 인덱스)
+    "side": np.int8,      # BUY(1) / SELL(-1)
+    "qty": np.int64,      # 체결 수량
+    "price": np.float64,  # 체결 가격
+}
+# 체결 시점에 계산해 두는 파생 열 (저장하지 않고 재생(replay) 시 다시 계산)
+DERIVED_COLUMNS = {
+    "realized_avg": np.float64,   # 평균단가 기준 실현 손익 (매도 행만 값이 있음)
+    "realized_fifo": np.float64,  # 선입선출(FIFO) 기준 실현 손익
+}
+_ALL_COLUMNS = {**BASE_COLUMNS, **DERIVED_COLUMNS}
+_INITIAL_CAPACITY = 64
+
+
+class TradeLedger:
+    """열 단위로 저장되는 추가 전용 거래 원장."""
+
+    def __init__(self, journal_path=None):
+        self.tickers = []         # 종목 코드 -> 종목명
+        self._ticker_ids = {}     # 종목명 -> 종목 코드
+        self._size = 0
+        self._data = {name: np.empty(_INITIAL_CAPACITY, dtype=dtype) for name, dtype in _ALL_COLUMNS.items()}
+        # 종목별 인덱스 및 보유 상태 (종목 코드 순서)
+        self._rows_by_ticker = []  # 종목별 행 번호 list
+        self._held_qty = []        # 종목별 보유 수량
+        self._avg_cost = []        # 종목별 평균 매입 단가
+        self._lots = []            # 종목별 FIFO 로트 deque([[수량, 단가], ...])
+        # 증분 저장용 저널 (JSON Lines, 아직 기록하지 않은 행만 덧붙임)
+        self.journal_path = journal_path
+        self._flushed = 0
+
+    def __len__(self):
+        return self._size
+
+    # --- 내부 도우미 ---
+    def _ticker_id(self, ticker):
+        ticker_id = self._ticker_ids.get(ticker)
+        if ticker_id is None:
+            ticker_id = len(self.tickers)
+            self.tickers.append(ticker)
+            self._ticker_ids[ticker] = ticker_id
+            self._rows_by_ticker.append([])
+            self._held_qty.append(0)
+            self._avg_cost.append(0.0)
+            self._lots.append(deque())
+        return ticker_id
+
+    def _grow(self):
+        capacity = len(self._data["ts"]) * 2
+        for name, column in self._data.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+
+    # --- 기록 ---
+    def record(self, day, ticker, side, qty, price, ts=None):
+        """체결 1건을 기록하고 평균단가 기준 실현 손익을 반환한다 (매수는 0)."""
+        if side not in (BUY, SELL):
+            raise ValueError(f"알 수 없는 거래 구분입니다: {side}")
+        if qty <= 0 or price <= 0:
+            raise ValueError("체결 수량과 가격은 0보다 커야 합니다.")
+
+        ticker_id = self._ticker_id(ticker)
+        held = self._held_qty[ticker_id]
+        avg_cost = self._avg_cost[ticker_id]
+        lots = self._lots[ticker_id]
+        realized_avg = 0.0
+        realized_fifo = 0.0
+
+        if side == BUY:
+            self._avg_cost[ticker_id] = (avg_cost * held + price * qty) / (held + qty)
+            self._held_qty[ticker_id] = held + qty
+            lots.append([qty, price])
+        else:
+            if qty > held:
+                raise ValueError(f"보유 수량({held}주)보다 많이 매도할 수 없습니다.")
+            realized_avg = (price - avg_cost) * qty
+            remaining = qty
+            while remaining > 0:
+                lot = lots[0]
+                take = min(remaining, lot[0])
+                realized_fifo += (price - lot[1]) * take
+                lot[0] -= take
+                remaining -= take
+                if lot[0] == 0:
+                    lots.popleft()
+            self._held_qty[ticker_id] = held - qty
+            if held == qty:
+                self._avg_cost[ticker_id] = 0.0  # 전량 매도 시 평균단가 초기화
+
+        if self._size == len(self._data["ts"]):
+            self._grow()
+        row = self._size
+        values = {
+            "ts": time.time() if ts is None else ts, "day": day, "ticker": ticker_id,
+            "side": side, "qty": qty, "price": price,
+            "realized_avg": realized_avg, "realized_fifo": realized_fifo,
+        }
+        for name, value in values.items():
+            self._data[name][row] = value
+        self._rows_by_ticker[ticker_id].append(row)
+        self._size += 1
+
+        if self.journal_path:
+            self.flush()
+        return realized_avg
+
+    # --- 조회 ---
+    def column(self, name):
+        """기록된 행까지의 열을 읽기 전용 numpy 뷰로 반환한다."""
+        view = self._data[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def history(self, ticker):
+        """종목별 거래 내역을 열 이름 -> 배열 dict 로 반환한다."""
+        ticker_id = self._ticker_ids.get(ticker)
+        rows = np.asarray(self._rows_by_ticker[ticker_id] if ticker_id is not None else [], dtype=np.int64)
+        return {name: self._data[name][rows] for name in _ALL_COLUMNS if name != "ticker"}
+
+    def realized_pnl(self, ticker=None, method="avg", since_day=None, until_day=None):
+        """실현 손익 합계 (method: "avg" 평균단가 / "fifo" 선입선출)."""
+        realized = self.column(_realized_column(method))
+        if ticker is not None:
+            ticker_id = self._ticker_ids.get(ticker)
+            if ticker_id is None:
+                return 0.0
+            rows = np.asarray(self._rows_by_ticker[ticker_id], dtype=np.int64)
+            realized = realized[rows]
+            days = self.column("day")[rows]
+        else:
+            days = self.column("day")
+        mask = np.ones(len(realized), dtype=bool)
+        if since_day is not None:
+            mask &= days >= since_day
+        if until_day is not None:
+            mask &= days <= until_day
+        return float(realized[mask].sum())
+
+    def realized_by_ticker(self, method="avg"):
+        """종목별 실현 손익 배열 (self.tickers 순서)."""
+        return np.bincount(
+            self.column("ticker"), weights=self.column(_realized_column(method)), minlength=len(self.tickers)
+        )
+
+    def holdings(self):
+        """(종목명 list, 보유 수량 배열, 평균단가 배열, FIFO 매입 원가 배열) 을 반환한다."""
+        qty = np.asarray(self._held_qty, dtype=np.int64)
+        avg_cost = np.asarray(self._avg_cost, dtype=np.float64)
+        fifo_cost = np.asarray([sum(q * p for q, p in lots) for lots in self._lots], dtype=np.float64)
+        return list(self.tickers), qty, avg_cost, fifo_cost
+
+    def cost_basis(self, ticker, method="avg"):
+        """현재 보유분의 총 매입 원가."""
+        if method not in METHODS:
+            raise ValueError(f"알 수 없는 원가 계산 방식입니다: {method}")
+        ticker_id = self._ticker_ids.get(ticker)
+        if ticker_id is None:
+            return 0.0
+        if method == "fifo":
+            return float(sum(q * p for q, p in self._lots[ticker_id]))
+        return float(self._held_qty[ticker_id] * self._avg_cost[ticker_id])
+
+    # --- 저장/복원 ---
+    def to_dict(self):
+        """JSON 으로 저장 가능한 열 단위 dict (기본 열만 저장)."""
+        return {
+            "tickers": list(self.tickers),
+            "columns": {name: self.column(name).tolist() for name in BASE_COLUMNS},
+        }
+
+    @classmethod
+    def from_dict(cls, data, journal_path=None):
+        ledger = cls()
+        if data:
+            tickers = data.get("tickers", [])
+            columns = data.get("columns", {})
+            for ts, day, ticker_id, side, qty, price in zip(*(columns.get(name, []) for name in BASE_COLUMNS)):
+                ledger.record(day, tickers[ticker_id], side, qty, price, ts=ts)
+        ledger.journal_path = journal_path
+        ledger._flushed = len(ledger)
+        return ledger
+
+    def pending_rows(self):
+        """저널에 아직 기록되지 않은 행 목록."""
+        return [
+            {
+                "ts": float(self._data["ts"][row]), "day": int(self._data["day"][row]),
+                "ticker": self.tickers[self._data["ticker"][row]], "side": int(self._data["side"][row]),
+                "qty": int(self._data["qty"][row]), "price": float(self._data["price"][row]),
+            }
+            for row in range(self._flushed, self._size)
+        ]
+
+    def flush(self):
+        """새로 추가된 행만 저널 파일 끝에 덧붙인다."""
+        if not self.journal_path or self._flushed == self._size:
+            return 0
+        rows = self.pending_rows()
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._flushed = self._size
+        return len(rows)
+
+    @classmethod
+    def load(cls, journal_path):
+        """저널 파일을 재생하여 원장을 복원한다 (파일이 없으면 빈 원장)."""
+        ledger = cls()
+        if os.path.exists(journal_path):
+            with open(journal_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        ledger.record(row["day"], row["ticker"], row["side"], row["qty"], row["price"], ts=row["ts"])
+        ledger.journal_path = journal_path
+        ledger._flushed = len(ledger)
+        return ledger
+
+
+def _realized_column(method):
+    if method not in METHODS:
+        raise ValueError(f"알 수 없는 원가 계산 방식입니다: {method}")
+    return f"realized_{method}"
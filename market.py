@@ -0,0 +1,94 @@
+import numpy as np
+
+# --- 팩터 모델 주가 엔진 ---
+# 일간 수익률 = 시장 팩터 × 베타 + 소속 섹터 팩터 + 개별 종목 잡음 + 뉴스에 따른 섹터 영향 (+ 가상 투자자 주문의 종목별 영향)
+# 시장/섹터 팩터는 공분산 행렬의 촐레스키(Cholesky) 분해로 상관관계를 준 뒤 하루에 한 번 행렬 곱으로 뽑는다.
+# 종목은 시장 1개 + 섹터 1개에만 노출되므로 하루 계산량은 O(종목 수 + 팩터 수²) 이다.
+
+MAX_DAILY_CHANGE = 0.15  # 하루 최대 변동률 (+/- 15%)
+MIN_PRICE = 1            # 최소 주가 1원
+
+# 수준별 기본 변동성 (일간 표준편차). LEVELS[수준]["volatility"] 로 덮어쓸 수 있음
+DEFAULT_VOLATILITY = {
+    "market": 0.006,             # 시장 전체 팩터
+    "sector": 0.008,             # 섹터 팩터
+    "idiosyncratic": 0.011,      # 개별 종목 잡음
+    "sector_correlation": 0.3,   # 섹터 팩터 간 상관계수
+}
+
+
+def factor_covariance(n_sectors, market_vol, sector_vol, sector_correlation=0.0):
+    """[시장, 섹터1..섹터S] 팩터 공분산 행렬을 만든다."""
+    if not -1.0 / max(n_sectors - 1, 1) < sector_correlation < 1.0:
+        raise ValueError(f"섹터 상관계수가 허용 범위를 벗어났습니다: {sector_correlation}")
+    sector_cov = np.full((n_sectors, n_sectors), sector_correlation * sector_vol ** 2)
+    np.fill_diagonal(sector_cov, sector_vol ** 2)
+    covariance = np.zeros((n_sectors + 1, n_sectors + 1))
+    covariance[0, 0] = market_vol ** 2
+    covariance[1:, 1:] = sector_cov
+    return covariance
+
+
+class FactorModel:
+    """시장/섹터/개별 잡음으로 구성된 주가 팩터 모델."""
+
+    def __init__(self, sector_index, n_sectors, market_vol, sector_vol, idiosyncratic_vol,
+                 sector_correlation=0.0, betas=None, rng=None, max_daily_change=MAX_DAILY_CHANGE):
+        self.sector_index = np.asarray(sector_index, dtype=np.intp)
+        self.n_stocks = len(self.sector_index)
+        self.n_sectors = n_sectors
+        self.betas = np.ones(self.n_stocks) if betas is None else np.asarray(betas, dtype=np.float64)
+        self.idiosyncratic_vol = idiosyncratic_vol
+        self.max_daily_change = max_daily_change
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # 팩터 공분산의 촐레스키 인자 (모델 생성 시 한 번만 계산)
+        self.cholesky = np.linalg.cholesky(factor_covariance(n_sectors, market_vol, sector_vol, sector_correlation))
+
+    @classmethod
+    def from_level(cls, sector_index, n_sectors, volatility=None, rng=None):
+        params = {**DEFAULT_VOLATILITY, **(volatility or {})}
+        return cls(
+            sector_index, n_sectors,
+            market_vol=params["market"], sector_vol=params["sector"],
+            idiosyncratic_vol=params["idiosyncratic"], sector_correlation=params["sector_correlation"],
+            rng=rng,
+        )
+
+    def draw_returns(self, sector_impacts=None, days=None, stock_impacts=None):
+        """일간 수익률을 뽑는다. days 를 주면 (days, 종목 수) 배열을 한 번에 만든다.
+
+        stock_impacts 는 종목별로 더할 수익률 (가상 투자자 주문의 가격 영향 등).
+        """
+        shape = () if days is None else (days,)
+        # 독립 표준정규 → 촐레스키 인자를 곱해 상관된 팩터 수익률
+        factors = self.rng.standard_normal(shape + (self.n_sectors + 1,)) @ self.cholesky.T
+        returns = factors[..., :1] * self.betas + factors[..., 1:][..., self.sector_index]
+        returns += self.rng.standard_normal(shape + (self.n_stocks,)) * self.idiosyncratic_vol
+        if sector_impacts is not None:
+            returns += np.asarray(sector_impacts, dtype=np.float64)[..., self.sector_index]
+        if stock_impacts is not None:
+            returns += np.asarray(stock_impacts, dtype=np.float64)
+        return np.clip(returns, -self.max_daily_change, self.max_daily_change, out=returns)
+
+    def step(self, prices, sector_impacts=None, stock_impacts=None):
+        """하루치 주가를 갱신한다 (원 단위 절사, 최소 1원)."""
+        new_prices = np.asarray(prices, dtype=np.float64) * (1.0 + self.draw_returns(sector_impacts, stock_impacts=stock_impacts))
+        return np.maximum(MIN_PRICE, np.floor(new_prices)).astype(np.int64)
+
+    def simulate(self, prices, days, sector_impacts=None, chunk_days=128):
+        """여러 날을 연속으로 시뮬레이션하여 (days + 1, 종목 수) 가격 경로를 반환한다.
+
+        sector_impacts 는 (days, 섹터 수) 배열 또는 None. 메모리를 아끼기 위해 chunk_days 일씩 나눠 뽑는다.
+        """
+        path = np.empty((days + 1, self.n_stocks), dtype=np.int64)
+        path[0] = np.asarray(prices, dtype=np.int64)
+        current = path[0].astype(np.float64)
+        for start in range(0, days, chunk_days):
+            stop = min(days, start + chunk_days)
+            impacts = None if sector_impacts is None else np.asarray(sector_impacts)[start:stop]
+            growth = 1.0 + self.draw_returns(impacts, days=stop - start)
+            # 절사/최소가 규칙이 매일 적용되어야 하므로 일 단위로 누적
+            for offset, day_growth in enumerate(growth):
+                current = np.maximum(MIN_PRICE, np.floor(current * day_growth))
+                path[start + offset + 1] = current
+        return path
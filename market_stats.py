@@ -0,0 +1,147 @@
+import numpy as np
+
+# --- 일별 시장 통계 ---
+# 하루가 지나 주가가 갱신될 때 전 종목의 최근 주가 창(window)을 (종목 수 × 일수) 배열로 모아
+# 1/5/20일 수익률, 변동성, 섹터 평균, 상승/하락 상위 종목을 한 번에 계산해 둔다.
+# 화면에서는 계산된 배열을 표로 보여주기만 하므로 재실행(rerun)마다 다시 계산하지 않는다.
+
+RETURN_WINDOWS = (1, 5, 20)   # 수익률 기간 (거래일)
+VOLATILITY_WINDOW = 20        # 변동성 계산에 쓰는 최근 일간 수익률 수
+TOP_MOVERS = 5                # 상승/하락 상위 종목 수
+PAGE_SORT_FIELDS = ("catalog", "price", "change", "volatility")   # 시세 표 정렬 기준 (catalog: 카탈로그 순서)
+
+
+class MarketStats:
+    """하루치 시장 통계 (모든 값은 % 단위, 기록이 부족한 칸은 NaN)."""
+
+    def __init__(self, source, history_length, tickers, sector_names, sector_index, prices, returns, volatility):
+        self.source = source                  # 계산에 쓴 stocks dict (같은 객체인지로 최신 여부 판단)
+        self.history_length = history_length  # 계산 시점의 주가 기록 길이
+        self.tickers = tickers
+        self.sector_names = sector_names
+        self.sector_index = sector_index
+        self.prices = prices
+        self.returns = returns                # 기간 -> 종목별 수익률 배열
+        self.volatility = volatility          # 종목별 일간 수익률 표준편차
+        self.sector_returns = {window: _sector_mean(values, sector_index, len(sector_names)) for window, values in returns.items()}
+        self.sector_volatility = _sector_mean(volatility, sector_index, len(sector_names))
+        self.gainers, self.losers = self._movers(returns[1])
+        # 섹터별 행 구간: 섹터 순으로 묶은 정렬 색인에서 섹터 i 는 [offsets[i], offsets[i + 1])
+        self.sector_offsets = np.concatenate([[0], np.cumsum(np.bincount(sector_index, minlength=len(sector_names)))])
+        self._orders = {}                     # (정렬 기준, 오름차순) -> (전체 정렬 색인, 섹터별로 묶은 정렬 색인)
+
+    @classmethod
+    def from_stocks(cls, stocks):
+        """state["stocks"] ({섹터: {종목: {current_price, price_history}}}) 에서 통계를 계산한다."""
+        window = max(max(RETURN_WINDOWS), VOLATILITY_WINDOW) + 1
+        sector_names = list(stocks.keys())
+        tickers, sector_index, histories = [], [], []
+        for i, sector in enumerate(sector_names):
+            for name, info in stocks[sector].items():
+                tickers.append(name)
+                sector_index.append(i)
+                histories.append(info.get("price_history") or [info.get("current_price", 0)])
+        sector_index = np.array(sector_index, dtype=np.int32)
+        lengths = np.array([min(len(h), window) for h in histories], dtype=np.int32)
+        history_length = max((len(h) for h in histories), default=0)
+
+        # 최근 window 일을 오른쪽 정렬한 배열 (기록이 짧은 종목은 왼쪽을 NaN 으로 채움)
+        matrix = np.full((len(histories), window), np.nan)
+        for row, (history, length) in enumerate(zip(histories, lengths)):
+            matrix[row, window - length:] = history[-length:]
+        matrix[matrix <= 0] = np.nan
+
+        prices = matrix[:, -1]
+        returns = {w: (prices / matrix[:, -1 - w] - 1) * 100 for w in RETURN_WINDOWS}
+        daily = (matrix[:, 1:] / matrix[:, :-1] - 1) * 100 # 일간 수익률 (%)
+        volatility = _row_std(daily[:, -VOLATILITY_WINDOW:])
+        return cls(stocks, history_length, tickers, sector_names, sector_index, prices, returns, volatility)
+
+    def is_current(self, stocks):
+        """stocks 가 계산 이후 바뀌지 않았는지 (같은 객체이고 주가 기록 길이가 같음)."""
+        if stocks is not self.source:
+            return False
+        first_sector = next(iter(stocks.values()), {})
+        first = next(iter(first_sector.values()), None)
+        return first is None or len(first.get("price_history", [])) == self.history_length
+
+    def _movers(self, values, n=TOP_MOVERS):
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0:
+            return valid, valid
+        order = valid[np.argsort(values[valid], kind="stable")]
+        gainers = order[::-1][:n]
+        losers = order[:n]
+        return gainers[values[gainers] > 0], losers[values[losers] < 0]
+
+    def _sort_order(self, field, ascending):
+        """정렬 색인 (통계와 함께 하루 동안 재사용). 값이 NaN 인 종목은 방향과 상관없이 맨 뒤."""
+        key = (field, ascending)
+        orders = self._orders.get(key)
+        if orders is None:
+            if field == "catalog":
+                values = np.arange(len(self.tickers), dtype=np.float64)
+            elif field == "price":
+                values = self.prices
+            elif field == "change":
+                values = self.returns[1]
+            elif field == "volatility":
+                values = self.volatility
+            else:
+                raise ValueError(f"알 수 없는 정렬 기준입니다: {field}")
+            order = np.argsort(values if ascending else -values, kind="stable")
+            grouped = order[np.argsort(self.sector_index[order], kind="stable")] # 섹터 안에서는 정렬 순서 유지
+            orders = self._orders[key] = (order, grouped)
+        return orders
+
+    def page(self, field="catalog", ascending=True, sector=None, page=0, page_size=20):
+        """시세 표 한 페이지의 종목 번호 배열과 (필터 후) 전체 종목 수.
+
+        정렬 색인을 미리 만들어 두고 잘라내기만 하므로 종목 수와 상관없이 page_size 만큼만 다룬다.
+        """
+        order, grouped = self._sort_order(field, ascending)
+        if sector is None:
+            rows, start, end = order, 0, len(order)
+        else:
+            i = self.sector_names.index(sector)
+            rows, start, end = grouped, int(self.sector_offsets[i]), int(self.sector_offsets[i + 1])
+        first = min(start + page * page_size, end)
+        return rows[first:min(first + page_size, end)], end - start
+
+    def stock_columns(self):
+        """종목별 통계 열 (표 출력용)."""
+        return {
+            "종목": self.tickers,
+            "섹터": [self.sector_names[i] for i in self.sector_index],
+            "현재 주가": self.prices,
+            **{f"{w}일 수익률(%)": self.returns[w] for w in RETURN_WINDOWS},
+            f"변동성({VOLATILITY_WINDOW}일, %)": self.volatility,
+        }
+
+    def sector_columns(self):
+        """섹터별 평균 열 (표 출력용)."""
+        return {
+            "섹터": self.sector_names,
+            "종목 수": np.bincount(self.sector_index, minlength=len(self.sector_names)),
+            **{f"평균 {w}일 수익률(%)": self.sector_returns[w] for w in RETURN_WINDOWS},
+            "평균 변동성(%)": self.sector_volatility,
+        }
+
+
+def _sector_mean(values, sector_index, n_sectors):
+    """섹터별 평균 (NaN 은 제외, 값이 하나도 없는 섹터는 NaN)."""
+    valid = ~np.isnan(values)
+    sums = np.bincount(sector_index[valid], weights=values[valid], minlength=n_sectors)
+    counts = np.bincount(sector_index[valid], minlength=n_sectors)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _row_std(values):
+    """행별 표본 표준편차 (NaN 은 제외, 값이 2개 미만인 행은 NaN)."""
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=1)
+    filled = np.where(valid, values, 0.0)
+    means = filled.sum(axis=1) / np.maximum(counts, 1)
+    squares = np.where(valid, (filled - means[:, None]) ** 2, 0.0).sum(axis=1)
+    return np.where(counts >= 2, np.sqrt(squares / np.maximum(counts - 1, 1)), np.nan)
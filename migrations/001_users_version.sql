@@ -0,0 +1,3 @@
+-- users.version: 저장할 때마다 1씩 오르는 버전 (app.py 의 버전 비교 저장에 씀)
+-- Supabase SQL 편집기에서 한 번 실행한다. 이미 있으면 아무것도 바꾸지 않는다.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 0;
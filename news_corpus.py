@@ -0,0 +1,291 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+
+from backends import FakeLLMBackend, estimate_tokens
+from engine import LEVELS, NEWS_COUNT, build_news_prompt
+from tracing import span
+
+# --- 오프라인 뉴스 코퍼스 ---
+# 수준·관련 섹터·영향(변동률)이 미리 매겨진 기사 묶음을 SQLite 파일 하나에 색인해 두고,
+# 하루치 뉴스를 LLM 호출 없이 바로 뽑는다. LLM 은 코퍼스를 한꺼번에 채울 때만 쓴다.
+#   data/news_corpus.jsonl: 저장소에 함께 두는 원본 (한 줄에 기사 하나: level, article, explanation, sectors, impact)
+#   NEWS_CORPUS_PATH (기본 data/news_corpus.db): 원본에서 만든 색인 파일 (원본이 바뀌면 다시 가져옴)
+# 기사는 본문 지문(공백 정규화 후 SHA-1)으로 중복 없이 저장하고, 같은 지문으로 해설/섹터/영향을 찾는다.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_SOURCE_PATH = os.path.join(DATA_DIR, "news_corpus.jsonl")
+DEFAULT_DB_PATH = os.path.join(DATA_DIR, "news_corpus.db")
+
+CORPUS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    level TEXT NOT NULL,
+    article TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    sectors TEXT NOT NULL,
+    impact REAL NOT NULL DEFAULT 0,
+    source TEXT,
+    fingerprint TEXT NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS articles_level ON articles (level, id);
+CREATE TABLE IF NOT EXISTS article_sectors (
+    article_id INTEGER NOT NULL REFERENCES articles (id),
+    sector TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (article_id, sector)
+);
+CREATE INDEX IF NOT EXISTS article_sectors_sector ON article_sectors (sector, article_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+_WHITESPACE = re.compile(r"\s+")
+_ARTICLE_PATTERN = re.compile(r"\*\*신문 기사:\*\*\s*(.*?)\s*\*\*지시:\*\*", re.S)
+
+
+def fingerprint(article):
+    """공백을 정규화한 기사 본문의 SHA-1 지문."""
+    return hashlib.sha1(_WHITESPACE.sub(" ", article).strip().encode("utf-8")).hexdigest()
+
+
+class NewsCorpus:
+    """수준/섹터별로 색인된 기사 저장소 (SQLite, 스레드 안전)."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(CORPUS_SCHEMA)
+
+    def add(self, level, article, explanation, sectors, impact=0.0, source=None):
+        """기사 하나를 추가하고 id 를 돌려준다. 같은 지문의 기사가 이미 있으면 None."""
+        if level not in LEVELS:
+            raise ValueError(f"알 수 없는 수준입니다: {level}")
+        sectors = dict(sectors) if isinstance(sectors, dict) else {sector: 1.0 for sector in sectors}
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO articles (level, article, explanation, sectors, impact, source, fingerprint)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (level, article.strip(), explanation.strip(), json.dumps(sectors, ensure_ascii=False), float(impact),
+                 source, fingerprint(article)),
+            )
+            if not cursor.rowcount:
+                return None
+            article_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO article_sectors (article_id, sector, weight) VALUES (?, ?, ?)",
+                [(article_id, sector, float(weight)) for sector, weight in sectors.items()],
+            )
+        return article_id
+
+    def import_jsonl(self, path, source=None):
+        """JSON Lines 원본의 기사를 추가하고 새로 추가된 수를 돌려준다."""
+        added = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                added += self.add(
+                    row["level"], row["article"], row["explanation"], row.get("sectors", {}), row.get("impact", 0.0),
+                    source=row.get("source", source),
+                ) is not None
+        return added
+
+    def count(self, level=None):
+        with self._lock:
+            if level is None:
+                return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM articles WHERE level = ?", (level,)).fetchone()[0]
+
+    def ids(self, level, sector=None):
+        """수준(과 섹터)에 해당하는 기사 id 목록 (id 순)."""
+        with self._lock:
+            if sector is None:
+                rows = self._conn.execute("SELECT id FROM articles WHERE level = ? ORDER BY id", (level,))
+            else:
+                rows = self._conn.execute(
+                    "SELECT a.id FROM article_sectors s JOIN articles a ON a.id = s.article_id"
+                    " WHERE s.sector = ? AND a.level = ? ORDER BY a.id",
+                    (sector, level),
+                )
+            return [row[0] for row in rows]
+
+    def get(self, article_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return _row_dict(row)
+
+    def find(self, article):
+        """본문이 같은(공백 차이 무시) 기사. 없으면 None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM articles WHERE fingerprint = ?", (fingerprint(article),)).fetchone()
+        return _row_dict(row)
+
+    def tagged_meaning(self, article):
+        """코퍼스에 있는 기사면 engine 의 뉴스 해설 형식({explanation, sectors, sector_weights, impact}), 없으면 None."""
+        row = self.find(article)
+        if row is None:
+            return None
+        return {
+            "explanation": row["explanation"], "sectors": list(row["sectors"]),
+            "sector_weights": row["sectors"], "impact": row["impact"],
+        }
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def close(self):
+        self._conn.close()
+
+
+def _row_dict(row):
+    if row is None:
+        return None
+    result = dict(row)
+    result["sectors"] = json.loads(result["sectors"])
+    return result
+
+
+class CorpusSampler:
+    """기사 id 목록에서 한 바퀴(cycle) 동안 겹치지 않게 하나씩 뽑는다.
+
+    바퀴마다 (seed, 바퀴 번호)로 정한 아핀 순열 i -> (a·i + b) mod n 을 쓰므로
+    목록을 섞어 두지 않고도 한 번 뽑는 데 O(1) 이고, 상태는 정수 두 개(cycle, position)뿐이다.
+    """
+
+    def __init__(self, ids, seed=0, cycle=0, position=0):
+        self.ids = list(ids)
+        self.seed = seed
+        self.cycle = cycle
+        self.position = position
+        self._lock = threading.Lock()
+        self._step, self._offset = self._permutation(cycle)
+
+    def _permutation(self, cycle):
+        n = len(self.ids)
+        if n <= 1:
+            return 1, 0
+        rng = random.Random(f"{self.seed}:{cycle}")
+        step = rng.randrange(1, n)
+        while math.gcd(step, n) != 1:
+            step = step % (n - 1) + 1
+        return step, rng.randrange(n)
+
+    def pick(self):
+        with self._lock:
+            n = len(self.ids)
+            if n == 0:
+                raise LookupError("코퍼스에 기사가 없습니다.")
+            if self.position >= n:
+                self.cycle += 1
+                self.position = 0
+                self._step, self._offset = self._permutation(self.cycle)
+            article_id = self.ids[(self._step * self.position + self._offset) % n]
+            self.position += 1
+            return article_id
+
+    def sample(self, k):
+        """k 개를 뽑는다 (기사 수가 k 이상이면 한 묶음 안에서는 겹치지 않음).
+
+        묶음이 바퀴 경계에 걸치면 앞 바퀴 끝에서 이미 나온 기사는 새 바퀴에서 건너뛴다.
+        """
+        batch = []
+        while len(batch) < min(k, len(self.ids)):
+            article_id = self.pick()
+            if article_id not in batch:
+                batch.append(article_id)
+        return batch
+
+    def state(self):
+        return {"seed": self.seed, "cycle": self.cycle, "position": self.position}
+
+
+class CorpusBackend:
+    """코퍼스에서 뉴스/해설을 돌려주는 LLM 대체 백엔드 (비용 0, 네트워크 없음).
+
+    engine.build_news_prompt(수준) 와 같은 프롬프트에는 그 수준의 기사 5개를 "## 뉴스 N" 형식으로,
+    해설 프롬프트에는 본문이 코퍼스에 있는 기사의 저장된 해설을 돌려준다. 나머지는 fallback 이 답한다.
+    """
+
+    model = "corpus"
+
+    def __init__(self, corpus, seed=None, fallback=None):
+        self.corpus = corpus
+        self.fallback = fallback or FakeLLMBackend(seed=seed)
+        seed = random.randrange(2 ** 32) if seed is None else seed
+        self.samplers = {level: CorpusSampler(corpus.ids(level), seed=f"{seed}:{level}") for level in LEVELS}
+        self._news_prompts = {build_news_prompt(level): level for level in LEVELS}
+
+    def complete(self, prompt, temperature, max_tokens, json_mode=False, kind=None):
+        return self.complete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode)[0]
+
+    def complete_with_usage(self, prompt, temperature, max_tokens, json_mode=False):
+        with span("llm.corpus") as s:
+            content = None if json_mode else self._respond(prompt)
+            if content is None:
+                return self.fallback.complete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode)
+            s.record(request_bytes=len(prompt.encode("utf-8")), response_bytes=len(content.encode("utf-8")))
+        # 저장된 글을 돌려줄 뿐이므로 토큰은 추정치만 남긴다 (가격표상 비용 0)
+        return content, estimate_tokens(prompt), estimate_tokens(content)
+
+    async def acomplete(self, prompt, temperature, max_tokens, json_mode=False, kind=None):
+        return (await self.acomplete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode))[0]
+
+    async def acomplete_with_usage(self, prompt, temperature, max_tokens, json_mode=False):
+        # 코퍼스 조회는 로컬 SQLite 한 번이라 그대로 실행하고, 답이 없을 때만 fallback 을 기다린다
+        with span("llm.corpus") as s:
+            content = None if json_mode else self._respond(prompt)
+            if content is None:
+                return await self.fallback.acomplete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode)
+            s.record(request_bytes=len(prompt.encode("utf-8")), response_bytes=len(content.encode("utf-8")))
+        return content, estimate_tokens(prompt), estimate_tokens(content)
+
+    def _respond(self, prompt):
+        level = self._news_prompts.get(prompt)
+        if level is not None:
+            sampler = self.samplers[level]
+            if not sampler.ids:
+                return None
+            articles = [self.corpus.get(article_id)["article"] for article_id in sampler.sample(NEWS_COUNT)]
+            return "\n\n".join(f"## 뉴스 {i}\n{article}" for i, article in enumerate(articles, start=1))
+        match = _ARTICLE_PATTERN.search(prompt)
+        if match:
+            row = self.corpus.find(match.group(1))
+            if row is not None:
+                return f"해설: {row['explanation']}"
+        return None
+
+
+@lru_cache(maxsize=2)
+def _corpus_for(db_path, source_path, source_mtime):
+    corpus = NewsCorpus(db_path)
+    if source_mtime is not None and corpus.get_meta("source_mtime") != str(source_mtime):
+        corpus.import_jsonl(source_path, source=os.path.basename(source_path))
+        corpus.set_meta("source_mtime", source_mtime)
+    return corpus
+
+
+def get_corpus(db_path=None, source_path=None):
+    """프로세스에 하나만 여는 코퍼스. 원본 JSON Lines 가 바뀌었으면 새 기사를 가져온다. 기사가 없으면 None."""
+    db_path = db_path or os.environ.get("NEWS_CORPUS_PATH", DEFAULT_DB_PATH)
+    source_path = source_path or DEFAULT_SOURCE_PATH
+    mtime = os.path.getmtime(source_path) if os.path.exists(source_path) else None
+    corpus = _corpus_for(db_path, source_path, mtime)
+    return corpus if corpus.count() else None
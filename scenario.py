@@ -0,0 +1,108 @@
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# --- 시나리오 (교사가 미리 짜 둔 여러 날짜의 사건) ---
+# 금리 인상, 수출 호황처럼 며칠 동안 여러 섹터에 걸치는 사건을 JSON 파일로 적어 두면
+# 불러올 때 (거래일 × 섹터) 충격 행렬 하나로 미리 계산해 둔다. 하루 지나기 때는 그날의 행 하나만 더하므로
+# 사건 수나 시나리오 길이와 상관없이 하루 비용은 섹터 수만큼이다.
+# 파일 형식 (SCENARIO_PATH 로 지정, 없으면 시나리오 없음):
+#   {"name": "...", "events": [
+#       {"day": 3, "title": "기준금리 인상", "sectors": {"금융(Finance)": 1.0, "건설(Construction)": -1.0},
+#        "magnitude": 0.02, "decay": 0.6, "duration": 5},
+#       {"day": 10, "title": "수출 호황", "sectors": ["자동차(Auto)", "철강(Steel)"], "magnitude": 0.015},
+#       {"day": 20, "title": "경기 둔화 우려", "sectors": "*", "magnitude": -0.01, "decay": 0.8}]}
+#   day        사건이 일어나는 날. 그날 뉴스 패널에 제목이 뜨고, 그날 '하루 지나기' 때 주가에 반영된다 (뉴스와 같음)
+#   sectors    섹터 목록, {섹터: 가중치}, 또는 "*" (모든 섹터)
+#   magnitude  첫날 섹터 영향 (일간 수익률, 0.02 = +2%)
+#   decay      다음 날마다 남는 비율 (0 이면 하루만, 기본 0)
+#   duration   영향이 이어지는 최대 일수 (기본: 영향이 MIN_SHOCK 보다 작아질 때까지, 최대 MAX_DURATION 일)
+
+MIN_SHOCK = 1e-4      # 이보다 작아진 영향은 버림
+MAX_DURATION = 60     # 사건 하나가 이어지는 최대 일수
+
+
+class Scenario:
+    """미리 계산된 시나리오: shocks[d - 1] 이 Day d 에 '하루 지나기' 할 때 더할 섹터별 영향."""
+
+    def __init__(self, name, sector_names, shocks, headlines):
+        self.name = name
+        self.sector_names = sector_names
+        self.shocks = shocks          # (거래일 × 섹터) float64
+        self.headlines = headlines    # Day -> [사건 제목, ...]
+
+    @property
+    def days(self):
+        return self.shocks.shape[0]
+
+    def shocks_for(self, day):
+        """Day 의 섹터별 영향 행 (시나리오 밖이면 None)."""
+        return self.shocks[day - 1] if 1 <= day <= self.days else None
+
+
+def _event_sectors(event, sector_position):
+    sectors = event.get("sectors", "*")
+    if sectors == "*":
+        return list(range(len(sector_position))), [1.0] * len(sector_position)
+    weights = sectors if isinstance(sectors, dict) else {sector: 1.0 for sector in sectors}
+    unknown = [sector for sector in weights if sector not in sector_position]
+    if unknown:
+        raise ValueError(f"알 수 없는 섹터입니다: {', '.join(unknown)}")
+    return [sector_position[sector] for sector in weights], [float(weight) for weight in weights.values()]
+
+
+def compile_scenario(data, sector_names):
+    """시나리오 dict 를 (거래일 × 섹터) 충격 행렬로 만든다. 형식이 틀리면 몇 번째 사건인지 담은 ValueError."""
+    sector_position = {sector: i for i, sector in enumerate(sector_names)}
+    rows, columns, values, headlines = [], [], [], {}
+    for number, event in enumerate(data.get("events", []), start=1):
+        try:
+            day = int(event["day"])
+            magnitude = float(event["magnitude"])
+            decay = float(event.get("decay", 0.0))
+            if day < 1:
+                raise ValueError("day 는 1 이상이어야 합니다.")
+            if not 0.0 <= decay < 1.0:
+                raise ValueError("decay 는 0 이상 1 미만이어야 합니다.")
+            if "duration" in event:
+                duration = int(event["duration"])
+            elif decay > 0 and abs(magnitude) > MIN_SHOCK:
+                duration = int(np.ceil(np.log(MIN_SHOCK / abs(magnitude)) / np.log(decay)))
+            else:
+                duration = 1
+            duration = max(1, min(duration, MAX_DURATION))
+            event_columns, weights = _event_sectors(event, sector_position)
+        except KeyError as e:
+            raise ValueError(f"시나리오 {number}번째 사건에 {e.args[0]} 항목이 없습니다.") from e
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"시나리오 {number}번째 사건이 올바르지 않습니다: {e}") from e
+        # 사건 하나의 (일수 × 섹터) 영향을 펼쳐 모아 두었다가 마지막에 한 번에 더한다
+        profile = magnitude * decay ** np.arange(duration)
+        rows.append(np.repeat(np.arange(day - 1, day - 1 + duration), len(event_columns)))
+        columns.append(np.tile(event_columns, duration))
+        values.append(np.outer(profile, weights).ravel())
+        if event.get("title"):
+            headlines.setdefault(day, []).append(str(event["title"]))
+
+    days = max((int(r.max()) + 1 for r in rows if len(r)), default=0)
+    shocks = np.zeros((days, len(sector_names)))
+    if rows:
+        np.add.at(shocks, (np.concatenate(rows), np.concatenate(columns)), np.concatenate(values))
+    return Scenario(data.get("name", ""), list(sector_names), shocks, headlines)
+
+
+@lru_cache(maxsize=8)
+def _load_scenario_cached(path, mtime, sector_names):
+    with open(path, encoding="utf-8") as f:
+        return compile_scenario(json.load(f), sector_names)
+
+
+def load_scenario(sector_names, path=None):
+    """SCENARIO_PATH(또는 path) 의 시나리오를 섹터 순서에 맞춰 계산해 둔다 (파일이 바뀌지 않으면 캐시, 설정이 없으면 None)."""
+    path = path or os.environ.get("SCENARIO_PATH")
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    return _load_scenario_cached(path, os.path.getmtime(path), tuple(sector_names))
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from tracing import REGISTRY, Histogram
+
+# --- 프로세스 공용 LLM 요청 스케줄러 ---
+# 모든 세션의 LLM 요청이 한 줄로 서서 프로세스 전체의 분당 요청 수/토큰 수 한도(토큰 버킷) 안에서 나간다.
+#   우선순위: interactive(하루 지나기, 뉴스 생성) → prefetch(미리 받아 두기) → batch(일괄 작업). 앞 등급이 비어야 다음 등급을 보낸다.
+#   공평 분배: 같은 등급 안에서는 사용자별 줄을 돌아가며 하나씩 보낸다 (한 학생의 요청이 몰려도 다른 학생이 밀리지 않음).
+#   합치기: 같은 모델·프롬프트·설정의 요청이 이미 진행 중이면 새로 보내지 않고 그 응답을 함께 받는다 (coalesce).
+# 토큰은 보낼 때 (프롬프트 추정 토큰 + max_tokens) 만큼 미리 빼 두고, 응답의 실제 사용량을 보고 남은 만큼 돌려준다.
+# 대기 시간은 등급별로 tracing 의 "llm.queue.<등급>" 구간에도 기록된다 (Prometheus 내보내기에 포함).
+# 줄과 버킷은 공용 이벤트 루프(aio.py) 안에서만 바꾼다. 한도는 프로세스별이다 (앱 프로세스가 여럿이면 나눠 정할 것).
+
+PRIORITIES = ("interactive", "prefetch", "batch")
+# 분당 한도. LLM_RATE_LIMITS 환경 변수의 JSON 으로 덮어쓸 수 있고, null 이면 그 한도 없음
+DEFAULT_RATE_LIMITS = {"requests_per_minute": 500, "tokens_per_minute": 200_000}
+
+
+def load_rate_limits(text=None):
+    """기본 한도에 LLM_RATE_LIMITS(JSON) 의 값을 덮어쓴 표."""
+    limits = dict(DEFAULT_RATE_LIMITS)
+    text = os.environ.get("LLM_RATE_LIMITS") if text is None else text
+    if text:
+        limits.update(json.loads(text))
+    return limits
+
+
+class TokenBucket:
+    """분당 rate 만큼 고르게 채워지는 버킷 (최대 1분치). rate 가 None 이면 한도 없음."""
+
+    def __init__(self, rate_per_minute, clock=time.monotonic):
+        self.rate = rate_per_minute
+        self.clock = clock
+        self.level = float(rate_per_minute or 0)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(float(self.rate), self.level + (now - self._updated) * self.rate / 60)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """amount 를 꺼낼 수 있을 때까지 남은 초 (한 번에 버킷보다 많이 꺼내려 하면 가득 찰 때까지)."""
+        if self.rate is None:
+            return 0.0
+        self._refill()
+        return max(0.0, min(amount, self.rate) - self.level) * 60 / self.rate
+
+    def take(self, amount):
+        if self.rate is not None:
+            self._refill()
+            self.level -= min(amount, self.rate)
+
+    def give_back(self, amount):
+        if self.rate is not None:
+            self._refill()
+            self.level = min(float(self.rate), self.level + amount)
+
+
+class LLMScheduler:
+    """우선순위·사용자별 줄과 분당 요청/토큰 버킷으로 LLM 요청을 내보내는 스케줄러 (프로세스에 하나)."""
+
+    def __init__(self, limits=None, clock=time.monotonic):
+        limits = load_rate_limits() if limits is None else limits
+        self.requests = TokenBucket(limits.get("requests_per_minute"), clock)
+        self.tokens = TokenBucket(limits.get("tokens_per_minute"), clock)
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}   # 등급 -> 사용자 -> deque[(waiter, 토큰)]
+        self._in_flight = {}   # 합치기 키 -> 진행 중인 Task
+        self._timer = None
+        self._lock = threading.Lock()   # 화면(summary)에서 읽을 때를 위한 잠금
+        self._waits = {priority: Histogram() for priority in PRIORITIES}
+        self.coalesced = 0
+
+    def queue_depth(self, priority=None):
+        with self._lock:
+            priorities = PRIORITIES if priority is None else (priority,)
+            return sum(len(waiters) for p in priorities for waiters in self._queues[p].values())
+
+    async def run(self, request, user=None, priority="interactive", tokens=0):
+        """차례와 한도를 기다렸다가 request() 코루틴을 실행한다. 결과가 (내용, prompt 토큰, completion 토큰) 이면 남은 토큰을 돌려준다."""
+        if priority not in self._queues:
+            raise ValueError(f"알 수 없는 우선순위입니다: {priority}")
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        entry = (waiter, tokens)
+        enqueued = loop.time()
+        with self._lock:
+            self._queues[priority].setdefault(user, deque()).append(entry)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                waiters = self._queues[priority].get(user)
+                if waiters and entry in waiters:
+                    waiters.remove(entry)
+                    if not waiters:
+                        del self._queues[priority][user]
+            if waiter.done() and not waiter.cancelled(): # 차례를 받은 뒤에 취소됨
+                self.tokens.give_back(tokens)
+            self._dispatch()
+            raise
+        waited = loop.time() - enqueued
+        with self._lock:
+            self._waits[priority].observe(waited)
+        REGISTRY.observe(f"llm.queue.{priority}", waited)
+        try:
+            result = await request()
+        except BaseException:
+            self.tokens.give_back(tokens) # 실패/취소된 요청은 토큰을 쓰지 않은 것으로 봄
+            raise
+        if isinstance(result, tuple) and len(result) == 3:
+            used = result[1] + result[2]
+            if used < tokens:
+                self.tokens.give_back(tokens - used)
+            else:
+                self.tokens.take(used - tokens)
+        return result
+
+    def _next_entry(self):
+        """차례가 된 (등급, 사용자, 대기열) — 높은 등급의 맨 앞 사용자 (취소된 대기는 버림)."""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                user, waiters = next(iter(queue.items()))
+                while waiters and waiters[0][0].done():
+                    waiters.popleft()
+                if waiters:
+                    return priority, user, waiters
+                del queue[user]
+        return None
+
+    def _dispatch(self):
+        """한도가 허락하는 만큼 차례대로 대기를 풀어 준다. 한도에 막히면 채워질 때 다시 부르도록 예약한다."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with self._lock:
+            while True:
+                head = self._next_entry()
+                if head is None:
+                    return
+                priority, user, waiters = head
+                waiter, tokens = waiters[0]
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait > 0: # 높은 등급이 한도에 막히면 낮은 등급도 기다린다 (우선순위 유지)
+                    self._timer = waiter.get_loop().call_later(wait, self._dispatch)
+                    return
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                waiters.popleft()
+                # 보낸 사용자는 줄 맨 뒤로 (같은 등급 안에서 사용자별로 돌아가며)
+                queue = self._queues[priority]
+                if waiters:
+                    queue.move_to_end(user)
+                else:
+                    del queue[user]
+                waiter.set_result(None)
+
+    async def coalesce(self, key, call):
+        """key 가 같은 요청이 진행 중이면 그 결과를 함께 받고, 아니면 call() 을 실행한다. (결과, 합쳐졌는지) 를 돌려준다."""
+        task = self._in_flight.get(key)
+        shared = task is not None and not task.done()
+        if shared:
+            with self._lock:
+                self.coalesced += 1
+        else:
+            task = self._in_flight[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # 기다리던 쪽 하나가 취소되어도 함께 받는 다른 쪽을 위해 요청은 계속 진행한다
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception() # 기다리던 쪽이 모두 취소되었을 때 '예외를 읽지 않음' 경고를 막음
+
+    def summary(self):
+        """등급별 대기 수와 대기 시간 행 목록 (화면 표 출력용)."""
+        with self._lock:
+            return [
+                {
+                    "등급": priority,
+                    "대기 중": sum(len(waiters) for waiters in self._queues[priority].values()),
+                    "대기 사용자": len(self._queues[priority]),
+                    "보낸 수": self._waits[priority].count,
+                    "대기 p50 (ms)": round(self._waits[priority].quantile(0.50) * 1000, 1),
+                    "대기 p95 (ms)": round(self._waits[priority].quantile(0.95) * 1000, 1),
+                    "대기 최대 (ms)": round(self._waits[priority].max * 1000, 1),
+                }
+                for priority in PRIORITIES
+            ]
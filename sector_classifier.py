@@ -0,0 +1,132 @@
+import csv
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from universe import LEVEL_KEYS, load_universe
+
+# --- 오프라인 섹터 분류기 ---
+# LLM 에게 "관련 섹터" 를 묻는 대신, 섹터별 문서(섹터 이름 + 소속 종목 이름/수준별 설명 + 섹터 키워드)를
+# 글자 n-gram TF-IDF 벡터로 만들어 (섹터 수 × 어휘 수) 행렬로 한 번 캐시해 두고,
+# 하루치 기사를 희소 행렬(기사 × 어휘)로 만들어 행렬 곱 한 번으로 섹터별 코사인 유사도를 구한다.
+# 유사도는 섹터별 가중치(가장 관련 높은 섹터 = 1.0)로 바꿔 주가 갱신에 그대로 쓴다. 네트워크를 쓰지 않는다.
+
+NGRAM_RANGE = (2, 3)        # 글자 n-gram 길이 (한국어는 띄어쓰기/조사 변화가 많아 글자 단위가 안정적)
+MIN_SIMILARITY = 0.08       # 이보다 유사도가 낮으면 관련 섹터 없음
+RELATIVE_CUTOFF = 0.7       # 최고 유사도 대비 이 비율 이상인 섹터만 관련 섹터로 봄
+MAX_SECTORS = 3
+DEFAULT_KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sector_keywords.csv")
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def char_ngrams(text, ngram_range=NGRAM_RANGE):
+    """소문자화 후 단어별로 앞뒤에 공백을 붙여 만든 글자 n-gram 빈도."""
+    counts = Counter()
+    low, high = ngram_range
+    for word in _NON_WORD.sub(" ", text.lower()).split():
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                counts[padded[i:i + n]] += 1
+    return counts
+
+
+def load_sector_keywords(path=None):
+    """data/sector_keywords.csv (sector, keywords) 를 {섹터: 키워드 문자열} 로 읽는다. 파일이 없으면 빈 dict."""
+    path = path or DEFAULT_KEYWORDS_PATH
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8", newline="") as f:
+        return {row["sector"]: row["keywords"] for row in csv.DictReader(f)}
+
+
+class SectorClassifier:
+    """섹터별 TF-IDF 행렬로 기사와 섹터의 관련도를 계산한다."""
+
+    def __init__(self, sectors, documents, ngram_range=NGRAM_RANGE):
+        self.sectors = list(sectors)
+        self.sector_index = {sector: i for i, sector in enumerate(self.sectors)}
+        self.ngram_range = ngram_range
+        doc_counts = [char_ngrams(doc, ngram_range) for doc in documents]
+        self.vocabulary = {}
+        for counts in doc_counts:
+            for gram in counts:
+                self.vocabulary.setdefault(gram, len(self.vocabulary))
+        # 섹터 문서 기준 IDF (여러 섹터에 두루 나오는 n-gram 은 가중치를 낮춤)
+        tf = np.zeros((len(self.sectors), len(self.vocabulary)))
+        for row, counts in enumerate(doc_counts):
+            tf[row, [self.vocabulary[g] for g in counts]] = list(counts.values())
+        document_frequency = np.count_nonzero(tf, axis=0)
+        self.idf = np.log((1 + len(self.sectors)) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(np.where(tf > 0, tf, 1))) * (tf > 0) * self.idf # 로그 TF × IDF
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        self.matrix = weights / np.where(norms > 0, norms, 1) # 행별 L2 정규화 (섹터 × 어휘)
+
+    @classmethod
+    def from_universe(cls, universe, keywords=None):
+        keywords = load_sector_keywords() if keywords is None else keywords
+        sectors = list(universe.sectors)
+        parts = {sector: [sector, keywords.get(sector, "")] for sector in sectors}
+        for i, ticker in enumerate(universe.tickers):
+            sector = universe.sector_of(ticker)
+            parts[sector].append(ticker)
+            parts[sector].extend(universe.descriptions[level][i] for level in LEVEL_KEYS)
+        return cls(sectors, [" ".join(parts[sector]) for sector in sectors])
+
+    def _article_matrix(self, articles):
+        """기사들을 (행 번호, 어휘 번호, 값) 희소 표현으로 만든다 (행별 L2 정규화)."""
+        rows, cols, values = [], [], []
+        for row, article in enumerate(articles):
+            counts = char_ngrams(article, self.ngram_range)
+            ids = [self.vocabulary[g] for g in counts if g in self.vocabulary]
+            if not ids:
+                continue
+            tf = np.array([counts[g] for g in counts if g in self.vocabulary], dtype=np.float64)
+            weights = (1 + np.log(tf)) * self.idf[ids]
+            rows.extend([row] * len(ids))
+            cols.extend(ids)
+            values.extend(weights / np.linalg.norm(weights))
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(values)
+
+    def scores(self, articles):
+        """(기사 수 × 섹터 수) 코사인 유사도 행렬."""
+        rows, cols, values = self._article_matrix(articles)
+        result = np.zeros((len(articles), len(self.sectors)))
+        if len(rows):
+            # 희소(기사 × 어휘) · 밀집(어휘 × 섹터) 곱: 0이 아닌 칸만 곱한 뒤 기사별로 더함
+            np.add.at(result, rows, values[:, None] * self.matrix[:, cols].T)
+        return result
+
+    def sector_weights(self, articles, valid_sectors=None):
+        """기사별 {섹터: 가중치} 목록. 가장 관련 높은 섹터가 1.0, 관련 없는 기사는 빈 dict."""
+        scores = self.scores(articles)
+        if valid_sectors is not None:
+            valid = set(valid_sectors)
+            mask = np.array([sector in valid for sector in self.sectors])
+            scores = np.where(mask, scores, 0.0)
+        weights = []
+        for row in scores:
+            top = row.max(initial=0.0)
+            if top < MIN_SIMILARITY:
+                weights.append({})
+                continue
+            order = np.argsort(row)[::-1][:MAX_SECTORS]
+            weights.append({
+                self.sectors[i]: round(float(row[i] / top), 3) for i in order if row[i] >= top * RELATIVE_CUTOFF
+            })
+        return weights
+
+
+@lru_cache(maxsize=4)
+def _classifier_for(universe, keywords_mtime):
+    return SectorClassifier.from_universe(universe)
+
+
+def get_classifier(universe=None):
+    """카탈로그별로 한 번만 만드는 분류기 (키워드 파일이 바뀌면 다시 만듦)."""
+    universe = universe or load_universe()
+    mtime = os.path.getmtime(DEFAULT_KEYWORDS_PATH) if os.path.exists(DEFAULT_KEYWORDS_PATH) else None
+    return _classifier_for(universe, mtime)
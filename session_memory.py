@@ -0,0 +1,296 @@
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections.abc import MutableMapping
+
+import numpy as np
+
+import engine
+
+# --- 세션 메모리 계량과 유휴 세션 내려두기(spill) ---
+# 열린 탭마다 주가 기록이 든 stocks, 원장, 뉴스/해설, 포트폴리오가 세션 상태에 계속 남아 있으므로
+# 세션별 사용량을 대략 재고, 다음 경우 무거운 상태를 압축 파일(gzip JSON)로 내려둔 뒤 메모리에서 지운다.
+#   - 마지막 상호작용 후 idle_seconds 이상 지난 세션
+#   - 세션 예산(session_budget_bytes)을 넘은 채 over_budget_idle_seconds 이상 쉬고 있는 세션
+#   - 전체 사용량이 total_budget_bytes 를 넘으면 가장 오래 쉰 세션부터
+# sweep() 은 조건에 맞는 세션에 '내려둘 차례' 표시만 하고, 상태는 건드리지 않는다. 실제로 내려두고(idle/spill)
+# 다시 불러오는(begin) 일은 언제나 그 세션 자신의 실행 안에서, 그 세션이 넘긴 상태 매핑으로만 한다
+# (다른 세션의 스레드가 잠금 없이 남의 세션 상태를 바꾸지 않게). 화면이 열려 있는 세션은 주기적으로 idle() 을 부른다.
+# 세션이 살아 있는지는 세션 상태에 넣어 둔 표식(TOKEN_KEY)의 약한 참조로 보며, 세션이 끝나면 기록도 함께 정리된다.
+
+IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", 600))
+OVER_BUDGET_IDLE_SECONDS = 60
+SESSION_BUDGET_BYTES = int(float(os.environ.get("SESSION_MEMORY_BUDGET_MB", 8)) * 1024 ** 2)
+TOTAL_BUDGET_BYTES = int(float(os.environ.get("SESSION_MEMORY_TOTAL_MB", 512)) * 1024 ** 2)
+SPILL_DIR = os.environ.get("SESSION_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "stockgame-sessions")
+MEASURE_INTERVAL = 30.0   # 같은 세션의 사용량을 다시 재는 최소 간격 (초)
+SWEEP_INTERVAL = 5.0      # 내려둘 세션을 찾는 최소 간격 (초)
+MIN_IDLE_SECONDS = 5.0    # 전체 예산을 넘어도 이만큼은 쉬어야 내려둠
+IDLE_CHECK_SECONDS = 30.0 # 열린 화면이 idle() 로 내려둘 차례인지 확인하는 간격 (초)
+SPILLED_KEY = "_spilled"  # 내려둔 파일 경로 (세션 상태에 남는 유일한 흔적)
+TOKEN_KEY = "_memory_token"  # 세션이 살아 있는지 보는 표식
+# 내려두는 키 (복원은 engine.serialize_state/restore_state 로) 와 다시 계산하면 되는 캐시 키
+SPILL_KEYS = ["stocks", "portfolio", "ledger", "daily_news", "previous_daily_news", "news_meanings", "sector_impact_history"]
+CACHE_KEYS = ["market_stats"]
+CACHE_PREFIXES = ("_view_",)
+
+
+def estimate_bytes(obj, _seen=None):
+    """객체가 붙잡고 있는 메모리의 대략적인 크기 (같은 객체는 한 번만 셈)."""
+    seen = set() if _seen is None else _seen
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            total += item.nbytes + sys.getsizeof(item) if item.base is None else sys.getsizeof(item)
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            stack.append(vars(item))
+    return total
+
+
+class StateView(MutableMapping):
+    """[]/del/in 만 있는 세션 상태 객체(Streamlit SessionState 등)를 get/반복이 되는 매핑으로 감싼다."""
+
+    def __init__(self, state):
+        self._state = state
+
+    def __getitem__(self, key):
+        return self._state[key]
+
+    def __setitem__(self, key, value):
+        self._state[key] = value
+
+    def __delitem__(self, key):
+        del self._state[key]
+
+    def __contains__(self, key):
+        return key in self._state
+
+    def __iter__(self):
+        # SessionState 는 위젯 내부 키까지 돌므로 사용자 키만 있는 filtered_state 로 돈다
+        keys = getattr(self._state, "filtered_state", self._state)
+        return iter(list(keys))
+
+    def __len__(self):
+        return len(getattr(self._state, "filtered_state", self._state))
+
+
+class SessionToken:
+    """세션 상태에 넣어 두는 표식. SessionMemory 는 이것만 약한 참조로 들고 있다."""
+
+    __slots__ = ("__weakref__",)
+
+
+class _Entry:
+    __slots__ = ("token_ref", "last_seen", "active", "bytes", "measured_at", "spilled_bytes", "due")
+
+    def __init__(self, token, now):
+        self.token_ref = weakref.ref(token)
+        self.last_seen = now
+        self.active = 0
+        self.bytes = 0
+        self.measured_at = None
+        self.spilled_bytes = 0
+        self.due = False   # sweep 이 내려둘 차례로 표시함 (세션 자신의 다음 idle() 에서 내려둠)
+
+
+class SessionMemory:
+    """세션별 메모리 사용량을 재고 유휴 세션을 파일로 내려두는 프로세스 공용 관리자 (기록은 스레드 안전).
+
+    상태를 받는 메서드(begin/end/idle/spill)는 그 세션의 실행 스레드에서만 부른다.
+    wrap(세션 상태) 는 engine.serialize_state/restore_state 에 넘길 수 있는 매핑을 돌려줘야 한다 (기본: StateView).
+    """
+
+    def __init__(self, spill_dir=SPILL_DIR, idle_seconds=IDLE_SECONDS, session_budget_bytes=SESSION_BUDGET_BYTES,
+                 total_budget_bytes=TOTAL_BUDGET_BYTES, wrap=None, clock=time.monotonic):
+        self.spill_dir = spill_dir
+        self.idle_seconds = idle_seconds
+        self.session_budget_bytes = session_budget_bytes
+        self.total_budget_bytes = total_budget_bytes
+        self.wrap = wrap or StateView
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._last_sweep = None
+        self.spills = 0
+        self.rehydrations = 0
+
+    def spill_path(self, session_id):
+        name = hashlib.sha1(str(session_id).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}.json.gz")
+
+    # --- 세션 실행 구간 ---
+    def begin(self, session_id, raw_state):
+        """세션의 스크립트(또는 fragment) 실행 시작: 활성 표시를 하고 내려둔 상태가 있으면 다시 불러온다.
+
+        불러오기에 실패하면 OSError/ValueError 를 그대로 던진다 (부른 쪽에서 다시 로그인하도록 처리).
+        """
+        now = self.clock()
+        state = self.wrap(raw_state)
+        token = state.get(TOKEN_KEY)
+        if not isinstance(token, SessionToken):
+            token = state[TOKEN_KEY] = SessionToken()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry.token_ref() is not token:
+                entry = self._entries[session_id] = _Entry(token, now)
+            entry.active += 1
+            entry.last_seen = now
+            entry.due = False
+        try:
+            if SPILLED_KEY in state:
+                self._rehydrate(entry, state)
+        except BaseException:
+            self.end(session_id, raw_state)
+            raise
+
+    def end(self, session_id, raw_state):
+        """실행 끝: 사용량을 (재야 할 때) 다시 재고, 활성 표시를 풀고, 내려둘 세션을 찾는다."""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(session_id)
+        outermost = True
+        if entry is not None:
+            # 비어 있던 세션은 싸게 다시 잼
+            if entry.measured_at is None or entry.bytes == 0 or now - entry.measured_at >= MEASURE_INTERVAL:
+                self._measure(entry, self.wrap(raw_state), now)
+            with self._lock:
+                entry.active = max(0, entry.active - 1)
+                entry.last_seen = now
+                outermost = entry.active == 0
+        if outermost: # 전체 실행 안에서 도는 패널(fragment)이 끝날 때는 건너뜀
+            self.sweep()
+
+    def idle(self, session_id, raw_state):
+        """열려 있지만 쉬고 있는 세션이 주기적으로 부른다: 내려둘 차례로 표시되었으면 지금 내려둔다. 내려두었으면 True."""
+        self.sweep()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or not entry.due or entry.active:
+                return False
+        return self.spill(session_id, raw_state)
+
+    # --- 계량 ---
+    def _measure(self, entry, state, now):
+        seen = set()
+        total = 0
+        for key in SPILL_KEYS + CACHE_KEYS:
+            if key in state:
+                total += estimate_bytes(state[key], seen)
+        entry.bytes = total
+        entry.measured_at = now
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry.bytes for entry in self._entries.values())
+
+    # --- 내려두기 / 다시 불러오기 ---
+    def sweep(self, force=False):
+        """조건에 맞는 유휴 세션을 내려둘 차례로 표시한다 (상태는 건드리지 않음). 새로 표시한 세션 수를 돌려준다."""
+        now = self.clock()
+        with self._lock:
+            if not force and self._last_sweep is not None and now - self._last_sweep < SWEEP_INTERVAL:
+                return 0
+            self._last_sweep = now
+            for session_id in [sid for sid, entry in self._entries.items() if entry.token_ref() is None]:
+                self._forget(session_id)
+            candidates = []
+            for session_id, entry in self._entries.items():
+                idle = now - entry.last_seen
+                if entry.active or entry.bytes == 0:
+                    continue
+                if idle >= self.idle_seconds or (entry.bytes > self.session_budget_bytes and idle >= OVER_BUDGET_IDLE_SECONDS):
+                    candidates.append(session_id)
+            resident = sum(entry.bytes for sid, entry in self._entries.items() if sid not in candidates)
+            if resident > self.total_budget_bytes:
+                idle_order = sorted(
+                    (entry.last_seen, sid) for sid, entry in self._entries.items()
+                    if sid not in candidates and not entry.active and entry.bytes and now - entry.last_seen >= MIN_IDLE_SECONDS
+                )
+                for _, session_id in idle_order:
+                    if resident <= self.total_budget_bytes:
+                        break
+                    candidates.append(session_id)
+                    resident -= self._entries[session_id].bytes
+            marked = 0
+            for session_id in candidates:
+                entry = self._entries[session_id]
+                marked += not entry.due
+                entry.due = True
+            return marked
+
+    def spill(self, session_id, raw_state):
+        """세션 자신의 실행에서 무거운 상태를 파일로 내려두고 메모리에서 지운다. 내려두었으면 True."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry.active:
+                return False
+        state = self.wrap(raw_state)
+        if SPILLED_KEY in state or "stocks" not in state:
+            return False
+        path = self.spill_path(session_id)
+        data = engine.serialize_state(state).encode("utf-8")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        with gzip.open(path + ".tmp", "wb", compresslevel=3) as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        state[SPILLED_KEY] = path
+        for key in list(state):
+            if key in SPILL_KEYS or key in CACHE_KEYS or key.startswith(CACHE_PREFIXES):
+                del state[key]
+        with self._lock:
+            entry.spilled_bytes = len(data)
+            entry.bytes = 0
+            entry.due = False
+            self.spills += 1
+        return True
+
+    def _rehydrate(self, entry, state):
+        path = state[SPILLED_KEY]
+        with gzip.open(path, "rb") as f:
+            engine.restore_state(state, f.read().decode("utf-8"))
+        del state[SPILLED_KEY]
+        os.remove(path)
+        entry.measured_at = None
+        entry.spilled_bytes = 0
+        with self._lock:
+            self.rehydrations += 1
+
+    def _forget(self, session_id):
+        entry = self._entries.pop(session_id)
+        if entry.spilled_bytes:
+            try:
+                os.remove(self.spill_path(session_id))
+            except OSError:
+                pass
+
+    # --- 보고 ---
+    def report(self):
+        """세션별 상태/메모리 행 목록 (화면 표 출력용)."""
+        now = self.clock()
+        with self._lock:
+            rows = []
+            for session_id, entry in sorted(self._entries.items(), key=lambda item: -item[1].bytes):
+                status = "실행 중" if entry.active else ("내려둠" if entry.spilled_bytes else ("내려둘 차례" if entry.due else "대기"))
+                rows.append({
+                    "세션": str(session_id)[:8], "상태": status,
+                    "메모리 (KB)": round(entry.bytes / 1024, 1), "내려둔 파일 (KB)": round(entry.spilled_bytes / 1024, 1),
+                    "유휴 (초)": round(now - entry.last_seen, 1),
+                })
+            return rows
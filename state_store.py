@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+import time
+
+from tracing import span
+
+# --- 외부 상태 저장소 (여러 앱 프로세스가 공유) ---
+# 게임 상태를 프로세스 안의 st.session_state 에만 두지 않고, 모든 앱 프로세스(워커)가 함께 보는 키-값 저장소에 둔다.
+# 어느 워커가 요청을 받든 저장소에서 최신 상태를 읽으므로, 부하 분산기 뒤에 워커를 여러 개 띄울 수 있다.
+#   user:<계정>       사용자별 게임 상태 (engine.serialize_state 의 JSON). 저장할 때마다 버전이 1씩 오른다.
+#   shared:<이름>     모든 사용자가 함께 쓰는 값. 수준별/사용자별 하루 LLM 토큰 사용량 같은 카운터 (incr)
+# STATE_STORE_URL 로 고른다.
+#   sqlite:///경로   같은 서버의 여러 프로세스가 한 파일을 공유 (WAL)
+#   redis://호스트:포트/번호   여러 서버가 공유 (redis 패키지 필요, Redis 호환 서버면 됨)
+# 설정하지 않으면 예전처럼 users 테이블의 data 열에 통째로 저장한다.
+
+USER_PREFIX = "user:"
+SHARED_PREFIX = "shared:"
+
+KV_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    version INTEGER NOT NULL,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def user_key(account):
+    return f"{USER_PREFIX}{account}"
+
+
+def shared_key(*parts):
+    return SHARED_PREFIX + ":".join(str(part) for part in parts)
+
+
+class SQLiteStateStore:
+    """버전이 붙은 키-값 저장소 (SQLite). 같은 파일을 여러 프로세스가 함께 쓸 수 있다 (스레드 안전)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(KV_SCHEMA)
+
+    def get(self, key):
+        """(값, 버전). 없으면 (None, 0)."""
+        with span("state.get") as s, self._lock:
+            row = self._conn.execute("SELECT value, version FROM kv WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, 0
+            s.record(response_bytes=len(row[0].encode("utf-8")) if row[0] else 0)
+            return row[0], row[1]
+
+    def version(self, key):
+        """값은 읽지 않고 버전만 (없으면 0). 다른 워커가 새로 저장했는지 확인할 때 쓴다."""
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM kv WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else 0
+
+    def put(self, key, value, expected_version=None):
+        """값을 저장하고 새 버전을 돌려준다.
+
+        expected_version 을 주면 지금 버전이 그 값일 때만 저장하고(compare-and-swap), 아니면 저장하지 않고 None.
+        (0 은 아직 없는 키)
+        """
+        with span("state.put") as s, self._lock, self._conn:
+            s.record(request_bytes=len(value.encode("utf-8")))
+            if expected_version is None:
+                row = self._conn.execute(
+                    "INSERT INTO kv (key, value, version, updated_at) VALUES (?, ?, 1, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = kv.version + 1, updated_at = excluded.updated_at"
+                    " RETURNING version",
+                    (key, value, time.time()),
+                ).fetchone()
+            elif expected_version == 0:
+                row = self._conn.execute(
+                    "INSERT INTO kv (key, value, version, updated_at) VALUES (?, ?, 1, ?) ON CONFLICT(key) DO NOTHING RETURNING version",
+                    (key, value, time.time()),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "UPDATE kv SET value = ?, version = version + 1, updated_at = ? WHERE key = ? AND version = ? RETURNING version",
+                    (value, time.time(), key, expected_version),
+                ).fetchone()
+            return row[0] if row else None
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key, amount=1):
+        """카운터를 amount 만큼 올리고 새 값을 돌려준다 (여러 프로세스가 동시에 올려도 합이 맞음)."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "INSERT INTO counters (key, value) VALUES (?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = counters.value + excluded.value RETURNING value",
+                (key, amount),
+            ).fetchone()
+            return row[0]
+
+    def counter(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else 0
+
+    def close(self):
+        self._conn.close()
+
+
+class RedisStateStore:
+    """같은 동작을 Redis(또는 호환 서버)로 하는 저장소. 값과 버전은 해시 하나에, 카운터는 별도 키에 둔다."""
+
+    def __init__(self, url):
+        import redis # 선택 의존성: Redis 를 쓸 때만 필요
+        self.path = url
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._watch_error = redis.WatchError
+
+    def get(self, key):
+        with span("state.get") as s:
+            value, version = self._redis.hmget(key, "value", "version")
+            if version is None:
+                return None, 0
+            s.record(response_bytes=len(value.encode("utf-8")) if value else 0)
+            return value, int(version)
+
+    def version(self, key):
+        version = self._redis.hget(key, "version")
+        return int(version) if version is not None else 0
+
+    def put(self, key, value, expected_version=None):
+        with span("state.put") as s, self._redis.pipeline(transaction=True) as pipe:
+            s.record(request_bytes=len(value.encode("utf-8")))
+            try:
+                if expected_version is not None:
+                    pipe.watch(key) # WATCH 후 버전이 바뀌면 EXEC 가 실패함
+                    current = pipe.hget(key, "version")
+                    if (int(current) if current is not None else 0) != expected_version:
+                        return None
+                    pipe.multi()
+                pipe.hset(key, mapping={"value": value, "updated_at": time.time()}) # MULTI/EXEC: 값과 버전을 함께 바꿈
+                pipe.hincrby(key, "version", 1)
+                return int(pipe.execute()[1])
+            except self._watch_error:
+                return None
+
+    def delete(self, key):
+        self._redis.delete(key)
+
+    def incr(self, key, amount=1):
+        return int(self._redis.incrby(f"counter:{key}", amount))
+
+    def counter(self, key):
+        value = self._redis.get(f"counter:{key}")
+        return int(value) if value is not None else 0
+
+    def close(self):
+        self._redis.close()
+
+
+def open_state_store(url=None):
+    """STATE_STORE_URL(또는 url) 에 맞는 저장소. 설정이 없으면 None."""
+    url = url if url is not None else os.environ.get("STATE_STORE_URL")
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteStateStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStateStore(url)
+    raise ValueError(f"지원하지 않는 STATE_STORE_URL 입니다: {url}")
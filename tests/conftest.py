@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 모듈들이 저장소 최상위에 나란히 있으므로 테스트에서도 그대로 import 할 수 있게 경로에 넣는다
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
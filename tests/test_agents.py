@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from agents import AgentPopulation
+from market_stats import RETURN_WINDOWS
+
+N_STOCKS = 20
+TREND = 3   # 모든 기간에 크게 오른 종목
+
+
+def trending_returns():
+    returns = np.zeros(N_STOCKS)
+    returns[TREND] = 10.0
+    return {window: returns for window in RETURN_WINDOWS}
+
+
+def impacts(counts, seed=1, impact=0.01):
+    population = AgentPopulation(N_STOCKS, counts, seed=0)
+    return population.price_impacts(trending_returns(), np.zeros(N_STOCKS), np.random.default_rng(seed), impact=impact)
+
+
+def test_momentum_and_contrarian_push_a_trend_in_opposite_directions():
+    for seed in range(3):
+        assert impacts({"momentum": 300}, seed)[TREND] > 0
+        assert impacts({"contrarian": 300}, seed)[TREND] < 0
+
+
+@pytest.mark.parametrize("counts", [{"momentum": 300}, {"contrarian": 300}, {"momentum": 200, "contrarian": 100, "news": 100}])
+def test_impacts_stay_within_the_impact_bound(counts):
+    population = AgentPopulation(N_STOCKS, counts, seed=0)
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        returns = {window: rng.normal(0, 20, N_STOCKS) for window in RETURN_WINDOWS}
+        result = population.price_impacts(returns, rng.normal(0, 0.05, N_STOCKS), rng, impact=0.01)
+        assert np.all(np.abs(result) <= 0.01 + 1e-12)
+    # 모두가 같은 쪽으로 최대 주문을 내도 영향은 impact 를 넘지 않음
+    assert abs(impacts({"momentum": 300}, impact=0.01)[TREND]) <= 0.01 + 1e-12
+
+
+def test_stocks_nobody_watches_get_no_impact():
+    population = AgentPopulation(N_STOCKS, {"momentum": 1}, seed=0)
+    unwatched = population.depth == 0
+    assert unwatched.any()
+    returns = {window: np.linspace(-10, 10, N_STOCKS) for window in RETURN_WINDOWS}
+    result = population.price_impacts(returns, np.zeros(N_STOCKS), np.random.default_rng(0))
+    assert np.all(result[unwatched] == 0)
+    assert np.all(np.isfinite(result))
@@ -0,0 +1,35 @@
+import asyncio
+
+import aio
+
+
+def settle():
+    """기다리던 쪽이 깨어난 뒤에 도는 done-callback 까지 끝나도록 루프를 한 바퀴 돌린다."""
+    aio.run(asyncio.sleep(0))
+
+
+def test_serial_jobs_run_in_order_and_leave_no_key_behind():
+    done = []
+
+    async def job(i, delay):
+        await asyncio.sleep(delay)
+        done.append(i)
+        return i
+
+    futures = [aio.submit_serial("test-key", job(i, 0.01 * (3 - i))) for i in range(3)]
+    aio.wait_serial("test-key", timeout=5)
+    assert [f.result(timeout=5) for f in futures] == [0, 1, 2]
+    assert done == [0, 1, 2]
+    settle()
+    assert "test-key" not in aio._latest and "test-key" not in aio._key_locks
+
+
+def test_failed_job_still_frees_its_key():
+    async def fail():
+        raise ValueError("boom")
+
+    future = aio.submit_serial("failing-key", fail())
+    aio.wait_serial("failing-key", timeout=5)
+    assert isinstance(future.exception(timeout=5), ValueError)
+    settle()
+    assert "failing-key" not in aio._latest and "failing-key" not in aio._key_locks
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import backtest
+import engine
+from backtest import PriceHistory
+
+SECTORS = ["가", "나", "다"]
+SECTOR_INDEX = np.array([0, 0, 1, 1, 2, 2], dtype=np.int32)
+PARAMS = {
+    "buy_and_hold": {},
+    "momentum": {"lookback": 2, "top_n": 2, "rebalance": 2},
+    "sector_rotation": {"lookback": 3, "top_sectors": 1, "rebalance": 1},
+    "news_following": {"threshold": 0.0, "top_sectors": 1},
+}
+
+
+def make_history(days=12, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 1000 * np.cumprod(1 + rng.normal(0, 0.03, (days, len(SECTOR_INDEX))), axis=0)
+    impacts = rng.normal(0, 0.02, (days - 1, len(SECTORS)))
+    return PriceHistory([f"종목{i}" for i in range(len(SECTOR_INDEX))], SECTORS, SECTOR_INDEX, prices, impacts, 1_000_000)
+
+
+def with_future_changed(history, t, seed):
+    """Day t+1 까지는 그대로 두고 그 뒤의 주가와, 그 뒤에야 발표되는 영향(impacts[t:])만 바꾼 기록."""
+    rng = np.random.default_rng(seed)
+    prices, impacts = history.prices.copy(), history.impacts.copy()
+    prices[t + 1:] *= np.exp(rng.normal(0, 0.2, prices[t + 1:].shape))
+    impacts[t:] = rng.normal(0, 0.05, impacts[t:].shape)
+    return PriceHistory(history.tickers, history.sector_names, history.sector_index, prices, impacts, history.initial_cash)
+
+
+@pytest.mark.parametrize("strategy", list(backtest.STRATEGIES))
+def test_weights_only_use_prices_and_impacts_up_to_that_day(strategy):
+    history = make_history()
+    full = backtest.STRATEGIES[strategy](history, **PARAMS[strategy])
+    for t in range(history.days - 1):
+        # W[t] 는 Day t+1 종가로 정하는 비중: 그 뒤의 주가나 영향이 달라져도 같아야 함
+        for seed in range(3):
+            changed = backtest.STRATEGIES[strategy](with_future_changed(history, t, seed), **PARAMS[strategy])
+            np.testing.assert_allclose(changed[t], full[t], err_msg=f"W[{t}]")
+
+
+def test_news_following_trades_on_yesterdays_impact():
+    history = make_history(days=6)
+    history.impacts[:] = 0.0
+    history.impacts[2, 1] = 0.05 # Day 3 뉴스가 Day 3 -> Day 4 수익률에 준 영향 (Day 4 에 발표됨)
+    weights = backtest.news_following(history, threshold=0.0, top_sectors=1)
+    held = weights[:, SECTOR_INDEX == 1].sum(axis=1)
+    assert held.tolist() == [0.0, 0.0, 0.0, 1.0, 0.0]
+    assert not weights[0].any() # 첫날은 아직 발표된 영향이 없음
+
+
+def test_actual_equity_replays_the_engine_ledger():
+    rng = np.random.default_rng(0)
+    state = engine.new_state("초등", rng=rng)
+    sector, names = next(iter(state["stocks"].items()))
+    first, second = list(names)[:2]
+    expected = []
+    for day, trades in enumerate([[(first, 3)], [(second, 2)], [(first, -1)], [], [(second, -2), (first, 1)]], start=1):
+        assert state["day_count"] == day
+        for name, qty in trades:
+            if qty > 0:
+                engine.buy_stock(state, name, qty, sector)
+            else:
+                engine.sell_stock(state, name, -qty)
+        prices = {name: info["current_price"] for stocks in state["stocks"].values() for name, info in stocks.items()}
+        portfolio = state["portfolio"]
+        expected.append(portfolio["cash"] + sum(h["quantity"] * prices[name] for name, h in portfolio["stocks"].items()))
+        engine.apply_day(state, {}, ["뉴스"] * engine.NEWS_COUNT, rng=rng)
+
+    _, total_value, *_ = engine.calculate_portfolio_summary(state)
+    history = PriceHistory.from_state(state)
+    actual = backtest.actual_equity(history, engine.get_ledger(state))
+    assert len(actual) == len(expected) + 1
+    np.testing.assert_allclose(actual[:-1], expected)
+    np.testing.assert_allclose(actual[-1], total_value)
+
+
+def test_hold_keeps_each_decision_for_rebalance_days():
+    decisions = np.arange(1, 11, dtype=float).reshape(-1, 1)
+    weights = backtest._hold(decisions, start=2, days=10, rebalance=3)
+    assert weights[:, 0].tolist() == [0, 0, 1, 1, 1, 4, 4, 4, 7]
+    assert backtest._hold(decisions, start=2, days=10, rebalance=1)[:, 0].tolist() == [0, 0, 1, 2, 3, 4, 5, 6, 7]
+    assert not backtest._hold(decisions, start=9, days=10, rebalance=3).any() # 시작 전에 기록이 끝남
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from backends import FakeLLMBackend
+from hedging import MIN_HEDGE_DELAY, LatencyGuard, load_deadlines
+from usage import MeteredLLM
+
+
+def counts(guard, kind):
+    row = next(row for row in guard.summary() if row["종류"] == kind)
+    return row["헤지"], row["헤지 성공"], row["마감 초과"]
+
+
+def test_load_deadlines_overrides_per_kind():
+    deadlines = load_deadlines('{"news": 5, "explanation": null}')
+    assert deadlines["news"] == 5 and deadlines["explanation"] is None
+    assert deadlines["llm"] == 30.0
+
+
+def test_no_hedge_until_enough_samples():
+    guard = LatencyGuard({}, min_samples=3)
+    for _ in range(2):
+        guard.observe("news", 0.001)
+    assert guard.hedge_delay("news") is None
+    guard.observe("news", 0.001)
+    assert guard.hedge_delay("news") == MIN_HEDGE_DELAY
+    assert LatencyGuard({}, hedge=False, min_samples=0).hedge_delay("news") is None
+
+
+def test_deadline_cancels_the_request_and_raises_timeout():
+    guard = LatencyGuard({"news": 0.05})
+    started = []
+
+    async def slow():
+        started.append(asyncio.current_task())
+        await asyncio.sleep(5)
+
+    async def main():
+        with pytest.raises(TimeoutError):
+            await guard.call("news", slow)
+        await asyncio.sleep(0)
+        return started[0].cancelled()
+
+    assert asyncio.run(main())
+    assert counts(guard, "news") == (0, 0, 1)
+
+
+def test_error_before_the_hedge_propagates():
+    guard = LatencyGuard({"news": 1.0})
+
+    async def broken():
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(guard.call("news", broken))
+
+
+def test_hedge_returns_the_first_answer():
+    guard = LatencyGuard({"news": 2.0}, min_samples=1)
+    guard.observe("news", 0.01)
+    attempts = []
+
+    async def request():
+        attempts.append(1)
+        if len(attempts) == 1: # 첫 요청만 멈춤
+            await asyncio.sleep(5)
+        return "hedged"
+
+    assert asyncio.run(asyncio.wait_for(guard.call("news", request), 1.0)) == "hedged"
+    assert len(attempts) == 2
+    assert counts(guard, "news") == (1, 1, 0)
+
+
+def test_metered_llm_falls_back_to_offline_at_the_deadline():
+    llm = MeteredLLM(FakeLLMBackend(latency=1.0), budgets={}, guard=LatencyGuard({"news": 0.05}))
+    content = asyncio.run(llm.acomplete("## 뉴스 프롬프트", 0.7, 100, user="kim", kind="news"))
+    assert content
+    assert (llm.meter.recent[-1]["model"], llm.meter.recent[-1]["tier"]) == ("offline", "deadline")
+
+
+def test_deadline_fallback_prefers_the_cached_answer():
+    llm = MeteredLLM(FakeLLMBackend(latency=1.0), budgets={}, guard=LatencyGuard({"news": 0.05}))
+    llm.cache.put("같은 프롬프트", "어제 받은 답")
+    assert asyncio.run(llm.acomplete("같은 프롬프트", 0.7, 100, kind="news")) == "어제 받은 답"
+    assert (llm.meter.recent[-1]["model"], llm.meter.recent[-1]["tier"]) == ("cache", "deadline")
+
+
+def test_background_priorities_wait_for_the_real_answer():
+    llm = MeteredLLM(FakeLLMBackend(latency=0.1), budgets={}, guard=LatencyGuard({"news": 0.01}))
+    asyncio.run(llm.acomplete("미리 받기", 0.7, 100, kind="news", priority="prefetch"))
+    assert llm.meter.recent[-1]["model"] == "fake"
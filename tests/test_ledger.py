@@ -0,0 +1,66 @@
+import pytest
+
+from ledger import BUY, METHODS, SELL, TradeLedger
+
+
+@pytest.fixture
+def ledger():
+    # 10주 @100, 10주 @200 매수 후 15주 @300 매도
+    ledger = TradeLedger()
+    ledger.record(1, "삼성전자", BUY, 10, 100.0, ts=1.0)
+    ledger.record(2, "삼성전자", BUY, 10, 200.0, ts=2.0)
+    ledger.record(3, "삼성전자", SELL, 15, 300.0, ts=3.0)
+    return ledger
+
+
+def test_avg_and_fifo_realized_pnl(ledger):
+    assert ledger.realized_pnl(method="avg") == pytest.approx((300 - 150) * 15)
+    assert ledger.realized_pnl(method="fifo") == pytest.approx((300 - 100) * 10 + (300 - 200) * 5)
+
+
+def test_cost_basis_of_remaining_lots(ledger):
+    assert ledger.cost_basis("삼성전자", "avg") == pytest.approx(5 * 150)
+    assert ledger.cost_basis("삼성전자", "fifo") == pytest.approx(5 * 200)
+    assert ledger.cost_basis("없는 종목", "fifo") == 0.0
+
+
+def test_pnl_by_ticker_and_day_range(ledger):
+    ledger.record(4, "SK하이닉스", BUY, 2, 50.0, ts=4.0)
+    ledger.record(5, "SK하이닉스", SELL, 2, 40.0, ts=5.0)
+    assert ledger.realized_pnl("SK하이닉스", "fifo") == pytest.approx(-20)
+    assert ledger.realized_pnl(since_day=4) == pytest.approx(-20)
+    assert ledger.realized_pnl(until_day=3, method="fifo") == pytest.approx(2500)
+    assert ledger.realized_by_ticker("fifo").tolist() == pytest.approx([2500, -20])
+
+
+def test_full_sell_resets_average_cost(ledger):
+    ledger.record(4, "삼성전자", SELL, 5, 300.0, ts=4.0)
+    ledger.record(5, "삼성전자", BUY, 1, 500.0, ts=5.0)
+    assert ledger.cost_basis("삼성전자", "avg") == pytest.approx(500)
+    assert ledger.realized_pnl(method="avg") == ledger.realized_pnl(method="fifo") == pytest.approx(3000)
+
+
+def test_overselling_is_rejected(ledger):
+    with pytest.raises(ValueError):
+        ledger.record(4, "삼성전자", SELL, 6, 300.0)
+    assert len(ledger) == 3
+
+
+@pytest.mark.parametrize("call", [
+    lambda ledger: ledger.cost_basis("삼성전자", "lifo"),
+    lambda ledger: ledger.cost_basis("없는 종목", "lifo"),
+    lambda ledger: ledger.realized_pnl(method="lifo"),
+])
+def test_unknown_method_is_rejected(ledger, call):
+    assert "lifo" not in METHODS
+    with pytest.raises(ValueError, match="lifo"):
+        call(ledger)
+
+
+def test_round_trip_replays_derived_columns(ledger, tmp_path):
+    copy = TradeLedger.from_dict(ledger.to_dict())
+    assert copy.realized_pnl(method="fifo") == ledger.realized_pnl(method="fifo")
+    journal = tmp_path / "ledger.jsonl"
+    ledger.journal_path = str(journal)
+    assert ledger.flush() == 3
+    assert TradeLedger.load(str(journal)).cost_basis("삼성전자", "fifo") == pytest.approx(1000)
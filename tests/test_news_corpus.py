@@ -0,0 +1,50 @@
+from collections import Counter
+
+import pytest
+
+from news_corpus import CorpusSampler
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 30, 101])
+@pytest.mark.parametrize("seed", [0, 1, "초등"])
+def test_each_cycle_visits_every_article_once(n, seed):
+    sampler = CorpusSampler(range(n), seed=seed)
+    for cycle in range(3):
+        assert sorted(sampler.pick() for _ in range(n)) == list(range(n))
+    assert sampler.state() == {"seed": seed, "cycle": 2, "position": n}
+
+
+def test_cycles_use_different_orders():
+    sampler = CorpusSampler(range(30), seed=0)
+    first, second = [sampler.pick() for _ in range(30)], [sampler.pick() for _ in range(30)]
+    assert first != second
+
+
+def test_same_seed_and_state_resume_the_same_sequence():
+    sampler = CorpusSampler(range(30), seed=5)
+    [sampler.pick() for _ in range(40)]
+    resumed = CorpusSampler(range(30), **sampler.state())
+    assert [resumed.pick() for _ in range(25)] == [sampler.pick() for _ in range(25)]
+
+
+@pytest.mark.parametrize("n,k", [(7, 5), (5, 5), (11, 3)])
+def test_batches_never_repeat_across_cycle_boundaries(n, k):
+    for seed in range(50):
+        sampler = CorpusSampler(range(n), seed=seed)
+        for _ in range(20):
+            batch = sampler.sample(k)
+            assert len(batch) == k and len(set(batch)) == k
+
+
+def test_skipped_repeats_do_not_starve_other_articles():
+    sampler = CorpusSampler(range(7), seed=3)
+    seen = Counter(article for _ in range(70) for article in sampler.sample(5))
+    assert set(seen) == set(range(7))
+    assert max(seen.values()) - min(seen.values()) <= 5
+
+
+def test_small_and_empty_corpora():
+    assert sorted(CorpusSampler(range(3), seed=0).sample(5)) == [0, 1, 2]
+    with pytest.raises(LookupError):
+        CorpusSampler([], seed=0).pick()
+    assert CorpusSampler([], seed=0).sample(5) == []
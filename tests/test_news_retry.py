@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+import engine
+from backends import LLMError
+from tracing import REGISTRY
+
+TWO_ARTICLES = "## 뉴스 1\n첫 번째 기사입니다.\n\n## 뉴스 2\n두 번째 기사입니다."
+
+
+def fake_complete(retry):
+    """첫 요청에는 기사 2개, JSON 재요청에는 retry() 의 결과를 돌려주는 complete."""
+    def complete(prompt, temperature, max_tokens, json_mode=False, kind=None):
+        return retry() if json_mode else TWO_ARTICLES
+    return complete
+
+
+def fail(error):
+    def retry():
+        raise error
+    return retry
+
+
+def test_retry_fills_missing_articles():
+    news = engine.generate_news("초등", fake_complete(lambda: '{"articles": ["셋", "넷", "다섯"]}'))
+    assert news == ["첫 번째 기사입니다.", "두 번째 기사입니다.", "셋", "넷", "다섯"]
+
+
+@pytest.mark.parametrize("error", [LLMError("rate limited"), TimeoutError("slow"), ConnectionError("reset")])
+def test_llm_errors_keep_received_articles_and_count_as_retry_errors(error):
+    before = REGISTRY.errors.get("engine.news_retry", 0)
+    news = engine.generate_news("초등", fake_complete(fail(error)))
+    assert news[:2] == ["첫 번째 기사입니다.", "두 번째 기사입니다."]
+    assert news[2:] == [engine.NEWS_FAILED] * 3
+    assert REGISTRY.errors["engine.news_retry"] == before + 1
+
+
+def test_other_errors_are_not_swallowed():
+    with pytest.raises(KeyError):
+        engine.generate_news("초등", fake_complete(fail(KeyError("bug"))))
+
+
+def test_async_retry_shares_the_error_handling():
+    before = REGISTRY.errors.get("engine.news_retry", 0)
+    complete = fake_complete(fail(LLMError("down")))
+
+    async def acomplete(*args, **kwargs):
+        return complete(*args, **kwargs)
+
+    news = asyncio.run(engine.agenerate_news("초등", acomplete))
+    assert news[2:] == [engine.NEWS_FAILED] * 3
+    assert REGISTRY.errors["engine.news_retry"] == before + 1
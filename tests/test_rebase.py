@@ -0,0 +1,120 @@
+import json
+
+import numpy as np
+import pytest
+
+import engine
+
+
+@pytest.fixture
+def base():
+    """저장소와 맞춘 시점의 (저장 JSON, sync_marker)."""
+    state = engine.new_state("초등", rng=np.random.default_rng(0))
+    json_data = engine.serialize_state(state)
+    return json_data, engine.sync_marker(json.loads(json_data))
+
+
+def fork(json_data):
+    """같은 저장본을 연 다른 탭의 상태."""
+    state = {"selected_level": "초등"}
+    engine.restore_state(state, json_data)
+    return state
+
+
+def saved(state):
+    return json.loads(engine.serialize_state(state))
+
+
+def pick(state, n):
+    """n 번째 종목의 (섹터, 종목, 가격)."""
+    sector, name = [(sector, name) for sector, stocks in state["stocks"].items() for name in stocks][n]
+    return sector, name, state["stocks"][sector][name]["current_price"]
+
+
+def advance(state, seed):
+    engine.apply_day(state, {}, [f"뉴스 {i}" for i in range(engine.NEWS_COUNT)], rng=np.random.default_rng(seed))
+
+
+def test_disjoint_trades_are_both_kept(base):
+    json_data, marker = base
+    mine, theirs = fork(json_data), fork(json_data)
+    cash = mine["portfolio"]["cash"]
+    sector_a, a, price_a = pick(mine, 0)
+    sector_b, b, price_b = pick(theirs, 1)
+    engine.buy_stock(mine, a, 2, sector_a)
+    engine.buy_stock(theirs, b, 3, sector_b)
+
+    merged, dropped, day_discarded = engine.rebase_state(marker, saved(mine), saved(theirs))
+
+    assert dropped == [] and not day_discarded
+    assert merged["portfolio"]["stocks"][a]["quantity"] == 2
+    assert merged["portfolio"]["stocks"][b]["quantity"] == 3
+    assert merged["portfolio"]["cash"] == cash - 2 * price_a - 3 * price_b
+    assert len(engine._ledger_rows(merged["ledger"])) == 2
+
+
+def test_trade_already_in_theirs_is_not_applied_twice(base):
+    json_data, marker = base
+    mine = fork(json_data)
+    sector, name, _ = pick(mine, 0)
+    engine.buy_stock(mine, name, 1, sector)
+    mine_saved = saved(mine)
+
+    merged, dropped, _ = engine.rebase_state(marker, mine_saved, json.loads(json.dumps(mine_saved)))
+
+    assert dropped == []
+    assert merged["portfolio"]["stocks"][name]["quantity"] == 1
+
+
+def test_conflicting_cash_drops_the_trade_that_no_longer_fits(base):
+    json_data, marker = base
+    mine, theirs = fork(json_data), fork(json_data)
+    cash = mine["portfolio"]["cash"]
+    sector_a, a, price_a = pick(mine, 0)
+    sector_b, b, price_b = pick(theirs, 1)
+    # 두 탭이 각자 잔액의 대부분을 쓰면 합쳤을 때 한쪽만 들어간다
+    engine.buy_stock(mine, a, int(cash * 0.8 // price_a), sector_a)
+    theirs_qty = int(cash * 0.8 // price_b)
+    engine.buy_stock(theirs, b, theirs_qty, sector_b)
+
+    merged, dropped, day_discarded = engine.rebase_state(marker, saved(mine), saved(theirs))
+
+    assert not day_discarded
+    assert [(t["ticker"], t["side"]) for t in dropped] == [(a, engine.BUY)]
+    assert a not in merged["portfolio"]["stocks"]
+    assert merged["portfolio"]["cash"] == cash - theirs_qty * price_b
+    assert merged["portfolio"]["cash"] >= 0
+
+
+def test_concurrent_day_advance_keeps_theirs_and_moves_my_trades(base):
+    json_data, marker = base
+    mine, theirs = fork(json_data), fork(json_data)
+    sector, name, price = pick(mine, 0)
+    engine.buy_stock(mine, name, 1, sector)
+    advance(mine, seed=1)
+    advance(theirs, seed=2)
+    theirs_saved = saved(theirs)
+
+    merged, dropped, day_discarded = engine.rebase_state(marker, saved(mine), theirs_saved)
+
+    assert day_discarded
+    assert dropped == []
+    assert merged["day_count"] == theirs_saved["day_count"] == 2
+    assert merged["stocks"] == theirs_saved["stocks"] # 주가는 저장된 쪽의 하루 진행을 따름
+    assert merged["portfolio"]["stocks"][name] == {"quantity": 1, "purchase_price": price} # 체결가는 그대로
+
+
+def test_one_sided_day_advance_leads_and_other_trades_follow(base):
+    json_data, marker = base
+    mine, theirs = fork(json_data), fork(json_data)
+    advance(mine, seed=1)
+    sector, name, price = pick(theirs, 0)
+    engine.buy_stock(theirs, name, 1, sector)
+    mine_saved = saved(mine)
+
+    merged, dropped, day_discarded = engine.rebase_state(marker, mine_saved, saved(theirs))
+
+    assert not day_discarded and dropped == []
+    assert merged["day_count"] == 2
+    assert merged["stocks"] == mine_saved["stocks"]
+    assert merged["portfolio"]["stocks"][name]["quantity"] == 1
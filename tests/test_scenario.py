@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import engine
+from scenario import compile_scenario
+
+
+@pytest.fixture
+def state():
+    return engine.new_state("초등", rng=np.random.default_rng(0))
+
+
+def test_precompiled_shocks_are_applied_on_their_day(state):
+    first, second = list(state["stocks"])[:2]
+    scenario = compile_scenario(
+        {"events": [{"day": 1, "title": "수출 호황", "sectors": {first: 1.0, second: -0.5}, "magnitude": 0.02, "decay": 0.5, "duration": 2}]},
+        list(state["stocks"]),
+    )
+    engine.update_stock_prices(state, rng=np.random.default_rng(1), scenario=scenario)
+    assert state["sector_news_impact"][first] == pytest.approx(0.02)
+    assert state["sector_news_impact"][second] == pytest.approx(-0.01)
+
+    state["day_count"] = 2
+    engine.update_stock_prices(state, rng=np.random.default_rng(2), scenario=scenario)
+    assert state["sector_news_impact"][first] == pytest.approx(0.01)
+
+    state["day_count"] = 3 # 시나리오가 끝난 날
+    engine.update_stock_prices(state, rng=np.random.default_rng(3), scenario=scenario)
+    assert state["sector_news_impact"] == {}
+
+
+def test_without_scenario_prices_still_move(state):
+    before = [info["current_price"] for stocks in state["stocks"].values() for info in stocks.values()]
+    engine.apply_day(state, {}, ["뉴스"] * engine.NEWS_COUNT, rng=np.random.default_rng(1))
+    after = [info["current_price"] for stocks in state["stocks"].values() for info in stocks.values()]
+    assert state["day_count"] == 2 and before != after
+
+
+def test_malformed_events_fail_at_compile_time(state):
+    with pytest.raises(ValueError, match="day"):
+        compile_scenario({"events": [{"day": 0, "sectors": "*", "magnitude": 0.01}]}, list(state["stocks"]))
+    with pytest.raises(ValueError, match="섹터"):
+        compile_scenario({"events": [{"day": 1, "sectors": ["없는 섹터"], "magnitude": 0.01}]}, list(state["stocks"]))
+
+
+def test_news_impacts_are_drawn_from_the_given_rng():
+    meanings = {"뉴스": {"explanation": "판매가 증가하고 실적이 좋아질 수 있어요.", "sectors": ["가"]}}
+    first = engine.news_sector_impacts(meanings, ["가", "나"], np.random.default_rng(7))
+    again = engine.news_sector_impacts(meanings, ["가", "나"], np.random.default_rng(7))
+    assert first == again and first["가"] > 0 and first["나"] == 0.0
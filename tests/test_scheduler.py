@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from scheduler import LLMScheduler, TokenBucket, load_rate_limits
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_the_per_minute_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock) # 초당 1
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock.now = 1000 # 최대 1분치까지만 채워짐
+    assert bucket.wait_time(60) == 0.0
+    assert bucket.wait_time(120) == 0.0 # 버킷보다 큰 요청은 가득 찼을 때 보냄
+    bucket.give_back(10)
+    assert bucket.level == 60
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(None)
+    bucket.take(10 ** 9)
+    assert bucket.wait_time(10 ** 9) == 0.0
+
+
+def test_load_rate_limits_overrides_defaults():
+    limits = load_rate_limits('{"tokens_per_minute": null}')
+    assert limits["tokens_per_minute"] is None
+    assert limits["requests_per_minute"] == 500
+
+
+def run_all(scheduler, jobs):
+    """(사용자, 등급, 이름) 목록을 한꺼번에 줄 세우고 실제로 보내진 순서를 돌려준다."""
+    order = []
+
+    async def request(name):
+        order.append(name)
+        return "ok", 0, 0
+
+    async def main():
+        await asyncio.gather(*(
+            scheduler.run(lambda name=name: request(name), user=user, priority=priority) for user, priority, name in jobs
+        ))
+
+    asyncio.run(main())
+    return order
+
+
+def limited_scheduler():
+    scheduler = LLMScheduler({"requests_per_minute": 6000, "tokens_per_minute": None})
+    scheduler.requests.level = 0 # 빈 버킷에서 시작해 모든 요청이 줄을 섬
+    return scheduler
+
+
+def test_higher_priority_goes_first_even_when_queued_later():
+    jobs = [("a", "batch", f"batch{i}") for i in range(3)]
+    jobs += [("b", "prefetch", f"prefetch{i}") for i in range(2)]
+    jobs += [("c", "interactive", f"interactive{i}") for i in range(2)]
+    order = run_all(limited_scheduler(), jobs)
+    assert order == ["interactive0", "interactive1", "prefetch0", "prefetch1", "batch0", "batch1", "batch2"]
+
+
+def test_users_take_turns_within_a_priority():
+    jobs = [("a", "interactive", f"a{i}") for i in range(3)] + [("b", "interactive", f"b{i}") for i in range(2)]
+    order = run_all(limited_scheduler(), jobs)
+    assert order == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_unknown_priority_is_rejected():
+    async def main():
+        await LLMScheduler().run(lambda: None, priority="urgent")
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_unused_reserved_tokens_are_given_back():
+    clock = FakeClock()
+    scheduler = LLMScheduler({"requests_per_minute": None, "tokens_per_minute": 1000}, clock=clock)
+
+    async def request():
+        return "ok", 100, 50
+
+    async def failing():
+        raise RuntimeError("upstream")
+
+    async def main():
+        await scheduler.run(request, tokens=400)
+        with pytest.raises(RuntimeError):
+            await scheduler.run(failing, tokens=400)
+
+    asyncio.run(main())
+    assert scheduler.tokens.level == 850 # 실제 사용량만 빠짐, 실패한 요청은 모두 돌려받음
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = LLMScheduler({"requests_per_minute": 60, "tokens_per_minute": None})
+    scheduler.requests.level = 0
+
+    async def main():
+        task = asyncio.ensure_future(scheduler.run(lambda: None, user="z"))
+        await asyncio.sleep(0.01)
+        assert scheduler.queue_depth() == 1
+        task.cancel()
+        await asyncio.sleep(0)
+        return scheduler.queue_depth()
+
+    assert asyncio.run(main()) == 0
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    scheduler = LLMScheduler()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        results = await asyncio.gather(*(scheduler.coalesce("key", call) for _ in range(5)))
+        later = await scheduler.coalesce("key", call) # 끝난 요청은 합치지 않음
+        return results, later
+
+    results, later = asyncio.run(main())
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert {result for result, _ in results} == {"answer"}
+    assert later == ("answer", False)
+    assert len(calls) == 2 and scheduler.coalesced == 4
+
+
+def test_coalesced_callers_share_the_failure():
+    scheduler = LLMScheduler()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise TimeoutError("slow")
+
+    async def main():
+        return await asyncio.gather(*(scheduler.coalesce("key", call) for _ in range(3)), return_exceptions=True)
+
+    async def retry():
+        return "answer"
+
+    assert all(isinstance(result, TimeoutError) for result in asyncio.run(main()))
+    assert asyncio.run(scheduler.coalesce("key", retry)) == ("answer", False) # 실패한 요청은 키를 놓아줌
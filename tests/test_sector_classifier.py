@@ -0,0 +1,43 @@
+import pytest
+
+from sector_classifier import RELATIVE_CUTOFF, SectorClassifier
+
+SECTORS = ["반도체", "자동차", "식품"]
+DOCUMENTS = [
+    "반도체 메모리 칩 웨이퍼 삼성전자 하이닉스",
+    "자동차 전기차 배터리 현대차 기아 완성차",
+    "식품 라면 과자 음료 농심 오리온",
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return SectorClassifier(SECTORS, DOCUMENTS)
+
+
+@pytest.mark.parametrize("article, sector", [
+    ("메모리 반도체 수출이 늘었다", "반도체"),
+    ("전기차 판매 호조", "자동차"),
+    ("라면 가격 인상", "식품"),
+])
+def test_top_sector_gets_full_weight(classifier, article, sector):
+    assert classifier.sector_weights([article]) == [{sector: 1.0}]
+
+
+def test_relative_cutoff_keeps_only_close_runners_up(classifier):
+    both, one = classifier.sector_weights(["반도체 메모리 자동차 전기차", "메모리 반도체 전기차 배터리 완성차"])
+    assert both["자동차"] == 1.0 and RELATIVE_CUTOFF <= both["반도체"] < 1.0
+    # 반도체 유사도가 자동차의 RELATIVE_CUTOFF 배에 못 미치면 빠짐
+    scores = classifier.scores(["메모리 반도체 전기차 배터리 완성차"])[0]
+    assert 0 < scores[0] < scores[1] * RELATIVE_CUTOFF
+    assert one == {"자동차": 1.0}
+
+
+def test_empty_or_unmatched_articles_have_no_sectors(classifier):
+    assert classifier.sector_weights(["", "xyz qwerty", "날씨가 맑다"]) == [{}, {}, {}]
+    assert classifier.sector_weights([]) == []
+
+
+def test_valid_sectors_masks_the_rest(classifier):
+    articles = ["메모리 반도체 수출이 늘었다", "라면 과자 반도체 메모리"]
+    assert classifier.sector_weights(articles, valid_sectors=["자동차", "식품"]) == [{}, {"식품": 1.0}]
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import engine
+from session_memory import SPILLED_KEY, TOKEN_KEY, SessionMemory
+from universe import load_universe
+
+
+@pytest.fixture
+def clock():
+    now = [0.0]
+    return now
+
+
+def new_session(memory, session_id, clock):
+    state = {"user_id": f"user{session_id}"}
+    engine.initialize_state(state, "초등", universe=load_universe(), force_reset=True)
+    memory.begin(session_id, state)
+    memory.end(session_id, state)
+    return state
+
+
+def test_sweep_only_marks_and_owner_spills_then_rehydrates(tmp_path, clock):
+    memory = SessionMemory(spill_dir=str(tmp_path), idle_seconds=100, total_budget_bytes=10 ** 12, clock=lambda: clock[0])
+    idle, busy = new_session(memory, 0, clock), new_session(memory, 1, clock)
+    before = json.loads(engine.serialize_state(idle))
+    clock[0] = 50
+    memory.begin(1, busy)
+    memory.end(1, busy)
+
+    clock[0] = 120
+    assert memory.sweep(force=True) == 1
+    assert "stocks" in idle # 표시만 하고 다른 세션의 상태는 건드리지 않음
+    assert not memory.idle(1, busy) # 아직 유휴 시간이 안 된 세션
+    assert memory.idle(0, idle)
+    assert SPILLED_KEY in idle and "stocks" not in idle and TOKEN_KEY in idle
+
+    memory.begin(0, idle)
+    memory.end(0, idle)
+    assert SPILLED_KEY not in idle
+    assert json.loads(engine.serialize_state(idle)) == before
+    assert (memory.spills, memory.rehydrations) == (1, 1)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_running_session_is_not_spilled(tmp_path, clock):
+    memory = SessionMemory(spill_dir=str(tmp_path), idle_seconds=10, clock=lambda: clock[0])
+    state = new_session(memory, 0, clock)
+    clock[0] = 20
+    memory.sweep(force=True)
+    memory.begin(0, state) # 표시된 뒤 실행이 시작되면 표시가 풀림
+    assert not memory.idle(0, state)
+    memory.end(0, state)
+    assert not memory.idle(0, state)
+    assert "stocks" in state
+
+
+def test_total_budget_marks_longest_idle_first(tmp_path, clock):
+    memory = SessionMemory(spill_dir=str(tmp_path), idle_seconds=1e9, clock=lambda: clock[0])
+    states = []
+    for session_id in range(3):
+        clock[0] = session_id * 10
+        states.append(new_session(memory, session_id, clock))
+    memory.total_budget_bytes = memory.total_bytes() - 1 # 한 세션만 내려두면 예산 안
+    clock[0] = 100
+    assert memory.sweep(force=True) == 1
+    assert [memory.idle(session_id, state) for session_id, state in enumerate(states)] == [True, False, False]
+
+
+def test_ended_session_is_forgotten(tmp_path, clock):
+    memory = SessionMemory(spill_dir=str(tmp_path), clock=lambda: clock[0])
+    state = new_session(memory, 0, clock)
+    del state[TOKEN_KEY] # 세션이 끝나 상태가 사라진 것과 같음
+    memory.sweep(force=True)
+    assert memory.report() == []
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from state_store import SQLiteStateStore, open_state_store, shared_key, user_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+
+def test_missing_key_has_version_zero(store):
+    assert store.get(user_key("kim")) == (None, 0)
+    assert store.version(user_key("kim")) == 0
+
+
+def test_compare_and_set_only_wins_on_the_expected_version(store):
+    key = user_key("kim")
+    assert store.put(key, "a", expected_version=0) == 1
+    assert store.put(key, "b", expected_version=0) is None # 이미 있는 키를 새로 만들려 함
+    assert store.put(key, "b", expected_version=1) == 2
+    assert store.put(key, "c", expected_version=1) is None # 다른 워커가 먼저 저장함
+    assert store.get(key) == ("b", 2)
+    assert store.put(key, "d") == 3 # 버전 없이 덮어쓰기
+    assert store.get(key) == ("d", 3)
+
+
+def test_two_connections_see_each_others_writes(store, tmp_path):
+    other = SQLiteStateStore(str(tmp_path / "state.db"))
+    key = user_key("lee")
+    version = store.put(key, "mine", expected_version=0)
+    assert other.put(key, "theirs", expected_version=version) == 2
+    assert store.put(key, "stale", expected_version=version) is None
+    assert store.get(key) == ("theirs", 2)
+    other.close()
+
+
+def test_concurrent_writers_exactly_one_wins_each_version(store):
+    key = user_key("park")
+    store.put(key, "0", expected_version=0)
+    results = []
+
+    def writer(n):
+        results.append(store.put(key, str(n), expected_version=1))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results, key=lambda v: v is None) == [2] + [None] * 7
+
+
+def test_counters_add_up(store):
+    key = shared_key("tokens", "초등")
+    assert store.counter(key) == 0
+    assert store.incr(key, 5) == 5
+    assert store.incr(key) == 6
+    assert store.counter(key) == 6
+
+
+def test_open_state_store_by_url(tmp_path):
+    assert open_state_store("") is None
+    assert isinstance(open_state_store(f"sqlite:///{tmp_path / 's.db'}"), SQLiteStateStore)
+    with pytest.raises(ValueError):
+        open_state_store("mysql://localhost/db")
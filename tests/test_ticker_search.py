@@ -0,0 +1,55 @@
+import pytest
+
+from ticker_search import TickerIndex, choseong, matches
+
+TICKERS = ["삼성전자우", "삼성전자", "SK하이닉스", "삼성SDI", "한국전력", "전자랜드"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TickerIndex(TICKERS)
+
+
+def test_choseong_keeps_non_hangul():
+    assert choseong("삼성전자") == "ㅅㅅㅈㅈ"
+    assert choseong("sk하이닉스") == "skㅎㅇㄴㅅ"
+
+
+def test_exact_name_beats_prefix_and_prefix_beats_infix(index):
+    assert index.search("삼성전자") == ["삼성전자", "삼성전자우"]
+    # 이름 앞부분(전자랜드) > 이름 중간, 중간끼리는 짧은 이름 먼저
+    assert index.search("전자") == ["전자랜드", "삼성전자", "삼성전자우"]
+
+
+def test_choseong_prefix_ranks_before_choseong_infix(index):
+    assert index.search("ㅈㅈ") == ["전자랜드", "삼성전자", "삼성전자우"]
+
+
+def test_choseong_ties_break_by_length_then_catalog_order(index):
+    assert index.search("ㅅㅅ") == ["삼성전자", "삼성전자우", "삼성SDI"]
+    assert index.search("ㅅㅅ", limit=1) == ["삼성전자"]
+
+
+def test_mixed_syllables_and_initials_compare_as_initials(index):
+    assert index.search("삼ㅅㅈ") == ["삼성전자", "삼성전자우"]
+
+
+def test_case_and_spaces_are_ignored(index):
+    assert index.search("sk 하이") == ["SK하이닉스"]
+    assert index.search("하이닉스") == ["SK하이닉스"]
+
+
+def test_empty_and_unknown_queries(index):
+    assert index.search("", limit=2) == TICKERS[:2]
+    assert index.search("카카오") == []
+    assert index.search("ㅋㅋ") == []
+
+
+def test_top_k_caps_each_node():
+    index = TickerIndex([f"종목{i}" for i in range(10)], top_k=3)
+    assert index.search("종목", limit=10) == ["종목0", "종목1", "종목2"]
+
+
+@pytest.mark.parametrize("query", ["삼성", "전자", "ㅈㅈ", "ㅅㅅ", "sk", "ㅎㄱ", "닉스"])
+def test_matches_agrees_with_the_index(index, query):
+    assert sorted(index.search(query, limit=len(TICKERS))) == sorted(t for t in TICKERS if matches(query, t))
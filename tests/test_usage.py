@@ -0,0 +1,31 @@
+import asyncio
+
+import numpy as np
+
+import engine
+from backends import FakeLLMBackend
+from usage import MeteredLLM
+
+
+def test_engine_call_sites_label_their_kind():
+    llm = MeteredLLM(FakeLLMBackend(seed=0), budgets={})
+    state = engine.new_state("초등", rng=np.random.default_rng(0))
+    state["user_id"] = "kim"
+    complete = llm.session(state).complete
+    state["daily_news"] = engine.generate_news("초등", complete)
+    engine.advance_day(state, complete, rng=np.random.default_rng(1), call_interval=0)
+
+    kinds = [row["kind"] for row in llm.meter.recent]
+    assert kinds.count("news") == 2
+    assert kinds.count("explanation") == engine.NEWS_COUNT
+    assert {row["user"] for row in llm.meter.recent} == {"kim"}
+
+
+def test_async_session_passes_kind_through():
+    llm = MeteredLLM(FakeLLMBackend(seed=0), budgets={})
+    acomplete = llm.session({"user_id": "lee", "selected_level": "중등", "day_count": 3}).acomplete
+    asyncio.run(acomplete(engine.build_explanation_prompt("중등", "기사"), temperature=0.5, max_tokens=10, kind="explanation"))
+    asyncio.run(acomplete("자유 질문", temperature=0.5, max_tokens=engine.NEWS_MAX_TOKENS))
+
+    # 최대 토큰 수가 아니라 부른 쪽이 넘긴 kind 로 기록된다
+    assert [(row["kind"], row["level"], row["day"]) for row in llm.meter.recent] == [("explanation", "중등", 3), ("llm", "중등", 3)]
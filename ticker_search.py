@@ -0,0 +1,121 @@
+from functools import lru_cache
+
+# --- 종목 검색 색인 ---
+# 종목명으로 바로 찾을 수 있도록 카탈로그마다 한 번 접두사 트라이(trie)를 만들어 둔다.
+#   이름 트라이: 소문자로 바꾸고 공백을 뺀 이름의 모든 접미사를 넣어, 이름 앞부분뿐 아니라 중간("하이닉스")으로도 찾는다.
+#   초성 트라이: 한글 음절을 초성으로 바꾼 이름("삼성전자" -> "ㅅㅅㅈㅈ")을 같은 방식으로 넣는다.
+# 노드마다 순위가 높은 종목 TOP_K 개를 미리 정렬해 두므로 검색은 검색어 길이만큼 내려가기만 하면 된다.
+# 순위: 이름과 일치 > 이름 앞부분 > 초성 앞부분 > 이름 중간 > 초성 중간, 같은 순위면 짧은 이름, 카탈로그 순서
+
+TOP_K = 50
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_HANGUL_FIRST, _HANGUL_LAST = 0xAC00, 0xD7A3
+_JAMO_FIRST, _JAMO_LAST = 0x3131, 0x314E   # 호환용 자음 (ㄱ ~ ㅎ)
+EXACT, PREFIX, CHOSEONG_PREFIX, INFIX, CHOSEONG_INFIX = range(5)
+
+
+def normalize(text):
+    return "".join(str(text).lower().split())
+
+
+def choseong(text):
+    """한글 음절은 초성으로 바꾸고 나머지 글자는 그대로 둔다 (normalize 된 글자 기준)."""
+    out = []
+    for char in text:
+        code = ord(char)
+        if _HANGUL_FIRST <= code <= _HANGUL_LAST:
+            out.append(CHOSEONG[(code - _HANGUL_FIRST) // 588])
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def has_jamo(text):
+    return any(_JAMO_FIRST <= ord(char) <= _JAMO_LAST for char in text)
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = {}   # 만드는 동안: 종목 번호 -> 가장 좋은 순위, 다 만든 뒤: 정렬된 종목 번호 list
+
+
+class TickerIndex:
+    """종목명/초성 접두사 검색 색인 (만든 뒤에는 읽기 전용이라 세션끼리 공유해도 됨)."""
+
+    def __init__(self, tickers, top_k=TOP_K):
+        self.tickers = list(tickers)
+        self.top_k = top_k
+        self._names = _Node()
+        self._initials = _Node()
+        # 순위를 정수 하나로: (종류, 이름 길이, 카탈로그 순서) 순으로 비교되도록 자리를 나눠 더함
+        count = max(1, len(self.tickers))
+        self._kind_scale = count * (max((len(t) for t in self.tickers), default=0) + 1)
+        for ticker_id, ticker in enumerate(self.tickers):
+            name = normalize(ticker)
+            initials = choseong(name)
+            base = len(ticker) * count + ticker_id
+            for start in range(len(name)):
+                self._insert(self._names, name[start:], self._rank(PREFIX if start == 0 else INFIX, base), ticker_id,
+                             exact=self._rank(EXACT, base) if start == 0 else None)
+                self._insert(self._initials, initials[start:], self._rank(CHOSEONG_PREFIX if start == 0 else CHOSEONG_INFIX, base), ticker_id)
+        self._finish(self._names, count)
+        self._finish(self._initials, count)
+
+    def _rank(self, kind, base):
+        return kind * self._kind_scale + base
+
+    @staticmethod
+    def _insert(root, key, rank, ticker_id, exact=None):
+        node = root
+        children = root.children
+        for char in key:
+            node = children.get(char)
+            if node is None:
+                node = children[char] = _Node()
+            if node.top.get(ticker_id, rank + 1) > rank:
+                node.top[ticker_id] = rank
+            children = node.children
+        if exact is not None:
+            node.top[ticker_id] = exact
+
+    def _finish(self, root, count):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.top = [rank % count for rank in sorted(node.top.values())[:self.top_k]]
+            stack.extend(node.children.values())
+
+    def search(self, query, limit=20):
+        """검색어와 맞는 종목명을 순위대로 최대 limit 개 (검색어가 비면 카탈로그 앞쪽 종목)."""
+        key = normalize(query)
+        if not key:
+            return self.tickers[:limit]
+        if has_jamo(key): # 초성이 섞인 검색어는 초성끼리 비교
+            node, key = self._initials, choseong(key)
+        else:
+            node = self._names
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [self.tickers[ticker_id] for ticker_id in node.top[:limit]]
+
+
+def matches(query, name):
+    """종목 하나가 검색어와 맞는지 (색인 없이 몇 개만 거를 때)."""
+    key = normalize(query)
+    if not key:
+        return True
+    name = normalize(name)
+    if has_jamo(key):
+        return choseong(key) in choseong(name)
+    return key in name
+
+
+@lru_cache(maxsize=4)
+def get_ticker_index(universe):
+    """카탈로그(StockUniverse) 별 검색 색인. load_universe 가 같은 객체를 돌려주는 동안 한 번만 만든다."""
+    return TickerIndex(universe.tickers)
@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# --- 구간 계측 (tracing) ---
+# with span("단계 이름") as s: ... 형태로 구간 시간을 재고, 단계별 히스토그램에 모은다.
+# s.record(prompt_tokens=..., completion_tokens=..., request_bytes=..., response_bytes=...) 로
+# 토큰 수와 주고받은 바이트 수도 단계별 합계로 함께 기록한다.
+# 기록은 프로세스 전체에서 공유하는 REGISTRY 에 쌓이며 Prometheus 텍스트 형식으로 내보낼 수 있다.
+
+# 히스토그램 구간 상한 (초). 마지막 +Inf 구간은 자동으로 추가됨
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "stockgame"
+# record() 로 받을 수 있는 값 (이름: Prometheus 지표 이름)
+COUNTER_METRICS = {
+    "prompt_tokens": "tokens_total",
+    "completion_tokens": "tokens_total",
+    "request_bytes": "payload_bytes_total",
+    "response_bytes": "payload_bytes_total",
+}
+
+
+class Histogram:
+    """고정 구간 누적 히스토그램 (Prometheus histogram 과 같은 구조)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """구간 안에서 선형 보간한 분위수 추정값 (관측이 없으면 0)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - cumulative) / bucket_count)
+            cumulative += bucket_count
+        return self.max
+
+
+class Registry:
+    """단계별 히스토그램과 토큰/바이트 합계를 모으는 저장소 (스레드 안전)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}  # (단계, 항목) -> 합계
+        self.errors = {}    # 단계 -> 예외 발생 횟수
+
+    def observe(self, stage, seconds, values=None, error=False):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+            for name, value in (values or {}).items():
+                self.counters[(stage, name)] = self.counters.get((stage, name), 0) + value
+            if error:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.errors.clear()
+
+    def summary(self):
+        """단계별 요약 행 목록 (화면 표 출력용)."""
+        with self._lock:
+            rows = []
+            for stage, histogram in sorted(self.histograms.items()):
+                row = {
+                    "단계": stage,
+                    "호출 수": histogram.count,
+                    "p50 (ms)": round(histogram.quantile(0.50) * 1000, 1),
+                    "p95 (ms)": round(histogram.quantile(0.95) * 1000, 1),
+                    "p99 (ms)": round(histogram.quantile(0.99) * 1000, 1),
+                    "최대 (ms)": round(histogram.max * 1000, 1),
+                    "평균 (ms)": round(histogram.sum / histogram.count * 1000, 1),
+                    "오류": self.errors.get(stage, 0),
+                }
+                for name in COUNTER_METRICS:
+                    row[name] = self.counters.get((stage, name), 0)
+                rows.append(row)
+            return rows
+
+    def to_prometheus(self):
+        """Prometheus 텍스트 노출 형식 문자열."""
+        with self._lock:
+            lines = [
+                f"# HELP {METRIC_PREFIX}_stage_duration_seconds Duration of instrumented stages.",
+                f"# TYPE {METRIC_PREFIX}_stage_duration_seconds histogram",
+            ]
+            for stage, histogram in sorted(self.histograms.items()):
+                label = _escape(stage)
+                cumulative = 0
+                for bound, bucket_count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{METRIC_PREFIX}_stage_duration_seconds_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_PREFIX}_stage_duration_seconds_sum{{stage="{label}"}} {histogram.sum:.6f}')
+                lines.append(f'{METRIC_PREFIX}_stage_duration_seconds_count{{stage="{label}"}} {histogram.count}')
+            for metric in sorted(set(COUNTER_METRICS.values())):
+                lines.append(f"# TYPE {METRIC_PREFIX}_stage_{metric} counter")
+                for (stage, name), value in sorted(self.counters.items()):
+                    if COUNTER_METRICS.get(name) == metric:
+                        kind = name.rsplit("_", 1)[0]  # prompt/completion, request/response
+                        lines.append(f'{METRIC_PREFIX}_stage_{metric}{{stage="{_escape(stage)}",kind="{kind}"}} {value}')
+            lines.append(f"# TYPE {METRIC_PREFIX}_stage_errors_total counter")
+            for stage, value in sorted(self.errors.items()):
+                lines.append(f'{METRIC_PREFIX}_stage_errors_total{{stage="{_escape(stage)}"}} {value}')
+            return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+class Span:
+    def __init__(self):
+        self.values = {}
+
+    def record(self, **values):
+        """토큰 수, 바이트 수 등을 이 구간에 더한다."""
+        for name, value in values.items():
+            if name not in COUNTER_METRICS:
+                raise ValueError(f"기록할 수 없는 항목입니다: {name}")
+            if value:
+                self.values[name] = self.values.get(name, 0) + value
+
+
+@contextmanager
+def span(stage, registry=None):
+    current = Span()
+    started = time.perf_counter()
+    error = False
+    try:
+        yield current
+    except Exception: # st.rerun/st.stop 같은 흐름 제어 예외는 오류로 세지 않음
+        error = True
+        raise
+    finally:
+        (registry or REGISTRY).observe(stage, time.perf_counter() - started, current.values, error=error)
+
+
+def traced(stage):
+    """함수 전체를 하나의 구간으로 계측하는 데코레이터."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
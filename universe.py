@@ -0,0 +1,153 @@
+import csv
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# --- 종목 카탈로그 (Stock Universe) ---
+# 종목명, 섹터, 초기 가격 범위(price band), 수준별 설명을 파일(CSV/JSON/Parquet)에서 읽어 온다.
+# 종목 수만큼 Python 분기를 타지 않도록 가격 범위는 배열로 보관하고 초기 가격은 한 번에 생성한다.
+
+DEFAULT_UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "stock_universe.csv")
+DEFAULT_PRICE_BAND = (50000, 150000)  # 카탈로그에 가격 범위가 없을 때 사용
+LEVEL_KEYS = ("초등", "중등", "고등")
+NO_DESCRIPTION = "설명 없음"
+
+
+class StockUniverse:
+    """열 단위로 보관되는 종목 카탈로그."""
+
+    def __init__(self, records):
+        self.tickers = []
+        self.sectors = []        # 섹터 이름 (카탈로그에 처음 나온 순서)
+        sector_ids = {}
+        sector_index, price_min, price_max = [], [], []
+        self.descriptions = {level: [] for level in LEVEL_KEYS}
+
+        for record in records:
+            ticker = str(record["ticker"]).strip()
+            sector = str(record["sector"]).strip()
+            if not ticker or not sector:
+                continue
+            if sector not in sector_ids:
+                sector_ids[sector] = len(self.sectors)
+                self.sectors.append(sector)
+            low = _to_int(record.get("price_min"), DEFAULT_PRICE_BAND[0])
+            high = _to_int(record.get("price_max"), DEFAULT_PRICE_BAND[1])
+            if low <= 0 or high < low:
+                raise ValueError(f"{ticker}: 가격 범위가 올바르지 않습니다 ({low} ~ {high}).")
+            self.tickers.append(ticker)
+            sector_index.append(sector_ids[sector])
+            price_min.append(low)
+            price_max.append(high)
+            for level in LEVEL_KEYS:
+                self.descriptions[level].append(record.get(f"description_{level}") or NO_DESCRIPTION)
+
+        if len(set(self.tickers)) != len(self.tickers):
+            raise ValueError("카탈로그에 중복된 종목명이 있습니다.")
+        self.sector_index = np.asarray(sector_index, dtype=np.int32)
+        self.price_min = np.asarray(price_min, dtype=np.int64)
+        self.price_max = np.asarray(price_max, dtype=np.int64)
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def sector_of(self, ticker):
+        return self.sectors[self.sector_index[self.ticker_index[ticker]]]
+
+    def description(self, ticker, level):
+        descriptions = self.descriptions.get(level, self.descriptions["중등"])
+        return descriptions[self.ticker_index[ticker]]
+
+    def generate_initial_prices(self, rng=None):
+        """종목별 가격 범위 안에서 초기 가격을 한 번에 생성한다 (양 끝 포함)."""
+        rng = rng if rng is not None else np.random.default_rng()
+        return rng.integers(self.price_min, self.price_max, endpoint=True)
+
+    def build_stocks_state(self, rng=None):
+        """세션 상태의 stocks 구조 ({섹터: {종목: 정보}})를 만든다."""
+        prices = self.generate_initial_prices(rng).tolist()
+        stocks = {sector: {} for sector in self.sectors}
+        sector_names = [self.sectors[i] for i in self.sector_index.tolist()]
+        for i, (ticker, sector, price) in enumerate(zip(self.tickers, sector_names, prices)):
+            stocks[sector][ticker] = {
+                "current_price": price,
+                "price_history": [price],  # 초기 가격 기록
+                **{f"description_{level}": self.descriptions[level][i] for level in LEVEL_KEYS},
+            }
+        return stocks
+
+
+def _to_int(value, default):
+    if value is None or value == "":
+        return default
+    return int(float(value))
+
+
+def _read_records(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            return list(csv.DictReader(f))
+    if extension == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("stocks", []) if isinstance(data, dict) else data
+    if extension == ".parquet":
+        import pandas as pd  # Parquet 카탈로그를 쓸 때만 필요
+        return pd.read_parquet(path).to_dict("records")
+    raise ValueError(f"지원하지 않는 카탈로그 형식입니다: {path}")
+
+
+@lru_cache(maxsize=8)
+def _load_universe_cached(path, mtime):
+    return StockUniverse(_read_records(path))
+
+
+def load_universe(path=None):
+    """카탈로그 파일을 읽어 StockUniverse 로 반환한다 (파일이 바뀌지 않으면 캐시 사용)."""
+    path = os.path.abspath(path or os.environ.get("STOCK_UNIVERSE_PATH") or DEFAULT_UNIVERSE_PATH)
+    return _load_universe_cached(path, os.path.getmtime(path))
+
+
+def synthetic_universe(n_stocks, base=None, seed=0):
+    """기본 카탈로그의 섹터/가격 범위를 바탕으로 n_stocks 개 종목의 대형 카탈로그를 만든다."""
+    base = base or load_universe()
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(base), size=n_stocks)
+    records = []
+    for i, pick in enumerate(picks.tolist()):
+        ticker = base.tickers[pick]
+        records.append({
+            "ticker": f"{ticker} {i + 1:05d}",
+            "sector": base.sectors[base.sector_index[pick]],
+            "price_min": int(base.price_min[pick]),
+            "price_max": int(base.price_max[pick]),
+            **{f"description_{level}": base.descriptions[level][pick] for level in LEVEL_KEYS},
+        })
+    return StockUniverse(records)
+
+
+def write_universe_csv(universe, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["ticker", "sector", "price_min", "price_max"] + [f"description_{level}" for level in LEVEL_KEYS])
+        for i, ticker in enumerate(universe.tickers):
+            writer.writerow(
+                [ticker, universe.sectors[universe.sector_index[i]], int(universe.price_min[i]), int(universe.price_max[i])]
+                + [universe.descriptions[level][i] for level in LEVEL_KEYS]
+            )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="대형 모의 종목 카탈로그(CSV) 생성")
+    parser.add_argument("n_stocks", type=int, help="생성할 종목 수")
+    parser.add_argument("-o", "--output", default="stock_universe_large.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_universe_csv(synthetic_universe(args.n_stocks, seed=args.seed), args.output)
+    print(f"{args.n_stocks}개 종목 카탈로그를 {args.output} 에 저장했습니다.")
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import date
+
+from backends import FakeLLMBackend, estimate_tokens
+from hedging import LatencyGuard
+from scheduler import LLMScheduler
+from state_store import shared_key
+from tracing import span
+
+# --- LLM 토큰/비용 계량과 예산 ---
+# 모든 LLM 호출의 prompt/completion 토큰 수를 호출·사용자·수준·게임 날짜(Day)별로 기록하고,
+# 수준(학급)별 하루 예산을 넘으면 더 싼 모델 → 캐시/오프라인 뉴스 순서로 단계를 낮춘다.
+#   primary: 기본 모델
+#   cheap:   수준 전체 사용량이 cheap_after_tokens 이상일 때 (cheap 백엔드가 없으면 primary 유지)
+#   offline: 수준 전체 사용량이 offline_after_tokens 이상이거나 한 사용자가 user_daily_tokens 를 넘었을 때
+#            같은 프롬프트의 캐시된 응답을 재사용하고, 없으면 오프라인 백엔드(뉴스 코퍼스 또는 FakeLLMBackend)로 대신함
+# 예산은 실제 날짜(달력 기준 하루) 단위로 다시 채워진다.
+# 비동기 경로(acomplete)의 호출은 종류별 마감 시간과 헤지 요청을 적용하고 (hedging.py),
+# 마감 시간이 지나면 offline 단계와 같은 순서(캐시 → 오프라인 백엔드)로 대신한다 (tier "deadline" 으로 기록).
+# 비동기 경로의 업스트림 요청은 프로세스 공용 스케줄러(scheduler.py)의 우선순위 줄과 분당 한도를 거쳐 나가고,
+# 진행 중인 같은 요청에 합쳐진 호출은 model "coalesced", 토큰 0 으로 기록된다.
+# 공용 저장소(shared)나 기록 파일을 쓰는 계량기의 조회/기록은 비동기 경로에서 작업 스레드로 넘긴다 (공용 루프를 막지 않음).
+
+# 모델별 100만 토큰당 가격 (USD, 입력/출력)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "fake": (0.0, 0.0),
+    "corpus": (0.0, 0.0),
+    "cache": (0.0, 0.0),
+    "offline": (0.0, 0.0),
+    "coalesced": (0.0, 0.0),
+}
+# 수준별 하루 토큰 예산 (LLM_BUDGETS 환경 변수의 JSON 으로 수준별 항목을 덮어쓸 수 있음)
+# 하루 지나기 한 번에 해설 5건 + 뉴스 1건, 대략 4~6천 토큰을 쓴다.
+DEFAULT_BUDGETS = {
+    "초등": {"user_daily_tokens": 60_000, "cheap_after_tokens": 3_000_000, "offline_after_tokens": 6_000_000},
+    "중등": {"user_daily_tokens": 80_000, "cheap_after_tokens": 4_000_000, "offline_after_tokens": 8_000_000},
+    "고등": {"user_daily_tokens": 100_000, "cheap_after_tokens": 5_000_000, "offline_after_tokens": 10_000_000},
+}
+RECENT_CALLS = 1000      # 메모리에 남겨 두는 최근 호출 기록 수
+CACHE_PROMPTS = 256      # 응답 캐시에 보관하는 프롬프트 수
+CACHE_RESPONSES = 4      # 프롬프트당 보관하는 응답 수 (뉴스처럼 같은 프롬프트에서 여러 응답을 돌려 쓰기 위함)
+
+
+def load_budgets(text=None):
+    """기본 예산에 LLM_BUDGETS(JSON) 의 수준별 값을 덮어쓴 예산 표."""
+    budgets = {level: dict(values) for level, values in DEFAULT_BUDGETS.items()}
+    text = os.environ.get("LLM_BUDGETS") if text is None else text
+    if text:
+        for level, values in json.loads(text).items():
+            budgets.setdefault(level, {}).update(values)
+    return budgets
+
+
+def token_cost(model, prompt_tokens, completion_tokens):
+    """토큰 수에 해당하는 비용 (USD). 가격표에 없는 모델은 0."""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class UsageMeter:
+    """LLM 호출별 토큰 사용량을 모으는 계량기 (스레드 안전).
+
+    호출 기록은 최근 RECENT_CALLS 건만 메모리에 두고, journal_path 가 있으면 JSON Lines 로 덧붙인다.
+    예산 판단과 보고서에 필요한 합계는 기록할 때마다 갱신해 둔다.
+    shared (state_store 의 저장소) 가 있으면 예산 판단용 하루 토큰 합계를 그 카운터에 모아 모든 앱 프로세스가 함께 본다.
+    """
+
+    def __init__(self, journal_path=None, today=date.today, shared=None):
+        self.journal_path = journal_path
+        self.today = today
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=RECENT_CALLS)
+        self._user_tokens = {}   # (날짜, 사용자) -> 토큰 수
+        self._level_tokens = {}  # (날짜, 수준) -> 토큰 수
+        self._by_day = {}        # (수준, Day) -> 합계 dict
+
+    def record(self, user, level, day, kind, model, tier, prompt_tokens, completion_tokens):
+        """호출 한 건을 기록하고 비용(USD)을 돌려준다."""
+        cost = token_cost(model, prompt_tokens, completion_tokens)
+        tokens = prompt_tokens + completion_tokens
+        today = self.today().isoformat()
+        row = {
+            "ts": time.time(), "date": today, "user": user, "level": level, "day": day, "kind": kind,
+            "model": model, "tier": tier, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "cost": cost,
+        }
+        with self._lock:
+            self.recent.append(row)
+            self._user_tokens[(today, user)] = self._user_tokens.get((today, user), 0) + tokens
+            self._level_tokens[(today, level)] = self._level_tokens.get((today, level), 0) + tokens
+            totals = self._by_day.get((level, day))
+            if totals is None:
+                totals = self._by_day[(level, day)] = {
+                    "calls": 0, "degraded": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0, "users": set(),
+                }
+            totals["calls"] += 1
+            totals["degraded"] += tier != "primary"
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost"] += cost
+            totals["users"].add(user)
+            if self.journal_path:
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        if self.shared is not None:
+            self.shared.incr(shared_key("tokens", today, "user", user), tokens)
+            self.shared.incr(shared_key("tokens", today, "level", level), tokens)
+        return cost
+
+    @property
+    def blocking(self):
+        """기록/조회가 공용 저장소나 파일 I/O 를 하는지 (그렇다면 이벤트 루프에서는 작업 스레드로 넘겨야 함)."""
+        return self.shared is not None or bool(self.journal_path)
+
+    def user_tokens(self, user):
+        today = self.today().isoformat()
+        if self.shared is not None:
+            return self.shared.counter(shared_key("tokens", today, "user", user))
+        with self._lock:
+            return self._user_tokens.get((today, user), 0)
+
+    def level_tokens(self, level):
+        today = self.today().isoformat()
+        if self.shared is not None:
+            return self.shared.counter(shared_key("tokens", today, "level", level))
+        with self._lock:
+            return self._level_tokens.get((today, level), 0)
+
+    def report_by_day(self):
+        """수준·게임 날짜(Day)별 호출 수, 토큰, 비용 행 목록 (화면 표 출력용)."""
+        with self._lock:
+            rows = []
+            for (level, day), totals in sorted(self._by_day.items(), key=lambda item: (str(item[0][0]), item[0][1] or 0)):
+                users = len(totals["users"])
+                rows.append({
+                    "수준": level,
+                    "Day": day,
+                    "호출 수": totals["calls"],
+                    "대체 호출": totals["degraded"],
+                    "사용자 수": users,
+                    "prompt_tokens": totals["prompt_tokens"],
+                    "completion_tokens": totals["completion_tokens"],
+                    "비용 (USD)": round(totals["cost"], 6),
+                    "사용자당 비용 (USD)": round(totals["cost"] / users, 6) if users else 0.0,
+                })
+            return rows
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self._user_tokens.clear()
+            self._level_tokens.clear()
+            self._by_day.clear()
+
+
+class _ResponseCache:
+    """프롬프트별 최근 응답 몇 개를 보관하는 LRU 캐시."""
+
+    def __init__(self, max_prompts=CACHE_PROMPTS, per_prompt=CACHE_RESPONSES):
+        self.max_prompts = max_prompts
+        self.per_prompt = per_prompt
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+
+    def put(self, prompt, content):
+        with self._lock:
+            responses = self._entries.get(prompt)
+            if responses is None:
+                responses = self._entries[prompt] = deque(maxlen=self.per_prompt)
+            responses.append(content)
+            self._entries.move_to_end(prompt)
+            while len(self._entries) > self.max_prompts:
+                self._entries.popitem(last=False)
+
+    def get(self, prompt):
+        with self._lock:
+            responses = self._entries.get(prompt)
+            if not responses:
+                return None
+            self._entries.move_to_end(prompt)
+            return self._rng.choice(responses)
+
+
+class MeteredLLM:
+    """사용량을 계량하고 수준별 예산에 따라 모델 단계를 고르는 LLM 백엔드 래퍼.
+
+    엔진에는 session(state).complete (비동기 경로는 .acomplete) 를 넘긴다. 호출 시점의 user_id, selected_level, day_count 로 기록된다.
+    guard(LatencyGuard) 의 마감 시간/헤지는 비동기 경로에만 적용된다 (동기 complete 는 백엔드를 그대로 기다림).
+    """
+
+    def __init__(self, primary, meter=None, budgets=None, cheap=None, offline=None, guard=None, scheduler=None):
+        self.primary = primary
+        self.cheap = cheap
+        self.offline = offline or FakeLLMBackend()
+        self.meter = meter or UsageMeter()
+        self.budgets = budgets if budgets is not None else load_budgets()
+        self.guard = guard or LatencyGuard()
+        self.scheduler = scheduler or LLMScheduler()
+        self.cache = _ResponseCache()
+
+    def tier(self, user, level):
+        """지금 이 사용자/수준이 써야 할 단계 (primary/cheap/offline)."""
+        budget = self.budgets.get(level, {})
+        level_tokens = self.meter.level_tokens(level)
+        if level_tokens >= budget.get("offline_after_tokens", float("inf")):
+            return "offline"
+        if self.meter.user_tokens(user) >= budget.get("user_daily_tokens", float("inf")):
+            return "offline"
+        if level_tokens >= budget.get("cheap_after_tokens", float("inf")) and self.cheap is not None:
+            return "cheap"
+        return "primary"
+
+    def complete(self, prompt, temperature, max_tokens, user=None, level=None, day=None, kind="llm", json_mode=False):
+        tier = self.tier(user, level)
+        if tier == "offline":
+            return self._complete_offline(prompt, temperature, max_tokens, user, level, day, kind, json_mode)
+        backend = self.cheap if tier == "cheap" else self.primary
+        content, prompt_tokens, completion_tokens = backend.complete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode)
+        return self._record(content, backend, tier, prompt, user, level, day, kind, prompt_tokens, completion_tokens)
+
+    async def _off_loop(self, fn, *args, **kwargs):
+        """계량기가 공용 저장소(SQLite/Redis)나 파일을 건드리면 작업 스레드에서 실행한다 (공용 루프의 다른 세션 I/O 를 막지 않음)."""
+        if self.meter.blocking:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    async def acomplete(self, prompt, temperature, max_tokens, user=None, level=None, day=None, kind="llm", json_mode=False,
+                        priority="interactive"):
+        """complete 의 비동기 버전. 스케줄러의 priority 등급 줄에서 차례를 기다리고, 마감 시간 안에 답이 없으면 캐시/오프라인 응답으로 대신한다."""
+        tier = await self._off_loop(self.tier, user, level)
+        if tier == "offline":
+            return await self._off_loop(self._complete_offline, prompt, temperature, max_tokens, user, level, day, kind, json_mode)
+        backend = self.cheap if tier == "cheap" else self.primary
+
+        def send(): # 헤지 요청도 따로 줄을 서고 한도에 포함된다
+            return self.scheduler.run(
+                lambda: backend.acomplete_with_usage(prompt, temperature, max_tokens, json_mode=json_mode),
+                user=user, priority=priority, tokens=estimate_tokens(prompt) + max_tokens,
+            )
+
+        # 마감 시간과 헤지는 학생이 기다리는 interactive 요청에만 (미리 받기/일괄 작업은 늦더라도 실제 응답을 기다림)
+        call = (lambda: self.guard.call(kind, send)) if priority == "interactive" else send
+        try:
+            (content, prompt_tokens, completion_tokens), shared = await self.scheduler.coalesce(
+                (backend.model, prompt, temperature, max_tokens, json_mode), call,
+            )
+        except TimeoutError:
+            with span("llm.deadline_fallback"):
+                return await self._off_loop(
+                    self._complete_offline, prompt, temperature, max_tokens, user, level, day, kind, json_mode, tier="deadline",
+                )
+        if shared:
+            await self._off_loop(self.meter.record, user, level, day, kind, "coalesced", tier, 0, 0)
+            return content
+        return await self._off_loop(self._record, content, backend, tier, prompt, user, level, day, kind, prompt_tokens, completion_tokens)
+
+    def _complete_offline(self, prompt, temperature, max_tokens, user, level, day, kind, json_mode, tier="offline"):
+        content = self.cache.get(prompt)
+        if content is not None:
+            self.meter.record(user, level, day, kind, "cache", tier, 0, 0)
+            return content
+        # 오프라인 대체는 로컬에서 바로 답하고 과금되지 않으므로 토큰 0 으로 기록
+        content = self.offline.complete(prompt, temperature, max_tokens, json_mode=json_mode)
+        self.meter.record(user, level, day, kind, "offline", tier, 0, 0)
+        return content
+
+    def _record(self, content, backend, tier, prompt, user, level, day, kind, prompt_tokens, completion_tokens):
+        self.meter.record(user, level, day, kind, backend.model, tier, prompt_tokens, completion_tokens)
+        self.cache.put(prompt, content)
+        return content
+
+    def session(self, state, priority="interactive"):
+        """state 의 사용자/수준/날짜로 기록하는 세션용 LLM. priority 는 비동기 경로의 스케줄러 등급."""
+        return _SessionLLM(self, state, priority)
+
+
+class _SessionLLM:
+    def __init__(self, metered, state, priority="interactive"):
+        self._metered = metered
+        self._state = state
+        self._priority = priority
+
+    def _labels(self):
+        state = self._state
+        return {"user": state.get("user_id"), "level": state.get("selected_level", "초등"), "day": state.get("day_count", 1)}
+
+    def complete(self, prompt, temperature, max_tokens, json_mode=False, kind="llm"):
+        return self._metered.complete(prompt, temperature, max_tokens, json_mode=json_mode, kind=kind, **self._labels())
+
+    async def acomplete(self, prompt, temperature, max_tokens, json_mode=False, kind="llm"):
+        # 공용 루프에서는 st.session_state 를 읽을 수 없으므로 state 는 일반 dict 로 넘긴다 (app.session_llm)
+        return await self._metered.acomplete(
+            prompt, temperature, max_tokens, json_mode=json_mode, kind=kind, priority=self._priority, **self._labels(),
+        )